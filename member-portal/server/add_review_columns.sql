@@ -1,3 +1,7 @@
+-- NOTE: The canonical definition of member_users, loan_applications and
+-- loan_review_history now lives in member-portal/server/loan_schema.py.
+-- Prefer `python loan_cli.py --migrate` over running this script by hand.
+
 -- Script to add review columns to existing loan_applications table
 -- Run this if you already have a loan_applications table and need to add review columns
 
@@ -0,0 +1,121 @@
+"""
+Helpers shared by the benchmark scripts: throwaway database settings,
+synthetic uploads and latency summaries.
+"""
+
+import io
+import os
+import statistics
+import struct
+import subprocess
+import uuid
+
+import psycopg2
+from PIL import Image
+
+import loan_schema
+
+
+def bench_db_config():
+    """Database settings for the throwaway benchmark database."""
+    return {
+        'host': os.environ.get('BENCH_DB_HOST', 'localhost'),
+        'database': os.environ.get('BENCH_DB_NAME', 'slz_bench'),
+        'user': os.environ.get('BENCH_DB_USER', 'postgres'),
+        'password': os.environ.get('BENCH_DB_PASSWORD', 'password'),
+        'port': int(os.environ.get('BENCH_DB_PORT', '5432')),
+    }
+
+
+class BytesUpload:
+    """Minimal werkzeug FileStorage stand-in backed by bytes."""
+
+    def __init__(self, content, filename):
+        self.filename = filename
+        self.stream = io.BytesIO(content)
+
+    def read(self, size=-1):
+        return self.stream.read(size)
+
+    def seek(self, position, whence=0):
+        return self.stream.seek(position, whence)
+
+    def tell(self):
+        return self.stream.tell()
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.stream.getvalue())
+
+
+def synthetic_jpeg(width, height, quality=90):
+    """Return JPEG bytes of random noise, which compresses about as badly as a phone scan."""
+    img = Image.frombytes('RGB', (width, height), os.urandom(width * height * 3))
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def unique_jpeg(content):
+    """
+    Return ``content`` with a random JPEG comment segment after SOI.
+
+    The image is unchanged but the bytes (and SHA-256) differ, so repeated
+    submissions are not deduplicated by the content-addressed store.
+    """
+    comment = uuid.uuid4().bytes
+    return content[:2] + b'\xff\xfe' + struct.pack('>H', len(comment) + 2) + comment + content[2:]
+
+
+def create_member(conn):
+    """Insert one active member and return its user_id."""
+    member_id = str(uuid.uuid4())
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO member_users (user_id, user_name, user_email, user_password, member_number, is_active) "
+        "VALUES (%s, %s, %s, %s, %s, true)",
+        (member_id, 'Bench Member', f'bench-{member_id}@example.com', 'x', f'BENCH-{member_id[:8]}')
+    )
+    cursor.close()
+    return member_id
+
+
+def prepare_database(db_config):
+    """Apply the canonical schema and create one active member to submit as."""
+    conn = psycopg2.connect(**db_config)
+    try:
+        loan_schema.apply_migrations(conn)
+        member_id = create_member(conn)
+        conn.commit()
+        return member_id
+    finally:
+        conn.close()
+
+
+def latency_summary(latencies):
+    """Mean, p50/p95/p99 and max of a list of durations in seconds, reported in milliseconds."""
+    latencies = sorted(latencies)
+
+    def percentile(p):
+        index = min(len(latencies) - 1, int(round(p / 100.0 * (len(latencies) - 1))))
+        return latencies[index] * 1000
+
+    return {
+        'iterations': len(latencies),
+        'mean': statistics.mean(latencies) * 1000,
+        'p50': percentile(50),
+        'p95': percentile(95),
+        'p99': percentile(99),
+        'max': latencies[-1] * 1000,
+    }
+
+
+def git_revision():
+    """Current commit of the checkout, or None outside a git work tree."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
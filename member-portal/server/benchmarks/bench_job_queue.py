@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark submit latency with upload post-processing inline versus on the
+job queue, and job throughput by number of worker processes.
+
+"inline" submits with normalization and derivatives in the request, as
+before. "background" sets post_process_in_background, so submit only queues
+a process_upload job. Each process count then drains:
+
+- process_upload jobs, which are CPU-bound; they scale with worker processes
+  up to the number of cores;
+- sleep jobs (a fixed wait), which only exercise claiming and completing, so
+  their throughput shows the queue's own scaling whatever the core count.
+
+Run it against a throwaway database, never production:
+
+    BENCH_DB_NAME=slz_bench python benchmarks/bench_job_queue.py --iterations 40 --processes 1,2,4
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_common import (BytesUpload, bench_db_config, latency_summary, prepare_database,  # noqa: E402
+                          synthetic_jpeg, unique_jpeg)
+import job_queue  # noqa: E402
+from loan_application_service import LoanApplicationService, job_handlers  # noqa: E402
+
+BENCH_QUEUE = 'bench'
+
+
+def handlers(db_config):
+    """Worker handlers: the service's, plus a fixed-wait job."""
+    def sleep(payload):
+        time.sleep(payload['seconds'])
+    return dict(job_handlers(db_config), sleep=sleep)
+
+
+def submit_all(service, member_id, content, iterations):
+    latencies = []
+    for _ in range(iterations):
+        upload = BytesUpload(unique_jpeg(content), 'scan.jpg')
+        started = time.perf_counter()
+        result = service.submit_loan_application(member_id, upload)
+        latencies.append(time.perf_counter() - started)
+        if not result['success']:
+            raise RuntimeError(result['message'])
+    return latencies_ms(latencies)
+
+
+def latencies_ms(latencies):
+    return {name: round(value, 2) if isinstance(value, float) else value
+            for name, value in latency_summary(latencies).items()}
+
+
+def drain(db_config, queue, processes):
+    with contextlib.redirect_stdout(sys.stderr):
+        counters = job_queue.run_workers(db_config, handlers_spec='bench_job_queue:handlers',
+                                         processes=processes, queues=(queue,), drain=True)
+    if counters['jobs'] != counters['succeeded']:
+        raise RuntimeError(f'Jobs failed: {counters}')
+    return {'processes': processes, 'jobs': counters['jobs'], 'seconds': counters['seconds'],
+            'jobs_per_second': counters['jobs_per_second']}
+
+
+def run(iterations, width, height, process_counts, sleep_jobs, sleep_seconds):
+    db_config = bench_db_config()
+    member_id = prepare_database(db_config)
+    content = synthetic_jpeg(width, height)
+    workdir = tempfile.mkdtemp(prefix='bench_jobs_')
+    # The service's upload folder is relative, so workers find the same files
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            service = LoanApplicationService(db_config, {'min_size': 1, 'max_size': 1})
+        service.ensure_schema()
+        service.normalize_uploads = True
+
+        submit = {'inline': submit_all(service, member_id, content, iterations)}
+        service.post_process_in_background = True
+
+        uploads = []
+        for processes in process_counts:
+            submit['background'] = submit_all(service, member_id, content, iterations)
+            uploads.append(drain(db_config, job_queue.UPLOADS_QUEUE, processes))
+
+        sleeps = []
+        conn = psycopg2.connect(**db_config)
+        try:
+            for processes in process_counts:
+                for _ in range(sleep_jobs):
+                    job_queue.enqueue(conn, BENCH_QUEUE, 'sleep', {'seconds': sleep_seconds})
+                conn.commit()
+                sleeps.append(drain(db_config, BENCH_QUEUE, processes))
+        finally:
+            conn.close()
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'benchmark': 'job_queue',
+        'file_bytes': len(content),
+        'cpu_count': os.cpu_count(),
+        'submit_latency_ms': submit,
+        'process_upload': uploads,
+        'sleep': {'seconds_per_job': sleep_seconds, 'results': sleeps},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=40, help='Submits per round')
+    parser.add_argument('--width', type=int, default=1600)
+    parser.add_argument('--height', type=int, default=1200)
+    parser.add_argument('--processes', default='1,2,4', help='Comma-separated worker process counts')
+    parser.add_argument('--sleep-jobs', type=int, default=400)
+    parser.add_argument('--sleep-ms', type=float, default=20.0)
+    parser.add_argument('--output', help='Write the JSON report to this file as well as stdout')
+    args = parser.parse_args()
+
+    report = run(args.iterations, args.width, args.height,
+                 [int(count) for count in args.processes.split(',')],
+                 args.sleep_jobs, args.sleep_ms / 1000.0)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
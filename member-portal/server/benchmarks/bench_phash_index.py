@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Lookup latency of the payment reference HammingIndex as the corpus grows.
+
+For each corpus size the index is filled with random 64-bit pHash/dHash
+pairs. It is then queried with hashes a few bits away from stored ones, the
+way a re-saved screenshot is. Each query is also answered by a linear numpy
+scan over the whole corpus, which gives the baseline and checks that both
+return the same matches.
+
+Random hashes spread evenly over the chunk buckets. Real pHashes cluster
+(many receipts share a layout), so treat these numbers as the best case for
+bucket occupancy. No database is needed:
+
+    python benchmarks/bench_phash_index.py --sizes 10000,100000,1000000 --output phash.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_common import git_revision, latency_summary  # noqa: E402
+from payment_reference_hashes import (  # noqa: E402
+    DHASH_THRESHOLD, PHASH_THRESHOLD, HammingIndex, _popcount
+)
+
+DEFAULT_SIZES = (10000, 100000, 1000000)
+
+
+def random_hashes(rng, count):
+    return rng.integers(0, np.iinfo(np.uint64).max, size=count, dtype=np.uint64, endpoint=True)
+
+
+def flip_bits(rng, value, bits):
+    """``value`` with ``bits`` distinct random bits flipped."""
+    for bit in rng.choice(64, size=bits, replace=False):
+        value ^= 1 << int(bit)
+    return value
+
+
+def linear_search(phashes, dhashes, ids, phash_value, dhash_value):
+    """Reference answer: exact distances against every stored hash."""
+    phash_distances = _popcount(phashes ^ np.uint64(phash_value))
+    dhash_distances = _popcount(dhashes ^ np.uint64(dhash_value))
+    keep = (phash_distances <= PHASH_THRESHOLD) & (dhash_distances <= DHASH_THRESHOLD)
+    return sorted(ids[keep].tolist())
+
+
+def bench_size(rng, size, iterations):
+    phashes, dhashes = random_hashes(rng, size), random_hashes(rng, size)
+    ids = np.arange(1, size + 1, dtype=np.int64)
+
+    started = time.perf_counter()
+    index = HammingIndex()
+    index.extend(zip(ids.tolist(), phashes.tolist(), dhashes.tolist()))
+    build_seconds = time.perf_counter() - started
+
+    queries = []
+    for position in rng.integers(0, size, size=iterations):
+        queries.append((
+            flip_bits(rng, int(phashes[position]), int(rng.integers(0, PHASH_THRESHOLD + 1))),
+            flip_bits(rng, int(dhashes[position]), int(rng.integers(0, DHASH_THRESHOLD + 1)))
+        ))
+
+    indexed, scanned, candidates, mismatches = [], [], [], 0
+    for phash_value, dhash_value in queries:
+        started = time.perf_counter()
+        found = index.search(phash_value, PHASH_THRESHOLD, dhash_value, DHASH_THRESHOLD)
+        indexed.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        expected = linear_search(phashes, dhashes, ids, phash_value, dhash_value)
+        scanned.append(time.perf_counter() - started)
+
+        candidates.append(len(np.unique(index._candidates(phash_value, PHASH_THRESHOLD))))
+        if sorted(entry_id for entry_id, _, _ in found) != expected:
+            mismatches += 1
+
+    return {
+        'build_seconds': round(build_seconds, 3),
+        'index_mb': round(index.nbytes() / 1024 / 1024, 1),
+        'chunks': index.chunks,
+        'mean_candidates': round(float(np.mean(candidates)), 1),
+        'mismatches': mismatches,
+        'index_search': latency_summary(indexed),
+        'linear_scan': latency_summary(scanned),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--sizes', default=','.join(str(n) for n in DEFAULT_SIZES),
+                        help='Comma-separated corpus sizes')
+    parser.add_argument('--seed', type=int, default=20251015)
+    parser.add_argument('--output', help='Write the JSON report to this file as well as stdout')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    report = {
+        'benchmark': 'phash_index',
+        'commit': git_revision(),
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'iterations': args.iterations,
+        'phash_threshold': PHASH_THRESHOLD,
+        'dhash_threshold': DHASH_THRESHOLD,
+        'results': {},
+    }
+    for size in (int(n) for n in args.sizes.split(',') if n):
+        report['results'][str(size)] = bench_size(rng, size, args.iterations)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for LoanApplicationService hot paths.
+
+Suites:
+
+- submit: submit_loan_application end to end, and each phase of the
+  pipeline timed on its own (in-memory read and validation, staging write,
+  member check + insert statement, commit, publish, derivative rendering)
+- list: get_loan_applications on tables of 1k / 100k / 1M rows (first page,
+  status filter, member filter, a page reached by cursor, page with total)
+- update: update_application_status one row at a time and update_statuses
+  on batches of ids
+- validate: _validate_file_type on files of each upload size
+
+Uploads are synthetic noise JPEGs of realistic sizes, each made unique so
+the content-addressed store does not deduplicate them. The loan tables are
+truncated and reseeded, so only run this against a throwaway database (the
+name must contain "bench" or "test"):
+
+    BENCH_DB_NAME=slz_bench python benchmarks/bench_service.py --output before.json
+    BENCH_DB_NAME=slz_bench python benchmarks/bench_service.py --output after.json --compare before.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import upload_validation  # noqa: E402
+from bench_common import (  # noqa: E402
+    BytesUpload, bench_db_config, create_member, git_revision, latency_summary,
+    prepare_database, synthetic_jpeg, unique_jpeg
+)
+from loan_application_service import LoanApplicationService  # noqa: E402
+from upload_storage import ShardedUploadStore  # noqa: E402
+
+# name -> (width, height) of the synthetic scans; noise at quality 90 gives
+# roughly 0.3MB, 1.7MB and 3.9MB files
+UPLOAD_SIZES = {
+    'small': (640, 480),
+    'medium': (1600, 1200),
+    'large': (2400, 1800),
+}
+
+DEFAULT_ROW_COUNTS = (1000, 100000, 1000000)
+
+# Members the seeded applications are spread over
+SEED_MEMBERS = 1000
+
+SUITES = ('submit', 'list', 'update', 'validate')
+
+
+def timed(fn, iterations, warmup=3):
+    """Call ``fn`` ``warmup`` times untimed, then ``iterations`` times; return the latency summary."""
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return latency_summary(latencies)
+
+
+def make_service(db_config, upload_folder):
+    with contextlib.redirect_stdout(sys.stderr):
+        service = LoanApplicationService(db_config, {'min_size': 1, 'max_size': 2})
+    service.upload_folder = upload_folder
+    service.upload_store = ShardedUploadStore(upload_folder)
+    service.adoptable_folders = [upload_folder]
+    service.ensure_schema()
+    return service
+
+
+def bench_submit(service, member_id, iterations):
+    """End-to-end and per-phase timings of a single submit, per upload size."""
+    results = {}
+    for size_name, (width, height) in UPLOAD_SIZES.items():
+        content = synthetic_jpeg(width, height)
+
+        def end_to_end():
+            result = service.submit_loan_application(member_id, BytesUpload(unique_jpeg(content), 'scan.jpg'))
+            if not result['success']:
+                raise RuntimeError(result['message'])
+
+        entry = {'file_bytes': len(content), 'end_to_end': timed(end_to_end, iterations)}
+
+        phases = {name: [] for name in ('read_validate', 'stage_write', 'insert', 'commit', 'publish', 'derivatives')}
+        for _ in range(iterations):
+            upload_file = BytesUpload(unique_jpeg(content), 'scan.jpg')
+            started = time.perf_counter()
+            upload = upload_validation.read_jpeg(upload_file, service.max_file_size)
+            phases['read_validate'].append(time.perf_counter() - started)
+
+            file_path = service.upload_store.path_for(upload.sha256, 'scan.jpg')
+            staged_path = service.upload_store.staging_path(file_path)
+            started = time.perf_counter()
+            upload.write_to(staged_path)
+            upload.close()
+            phases['stage_write'].append(time.perf_counter() - started)
+
+            with service._connection() as conn:
+                started = time.perf_counter()
+                _, application_id = service._insert_application(
+                    conn, member_id, file_path, upload.sha256, upload.size
+                )
+                phases['insert'].append(time.perf_counter() - started)
+                started = time.perf_counter()
+                conn.commit()
+                phases['commit'].append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                service.upload_store.publish(staged_path, file_path)
+                phases['publish'].append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                service._attach_derivatives(conn, application_id, file_path)
+                phases['derivatives'].append(time.perf_counter() - started)
+
+        entry['phases'] = {name: latency_summary(latencies) for name, latencies in phases.items()}
+        results[size_name] = entry
+    return results
+
+
+def seed_applications(conn, member_ids, target_rows):
+    """Grow loan_applications to ``target_rows`` rows with a realistic status mix; returns seconds taken."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT count(*) FROM loan_applications")
+    existing = cursor.fetchone()[0]
+    started = time.perf_counter()
+    if existing < target_rows:
+        cursor.execute("""
+        INSERT INTO loan_applications (user_id, jpg_file_path, status, review_status, submitted_at)
+        SELECT (%(members)s::uuid[])[1 + g %% %(member_count)s],
+               'bench/' || g || '.jpg',
+               (ARRAY['pending', 'pending', 'approved', 'rejected'])[1 + g %% 4],
+               'pending_review',
+               now() - make_interval(secs => g)
+        FROM generate_series(%(start)s, %(end)s) AS g
+        """, {'members': member_ids, 'member_count': len(member_ids), 'start': existing + 1, 'end': target_rows})
+        cursor.execute("ANALYZE loan_applications")
+    conn.commit()
+    cursor.close()
+    return time.perf_counter() - started
+
+
+def bench_list(service, db_config, row_counts, iterations):
+    """get_loan_applications latency as the table grows."""
+    conn = psycopg2.connect(**db_config)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("TRUNCATE loan_applications, upload_blobs CASCADE")
+        member_ids = [create_member(conn) for _ in range(SEED_MEMBERS)]
+        conn.commit()
+        cursor.close()
+
+        results = {}
+        for rows in sorted(row_counts):
+            seed_seconds = seed_applications(conn, member_ids, rows)
+            deep_cursor = None
+            page = service.get_loan_applications(limit=50)
+            for _ in range(20):
+                if not page.get('next_cursor'):
+                    break
+                deep_cursor = page['next_cursor']
+                page = service.get_loan_applications(limit=50, cursor=deep_cursor)
+
+            cases = {
+                'first_page': lambda: service.get_loan_applications(limit=50),
+                'status_filter': lambda: service.get_loan_applications(status='pending', limit=50),
+                'member_filter': lambda: service.get_loan_applications(user_id=member_ids[0], limit=50),
+                'page_21_by_cursor': lambda: service.get_loan_applications(limit=50, cursor=deep_cursor),
+                'first_page_with_total': lambda: service.get_loan_applications(limit=50, include_total=True),
+            }
+            results[str(rows)] = {'seed_seconds': seed_seconds}
+            for name, call in cases.items():
+                results[str(rows)][name] = timed(call, iterations)
+        return results
+    finally:
+        conn.close()
+
+
+def bench_update(service, iterations, batch_size=500, warmup=3):
+    """Single-row status changes and bulk update_statuses on pending rows."""
+    batch_runs = min(iterations, 10)
+    with service._connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT application_id FROM loan_applications WHERE status = 'pending' ORDER BY application_id LIMIT %s",
+            (iterations + warmup + (batch_runs + warmup) * batch_size,)
+        )
+        pending = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+    if len(pending) < iterations + warmup:
+        raise RuntimeError('Not enough pending rows; run the list suite first')
+
+    single = iter(pending[:iterations + warmup])
+
+    def one():
+        result = service.update_application_status(next(single), 'approved')
+        if not result['success']:
+            raise RuntimeError(result['message'])
+
+    results = {'update_application_status': timed(one, iterations, warmup)}
+
+    remaining = pending[iterations + warmup:]
+    batches = [remaining[i:i + batch_size] for i in range(0, len(remaining) - batch_size + 1, batch_size)]
+    if len(batches) > warmup:
+        chunks = iter(batches)
+        results[f'update_statuses_{batch_size}'] = timed(
+            lambda: service.update_statuses(next(chunks), 'approved', expected_current_status='pending'),
+            len(batches) - warmup, warmup
+        )
+    return results
+
+
+def bench_validate(service, folder, iterations):
+    """_validate_file_type on a file of each upload size."""
+    results = {}
+    for size_name, (width, height) in UPLOAD_SIZES.items():
+        path = os.path.join(folder, f'validate_{size_name}.jpg')
+        with open(path, 'wb') as f:
+            f.write(synthetic_jpeg(width, height))
+        results[size_name] = dict(
+            timed(lambda: service._validate_file_type(path), iterations),
+            file_bytes=os.path.getsize(path)
+        )
+    return results
+
+
+def run(suites, iterations, row_counts):
+    db_config = bench_db_config()
+    if 'bench' not in db_config['database'] and 'test' not in db_config['database']:
+        raise SystemExit(f"Refusing to truncate tables in '{db_config['database']}'; use a throwaway bench/test database")
+
+    member_id = prepare_database(db_config)
+    upload_folder = tempfile.mkdtemp(prefix='bench_service_')
+    report = {
+        'benchmark': 'loan_application_service',
+        'commit': git_revision(),
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'iterations': iterations,
+        'results': {},
+    }
+    try:
+        service = make_service(db_config, upload_folder)
+        if 'submit' in suites:
+            report['results']['submit'] = bench_submit(service, member_id, iterations)
+        if 'list' in suites:
+            report['results']['list'] = bench_list(service, db_config, row_counts, iterations)
+        if 'update' in suites:
+            report['results']['update'] = bench_update(service, iterations)
+        if 'validate' in suites:
+            report['results']['validate'] = bench_validate(service, upload_folder, iterations)
+        service.pool.close()
+    finally:
+        shutil.rmtree(upload_folder, ignore_errors=True)
+    return report
+
+
+def _latencies(node, path=()):
+    """Yield (path, summary) for every latency summary in a report tree."""
+    if isinstance(node, dict):
+        if 'p50' in node and 'iterations' in node:
+            yield '.'.join(path), node
+            return
+        for key, value in node.items():
+            yield from _latencies(value, path + (key,))
+
+
+def compare(report, baseline):
+    """Return per-metric p50/p95 changes against a baseline report."""
+    before = dict(_latencies(baseline.get('results', {})))
+    changes = {}
+    for name, summary in _latencies(report['results']):
+        if name not in before:
+            continue
+        old = before[name]
+        changes[name] = {
+            'p50_ms': [round(old['p50'], 3), round(summary['p50'], 3)],
+            'p95_ms': [round(old['p95'], 3), round(summary['p95'], 3)],
+            'p50_change_pct': round((summary['p50'] - old['p50']) / old['p50'] * 100, 1) if old['p50'] else None,
+        }
+    return {'baseline_commit': baseline.get('commit'), 'metrics': changes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--suites', default=','.join(SUITES),
+                        help=f"Comma-separated subset of {', '.join(SUITES)}")
+    parser.add_argument('--rows', default=','.join(str(n) for n in DEFAULT_ROW_COUNTS),
+                        help='Comma-separated table sizes for the list suite')
+    parser.add_argument('--output', help='Write the JSON report to this file as well as stdout')
+    parser.add_argument('--compare', help='Baseline report to compare p50/p95 against')
+    args = parser.parse_args()
+
+    suites = [suite for suite in args.suites.split(',') if suite]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"Unknown suites: {', '.join(sorted(unknown))}")
+    if 'update' in suites and 'list' not in suites:
+        parser.error('The update suite runs on rows seeded by the list suite')
+
+    report = run(suites, args.iterations, [int(n) for n in args.rows.split(',') if n])
+    if args.compare:
+        with open(args.compare) as f:
+            report['comparison'] = compare(report, json.load(f))
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Benchmark the loan application submit pipeline before and after the
+single-transaction rewrite.
+
+"legacy" replays the statements the original submit_loan_application issued
+(fresh connection per step, SELECT member, CREATE TABLE IF NOT EXISTS, INSERT,
+each with its own commit). "current" calls LoanApplicationService on a warm
+connection pool. Both count database round trips and report latency
+percentiles. Each current submit gets unique bytes (so none is a
+deduplicated hit) and skips derivatives, which the legacy submit never
+rendered, so both variants do the same file work.
+
+Run it against a throwaway database, never production:
+
+    BENCH_DB_NAME=slz_bench python benchmarks/bench_submit_pipeline.py --iterations 500
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+import psycopg2
+from psycopg2 import extensions
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_common import (BytesUpload, bench_db_config, latency_summary, prepare_database,  # noqa: E402
+                          synthetic_jpeg, unique_jpeg)
+from loan_application_service import LoanApplicationService  # noqa: E402
+from upload_storage import ShardedUploadStore  # noqa: E402
+
+
+class RoundTrips:
+    """Counter of statements, commits and connects issued to the server."""
+    count = 0
+
+
+class CountingCursor(extensions.cursor):
+    def execute(self, query, vars=None):
+        RoundTrips.count += 1
+        return super().execute(query, vars)
+
+
+class CountingConnection(extensions.connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        RoundTrips.count += 1
+
+    def cursor(self, *args, **kwargs):
+        kwargs.setdefault('cursor_factory', CountingCursor)
+        return super().cursor(*args, **kwargs)
+
+    def _in_transaction(self):
+        # psycopg2 sends nothing to the server when there is no open transaction
+        return self.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE
+
+    def commit(self):
+        if self._in_transaction():
+            RoundTrips.count += 1
+        return super().commit()
+
+    def rollback(self):
+        if self._in_transaction():
+            RoundTrips.count += 1
+        return super().rollback()
+
+
+def legacy_submit(db_config, user_id, upload, upload_folder):
+    """Replay the statement sequence of the original per-step-connection submit."""
+    conn = psycopg2.connect(**db_config)
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT user_id, user_name, member_number FROM member_users WHERE user_id = %s AND is_active = true",
+        (user_id,)
+    )
+    found = cursor.fetchone() is not None
+    cursor.close()
+    conn.close()
+    if not found:
+        return False
+
+    file_path = os.path.join(upload_folder, f"legacy_{uuid.uuid4().hex}.jpg")
+    upload.save(file_path)
+    with Image.open(file_path) as img:
+        if img.format != 'JPEG':
+            return False
+
+    conn = psycopg2.connect(**db_config)
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS loan_applications (
+            application_id SERIAL PRIMARY KEY,
+            user_id UUID NOT NULL,
+            application_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            jpg_file_path VARCHAR(500) NOT NULL,
+            status VARCHAR(50) DEFAULT 'pending',
+            submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES member_users(user_id) ON DELETE CASCADE
+        )
+    """)
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+    conn = psycopg2.connect(**db_config)
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO loan_applications (user_id, jpg_file_path, status, submitted_at) "
+        "VALUES (%s, %s, %s, now()) RETURNING application_id",
+        (user_id, file_path, 'pending')
+    )
+    cursor.fetchone()
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return True
+
+
+def summarize(name, latencies, round_trips, iterations):
+    return {
+        'variant': name,
+        'iterations': iterations,
+        'round_trips_per_submit': round_trips / iterations,
+        'latency_ms': latency_summary(latencies),
+    }
+
+
+def run(iterations, width, height):
+    db_config = dict(bench_db_config(), connection_factory=CountingConnection)
+    member_id = prepare_database(db_config)
+    content = synthetic_jpeg(width, height)
+    upload_folder = tempfile.mkdtemp(prefix='bench_submit_')
+
+    results = []
+    try:
+        # Legacy: every step opens its own connection
+        latencies = []
+        RoundTrips.count = 0
+        for _ in range(iterations):
+            upload = BytesUpload(content, 'scan.jpg')
+            started = time.perf_counter()
+            legacy_submit(db_config, member_id, upload, upload_folder)
+            latencies.append(time.perf_counter() - started)
+        results.append(summarize('legacy', latencies, RoundTrips.count, iterations))
+
+        # Current: one pooled connection, one statement, one commit
+        with contextlib.redirect_stdout(sys.stderr):
+            service = LoanApplicationService(db_config, {'min_size': 1, 'max_size': 1})
+        service.upload_folder = upload_folder
+        service.upload_store = ShardedUploadStore(upload_folder)
+        service.ensure_schema()
+        service.derivatives_on_submit = False
+        latencies = []
+        RoundTrips.count = 0
+        for _ in range(iterations):
+            upload = BytesUpload(unique_jpeg(content), 'scan.jpg')
+            started = time.perf_counter()
+            result = service.submit_loan_application(member_id, upload)
+            latencies.append(time.perf_counter() - started)
+            if not result['success']:
+                raise RuntimeError(result['message'])
+        results.append(summarize('current', latencies, RoundTrips.count, iterations))
+    finally:
+        shutil.rmtree(upload_folder, ignore_errors=True)
+
+    return {
+        'benchmark': 'submit_pipeline',
+        'file_bytes': len(content),
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--width', type=int, default=1600)
+    parser.add_argument('--height', type=int, default=1200)
+    parser.add_argument('--output', help='Write the JSON report to this file as well as stdout')
+    args = parser.parse_args()
+
+    report = run(args.iterations, args.width, args.height)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
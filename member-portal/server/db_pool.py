@@ -0,0 +1,261 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the acquire timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections.
+
+    Connections are opened lazily up to ``max_size``. On checkout a connection
+    is discarded and replaced if it is closed, older than ``max_lifetime``, or
+    fails a ``SELECT 1`` health check after sitting idle for longer than
+    ``health_check_after`` seconds.
+    """
+
+    def __init__(self, db_config, min_size=1, max_size=10, acquire_timeout=10.0,
+                 max_lifetime=1800.0, health_check_after=5.0):
+        """
+        Initialize the pool.
+
+        Args:
+            db_config (dict): Keyword arguments for psycopg2.connect
+            min_size (int): Connections opened on first use and kept idle
+            max_size (int): Upper bound on open connections
+            acquire_timeout (float): Seconds to wait for a free connection
+            max_lifetime (float): Seconds before a connection is recycled
+            health_check_after (float): Idle seconds after which checkout pings
+                the connection (0 pings on every checkout, None never pings)
+        """
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+
+        self.db_config = db_config
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+
+        self._cond = threading.Condition()
+        self._idle = deque()          # (conn, created_at, last_used)
+        self._created_at = {}         # id(conn) -> created_at for checked-out connections
+        self._size = 0
+        self._waiting = 0
+        self._filled = False
+        self._closed = False
+
+        self._counters = {
+            'acquired': 0,
+            'timeouts': 0,
+            'created': 0,
+            'closed': 0,
+            'failed_health_checks': 0,
+            'acquire_time_total': 0.0,
+            'acquire_time_max': 0.0,
+        }
+
+    def _connect(self):
+        try:
+            return psycopg2.connect(**self.db_config)
+        except psycopg2.Error as e:
+            raise Exception(f"Database connection failed: {str(e)}")
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._counters['closed'] += 1
+            self._cond.notify()
+
+    def _is_healthy(self, conn, created_at, last_used, now):
+        if conn.closed:
+            return False
+        if self.max_lifetime is not None and now - created_at > self.max_lifetime:
+            return False
+        if self.health_check_after is not None and now - last_used >= self.health_check_after:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                self._counters['failed_health_checks'] += 1
+                return False
+        return True
+
+    def _fill(self):
+        """Open ``min_size`` connections the first time the pool is used."""
+        with self._cond:
+            if self._filled:
+                return
+            self._filled = True
+            missing = max(0, self.min_size - self._size)
+            self._size += missing
+
+        opened = []
+        try:
+            for _ in range(missing):
+                opened.append(self._connect())
+        finally:
+            now = time.monotonic()
+            with self._cond:
+                self._size -= missing - len(opened)
+                self._counters['created'] += len(opened)
+                for conn in opened:
+                    self._idle.append((conn, now, now))
+                self._cond.notify_all()
+
+    def acquire(self):
+        """
+        Check out a connection, waiting up to ``acquire_timeout`` seconds.
+
+        Returns:
+            connection: A psycopg2 connection that must be given back with release()
+        """
+        if not self._filled:
+            self._fill()
+
+        started = time.monotonic()
+        deadline = started + self.acquire_timeout
+
+        while True:
+            create = False
+            with self._cond:
+                if self._closed:
+                    raise Exception("Connection pool is closed")
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        raise PoolTimeout(
+                            f"Timed out after {self.acquire_timeout:.1f}s waiting for a database connection "
+                            f"({self._size} open, max {self.max_size})"
+                        )
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+                if self._idle:
+                    conn, created_at, last_used = self._idle.pop()
+                else:
+                    self._size += 1
+                    create = True
+
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                created_at = time.monotonic()
+                with self._cond:
+                    self._counters['created'] += 1
+            elif not self._is_healthy(conn, created_at, last_used, time.monotonic()):
+                self._discard(conn)
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._created_at[id(conn)] = created_at
+                self._counters['acquired'] += 1
+                self._counters['acquire_time_total'] += waited
+                self._counters['acquire_time_max'] = max(self._counters['acquire_time_max'], waited)
+            return conn
+
+    def release(self, conn, discard=False):
+        """
+        Return a connection to the pool.
+
+        Args:
+            conn: Connection previously returned by acquire()
+            discard (bool): Close the connection instead of reusing it
+        """
+        with self._cond:
+            created_at = self._created_at.pop(id(conn), None)
+            closed_pool = self._closed
+
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        if discard or closed_pool or conn.closed or created_at is None:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the duration of a ``with`` block.
+
+        The transaction is committed when the block exits normally and rolled
+        back when it raises.
+        """
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def stats(self):
+        """
+        Return pool counters for sizing against Postgres max_connections.
+
+        Returns:
+            dict: Current size/in-use/idle/waiting plus cumulative counters
+        """
+        with self._cond:
+            counters = dict(self._counters)
+            acquired = counters['acquired']
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'waiting': self._waiting,
+                'acquired': acquired,
+                'timeouts': counters['timeouts'],
+                'created': counters['created'],
+                'closed': counters['closed'],
+                'failed_health_checks': counters['failed_health_checks'],
+                'acquire_ms_avg': (counters['acquire_time_total'] / acquired * 1000) if acquired else 0.0,
+                'acquire_ms_max': counters['acquire_time_max'] * 1000,
+            }
+
+    def close(self):
+        """Close all idle connections; checked-out ones are closed on release."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn, _, _ in idle:
+            self._discard(conn)
@@ -0,0 +1,113 @@
+"""
+Fixed-size JPEG derivatives of loan application scans.
+
+Staff list views need a small thumbnail and the review screen a screen-sized
+preview, not the original scan of up to 10MB. ``render_derivatives`` opens
+the original once and uses Pillow's JPEG draft mode, so libjpeg decodes
+directly at 1/2, 1/4 or 1/8 scale and a large scan is never decoded at full
+resolution. The preview is rendered first and the thumbnail is made from it.
+"""
+
+import math
+import os
+import uuid
+
+from PIL import Image, ImageOps
+
+DERIVATIVES_FOLDER = 'derivatives'
+
+# kind -> (max width, max height, JPEG quality), largest first
+DERIVATIVE_SIZES = {
+    'preview': (1600, 1600, 85),
+    'thumbnail': (320, 320, 75),
+}
+
+
+def derivative_path(upload_root, file_path, kind):
+    """
+    Return where the ``kind`` derivative of a stored upload lives.
+
+    The derivative mirrors the upload's path below the upload root, so
+    content-addressed uploads share derivatives the same way they share
+    blobs.
+
+    Args:
+        upload_root (str): Root folder of the upload store
+        file_path (str): Stored upload path
+        kind (str): Key of DERIVATIVE_SIZES
+
+    Returns:
+        str: Derivative path
+    """
+    relative = os.path.relpath(file_path, upload_root)
+    if relative.startswith(os.pardir):
+        relative = os.path.basename(file_path)
+    name = os.path.splitext(relative)[0] + '.jpg'
+    return os.path.join(upload_root, DERIVATIVES_FOLDER, kind, name)
+
+
+def draft_size(size, max_edge):
+    """
+    Size to request from ``Image.draft`` for output capped at ``max_edge``.
+
+    Pillow only reduces the decode scale while both edges stay at least as
+    large as the requested size, so a square (max_edge, max_edge) box keeps a
+    landscape scan at full resolution. The request is ``size`` scaled so its
+    longest edge is ``max_edge``, which works for either orientation.
+
+    Args:
+        size (tuple): (width, height) of the image
+        max_edge (int): Longest edge of the largest output
+
+    Returns:
+        tuple: (width, height) to pass to draft
+    """
+    width, height = size
+    scale = min(1.0, max_edge / max(width, height))
+    return math.ceil(width * scale), math.ceil(height * scale)
+
+
+def render_derivatives(source_path, outputs):
+    """
+    Render derivatives of one JPEG.
+
+    Existing outputs are kept as they are. Each output is written to a temp
+    name and renamed into place, so readers never see a partial file.
+
+    Args:
+        source_path (str): Original JPEG
+        outputs (dict): kind -> output path
+
+    Returns:
+        dict: kind -> output path for every requested derivative
+    """
+    todo = {kind: path for kind, path in outputs.items() if not os.path.exists(path)}
+    if not todo:
+        return dict(outputs)
+
+    kinds = [kind for kind in DERIVATIVE_SIZES if kind in todo]
+    with Image.open(source_path) as img:
+        largest_width, largest_height, _ = DERIVATIVE_SIZES[kinds[0]]
+        # Let libjpeg decode at the smallest scale whose longest edge still
+        # covers the largest output
+        img.draft('RGB', draft_size(img.size, max(largest_width, largest_height)))
+        current = ImageOps.exif_transpose(img).convert('RGB')
+
+    for kind in kinds:
+        width, height, quality = DERIVATIVE_SIZES[kind]
+        current.thumbnail((width, height), Image.LANCZOS)
+        _save_atomic(current, todo[kind], quality)
+
+    return dict(outputs)
+
+
+def _save_atomic(img, path, quality):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".tmp_{uuid.uuid4().hex[:8]}_{os.path.basename(path)}")
+    try:
+        img.save(temp_path, 'JPEG', quality=quality, optimize=True)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
@@ -0,0 +1,221 @@
+"""
+Storage-saving normalization of accepted images.
+
+Phone photos arrive with large EXIF blocks, embedded thumbnails and high
+quality settings, and screenshots arrive as unoptimized PNGs.
+``normalize_image`` applies the EXIF orientation, drops metadata, caps the
+longest edge and re-encodes the image (optimized progressive JPEG, or
+optimized PNG). The original bytes are kept whenever the re-encode is not
+smaller. ``normalize_directory`` runs the same stage over existing files in a
+process pool, and can report the savings without rewriting anything. It
+leaves the upload store and derivative folders alone: their files are
+tracked in the database (sizes, blob digests), and the service normalizes
+uploads itself as they arrive.
+"""
+
+import io
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from PIL import Image, ImageOps
+
+from image_derivatives import DERIVATIVES_FOLDER, draft_size
+from upload_storage import STAGING_FOLDER
+
+# max_edge: longest side in pixels after normalization (None keeps the size)
+# jpeg_quality: quality of re-encoded JPEGs
+DEFAULT_OPTIONS = {
+    'max_edge': 3000,
+    'jpeg_quality': 85,
+}
+
+NORMALIZED_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Pixel modes each format can store without conversion
+_JPEG_MODES = ('L', 'RGB', 'CMYK')
+
+
+class NormalizedImage:
+    """Outcome of normalize_image; ``data`` is what should be stored."""
+
+    def __init__(self, data, original_size, image_format, changed, width, height):
+        self.data = data
+        self.original_size = original_size
+        self.stored_size = len(data)
+        self.format = image_format
+        self.changed = changed
+        self.width = width
+        self.height = height
+
+
+def normalize_image(data, options=None):
+    """
+    Normalize one JPEG or PNG held in memory.
+
+    Args:
+        data (bytes): Image as uploaded
+        options (dict, optional): Overrides of DEFAULT_OPTIONS
+
+    Returns:
+        NormalizedImage: Re-encoded bytes when they are smaller, otherwise
+            the original bytes with ``changed`` False
+
+    Raises:
+        ValueError: If the data is not a JPEG or PNG Pillow can decode
+    """
+    options = dict(DEFAULT_OPTIONS, **(options or {}))
+    max_edge = options['max_edge']
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            image_format = img.format
+            original_dimensions = img.size
+            if image_format not in ('JPEG', 'PNG'):
+                raise ValueError(f'Unsupported image format: {image_format}')
+            icc_profile = img.info.get('icc_profile')
+            if image_format == 'JPEG' and max_edge:
+                # Decode at a reduced scale when the cap allows it
+                img.draft(img.mode, draft_size(img.size, max_edge))
+            normalized = ImageOps.exif_transpose(img)
+            if normalized is img:
+                normalized = img.copy()
+    except (OSError, SyntaxError) as e:
+        raise ValueError(f'Cannot decode image: {str(e)}')
+
+    if max_edge and max(normalized.size) > max_edge:
+        normalized.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    output = io.BytesIO()
+    # Only the colour profile is carried over; EXIF, XMP, comments and
+    # embedded thumbnails are dropped
+    save_options = {'optimize': True}
+    if icc_profile:
+        save_options['icc_profile'] = icc_profile
+    if image_format == 'JPEG':
+        if normalized.mode not in _JPEG_MODES:
+            normalized = normalized.convert('RGB')
+        normalized.save(output, 'JPEG', quality=options['jpeg_quality'], progressive=True, **save_options)
+    else:
+        normalized.save(output, 'PNG', **save_options)
+
+    encoded = output.getvalue()
+    if len(encoded) < len(data):
+        return NormalizedImage(encoded, len(data), image_format, True, *normalized.size)
+    return NormalizedImage(data, len(data), image_format, False, *original_dimensions)
+
+
+def normalize_file(path, options=None, dry_run=False):
+    """
+    Normalize one file in place; runs in a worker process for normalize_directory.
+
+    The file keeps its name, so paths stored elsewhere stay valid. It is only
+    rewritten (through a temp file and an atomic rename) when that saves bytes.
+
+    Returns:
+        dict: path, original_bytes, stored_bytes and changed, or path and
+            error when the file could not be processed
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        result = normalize_image(data, options)
+        if result.changed and not dry_run:
+            _replace_atomic(path, result.data)
+    except (OSError, ValueError) as e:
+        return {'path': path, 'error': str(e)}
+    return {
+        'path': path,
+        'original_bytes': result.original_size,
+        'stored_bytes': result.stored_size,
+        'changed': result.changed
+    }
+
+
+def _replace_atomic(path, data):
+    directory, filename = os.path.split(path)
+    temp_path = os.path.join(directory, f".tmp_{uuid.uuid4().hex[:8]}_{filename}")
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def find_images(directory, skipped=None):
+    """
+    List the JPEG/PNG files below ``directory`` that may be rewritten in place.
+
+    Hidden files and folders (staging, temp files) are left out, and so are
+    folders the service manages: an upload store (recognized by its staging
+    folder), whose files have their sizes and digests recorded in
+    loan_applications and upload_blobs, and derivative folders, which are
+    rendered from the stored uploads.
+
+    Args:
+        directory (str): Folder to walk recursively
+        skipped (list, optional): Receives the managed folders left out
+
+    Returns:
+        list: Image paths in walk order
+    """
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        if STAGING_FOLDER in dirs or os.path.basename(root) == DERIVATIVES_FOLDER:
+            if skipped is not None:
+                skipped.append(root)
+            dirs[:] = []
+            continue
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        for name in sorted(files):
+            if not name.startswith('.') and name.lower().endswith(NORMALIZED_EXTENSIONS):
+                paths.append(os.path.join(root, name))
+    return paths
+
+
+def normalize_directory(directory, options=None, dry_run=False, workers=None):
+    """
+    Normalize every image below ``directory``.
+
+    Args:
+        directory (str): Folder to walk recursively
+        options (dict, optional): Overrides of DEFAULT_OPTIONS
+        dry_run (bool): Only report what would be saved
+        workers (int, optional): Worker processes (default: CPU count,
+            1 runs inline)
+
+    Returns:
+        dict: Files scanned and rewritten, original/stored/saved byte totals,
+            {path, error} entries for files that could not be read, and the
+            managed folders that were skipped
+    """
+    skipped = []
+    paths = find_images(directory, skipped)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) < 2:
+        outcomes = [normalize_file(path, options, dry_run) for path in paths]
+    else:
+        chunksize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(normalize_file, paths, repeat(options), repeat(dry_run), chunksize=chunksize))
+
+    errors = [outcome for outcome in outcomes if 'error' in outcome]
+    processed = [outcome for outcome in outcomes if 'error' not in outcome]
+    original_bytes = sum(outcome['original_bytes'] for outcome in processed)
+    stored_bytes = sum(outcome['stored_bytes'] for outcome in processed)
+    return {
+        'directory': directory,
+        'dry_run': dry_run,
+        'files': len(paths),
+        'changed': sum(1 for outcome in processed if outcome['changed']),
+        'original_bytes': original_bytes,
+        'stored_bytes': stored_bytes,
+        'saved_bytes': original_bytes - stored_bytes,
+        'errors': errors,
+        'skipped_folders': skipped
+    }
@@ -61,6 +61,16 @@ try {
   console.error('❌ Error registering dashboard routes:', error);
 }
 
+// Register notification routes
+try {
+  console.log('Registering notification routes...');
+  const notificationRoutes = require('./routes/notifications');
+  app.use('/api/notifications', notificationRoutes);
+  console.log('✅ Notification routes registered successfully');
+} catch (error) {
+  console.error('❌ Error registering notification routes:', error);
+}
+
 // Register payment routes
 try {
   console.log('Registering payment routes...');
@@ -0,0 +1,681 @@
+"""
+Durable background jobs kept in Postgres.
+
+Work that does not have to finish before a request returns becomes a
+job_queue row. The row is inserted in the transaction of the change that
+needs the work. A submit in background mode inserts its process_upload job
+in the statement that inserts the application, so a job exists only if that
+change committed.
+
+``JobWorker`` claims jobs with FOR UPDATE SKIP LOCKED and a lease. The claim
+marks the jobs running and commits, so a handler runs outside any open
+transaction and holds no row locks while it works. If a worker dies, its jobs
+stay running; once their lease has expired, ``requeue_expired`` puts them
+back.
+
+A job that raises is retried with exponential backoff. After max_attempts
+it moves to job_dead_letters, where ``retry_dead_jobs`` can requeue it.
+Handlers raise ``PermanentJobError`` for failures a retry cannot fix, and
+those jobs go straight to dead letters.
+
+``run_workers`` starts one process per worker, each with its own connection.
+Processes share nothing but the queue table, so CPU-bound handlers scale with
+the number of processes instead of contending for one interpreter lock.
+"""
+
+import importlib
+import json
+import multiprocessing
+import os
+import select
+import signal
+import socket
+import sys
+import time
+
+import psycopg2
+
+JOBS_TABLE = 'job_queue'
+DEAD_LETTER_TABLE = 'job_dead_letters'
+
+# NOTIFY channel signalled when jobs become ready; the payload is the queue name
+JOB_CHANNEL = 'job_queue'
+
+# Queue the loan application service posts upload post-processing to
+UPLOADS_QUEUE = 'uploads'
+
+# Named job priorities for enqueue (lower runs first)
+PRIORITIES = {
+    'urgent': 0,
+    'high': 1,
+    'medium': 2,
+    'low': 3,
+}
+DEFAULT_PRIORITY = PRIORITIES['medium']
+
+DEFAULT_MAX_ATTEMPTS = 5
+
+# A failed job waits RETRY_BASE_SECONDS * 2 ** (attempts - 1), capped at
+# RETRY_MAX_SECONDS, before it is tried again
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 3600
+
+# Seconds a claimed job may run before another worker may take it back
+LEASE_SECONDS = 600
+
+# Seconds between a worker's checks for expired leases
+REAP_INTERVAL = 30.0
+
+# Seconds a worker sleeps when nothing is ready and no NOTIFY arrives
+POLL_INTERVAL = 5.0
+
+DEFAULT_PROCESSES = 2
+DEFAULT_BATCH_SIZE = 1
+
+# Handler factory the command line uses unless --handlers names another
+DEFAULT_HANDLERS = 'loan_application_service:job_handlers'
+
+_JOB_COLUMNS = 'job_id, queue, job_type, payload, priority, attempts, max_attempts'
+
+CLAIM_SQL = f"""
+UPDATE {JOBS_TABLE}
+SET status = 'running', attempts = attempts + 1, locked_at = CURRENT_TIMESTAMP, locked_by = %(worker)s
+WHERE job_id IN (
+    SELECT job_id FROM {JOBS_TABLE}
+    WHERE queue = ANY(%(queues)s) AND status = 'queued' AND run_at <= CURRENT_TIMESTAMP
+    ORDER BY priority, run_at, job_id
+    LIMIT %(limit)s
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING {_JOB_COLUMNS}
+"""
+
+# Move the selected job_queue rows (the ``doomed`` CTE, defined by the caller)
+# to the dead letters
+_BURY_SQL = f"""
+, buried AS (
+    DELETE FROM {JOBS_TABLE} WHERE job_id IN (SELECT job_id FROM doomed)
+    RETURNING job_id, queue, job_type, payload, priority, attempts, max_attempts, created_at
+)
+INSERT INTO {DEAD_LETTER_TABLE} (job_id, queue, job_type, payload, priority, attempts,
+                                 max_attempts, last_error, created_at)
+SELECT job_id, queue, job_type, payload, priority, attempts, max_attempts, %(error)s, created_at
+FROM buried
+"""
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying the job cannot succeed."""
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next try of a job that has failed ``attempts`` times."""
+    return min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS)
+
+
+def enqueue(conn, queue, job_type, payload=None, priority=DEFAULT_PRIORITY, delay=0,
+            max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Queue a job in the caller's transaction.
+
+    The job becomes visible to workers, and the workers are woken, when the
+    caller commits.
+
+    Args:
+        conn: Connection holding the transaction that needs the job
+        queue (str): Queue name
+        job_type (str): Handler name
+        payload (dict, optional): JSON-serializable handler arguments
+        priority (int): Lower runs first; see PRIORITIES
+        delay (float): Seconds before the job may run
+        max_attempts (int): Tries before the job is dead-lettered
+
+    Returns:
+        int: The new job_id
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"""
+    INSERT INTO {JOBS_TABLE} (queue, job_type, payload, priority, max_attempts, run_at)
+    VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP + make_interval(secs => %s))
+    RETURNING job_id
+    """, (queue, job_type, json.dumps(payload or {}), priority, max_attempts, delay))
+    job_id = cursor.fetchone()[0]
+    cursor.execute("SELECT pg_notify(%s, %s)", (JOB_CHANNEL, queue))
+    cursor.close()
+    return job_id
+
+
+def signal_workers(conn, queue):
+    """Wake idle workers of ``queue`` when the caller's transaction commits."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_notify(%s, %s)", (JOB_CHANNEL, queue))
+    cursor.close()
+
+
+def claim_jobs(conn, queues, worker_id, limit=DEFAULT_BATCH_SIZE):
+    """
+    Lease the next ready jobs of ``queues`` to ``worker_id``.
+
+    The claim counts as an attempt. The caller should commit right away so
+    the handlers run outside the claiming transaction.
+
+    Returns:
+        list: Job dicts in priority order
+    """
+    cursor = conn.cursor()
+    cursor.execute(CLAIM_SQL, {'queues': list(queues), 'worker': worker_id, 'limit': limit})
+    rows = cursor.fetchall()
+    cursor.close()
+    jobs = [
+        {'job_id': job_id, 'queue': queue, 'job_type': job_type, 'payload': payload,
+         'priority': priority, 'attempts': attempts, 'max_attempts': max_attempts}
+        for job_id, queue, job_type, payload, priority, attempts, max_attempts in rows
+    ]
+    return sorted(jobs, key=lambda job: (job['priority'], job['job_id']))
+
+
+def complete_job(conn, job, worker_id):
+    """
+    Delete a finished job.
+
+    Returns:
+        bool: False when the lease had expired and the job was taken back
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"DELETE FROM {JOBS_TABLE} WHERE job_id = %s AND locked_by = %s AND attempts = %s",
+                   (job['job_id'], worker_id, job['attempts']))
+    done = cursor.rowcount == 1
+    cursor.close()
+    return done
+
+
+def fail_job(conn, job, worker_id, error, permanent=False):
+    """
+    Schedule a failed job's retry, or dead-letter it when it is out of attempts.
+
+    Returns:
+        str: 'retried', 'dead', or 'lost' when the lease had expired
+    """
+    message = str(error)[:1000] or type(error).__name__
+    params = {'job_id': job['job_id'], 'worker': worker_id, 'attempts': job['attempts'], 'error': message}
+    cursor = conn.cursor()
+    if permanent or job['attempts'] >= job['max_attempts']:
+        cursor.execute(f"""
+        WITH doomed AS (
+            SELECT job_id FROM {JOBS_TABLE}
+            WHERE job_id = %(job_id)s AND locked_by = %(worker)s AND attempts = %(attempts)s
+        )
+        """ + _BURY_SQL, params)
+        outcome = 'dead'
+    else:
+        cursor.execute(f"""
+        UPDATE {JOBS_TABLE}
+        SET status = 'queued', locked_at = NULL, locked_by = NULL, last_error = %(error)s,
+            run_at = CURRENT_TIMESTAMP + make_interval(secs => %(delay)s)
+        WHERE job_id = %(job_id)s AND locked_by = %(worker)s AND attempts = %(attempts)s
+        """, dict(params, delay=retry_delay(job['attempts'])))
+        outcome = 'retried'
+    if cursor.rowcount != 1:
+        outcome = 'lost'
+    cursor.close()
+    return outcome
+
+
+def requeue_expired(conn, lease_seconds=LEASE_SECONDS):
+    """
+    Take back jobs whose worker held them longer than the lease.
+
+    Jobs with attempts left are queued again at once; the others are
+    dead-lettered.
+
+    Returns:
+        dict: requeued and dead counts
+    """
+    cursor = conn.cursor()
+    expired = "status = 'running' AND locked_at < CURRENT_TIMESTAMP - make_interval(secs => %(lease)s)"
+    cursor.execute(f"""
+    WITH doomed AS (
+        SELECT job_id FROM {JOBS_TABLE} WHERE {expired} AND attempts >= max_attempts
+        FOR UPDATE SKIP LOCKED
+    )
+    """ + _BURY_SQL, {'lease': lease_seconds, 'error': 'lease expired'})
+    dead = cursor.rowcount
+    cursor.execute(f"""
+    UPDATE {JOBS_TABLE}
+    SET status = 'queued', run_at = CURRENT_TIMESTAMP, locked_at = NULL, locked_by = NULL,
+        last_error = 'lease expired (' || locked_by || ')'
+    WHERE job_id IN (SELECT job_id FROM {JOBS_TABLE} WHERE {expired} FOR UPDATE SKIP LOCKED)
+    """, {'lease': lease_seconds})
+    requeued = cursor.rowcount
+    cursor.close()
+    return {'requeued': requeued, 'dead': dead}
+
+
+def queue_status(conn):
+    """
+    Backlog of every queue.
+
+    Returns:
+        dict: queue -> ready, scheduled (waiting for run_at, e.g. a retry),
+            running and dead counts, and the seconds the oldest ready job has
+            been waiting
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"""
+    SELECT queue,
+           count(*) FILTER (WHERE status = 'queued' AND run_at <= CURRENT_TIMESTAMP),
+           count(*) FILTER (WHERE status = 'queued' AND run_at > CURRENT_TIMESTAMP),
+           count(*) FILTER (WHERE status = 'running'),
+           EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - min(run_at) FILTER (WHERE status = 'queued'
+                                                                     AND run_at <= CURRENT_TIMESTAMP))
+    FROM {JOBS_TABLE}
+    GROUP BY queue
+    """)
+    status = {}
+    for queue, ready, scheduled, running, oldest in cursor.fetchall():
+        status[queue] = {
+            'ready': ready,
+            'scheduled': scheduled,
+            'running': running,
+            'dead': 0,
+            'oldest_seconds': round(float(oldest), 1) if oldest is not None else None
+        }
+    cursor.execute(f"SELECT queue, count(*) FROM {DEAD_LETTER_TABLE} GROUP BY queue")
+    for queue, dead in cursor.fetchall():
+        status.setdefault(queue, {'ready': 0, 'scheduled': 0, 'running': 0, 'oldest_seconds': None})
+        status[queue]['dead'] = dead
+    cursor.close()
+    return status
+
+
+def _dead_filter(queue, job_ids):
+    conditions = []
+    params = []
+    if queue:
+        conditions.append("queue = %s")
+        params.append(queue)
+    if job_ids:
+        conditions.append("job_id = ANY(%s)")
+        params.append(list(job_ids))
+    return ("WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+
+def list_dead_jobs(conn, queue=None, limit=50):
+    """
+    Most recently dead-lettered jobs.
+
+    Returns:
+        list: Job dicts with last_error, created_at and failed_at (ISO strings)
+    """
+    where, params = _dead_filter(queue, None)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+    SELECT job_id, queue, job_type, payload, priority, attempts, last_error, created_at, failed_at
+    FROM {DEAD_LETTER_TABLE} {where}
+    ORDER BY failed_at DESC, job_id DESC
+    LIMIT %s
+    """, params + [limit])
+    rows = cursor.fetchall()
+    cursor.close()
+    return [
+        {'job_id': job_id, 'queue': queue_name, 'job_type': job_type, 'payload': payload,
+         'priority': priority, 'attempts': attempts, 'last_error': last_error,
+         'created_at': created_at.isoformat() if created_at else None,
+         'failed_at': failed_at.isoformat() if failed_at else None}
+        for job_id, queue_name, job_type, payload, priority, attempts, last_error, created_at, failed_at in rows
+    ]
+
+
+def retry_dead_jobs(conn, queue=None, job_ids=None):
+    """
+    Queue dead-lettered jobs again with a fresh set of attempts.
+
+    Args:
+        conn: Connection; the caller commits
+        queue (str, optional): Only jobs of this queue
+        job_ids (list, optional): Only these jobs
+
+    Returns:
+        int: Jobs requeued
+    """
+    where, params = _dead_filter(queue, job_ids)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+    WITH revived AS (
+        DELETE FROM {DEAD_LETTER_TABLE} {where}
+        RETURNING job_id, queue, job_type, payload, priority, max_attempts, last_error, created_at
+    )
+    INSERT INTO {JOBS_TABLE} (job_id, queue, job_type, payload, priority, max_attempts, last_error, created_at)
+    SELECT job_id, queue, job_type, payload, priority, max_attempts, last_error, created_at FROM revived
+    RETURNING queue
+    """, params)
+    queues = {row[0] for row in cursor.fetchall()}
+    revived = cursor.rowcount
+    cursor.close()
+    for name in queues:
+        signal_workers(conn, name)
+    return revived
+
+
+def purge_dead_jobs(conn, queue=None, job_ids=None):
+    """
+    Delete dead-lettered jobs for good.
+
+    Returns:
+        int: Jobs deleted
+    """
+    where, params = _dead_filter(queue, job_ids)
+    cursor = conn.cursor()
+    cursor.execute(f"DELETE FROM {DEAD_LETTER_TABLE} {where}", params)
+    deleted = cursor.rowcount
+    cursor.close()
+    return deleted
+
+
+class JobWorker:
+    """Claims and runs jobs on its own connection; run one per process."""
+
+    def __init__(self, db_config, handlers, queues=(UPLOADS_QUEUE,), batch_size=DEFAULT_BATCH_SIZE,
+                 poll_interval=POLL_INTERVAL, lease_seconds=LEASE_SECONDS, worker_id=None):
+        """
+        Initialize the worker.
+
+        Args:
+            db_config (dict): Database configuration (staff database)
+            handlers (dict): job_type -> callable taking the job payload
+            queues (tuple): Queues to claim from
+            batch_size (int): Jobs leased per claim
+            poll_interval (float): Seconds between queue checks when no
+                NOTIFY arrives
+            lease_seconds (float): Seconds before a claimed job that has not
+                finished may be taken back
+            worker_id (str, optional): Recorded in locked_by; defaults to
+                host:pid
+        """
+        self.db_config = db_config
+        self.handlers = handlers
+        self.queues = tuple(queues)
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.conn = None
+        self._last_reap = None
+        self.counters = {'jobs': 0, 'succeeded': 0, 'retried': 0, 'dead': 0, 'lost': 0}
+
+    def connect(self):
+        """Open the worker's connection and subscribe to JOB_CHANNEL."""
+        self.close()
+        self.conn = psycopg2.connect(**self.db_config)
+        cursor = self.conn.cursor()
+        cursor.execute(f"LISTEN {JOB_CHANNEL}")
+        cursor.close()
+        self.conn.commit()
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except psycopg2.Error:
+                pass
+            self.conn = None
+
+    def run_once(self):
+        """
+        Claim and run one batch.
+
+        Returns:
+            int: Jobs handled (0 when nothing was ready)
+        """
+        if self.conn is None or self.conn.closed:
+            self.connect()
+        try:
+            now = time.monotonic()
+            if self._last_reap is None or now - self._last_reap >= REAP_INTERVAL:
+                requeue_expired(self.conn, self.lease_seconds)
+                self._last_reap = now
+            jobs = claim_jobs(self.conn, self.queues, self.worker_id, self.batch_size)
+            self.conn.commit()
+        except psycopg2.Error:
+            self._rollback()
+            raise
+        for job in jobs:
+            self._run(job)
+        return len(jobs)
+
+    def _run(self, job):
+        handler = self.handlers.get(job['job_type'])
+        error = None
+        permanent = False
+        try:
+            if handler is None:
+                raise PermanentJobError(f"No handler for job type {job['job_type']}")
+            handler(job['payload'])
+        except PermanentJobError as e:
+            error, permanent = e, True
+        except Exception as e:
+            error = e
+
+        try:
+            if error is None:
+                outcome = 'succeeded' if complete_job(self.conn, job, self.worker_id) else 'lost'
+            else:
+                outcome = fail_job(self.conn, job, self.worker_id, error, permanent)
+            self.conn.commit()
+        except psycopg2.Error:
+            # The lease runs out and the job is tried again
+            self._rollback()
+            raise
+        if error is not None:
+            print(f"Job {job['job_id']} ({job['job_type']}) failed on attempt {job['attempts']}, "
+                  f"{outcome}: {str(error)}", file=sys.stderr)
+        self.counters['jobs'] += 1
+        self.counters[outcome] += 1
+
+    def _rollback(self):
+        try:
+            self.conn.rollback()
+        except psycopg2.Error:
+            self.close()
+
+    def wait(self, timeout):
+        """Block until a worker is signalled through JOB_CHANNEL or ``timeout`` passes."""
+        if not self.conn.notifies:
+            readable, _, _ = select.select([self.conn], [], [], timeout)
+            if readable:
+                self.conn.poll()
+        self.conn.notifies.clear()
+
+    def run(self, stop, drain=False):
+        """
+        Run jobs until ``stop`` is set, or with ``drain`` until nothing is ready.
+
+        Args:
+            stop: threading or multiprocessing Event
+            drain (bool): Return as soon as a claim comes back empty
+
+        Returns:
+            dict: Job counters
+        """
+        backoff = 1.0
+        try:
+            while not stop.is_set():
+                try:
+                    handled = self.run_once()
+                    backoff = 1.0
+                    if handled:
+                        continue
+                    if drain:
+                        break
+                    self.wait(self.poll_interval)
+                except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                    print(f"Job worker {self.worker_id} disconnected: {str(e)}; retrying in {backoff:.0f}s",
+                          file=sys.stderr)
+                    self.close()
+                    stop.wait(backoff)
+                    backoff = min(backoff * 2, 60.0)
+        finally:
+            self.close()
+        return dict(self.counters)
+
+
+def load_handlers(spec, db_config):
+    """Build the handler dict from a 'module:function' factory taking db_config."""
+    module_name, _, function_name = spec.partition(':')
+    factory = getattr(importlib.import_module(module_name), function_name)
+    return factory(db_config)
+
+
+def _worker_main(handlers_spec, db_config, options, drain, stop, results):
+    # Ctrl-C reaches the whole process group; the parent sets ``stop`` and
+    # each worker finishes the batch it is running
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker = JobWorker(db_config, load_handlers(handlers_spec, db_config), **options)
+    results.put(worker.run(stop, drain=drain))
+
+
+def run_workers(db_config, handlers_spec=DEFAULT_HANDLERS, processes=DEFAULT_PROCESSES,
+                queues=(UPLOADS_QUEUE,), batch_size=DEFAULT_BATCH_SIZE, poll_interval=POLL_INTERVAL,
+                lease_seconds=LEASE_SECONDS, drain=False):
+    """
+    Run ``processes`` worker processes until interrupted, or with ``drain``
+    until the queues have nothing ready.
+
+    Args:
+        db_config (dict): Database configuration (staff database)
+        handlers_spec (str): 'module:function' returning the handler dict;
+            imported in each worker process
+        processes (int): Worker processes
+        queues (tuple): Queues to claim from
+        batch_size (int): Jobs leased per claim
+        poll_interval (float): Seconds between queue checks when idle
+        lease_seconds (float): Lease of a claimed job
+        drain (bool): Stop once nothing is ready
+
+    Returns:
+        dict: Job counters summed over the workers, with seconds and
+            jobs_per_second
+    """
+    context = multiprocessing.get_context('spawn')
+    stop = context.Event()
+    results = context.Queue()
+    options = {
+        'queues': tuple(queues),
+        'batch_size': batch_size,
+        'poll_interval': poll_interval,
+        'lease_seconds': lease_seconds,
+    }
+    workers = [
+        context.Process(target=_worker_main, name=f'job-worker-{number}',
+                        args=(handlers_spec, db_config, options, drain, stop, results))
+        for number in range(processes)
+    ]
+    previous_sigterm = signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    started = time.perf_counter()
+    try:
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            while worker.is_alive():
+                try:
+                    worker.join(1.0)
+                except KeyboardInterrupt:
+                    stop.set()
+    finally:
+        stop.set()
+        signal.signal(signal.SIGTERM, previous_sigterm)
+    seconds = time.perf_counter() - started
+
+    totals = {'jobs': 0, 'succeeded': 0, 'retried': 0, 'dead': 0, 'lost': 0}
+    for _ in workers:
+        try:
+            counters = results.get(timeout=1.0)
+        except Exception:
+            # A worker that crashed reports nothing; its jobs come back after the lease
+            continue
+        for name, value in counters.items():
+            totals[name] += value
+    totals['processes'] = processes
+    totals['seconds'] = round(seconds, 3)
+    totals['jobs_per_second'] = round(totals['jobs'] / seconds, 1) if seconds else None
+    return totals
+
+
+def main():
+    """Command-line entry point; DATABASE_URL overrides the default staff database settings."""
+    db_config = {
+        'host': 'localhost',
+        'database': 'slz_coop_staff',
+        'user': 'postgres',
+        'password': 'password',
+        'port': 5432
+    }
+    if os.environ.get('DATABASE_URL'):
+        db_config = {'dsn': os.environ['DATABASE_URL']}
+
+    args = sys.argv[1:]
+
+    def option(name, default=None):
+        return args[args.index(name) + 1] if name in args and args.index(name) + 1 < len(args) else default
+
+    if not args or '--help' in args:
+        print("Usage:")
+        print("  python job_queue.py --work [--processes <n>] [--queue <name>[,<name>...]] [--batch-size <n>]")
+        print("                             [--poll <seconds>] [--lease <seconds>] [--handlers <module:function>]")
+        print("  python job_queue.py --drain [same options as --work]")
+        print("  python job_queue.py --status")
+        print("  python job_queue.py --dead [--queue <name>] [--limit <n>]")
+        print("  python job_queue.py --retry-dead [--queue <name>] [--job <id>]")
+        print("  python job_queue.py --purge-dead [--queue <name>] [--job <id>]")
+        print("  python job_queue.py --requeue-expired [--lease <seconds>]")
+        sys.exit(0 if args else 1)
+
+    queue = option('--queue')
+    job_ids = [int(option('--job'))] if option('--job') else None
+    lease_seconds = float(option('--lease', LEASE_SECONDS))
+    try:
+        if '--work' in args or '--drain' in args:
+            drain = '--drain' in args
+            processes = int(option('--processes', DEFAULT_PROCESSES))
+            queues = tuple(queue.split(',')) if queue else (UPLOADS_QUEUE,)
+            print(f"{'Draining' if drain else 'Working'} {', '.join(queues)} with {processes} processes",
+                  file=sys.stderr)
+            counters = run_workers(
+                db_config,
+                handlers_spec=option('--handlers', DEFAULT_HANDLERS),
+                processes=processes,
+                queues=queues,
+                batch_size=int(option('--batch-size', DEFAULT_BATCH_SIZE)),
+                poll_interval=float(option('--poll', POLL_INTERVAL)),
+                lease_seconds=lease_seconds,
+                drain=drain
+            )
+            result = dict(counters, success=True, message=f"Ran {counters['jobs']} jobs.")
+        else:
+            conn = psycopg2.connect(**db_config)
+            try:
+                if '--status' in args:
+                    result = {'success': True, 'queues': queue_status(conn)}
+                elif '--dead' in args:
+                    result = {'success': True, 'jobs': list_dead_jobs(conn, queue, int(option('--limit', 50)))}
+                elif '--retry-dead' in args:
+                    count = retry_dead_jobs(conn, queue, job_ids)
+                    result = {'success': True, 'message': f'Requeued {count} dead jobs.', 'requeued': count}
+                elif '--purge-dead' in args:
+                    count = purge_dead_jobs(conn, queue, job_ids)
+                    result = {'success': True, 'message': f'Deleted {count} dead jobs.', 'deleted': count}
+                elif '--requeue-expired' in args:
+                    result = dict(requeue_expired(conn, lease_seconds), success=True)
+                else:
+                    result = {'success': False, 'message': f'Unknown command: {args[0]}'}
+                conn.commit()
+            finally:
+                conn.close()
+    except psycopg2.Error as e:
+        result = {'success': False, 'message': f'Database error: {str(e)}'}
+    print(json.dumps(result))
+    sys.exit(0 if result['success'] else 1)
+
+
+if __name__ == "__main__":
+    main()
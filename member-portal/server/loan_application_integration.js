@@ -3,10 +3,10 @@
  * This file shows how to integrate the Python service with the existing Node.js backend
  */
 
-const { spawn } = require('child_process');
 const path = require('path');
 const multer = require('multer');
 const fs = require('fs');
+const { getLoanServiceClient } = require('./loan_service_client');
 
 // Configure multer for file uploads
 const storage = multer.diskStorage({
@@ -46,34 +46,8 @@ const upload = multer({
  * @returns {Promise<Object>} Result from Python service
  */
 function callPythonLoanService(user_id, file_path) {
-    return new Promise((resolve, reject) => {
-        const pythonScript = path.join(__dirname, 'loan_cli.py');
-        const pythonProcess = spawn('python3', [pythonScript, '--submit', user_id, file_path]);
-        
-        let output = '';
-        let error = '';
-        
-        pythonProcess.stdout.on('data', (data) => {
-            output += data.toString();
-        });
-        
-        pythonProcess.stderr.on('data', (data) => {
-            error += data.toString();
-        });
-        
-        pythonProcess.on('close', (code) => {
-            if (code === 0) {
-                try {
-                    const result = JSON.parse(output);
-                    resolve(result);
-                } catch (parseError) {
-                    reject(new Error('Failed to parse Python service response'));
-                }
-            } else {
-                reject(new Error(`Python service failed: ${error}`));
-            }
-        });
-    });
+    // adopt: the service moves multer's file into place instead of copying it
+    return getLoanServiceClient().call('submit', { user_id, file_path, adopt: true });
 }
 
 /**
@@ -110,7 +84,7 @@ function handleLoanApplicationSubmission(req, res) {
             const result = await callPythonLoanService(user_id, req.file.path);
             
             // Clean up uploaded file if Python service fails
-            if (!result.success) {
+            if (!result.success && fs.existsSync(req.file.path)) {
                 fs.unlinkSync(req.file.path);
             }
             
@@ -135,44 +109,24 @@ function handleLoanApplicationSubmission(req, res) {
  */
 async function handleGetLoanApplications(req, res) {
     try {
-        const { user_id } = req.query;
-        
-        // Call Python service to get applications
-        const pythonProcess = spawn('python3', [
-            path.join(__dirname, 'loan_cli.py'),
-            '--list',
-            user_id || ''
-        ]);
-        
-        let output = '';
-        let error = '';
-        
-        pythonProcess.stdout.on('data', (data) => {
-            output += data.toString();
-        });
-        
-        pythonProcess.stderr.on('data', (data) => {
-            error += data.toString();
-        });
-        
-        pythonProcess.on('close', (code) => {
-            if (code === 0) {
-                try {
-                    const result = JSON.parse(output);
-                    res.json(result);
-                } catch (parseError) {
-                    res.status(500).json({
-                        success: false,
-                        message: 'Failed to parse response'
-                    });
-                }
-            } else {
-                res.status(500).json({
-                    success: false,
-                    message: `Python service failed: ${error}`
-                });
-            }
+        const {
+            user_id, status, review_status, submitted_from, submitted_to,
+            member_number, limit, cursor, include_total
+        } = req.query;
+        
+        // Call Python service to get one page of applications
+        const result = await getLoanServiceClient().call('list', {
+            user_id: user_id || null,
+            status,
+            review_status,
+            submitted_from,
+            submitted_to,
+            member_number,
+            limit,
+            cursor,
+            include_total: include_total === 'true' || include_total === '1'
         });
+        res.json(result);
         
     } catch (error) {
         res.status(500).json({
@@ -187,52 +141,30 @@ async function handleGetLoanApplications(req, res) {
  */
 async function handleUpdateApplicationStatus(req, res) {
     try {
-        const { application_id, status } = req.body;
+        const {
+            application_id, application_ids, filter, status,
+            expected_current_status, reviewer_id, reviewer_role, notes
+        } = req.body;
         
-        if (!application_id || !status) {
+        if (!(application_id || application_ids || filter) || !status) {
             return res.status(400).json({
                 success: false,
                 message: 'Application ID and status are required'
             });
         }
         
-        // Call Python service to update status
-        const pythonProcess = spawn('python3', [
-            path.join(__dirname, 'loan_cli.py'),
-            '--update-status',
-            application_id.toString(),
-            status
-        ]);
-        
-        let output = '';
-        let error = '';
-        
-        pythonProcess.stdout.on('data', (data) => {
-            output += data.toString();
-        });
-        
-        pythonProcess.stderr.on('data', (data) => {
-            error += data.toString();
-        });
-        
-        pythonProcess.on('close', (code) => {
-            if (code === 0) {
-                try {
-                    const result = JSON.parse(output);
-                    res.json(result);
-                } catch (parseError) {
-                    res.status(500).json({
-                        success: false,
-                        message: 'Failed to parse response'
-                    });
-                }
-            } else {
-                res.status(500).json({
-                    success: false,
-                    message: `Python service failed: ${error}`
-                });
-            }
+        // Call Python service to update one application, or many in one statement
+        const result = await getLoanServiceClient().call('update_status', {
+            application_id,
+            application_ids,
+            filter,
+            status,
+            expected_current_status,
+            reviewer_id,
+            reviewer_role,
+            notes
         });
+        res.json(result);
         
     } catch (error) {
         res.status(500).json({
@@ -1,15 +1,148 @@
 import os
+import base64
+import errno
+import json
+import logging
+import time
+import threading
+import shutil
 import uuid
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+from itertools import repeat
 from datetime import datetime
 from werkzeug.utils import secure_filename
 import mimetypes
 from PIL import Image
 import io
+from db_pool import ConnectionPool
+from loan_metrics import instrumented
+import image_derivatives
+import image_normalize
+import job_queue
+import loan_metrics
+from member_cache import MISS, MemberCache, MemberInvalidationListener
+import loan_review_stats
+import loan_schema
+import notifications
+import upload_storage
+import upload_validation
+from upload_storage import ShardedUploadStore
+from upload_validation import UploadRejected
+
+logger = logging.getLogger('loan_application_service')
+
+# Page size of the Flask list route when the client does not ask for one
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Allowed loan_applications.status transitions; approved and rejected are final
+STATUS_TRANSITIONS = {
+    'pending': ('approved', 'rejected'),
+    'approved': (),
+    'rejected': (),
+}
+
+# Filter names accepted by _application_filters (and update_statuses filter dicts)
+APPLICATION_FILTERS = ('user_id', 'status', 'review_status', 'submitted_from', 'submitted_to', 'member_number')
+
+# Rows per server round trip when streaming an export
+EXPORT_ITERSIZE = 2000
+
+# Below this many files submit_many validates inline instead of starting processes
+PARALLEL_VALIDATION_THRESHOLD = 8
+
+# Applications per transaction when backfilling thumbnails and previews
+DERIVATIVE_BATCH_SIZE = 100
+
+
+def _inspect_upload_file(path, max_size):
+    """
+    Validate and hash one file for submit_many; runs in a worker process.
+    
+    Returns:
+        tuple: (True, (size, sha256)) or (False, rejection message)
+    """
+    try:
+        size, _, _ = upload_validation.validate_jpeg_file(path, max_size)
+        return True, (size, upload_storage.sha256_file(path))
+    except UploadRejected as e:
+        return False, str(e)
+    except OSError as e:
+        return False, f'Error reading file: {str(e)}'
+
+
+def _render_upload_derivatives(upload_root, file_path):
+    """
+    Render every derivative of one stored upload; runs in a worker process.
+    
+    Returns:
+        tuple: (True, {kind: path}) or (False, error message)
+    """
+    outputs = {
+        kind: image_derivatives.derivative_path(upload_root, file_path, kind)
+        for kind in image_derivatives.DERIVATIVE_SIZES
+    }
+    try:
+        return True, image_derivatives.render_derivatives(file_path, outputs)
+    except (OSError, ValueError) as e:
+        return False, f'Error rendering derivatives: {str(e)}'
+
+
+def _member_record(row):
+    """Build a member dict from (user_id, user_name, user_email, member_number, is_active)."""
+    return {
+        'user_id': str(row[0]),
+        'user_name': row[1],
+        'user_email': row[2],
+        'member_number': row[3],
+        'is_active': row[4]
+    }
+
+
+def _where(conditions):
+    """Join filter conditions into a WHERE clause (empty when there are none)."""
+    return ("WHERE " + " AND ".join(conditions)) if conditions else ""
+
+
+def clamp_page_size(limit, default=DEFAULT_PAGE_SIZE):
+    """
+    Page size for a listing request: ``limit`` clamped to 1..MAX_PAGE_SIZE,
+    or ``default`` when none was given (None only for callers that really
+    want every row, such as the command line).
+    """
+    if limit in (None, ''):
+        return default
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+def _encode_cursor(submitted_at, application_id):
+    """Encode a keyset position as an opaque URL-safe token."""
+    position = [submitted_at.isoformat() if submitted_at else None, application_id]
+    return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    """Decode a token from _encode_cursor into (submitted_at, application_id)."""
+    try:
+        submitted_at, application_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return submitted_at, int(application_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def _jsonable_row(row):
+    """Copy a result row, converting datetime values to ISO format strings."""
+    return {
+        key: value.isoformat() if hasattr(value, 'isoformat') else value
+        for key, value in row.items()
+    }
+
 
 class LoanApplicationService:
-    def __init__(self, db_config):
+    def __init__(self, db_config, pool_config=None, schema_mode='verify'):
         """
         Initialize the loan application service with database configuration.
         
@@ -20,341 +153,1568 @@ class LoanApplicationService:
                 - user: Database user
                 - password: Database password
                 - port: Database port
+            pool_config (dict, optional): ConnectionPool options
+                (min_size, max_size, acquire_timeout, max_lifetime,
+                health_check_after)
+            schema_mode (str, optional): 'verify' fails fast when the database
+                does not match loan_schema, 'migrate' applies missing changes,
+                None skips the check. Runs once per process.
         """
         self.db_config = db_config
+        self.pool = ConnectionPool(db_config, **(pool_config or {}))
+        self.schema_mode = schema_mode
         self.upload_folder = "loan_applications"
         self.allowed_extensions = {'jpg', 'jpeg'}
         self.max_file_size = 10 * 1024 * 1024  # 10MB max file size
+        # Enabled by enable_member_cache() in long-lived workers
+        self.member_cache = None
+        self._member_listener = None
+        # Started by start_statistics_folder() in long-lived workers
+        self._statistics_folder = None
+        self._statistics_stop = threading.Event()
+        # Folders whose files adopt_loan_application may move instead of copy
+        self.adoptable_folders = [self.upload_folder]
+        
+        # Content-addressed layout (ab/cd/<sha256>.jpg); identical uploads share a blob
+        self.upload_store = ShardedUploadStore(self.upload_folder)
+        # Render thumbnail/preview right after a single submit; when False
+        # (and for submit_many) backfill_derivatives() fills them in later
+        self.derivatives_on_submit = True
+        # Re-encode accepted uploads (EXIF orientation, no metadata, longest
+        # edge capped) when that makes them smaller; see image_normalize
+        self.normalize_uploads = False
+        self.normalize_options = dict(image_normalize.DEFAULT_OPTIONS)
+        # Leave normalization and derivatives of a single submit to a
+        # process_upload job (see job_queue); submit then returns once the
+        # row and the file as uploaded are durable
+        self.post_process_in_background = False
+        # Per-method and per-phase latency, error and upload counters; set
+        # metrics.slow_call_threshold (seconds) to log slow calls
+        self.metrics = loan_metrics.ServiceMetrics()
+        
+        # Ensure we're connecting to the correct database
+        if db_config.get('database') != 'slz_coop_staff':
+            print(f"Warning: Expected database 'slz_coop_staff', got '{db_config.get('database')}'")
+            print("Make sure you're connecting to the staff database where member_users table exists.")
+    
+    @contextmanager
+    def _connection(self, conn=None):
+        """
+        Borrow a pooled connection, or reuse one the caller already holds.
+
+        A borrowed connection is committed (or rolled back on error) and
+        returned to the pool when the block exits; a connection passed in by
+        the caller is left for the caller to finish.
+        """
+        if conn is not None:
+            yield conn
+            return
+        with ExitStack() as stack:
+            with self.metrics.span('connection'):
+                pooled = stack.enter_context(self.pool.connection())
+                self._ensure_schema(pooled)
+            yield pooled
+
+    def _db_key(self):
+        return (self.db_config.get('host'), self.db_config.get('port'), self.db_config.get('database'))
+
+    def _ensure_schema(self, conn):
+        """Run the once-per-process schema check on a borrowed connection."""
+        loan_schema.ensure_schema(conn, self._db_key(), self.schema_mode)
+
+    def ensure_schema(self):
+        """
+        Verify or migrate the schema now instead of on first use.
+
+        Returns:
+            list: Changes applied (empty unless schema_mode is 'migrate')
+        """
+        with self.pool.connection() as conn:
+            return loan_schema.ensure_schema(conn, self._db_key(), self.schema_mode)
+
+    def migrate_schema(self):
+        """
+        Apply missing tables, columns, indexes and triggers from loan_schema.
+
+        Returns:
+            dict: Result with the list of applied changes and remaining warnings
+        """
+        try:
+            with self.pool.connection() as conn:
+                applied = loan_schema.apply_migrations(conn)
+            with self.pool.connection() as conn:
+                report = loan_schema.check_schema(conn)
+            problems = loan_schema.schema_problems(report)
+            return {
+                'success': not problems,
+                'message': 'Schema is up to date.' if not problems else '; '.join(problems),
+                'applied': applied,
+                'warnings': report['type_mismatches']
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Error migrating schema: {str(e)}',
+                'applied': []
+            }
+
+    def check_schema(self):
+        """
+        Compare the database against loan_schema without changing it.
+
+        Returns:
+            dict: Result with blocking problems and type warnings
+        """
+        try:
+            with self.pool.connection() as conn:
+                report = loan_schema.check_schema(conn)
+            problems = loan_schema.schema_problems(report)
+            return {
+                'success': not problems,
+                'message': 'Schema is up to date.' if not problems else 'Schema is out of date.',
+                'problems': problems,
+                'warnings': report['type_mismatches']
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Error checking schema: {str(e)}',
+                'problems': []
+            }
+
+    @instrumented('get_review_statistics')
+    def get_review_statistics(self):
+        """
+        Application counts by review status and status, from the maintained
+        statistics rather than a count over loan_applications.
+
+        Folds the statistics deltas first when more than
+        loan_review_stats.FOLD_THRESHOLD are pending, so the delta table
+        stays short even where no worker folds it on a timer.
+
+        Returns:
+            dict: Result with 'statistics' (see loan_review_stats.read_statistics)
+        """
+        try:
+            with self._connection() as conn, self.metrics.span('query'):
+                loan_review_stats.fold_if_backlogged(conn)
+                statistics = loan_review_stats.read_statistics(conn)
+            return {'success': True, 'statistics': statistics}
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Error reading review statistics: {str(e)}'
+            }
+
+    def fold_review_statistics(self):
+        """
+        Fold pending statistics deltas into loan_review_stats.
+
+        Returns:
+            dict: Result with the number of deltas folded and groups touched
+        """
+        try:
+            with self._connection() as conn:
+                folded = loan_review_stats.fold_deltas(conn)
+            return dict(folded, success=True, message=f"Folded {folded['deltas']} statistics deltas.")
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Error folding review statistics: {str(e)}'
+            }
+
+    def rebuild_review_statistics(self):
+        """
+        Recompute loan_review_stats from loan_applications (repair).
+
+        Returns:
+            dict: Result with the number of groups written
+        """
+        try:
+            with self._connection() as conn:
+                groups = loan_review_stats.rebuild_statistics(conn)
+            return {'success': True, 'message': f'Rebuilt review statistics ({groups} groups).', 'groups': groups}
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Error rebuilding review statistics: {str(e)}'
+            }
+
+    def check_review_statistics(self):
+        """
+        Compare the maintained statistics with a full count of loan_applications.
+
+        Returns:
+            dict: Result with 'consistent' and the mismatching groups
+        """
+        try:
+            with self._connection() as conn:
+                return loan_review_stats.check_statistics(conn)
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Error checking review statistics: {str(e)}'
+            }
+
+    def start_statistics_folder(self, interval=60.0):
+        """
+        Fold statistics deltas every ``interval`` seconds on a daemon thread.
+
+        Meant for long-lived workers, so the delta table stays short and
+        statistics reads stay cheap. Errors are logged and retried on the
+        next round.
+        """
+        if self._statistics_folder is not None:
+            return
+
+        def run():
+            while not self._statistics_stop.wait(interval):
+                result = self.fold_review_statistics()
+                if not result['success']:
+                    logger.warning(result['message'])
+
+        self._statistics_folder = threading.Thread(target=run, name='review-statistics-folder', daemon=True)
+        self._statistics_folder.start()
+
+    def get_pool_stats(self):
+        """Return connection pool counters (size, in-use, waiting, acquire latency)."""
+        return self.pool.stats()
+
+    def get_metrics(self):
+        """
+        Return call/phase latency histograms and counters as plain data.
+
+        Returns:
+            dict: loan_metrics snapshot plus current 'pool' and 'member_cache' stats
+        """
+        snapshot = self.metrics.snapshot()
+        snapshot['pool'] = self.get_pool_stats()
+        snapshot['member_cache'] = self.get_member_cache_stats()
+        return snapshot
+
+    def render_metrics(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        gauges = {f'pool_{key}': value for key, value in self.get_pool_stats().items()}
+        cache_stats = self.get_member_cache_stats()
+        if cache_stats:
+            gauges.update((f'member_cache_{key}', value) for key, value in cache_stats.items())
+        return self.metrics.render_prometheus(gauges)
+    
+    def _has_allowed_extension(self, filename):
+        """
+        Check the extension and guessed MIME type of an upload's filename.
+        
+        Args:
+            filename (str): Filename as supplied by the client
+            
+        Returns:
+            bool: True if the name looks like a JPG/JPEG file
+        """
+        file_ext = filename.lower().split('.')[-1]
+        if '.' not in filename or file_ext not in self.allowed_extensions:
+            return False
+        
+        mime_type, _ = mimetypes.guess_type(filename)
+        return mime_type in ['image/jpeg', 'image/jpg']
+    
+    def _validate_file_type(self, file_path):
+        """
+        Validate that the file is a valid JPG/JPEG image.
+        
+        Only the JPEG markers and header are read; pixel data is not decoded.
+        
+        Args:
+            file_path (str): Path to the file to validate
+            
+        Returns:
+            bool: True if file is valid JPG/JPEG, False otherwise
+        """
+        try:
+            if not self._has_allowed_extension(file_path):
+                return False
+            upload_validation.validate_jpeg_file(file_path, self.max_file_size)
+            return True
+        except Exception:
+            return False
+    
+    @instrumented('get_member_info')
+    def get_member_info(self, user_id, conn=None):
+        """
+        Get member information by user ID.
+        
+        Args:
+            user_id (str): User ID to look up
+            conn (optional): Connection to run on instead of borrowing one
+            
+        Returns:
+            dict: Member information or None if not found
+        """
+        if self.member_cache is not None:
+            cached = self.member_cache.get(user_id)
+            if cached is not MISS:
+                return cached
+            token = self.member_cache.load_token()
+        
+        try:
+            with self._connection(conn) as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(
+                    "SELECT user_id, user_name, user_email, member_number, is_active FROM member_users WHERE user_id = %s", 
+                    (user_id,)
+                )
+                result = cursor.fetchone()
+                
+                cursor.close()
+            
+            member = _member_record(result) if result else None
+            if self.member_cache is not None:
+                self.member_cache.put(user_id, member, token)
+            return member
+        except Exception as e:
+            raise Exception(f"Error fetching member info: {str(e)}")
+    
+    def _cached_rejection(self, user_id):
+        """
+        Return a rejection message if the member cache already knows the
+        member is unknown or inactive, otherwise None.
+        
+        Active members are still checked by the submit statement itself, so a
+        stale positive entry can never let a deactivated member through.
+        """
+        if self.member_cache is None:
+            return None
+        cached = self.member_cache.get(user_id)
+        if cached is MISS or (cached is not None and cached['is_active']):
+            return None
+        return self._member_rejection_message(cached['is_active'] if cached else None)
+    
+    def enable_member_cache(self, max_entries=10000, ttl=60.0, negative_ttl=10.0):
+        """
+        Cache member lookups in this process, invalidated by LISTEN/NOTIFY.
+        
+        Meant for long-lived workers. A dedicated connection listens on the
+        channel the member_users trigger notifies, so a change reaches the
+        cache one notification after it commits; the TTLs only bound the
+        damage of a missed notification.
+        
+        Args:
+            max_entries (int): LRU capacity
+            ttl (float): Seconds a member record is trusted
+            negative_ttl (float): Seconds an unknown user ID is remembered
+        """
+        if self.member_cache is not None:
+            return
+        cache = MemberCache(max_entries, ttl, negative_ttl)
+        listener = MemberInvalidationListener(self.db_config, cache)
+        listener.start()
+        self.member_cache = cache
+        self._member_listener = listener
+    
+    def get_member_cache_stats(self):
+        """Return member cache counters, or None when the cache is disabled."""
+        if self.member_cache is None:
+            return None
+        stats = self.member_cache.stats()
+        stats['notifications'] = self._member_listener.notifications
+        stats['listener_reconnects'] = self._member_listener.reconnects
+        return stats
+    
+    @instrumented('submit_loan_application')
+    def submit_loan_application(self, user_id, jpg_file):
+        """
+        Submit a loan application with JPG file upload.
+        
+        Args:
+            user_id (str): User ID of the member submitting the application
+            jpg_file: File object containing the JPG image
+            
+        Returns:
+            dict: Result containing success status, message, and application_id
+        """
+        try:
+            with self._connection() as conn:
+                return self._submit_loan_application(conn, user_id, jpg_file)
+                
+        except psycopg2.Error as e:
+            return {
+                'success': False,
+                'message': f'Database error: {str(e)}',
+                'application_id': None
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Error processing loan application: {str(e)}',
+                'application_id': None
+            }
+    
+    def _submit_loan_application(self, conn, user_id, jpg_file):
+        """
+        Run submit_loan_application on a single borrowed connection.
+        
+        The upload is written to the store's staging folder and only published
+        under its final path after the row commits. recover_uploads() finishes
+        or discards staged files left behind by a crash, so a committed row
+        always ends up with its file and an uncommitted row never leaves one.
+        """
+        # Reject malformed IDs before touching disk or the database
+        try:
+            uuid.UUID(str(user_id))
+        except ValueError:
+            return {
+                'success': False,
+                'message': 'Invalid user ID. Member account does not exist.',
+                'application_id': None
+            }
+        
+        # Members the cache already knows cannot submit are turned away
+        # before the upload is read
+        rejection = self._cached_rejection(user_id)
+        if rejection:
+            return {
+                'success': False,
+                'message': rejection,
+                'application_id': None
+            }
+        
+        # Validate file
+        if not jpg_file or not jpg_file.filename:
+            return {
+                'success': False,
+                'message': 'No file provided.',
+                'application_id': None
+            }
+        
+        # Check the name before reading any bytes
+        original_filename = secure_filename(jpg_file.filename)
+        if not self._has_allowed_extension(original_filename):
+            return {
+                'success': False,
+                'message': 'Invalid file type. Only JPG/JPEG files are allowed.',
+                'application_id': None
+            }
+        
+        # Read and validate the upload in memory; the size limit is enforced
+        # while reading, so rejected uploads never reach the disk
+        try:
+            with self.metrics.span('read_validate'):
+                upload = upload_validation.read_jpeg(jpg_file, self.max_file_size)
+        except UploadRejected as e:
+            self.metrics.inc('rejected_uploads_total', reason=e.reason)
+            return {
+                'success': False,
+                'message': str(e),
+                'application_id': None
+            }
+        background = self.post_process_in_background
+        if self.normalize_uploads and not background:
+            with self.metrics.span('normalize'):
+                upload = self._normalize_upload(upload)
+        
+        # The digest stays that of the bytes as uploaded, so a re-upload of
+        # the same file still finds its (normalized) blob
+        file_path = self.upload_store.path_for(upload.sha256, original_filename)
+        staged_path = self.upload_store.staging_path(file_path)
+        
+        try:
+            # Only validated bytes are written, into the staging folder
+            try:
+                with self.metrics.span('stage_write'):
+                    upload.write_to(staged_path)
+            finally:
+                upload.close()
+            
+            # Check the member and store the application in one round trip
+            with self.metrics.span('insert'):
+                is_active, application_id = self._insert_application(
+                    conn, user_id, file_path, self._blob_digest(upload.sha256), upload.size, upload.original_size,
+                    job_payload=self._post_process_payload() if background else None
+                )
+            
+            if application_id is None:
+                conn.rollback()
+                self.upload_store.discard(staged_path)
+                return {
+                    'success': False,
+                    'message': self._member_rejection_message(is_active),
+                    'application_id': None
+                }
+            
+            with self.metrics.span('commit'):
+                conn.commit()
+            
+        except Exception as e:
+            # Clean up file if writing it or the database operation fails
+            self.upload_store.discard(staged_path)
+            raise e
+        
+        # The row is durable; publishing the file completes the submission
+        with self.metrics.span('publish'):
+            published = self.upload_store.publish(staged_path, file_path)
+        if published:
+            self.metrics.inc('upload_bytes_written_total', upload.size)
+        if background:
+            # Wake the workers only now, so the job does not find the file unpublished
+            self._signal_job_workers(conn)
+            derivatives = {}
+        else:
+            with self.metrics.span('derivatives'):
+                derivatives = self._attach_derivatives(conn, application_id, file_path)
+        
+        return {
+            'success': True,
+            'message': 'Loan application submitted successfully.',
+            'application_id': application_id,
+            'file_path': file_path,
+            'deduplicated': not published,
+            'thumbnail_path': derivatives.get('thumbnail'),
+            'preview_path': derivatives.get('preview'),
+            'post_processing': 'queued' if background else 'done'
+        }
+    
+    def _attach_derivatives(self, conn, application_id, file_path):
+        """
+        Render derivatives for a just-committed application and record them.
+        
+        Best effort: the submission has already succeeded, so a failure only
+        leaves thumbnail_path/preview_path NULL for backfill_derivatives().
+        
+        Returns:
+            dict: kind -> path of the recorded derivatives (empty on failure)
+        """
+        if not self.derivatives_on_submit:
+            return {}
+        ok, derivatives = _render_upload_derivatives(self.upload_store.root, file_path)
+        if not ok:
+            return {}
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+            UPDATE loan_applications SET thumbnail_path = %s, preview_path = %s
+            WHERE application_id = %s
+            """, (derivatives['thumbnail'], derivatives['preview'], application_id))
+            cursor.close()
+            conn.commit()
+        except psycopg2.Error:
+            conn.rollback()
+            return {}
+        return derivatives
+    
+    def _post_process_payload(self):
+        """process_upload payload carrying this service's upload settings."""
+        return {'normalize': dict(self.normalize_options) if self.normalize_uploads else None}
+    
+    def _signal_job_workers(self, conn):
+        """Wake idle job workers; best effort, since workers also poll."""
+        try:
+            job_queue.signal_workers(conn, job_queue.UPLOADS_QUEUE)
+            conn.commit()
+        except psycopg2.Error:
+            conn.rollback()
+    
+    def process_upload_job(self, payload):
+        """
+        Finish a submit that left its post-processing to the job queue.
+        
+        Runs in a job_queue worker. Normalizes the stored file in place when
+        the payload asks for it, then renders and records the derivatives. A
+        file that is not there yet (the submit has not published it) fails
+        the job so it is retried. A file whose pixels cannot be decoded fails
+        it permanently.
+        
+        Args:
+            payload (dict): application_id, and normalize (image_normalize
+                options, or None to keep the file as uploaded)
+        
+        Returns:
+            dict: application_id, stored_size_bytes and the derivative paths
+        
+        Raises:
+            job_queue.PermanentJobError: If the upload cannot be decoded
+        """
+        application_id = payload['application_id']
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT jpg_file_path, original_size_bytes FROM loan_applications WHERE application_id = %s
+            """, (application_id,))
+            row = cursor.fetchone()
+            cursor.close()
+        if row is None or row[0] is None:
+            # Withdrawn before the job ran, or nothing was uploaded
+            return {'application_id': application_id}
+        file_path, original_size = row
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f'Upload not published yet: {file_path}')
+        
+        stored_size = None
+        if payload.get('normalize') is not None:
+            stored_size = self._normalize_stored_upload(file_path, original_size, payload['normalize'])
+        
+        ok, derivatives = _render_upload_derivatives(self.upload_store.root, file_path)
+        if not ok:
+            raise RuntimeError(derivatives)
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            UPDATE loan_applications SET thumbnail_path = %s, preview_path = %s
+            WHERE application_id = %s
+            """, (derivatives['thumbnail'], derivatives['preview'], application_id))
+            cursor.close()
+        return {
+            'application_id': application_id,
+            'stored_size_bytes': stored_size,
+            'thumbnail_path': derivatives['thumbnail'],
+            'preview_path': derivatives['preview']
+        }
+    
+    def _normalize_stored_upload(self, file_path, original_size, options):
+        """
+        Normalize a stored upload in place and record its new size.
+        
+        A deduplicated file is shared by several applications, each with its
+        own job. An advisory lock on the path serializes those jobs. A file
+        whose size already differs from the upload as received has been
+        re-encoded before, so it is never re-encoded twice.
+        
+        Returns:
+            int: Stored size in bytes
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (file_path,))
+            stored_size = os.path.getsize(file_path)
+            if stored_size == original_size:
+                outcome = image_normalize.normalize_file(file_path, options)
+                if 'error' in outcome:
+                    raise job_queue.PermanentJobError(f"Cannot decode upload: {outcome['error']}")
+                stored_size = outcome['stored_bytes']
+            # Also repairs sizes a job that died after rewriting the file left behind
+            cursor.execute("""
+            UPDATE loan_applications SET stored_size_bytes = %s
+            WHERE jpg_file_path = %s AND stored_size_bytes IS DISTINCT FROM %s
+            """, (stored_size, file_path, stored_size))
+            cursor.execute("""
+            UPDATE upload_blobs SET size_bytes = %s
+            WHERE storage_path = %s AND size_bytes IS DISTINCT FROM %s
+            """, (stored_size, file_path, stored_size))
+            cursor.close()
+        return stored_size
+    
+    def _normalize_upload(self, upload):
+        """
+        Swap a validated upload for its normalized re-encode when that is smaller.
+        
+        Args:
+            upload (ValidatedUpload): Upload as received
+            
+        Returns:
+            ValidatedUpload: The re-encoded upload, or ``upload`` itself when
+                re-encoding would not save bytes or the pixels cannot be decoded
+        """
+        upload.buffer.seek(0)
+        try:
+            result = image_normalize.normalize_image(upload.buffer.read(), self.normalize_options)
+        except ValueError:
+            # The header was valid; store the bytes as uploaded
+            upload.buffer.seek(0)
+            return upload
+        if not result.changed:
+            upload.buffer.seek(0)
+            return upload
+        upload.close()
+        return upload_validation.ValidatedUpload(
+            io.BytesIO(result.data), result.stored_size, result.width, result.height,
+            sha256=upload.sha256, original_size=result.original_size
+        )
+    
+    def _blob_digest(self, sha256):
+        """Return the digest to record in upload_blobs, or None if the store does not deduplicate."""
+        return sha256 if self.upload_store.deduplicates else None
+    
+    def _insert_application(self, conn, user_id, file_path, sha256=None, size=None, original_size=None,
+                            job_payload=None):
+        """
+        Validate the member and insert the application in a single statement.
+        
+        When ``sha256`` is given the statement also takes a reference on the
+        upload_blobs row for that content, creating it on first use. With
+        ``job_payload`` it also queues a process_upload job for the new
+        application at the default job priority.
+        
+        Args:
+            conn: Connection holding the submit transaction
+            user_id (str): Member user ID
+            file_path (str): Final path of the application file
+            sha256 (str, optional): Content digest of a deduplicated upload
+            size (int, optional): Stored upload size in bytes
+            original_size (int, optional): Upload size as received (defaults to size)
+            job_payload (dict, optional): process_upload payload, without the
+                application_id the statement adds
+            
+        Returns:
+            tuple: (is_active, application_id). is_active is None when the
+                member does not exist; application_id is None whenever
+                nothing was inserted.
+        """
+        token = self.member_cache.load_token() if self.member_cache is not None else None
+        cursor = conn.cursor()
+        
+        job_query = f""", job AS (
+            INSERT INTO {job_queue.JOBS_TABLE} (queue, job_type, payload, priority)
+            SELECT %(job_queue)s, 'process_upload',
+                   %(job_payload)s::jsonb || jsonb_build_object('application_id', application_id),
+                   %(job_priority)s
+            FROM inserted
+        )""" if job_payload is not None else ""
+        
+        submit_query = """
+        WITH member AS (
+            SELECT user_id, is_active FROM member_users WHERE user_id = %(user_id)s
+        ), inserted AS (
+            INSERT INTO loan_applications (user_id, jpg_file_path, upload_sha256, original_size_bytes,
+                                           stored_size_bytes, status, submitted_at)
+            SELECT user_id, %(file_path)s, %(sha256)s, %(original_size)s, %(size)s, %(status)s, %(submitted_at)s
+            FROM member WHERE is_active
+            RETURNING application_id
+        ), blob AS (
+            INSERT INTO upload_blobs (sha256, storage_path, size_bytes, ref_count)
+            SELECT %(sha256)s, %(file_path)s, %(size)s, 1 FROM inserted WHERE %(sha256)s::varchar IS NOT NULL
+            ON CONFLICT (sha256) DO UPDATE
+            SET ref_count = upload_blobs.ref_count + 1, last_referenced_at = CURRENT_TIMESTAMP
+        )""" + job_query + """
+        SELECT (SELECT is_active FROM member), (SELECT application_id FROM inserted)
+        """
+        
+        cursor.execute(submit_query, {
+            'user_id': user_id,
+            'file_path': file_path,
+            'sha256': sha256,
+            'size': size,
+            'original_size': original_size if original_size is not None else size,
+            'status': 'pending',
+            'submitted_at': datetime.now(),
+            'job_queue': job_queue.UPLOADS_QUEUE,
+            'job_priority': job_queue.DEFAULT_PRIORITY,
+            'job_payload': json.dumps(job_payload or {})
+        })
+        result = cursor.fetchone()
+        cursor.close()
+        if result[0] is None and self.member_cache is not None:
+            # Remember unknown IDs so repeated attempts skip the upload entirely
+            self.member_cache.put(user_id, None, token)
+        return result[0], result[1]
+    
+    @instrumented('adopt_loan_application')
+    def adopt_loan_application(self, user_id, source_path):
+        """
+        Submit a loan application for a file that is already on disk.
+        
+        Instead of copying the upload, the service takes ownership of it: the
+        file is validated in place and moved into the upload store with an
+        atomic rename. When the source folder is not writable by this process
+        (the upload belongs to another user) a hardlink is used instead, and a
+        copy only when the source is on another filesystem. On failure the
+        source file is left where it was.
+        
+        Args:
+            user_id (str): User ID of the member submitting the application
+            source_path (str): Path of the already-uploaded JPG file
+            
+        Returns:
+            dict: Same result as submit_loan_application, plus 'adopted_via'
+                ('rename', 'link' or 'copy') on success
+        """
+        try:
+            with self._connection() as conn:
+                return self._adopt_loan_application(conn, user_id, source_path)
+                
+        except psycopg2.Error as e:
+            return {
+                'success': False,
+                'message': f'Database error: {str(e)}',
+                'application_id': None
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Error processing loan application: {str(e)}',
+                'application_id': None
+            }
+    
+    def _adopt_loan_application(self, conn, user_id, source_path):
+        """Run adopt_loan_application on a single borrowed connection."""
+        try:
+            uuid.UUID(str(user_id))
+        except ValueError:
+            return {
+                'success': False,
+                'message': 'Invalid user ID. Member account does not exist.',
+                'application_id': None
+            }
+        
+        rejection = self._cached_rejection(user_id)
+        if rejection:
+            return {
+                'success': False,
+                'message': rejection,
+                'application_id': None
+            }
+        
+        if not source_path or not os.path.isfile(source_path):
+            return {
+                'success': False,
+                'message': 'No file provided.',
+                'application_id': None
+            }
+        
+        if not self._is_adoptable(source_path):
+            raise Exception(f"Refusing to adopt a file outside {', '.join(self.adoptable_folders)}")
+        
+        original_filename = secure_filename(os.path.basename(source_path))
+        if not self._has_allowed_extension(original_filename):
+            return {
+                'success': False,
+                'message': 'Invalid file type. Only JPG/JPEG files are allowed.',
+                'application_id': None
+            }
+        
+        # Validate in place: only the JPEG header and trailer are read
+        try:
+            with self.metrics.span('read_validate'):
+                upload_validation.validate_jpeg_file(source_path, self.max_file_size)
+        except UploadRejected as e:
+            self.metrics.inc('rejected_uploads_total', reason=e.reason)
+            return {
+                'success': False,
+                'message': str(e),
+                'application_id': None
+            }
+        
+        # Hashing reads the file but writes nothing
+        with self.metrics.span('hash'):
+            sha256 = upload_storage.sha256_file(source_path) if self.upload_store.deduplicates else None
+        size = os.path.getsize(source_path)
+        file_path = self.upload_store.path_for(sha256, original_filename)
+        staged_path = self.upload_store.staging_path(file_path)
+        
+        with self.metrics.span('stage_write'):
+            adopted_via = self._take_upload(source_path, staged_path)
+        try:
+            with self.metrics.span('insert'):
+                is_active, application_id = self._insert_application(conn, user_id, file_path, sha256, size)
+            
+            if application_id is None:
+                conn.rollback()
+                self._return_upload(staged_path, source_path, adopted_via)
+                return {
+                    'success': False,
+                    'message': self._member_rejection_message(is_active),
+                    'application_id': None
+                }
+            
+            with self.metrics.span('commit'):
+                conn.commit()
+            
+        except Exception as e:
+            self._return_upload(staged_path, source_path, adopted_via)
+            raise e
         
-        # Create upload directory if it doesn't exist
-        os.makedirs(self.upload_folder, exist_ok=True)
+        with self.metrics.span('publish'):
+            published = self.upload_store.publish(staged_path, file_path)
+        if published and adopted_via == 'copy':
+            self.metrics.inc('upload_bytes_written_total', size)
+        if adopted_via != 'rename':
+            try:
+                os.remove(source_path)
+            except OSError:
+                # Not ours to delete; the uploader cleans up its own copy
+                pass
+        with self.metrics.span('derivatives'):
+            derivatives = self._attach_derivatives(conn, application_id, file_path)
         
-        # Ensure we're connecting to the correct database
-        if db_config.get('database') != 'slz_coop_staff':
-            print(f"Warning: Expected database 'slz_coop_staff', got '{db_config.get('database')}'")
-            print("Make sure you're connecting to the staff database where member_users table exists.")
+        return {
+            'success': True,
+            'message': 'Loan application submitted successfully.',
+            'application_id': application_id,
+            'file_path': file_path,
+            'deduplicated': not published,
+            'adopted_via': adopted_via,
+            'thumbnail_path': derivatives.get('thumbnail'),
+            'preview_path': derivatives.get('preview')
+        }
     
-    def _get_db_connection(self):
-        """Create and return a database connection."""
-        try:
-            conn = psycopg2.connect(**self.db_config)
-            return conn
-        except psycopg2.Error as e:
-            raise Exception(f"Database connection failed: {str(e)}")
+    def _is_adoptable(self, path):
+        """Check that ``path`` lies inside one of the adoptable folders."""
+        real_path = os.path.realpath(path)
+        for folder in self.adoptable_folders:
+            real_folder = os.path.realpath(folder)
+            if os.path.commonpath([real_path, real_folder]) == real_folder:
+                return True
+        return False
     
-    def _validate_file_type(self, file_path):
+    def _take_upload(self, source_path, temp_path):
         """
-        Validate that the file is a valid JPG/JPEG image.
+        Move an existing upload into staging without copying bytes if possible.
         
-        Args:
-            file_path (str): Path to the file to validate
-            
         Returns:
-            bool: True if file is valid JPG/JPEG, False otherwise
+            str: 'rename', 'link' or 'copy', describing how the file was taken
         """
         try:
-            # Check file extension
-            file_ext = file_path.lower().split('.')[-1]
-            if file_ext not in self.allowed_extensions:
-                return False
-            
-            # Check MIME type
-            mime_type, _ = mimetypes.guess_type(file_path)
-            if mime_type not in ['image/jpeg', 'image/jpg']:
-                return False
-            
-            # Try to open with PIL to verify it's a valid image
-            with Image.open(file_path) as img:
-                # Verify it's actually a JPEG
-                if img.format not in ['JPEG', 'JPG']:
-                    return False
-                    
-            return True
-        except Exception:
-            return False
+            os.rename(source_path, temp_path)
+            adopted_via = 'rename'
+        except PermissionError:
+            # Cannot unlink from the uploader's folder; share the inode instead
+            os.link(source_path, temp_path)
+            adopted_via = 'link'
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Different filesystem: fall back to a copy
+            shutil.copyfile(source_path, temp_path)
+            adopted_via = 'copy'
+        
+        fd = os.open(temp_path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        return adopted_via
     
-    def _generate_unique_filename(self, original_filename):
+    def _return_upload(self, temp_path, source_path, adopted_via):
+        """Undo _take_upload so the caller still owns its file after a failure."""
+        if not os.path.exists(temp_path):
+            return
+        if adopted_via == 'rename':
+            os.rename(temp_path, source_path)
+        else:
+            os.remove(temp_path)
+    
+    @instrumented('submit_many', item_errors=True)
+    def submit_many(self, items, workers=None, batch_size=500):
         """
-        Generate a unique filename to prevent conflicts.
+        Submit many loan applications from files already on disk.
+        
+        Images are validated and hashed in a process pool, and each chunk of
+        ``batch_size`` applications is inserted with a single multi-row
+        statement and one commit. As in submit_loan_application, the
+        statement itself inserts only rows of active members and reports the
+        others, so a member deactivated mid-batch is never let through.
+        Source files are copied into the upload store and left untouched.
         
         Args:
-            original_filename (str): Original filename
+            items (list): Dicts with 'user_id' and 'file_path'
+            workers (int, optional): Validation processes (default: CPU count)
+            batch_size (int): Applications per insert statement and transaction
             
         Returns:
-            str: Unique filename with timestamp and UUID
+            dict: Summary with per-item results (same shape as
+                submit_loan_application, plus 'source'), submitted/failed
+                counts, elapsed_seconds and files_per_second
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        unique_id = str(uuid.uuid4())[:8]
-        file_ext = original_filename.split('.')[-1].lower()
-        return f"loan_app_{timestamp}_{unique_id}.{file_ext}"
+        started = time.perf_counter()
+        results = [None] * len(items)
+        
+        def fail(index, message):
+            self.metrics.inc('errors_total', method='submit_many', category=loan_metrics.error_category(message))
+            results[index] = {
+                'success': False,
+                'message': message,
+                'application_id': None,
+                'source': items[index].get('file_path')
+            }
+        
+        # Cheap per-item checks before any file is opened
+        pending = []
+        for index, item in enumerate(items):
+            user_id, file_path = item.get('user_id'), item.get('file_path')
+            try:
+                uuid.UUID(str(user_id))
+            except ValueError:
+                fail(index, 'Invalid user ID. Member account does not exist.')
+                continue
+            rejection = self._cached_rejection(str(uuid.UUID(str(user_id))))
+            if rejection:
+                fail(index, rejection)
+            elif not file_path or not os.path.isfile(file_path):
+                fail(index, 'No file provided.')
+            elif not self._has_allowed_extension(secure_filename(os.path.basename(file_path))):
+                fail(index, 'Invalid file type. Only JPG/JPEG files are allowed.')
+            else:
+                pending.append(index)
+        
+        try:
+            # Validate and hash images across cores
+            paths = [items[index]['file_path'] for index in pending]
+            with self.metrics.span('read_validate'):
+                inspected = self._inspect_files(paths, workers)
+            accepted = []
+            for index, (ok, info) in zip(pending, inspected):
+                if ok:
+                    accepted.append((index, info))
+                else:
+                    fail(index, info)
+            
+            for start in range(0, len(accepted), batch_size):
+                with self.metrics.span('insert_batch'):
+                    self._insert_batch(items, accepted[start:start + batch_size], results, fail)
+        except Exception as e:
+            for index in range(len(items)):
+                if results[index] is None:
+                    fail(index, f'Error processing loan application: {str(e)}')
+        
+        elapsed = time.perf_counter() - started
+        submitted = sum(1 for result in results if result['success'])
+        files_per_second = len(items) / elapsed if elapsed > 0 else 0.0
+        return {
+            'success': submitted == len(items),
+            'message': f'Submitted {submitted} of {len(items)} applications in {elapsed:.2f}s ({files_per_second:.1f} files/s).',
+            'submitted': submitted,
+            'failed': len(items) - submitted,
+            'elapsed_seconds': elapsed,
+            'files_per_second': files_per_second,
+            'results': results
+        }
     
-    def _validate_user_exists(self, user_id):
+    def _inspect_files(self, paths, workers=None):
+        """Run _inspect_upload_file over ``paths``, in a process pool when it is worth it."""
+        if len(paths) < PARALLEL_VALIDATION_THRESHOLD or workers == 1:
+            return [_inspect_upload_file(path, self.max_file_size) for path in paths]
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_inspect_upload_file, paths, repeat(self.max_file_size), chunksize=chunksize))
+    
+    def _insert_batch(self, items, accepted, results, fail):
         """
-        Validate that the user exists in the member_users table and is active.
+        Stage, insert and publish one chunk of validated batch items.
+        
+        Rows whose member is unknown or inactive when the statement runs are
+        not inserted; their staged files are discarded and ``fail`` records
+        the rejection.
         
         Args:
-            user_id (str): User ID to validate
-            
-        Returns:
-            bool: True if user exists and is active, False otherwise
+            items (list): All batch items
+            accepted (list): (index, (size, sha256)) for items to insert
+            results (list): Per-item results, filled in place
+            fail (callable): fail(index, message) records a rejected item
         """
+        staged = []
         try:
-            conn = self._get_db_connection()
-            cursor = conn.cursor()
-            
-            # Check if user exists in member_users table and is active
-            cursor.execute(
-                "SELECT user_id, user_name, member_number FROM member_users WHERE user_id = %s AND is_active = true", 
-                (user_id,)
-            )
-            result = cursor.fetchone()
-            
-            cursor.close()
-            conn.close()
+            for index, (size, sha256) in accepted:
+                source_path = items[index]['file_path']
+                file_path = self.upload_store.path_for(sha256, secure_filename(os.path.basename(source_path)))
+                staged_path = self.upload_store.staging_path(file_path)
+                staged.append((index, file_path, staged_path, sha256, size))
+                shutil.copyfile(source_path, staged_path)
+                fd = os.open(staged_path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
             
-            return result is not None
+            now = datetime.now()
+            rows = [
+                (position, items[index]['user_id'], file_path, self._blob_digest(sha256), size, 'pending', now)
+                for position, (index, file_path, _, sha256, size) in enumerate(staged)
+            ]
+            token = self.member_cache.load_token() if self.member_cache is not None else None
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                # Each accepted row draws its id up front (the CTE is
+                # materialized, so nextval runs once per row) and is inserted
+                # with it, so ids are matched to rows by position rather
+                # than by the order the INSERT happens to consume them in
+                outcomes = execute_values(cursor, """
+                WITH batch (position, user_id, jpg_file_path, upload_sha256, size_bytes, status, submitted_at) AS (VALUES %s),
+                member AS (
+                    SELECT b.position, mu.is_active
+                    FROM batch b LEFT JOIN member_users mu ON mu.user_id = b.user_id
+                ), accepted AS MATERIALIZED (
+                    SELECT nextval(pg_get_serial_sequence('loan_applications', 'application_id')) AS application_id, b.*
+                    FROM batch b JOIN member m ON m.position = b.position WHERE m.is_active
+                ), inserted AS (
+                    INSERT INTO loan_applications (application_id, user_id, jpg_file_path, upload_sha256,
+                                                   original_size_bytes, stored_size_bytes, status, submitted_at)
+                    SELECT application_id, user_id, jpg_file_path, upload_sha256, size_bytes, size_bytes, status,
+                           submitted_at
+                    FROM accepted
+                    RETURNING application_id
+                ), blobs AS (
+                    INSERT INTO upload_blobs (sha256, storage_path, size_bytes, ref_count)
+                    SELECT upload_sha256, min(jpg_file_path), max(size_bytes), count(*)
+                    FROM accepted WHERE upload_sha256 IS NOT NULL GROUP BY upload_sha256
+                    ON CONFLICT (sha256) DO UPDATE
+                    SET ref_count = upload_blobs.ref_count + EXCLUDED.ref_count,
+                        last_referenced_at = CURRENT_TIMESTAMP
+                )
+                SELECT m.position, m.is_active, i.application_id
+                FROM member m
+                LEFT JOIN accepted a ON a.position = m.position
+                LEFT JOIN inserted i ON i.application_id = a.application_id
+                ORDER BY m.position
+                """, rows, template='(%s, %s::uuid, %s, %s::varchar, %s::bigint, %s, %s::timestamp)',
+                    page_size=len(rows), fetch=True)
+                cursor.close()
         except Exception as e:
-            raise Exception(f"Error validating user: {str(e)}")
+            for index, _, staged_path, _, _ in staged:
+                self.upload_store.discard(staged_path)
+            for index, _ in accepted:
+                results[index] = {
+                    'success': False,
+                    'message': f'Error processing loan application: {str(e)}',
+                    'application_id': None,
+                    'source': items[index]['file_path']
+                }
+            return
+        
+        outcomes = {position: (is_active, application_id) for position, is_active, application_id in outcomes}
+        for position, (index, file_path, staged_path, _, size) in enumerate(staged):
+            is_active, application_id = outcomes[position]
+            if application_id is None:
+                self.upload_store.discard(staged_path)
+                if is_active is None and self.member_cache is not None:
+                    self.member_cache.put(str(uuid.UUID(str(items[index]['user_id']))), None, token)
+                fail(index, self._member_rejection_message(is_active))
+                continue
+            published = self.upload_store.publish(staged_path, file_path)
+            if published:
+                self.metrics.inc('upload_bytes_written_total', size)
+            results[index] = {
+                'success': True,
+                'message': 'Loan application submitted successfully.',
+                'application_id': application_id,
+                'file_path': file_path,
+                'deduplicated': not published,
+                'source': items[index]['file_path']
+            }
     
-    def get_member_info(self, user_id):
+    def _member_rejection_message(self, is_active):
+        """Return the submit error message for a member that failed validation."""
+        if is_active is None:
+            return 'Invalid user ID. Member account does not exist.'
+        elif not is_active:
+            return 'Member account is inactive. Please contact support.'
+        return 'Unable to validate member account.'
+    
+    @instrumented('recover_uploads')
+    def recover_uploads(self, grace_seconds=3600):
         """
-        Get member information by user ID.
+        Finish or discard uploads interrupted between commit and publish.
+        
+        A staged file whose final path is referenced by a committed row is
+        published. One with no row is deleted once it is older than
+        ``grace_seconds``, so in-flight submissions are left alone.
         
         Args:
-            user_id (str): User ID to look up
+            grace_seconds (int): Minimum age of an unreferenced staged file before removal
             
         Returns:
-            dict: Member information or None if not found
+            dict: Result with the lists of recovered and removed files
         """
         try:
-            conn = self._get_db_connection()
-            cursor = conn.cursor()
+            staged_files = {
+                staged_path: self.upload_store.final_path_for_staged(staged_path)
+                for staged_path in self.upload_store.staged_files()
+            }
             
-            cursor.execute(
-                "SELECT user_id, user_name, user_email, member_number, is_active FROM member_users WHERE user_id = %s", 
-                (user_id,)
-            )
-            result = cursor.fetchone()
+            committed = set()
+            if staged_files:
+                with self._connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute(
+                        "SELECT jpg_file_path FROM loan_applications WHERE jpg_file_path = ANY(%s)",
+                        (list(set(staged_files.values())),)
+                    )
+                    committed = {row[0] for row in cursor.fetchall()}
+                    cursor.close()
             
-            cursor.close()
-            conn.close()
+            recovered, removed = [], []
+            now = datetime.now().timestamp()
+            for staged_path, final_path in staged_files.items():
+                if final_path in committed:
+                    self.upload_store.publish(staged_path, final_path)
+                    recovered.append(final_path)
+                elif now - os.path.getmtime(staged_path) > grace_seconds:
+                    os.remove(staged_path)
+                    removed.append(staged_path)
             
-            if result:
-                return {
-                    'user_id': result[0],
-                    'user_name': result[1],
-                    'user_email': result[2],
-                    'member_number': result[3],
-                    'is_active': result[4]
-                }
-            return None
+            return {
+                'success': True,
+                'message': f'Recovered {len(recovered)} uploads, removed {len(removed)} abandoned staged files.',
+                'recovered': recovered,
+                'removed': removed
+            }
         except Exception as e:
-            raise Exception(f"Error fetching member info: {str(e)}")
+            return {
+                'success': False,
+                'message': f'Error recovering uploads: {str(e)}',
+                'recovered': [],
+                'removed': []
+            }
     
-    def _create_loan_applications_table(self):
+    @instrumented('remove_unreferenced_blobs')
+    def remove_unreferenced_blobs(self):
         """
-        Create the loan_applications table if it doesn't exist.
+        Delete upload blobs no application references any more.
+        
+        Files are removed while the deleted rows are still locked, so a
+        submission of the same content waits and then publishes a fresh copy.
+        
+        Returns:
+            dict: Result with the list of removed blob paths
         """
         try:
-            conn = self._get_db_connection()
-            cursor = conn.cursor()
-            
-            create_table_query = """
-            CREATE TABLE IF NOT EXISTS loan_applications (
-                application_id SERIAL PRIMARY KEY,
-                user_id UUID NOT NULL,
-                application_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                jpg_file_path VARCHAR(500) NOT NULL,
-                status VARCHAR(50) DEFAULT 'pending',
-                submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES member_users(user_id) ON DELETE CASCADE
-            );
-            """
-            
-            cursor.execute(create_table_query)
-            conn.commit()
-            
-            cursor.close()
-            conn.close()
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                DELETE FROM upload_blobs b
+                WHERE b.ref_count <= 0
+                  AND NOT EXISTS (SELECT 1 FROM loan_applications la WHERE la.upload_sha256 = b.sha256)
+                RETURNING b.storage_path
+                """)
+                removed = [row[0] for row in cursor.fetchall()]
+                cursor.close()
+                for path in removed:
+                    derivative_paths = [
+                        image_derivatives.derivative_path(self.upload_store.root, path, kind)
+                        for kind in image_derivatives.DERIVATIVE_SIZES
+                    ]
+                    for stale_path in [path] + derivative_paths:
+                        if os.path.exists(stale_path):
+                            os.remove(stale_path)
             
+            return {
+                'success': True,
+                'message': f'Removed {len(removed)} unreferenced blobs.',
+                'removed': removed
+            }
         except Exception as e:
-            raise Exception(f"Error creating loan_applications table: {str(e)}")
+            return {
+                'success': False,
+                'message': f'Error removing unreferenced blobs: {str(e)}',
+                'removed': []
+            }
     
-    def submit_loan_application(self, user_id, jpg_file):
+    @instrumented('migrate_uploads')
+    def migrate_uploads(self, batch_size=200):
         """
-        Submit a loan application with JPG file upload.
+        Move existing uploads into the content-addressed store.
+        
+        Rows without an upload_sha256 are processed in application_id order.
+        Each file is hashed and hardlinked (or copied) to its blob path, then
+        the batch's jpg_file_path/upload_sha256 updates and blob reference
+        counts are committed in one statement. Old files are removed only
+        after that commit, so every row points at a readable file at all
+        times and the migration can be interrupted and re-run.
         
         Args:
-            user_id (str): User ID of the member submitting the application
-            jpg_file: File object containing the JPG image
+            batch_size (int): Rows per transaction
             
         Returns:
-            dict: Result containing success status, message, and application_id
+            dict: Result with migrated/deduplicated counts, missing
+                application IDs and bytes freed
         """
+        if not self.upload_store.deduplicates:
+            return {
+                'success': False,
+                'message': 'The configured upload store is not content-addressed; nothing to migrate.'
+            }
+        
+        migrated = deduplicated = freed_bytes = 0
+        missing = []
+        last_id = 0
+        
         try:
-            # Validate user exists and is active
-            if not self._validate_user_exists(user_id):
-                member_info = self.get_member_info(user_id)
-                if member_info is None:
-                    return {
-                        'success': False,
-                        'message': 'Invalid user ID. Member account does not exist.',
-                        'application_id': None
-                    }
-                elif not member_info['is_active']:
-                    return {
-                        'success': False,
-                        'message': 'Member account is inactive. Please contact support.',
-                        'application_id': None
-                    }
-                else:
-                    return {
-                        'success': False,
-                        'message': 'Unable to validate member account.',
-                        'application_id': None
-                    }
-            
-            # Validate file
-            if not jpg_file or not jpg_file.filename:
-                return {
-                    'success': False,
-                    'message': 'No file provided.',
-                    'application_id': None
-                }
-            
-            # Check file size
-            jpg_file.seek(0, 2)  # Seek to end
-            file_size = jpg_file.tell()
-            jpg_file.seek(0)  # Reset to beginning
-            
-            if file_size > self.max_file_size:
-                return {
-                    'success': False,
-                    'message': f'File too large. Maximum size allowed is {self.max_file_size / (1024*1024):.1f}MB.',
-                    'application_id': None
-                }
-            
-            # Generate secure filename
-            original_filename = secure_filename(jpg_file.filename)
-            unique_filename = self._generate_unique_filename(original_filename)
-            file_path = os.path.join(self.upload_folder, unique_filename)
-            
-            # Save file temporarily to validate
-            jpg_file.save(file_path)
-            
-            try:
-                # Validate file type
-                if not self._validate_file_type(file_path):
-                    os.remove(file_path)  # Clean up invalid file
-                    return {
-                        'success': False,
-                        'message': 'Invalid file type. Only JPG/JPEG files are allowed.',
-                        'application_id': None
-                    }
+            while True:
+                with self._connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("""
+                    SELECT application_id, jpg_file_path FROM loan_applications
+                    WHERE application_id > %s AND upload_sha256 IS NULL AND jpg_file_path IS NOT NULL
+                    ORDER BY application_id
+                    LIMIT %s
+                    """, (last_id, batch_size))
+                    rows = cursor.fetchall()
+                    cursor.close()
                 
-                # Create loan_applications table if it doesn't exist
-                self._create_loan_applications_table()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
                 
-                # Store application in database
-                conn = self._get_db_connection()
-                cursor = conn.cursor()
+                moves = []
+                for application_id, old_path in rows:
+                    if not os.path.isfile(old_path):
+                        missing.append(application_id)
+                        continue
+                    sha256 = upload_storage.sha256_file(old_path)
+                    new_path = self.upload_store.path_for(sha256, old_path)
+                    if os.path.exists(new_path):
+                        deduplicated += 1
+                    else:
+                        self._place_blob(old_path, new_path)
+                    moves.append((application_id, old_path, new_path, sha256, os.path.getsize(old_path)))
                 
-                insert_query = """
-                INSERT INTO loan_applications (user_id, jpg_file_path, status, submitted_at)
-                VALUES (%s, %s, %s, %s)
-                RETURNING application_id
-                """
+                if not moves:
+                    continue
                 
-                cursor.execute(insert_query, (
-                    user_id,
-                    file_path,
-                    'pending',
-                    datetime.now()
-                ))
+                with self._connection() as conn:
+                    cursor = conn.cursor()
+                    updated = execute_values(cursor, """
+                    WITH moves (application_id, old_path, new_path, sha256, size_bytes) AS (VALUES %s),
+                    updated AS (
+                        UPDATE loan_applications la
+                        SET jpg_file_path = m.new_path, upload_sha256 = m.sha256
+                        FROM moves m
+                        WHERE la.application_id = m.application_id AND la.jpg_file_path = m.old_path
+                        RETURNING la.application_id, m.sha256, m.new_path, m.size_bytes
+                    ), blobs AS (
+                        INSERT INTO upload_blobs (sha256, storage_path, size_bytes, ref_count)
+                        SELECT sha256, min(new_path), max(size_bytes), count(*) FROM updated GROUP BY sha256
+                        ON CONFLICT (sha256) DO UPDATE
+                        SET ref_count = upload_blobs.ref_count + EXCLUDED.ref_count,
+                            last_referenced_at = CURRENT_TIMESTAMP
+                    )
+                    SELECT application_id FROM updated
+                    """, moves, template='(%s::integer, %s, %s, %s, %s::bigint)',
+                        page_size=len(moves), fetch=True)
+                    updated_ids = {row[0] for row in updated}
+                    
+                    # A path shared with a row that has not been migrated yet must stay
+                    cursor.execute(
+                        "SELECT DISTINCT jpg_file_path FROM loan_applications WHERE jpg_file_path = ANY(%s)",
+                        ([move[1] for move in moves],)
+                    )
+                    still_referenced = {row[0] for row in cursor.fetchall()}
+                    cursor.close()
                 
-                application_id = cursor.fetchone()[0]
-                conn.commit()
+                for application_id, old_path, new_path, _, size in moves:
+                    if application_id not in updated_ids:
+                        continue
+                    migrated += 1
+                    if old_path in still_referenced or not os.path.exists(old_path):
+                        continue
+                    if os.path.abspath(old_path) == os.path.abspath(new_path):
+                        continue
+                    if not os.path.samefile(old_path, new_path):
+                        freed_bytes += size
+                    os.remove(old_path)
+            
+            return {
+                'success': True,
+                'message': f'Migrated {migrated} uploads ({deduplicated} duplicates), {len(missing)} files missing.',
+                'migrated': migrated,
+                'deduplicated': deduplicated,
+                'missing': missing,
+                'freed_bytes': freed_bytes
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Error migrating uploads: {str(e)}',
+                'migrated': migrated,
+                'deduplicated': deduplicated,
+                'missing': missing,
+                'freed_bytes': freed_bytes
+            }
+    
+    @instrumented('backfill_derivatives')
+    def backfill_derivatives(self, batch_size=DERIVATIVE_BATCH_SIZE, workers=None):
+        """
+        Render thumbnails and previews for applications that have none.
+        
+        Rows are walked in application_id order. Each batch is rendered in a
+        process pool (draft-mode decoding is CPU bound) and its paths are
+        written back in one statement. Applications sharing a blob share its
+        derivatives, which are rendered once. Safe to interrupt and re-run.
+        
+        Args:
+            batch_size (int): Rows per transaction
+            workers (int, optional): Render processes (default: CPU count,
+                1 renders inline)
+            
+        Returns:
+            dict: Result with updated count, missing application IDs and
+                failed {application_id, message} entries
+        """
+        updated = 0
+        missing = []
+        failed = []
+        last_id = 0
+        workers = workers or os.cpu_count() or 1
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        
+        try:
+            while True:
+                with self._connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("""
+                    SELECT application_id, jpg_file_path FROM loan_applications
+                    WHERE application_id > %s AND jpg_file_path IS NOT NULL
+                      AND (thumbnail_path IS NULL OR preview_path IS NULL)
+                    ORDER BY application_id
+                    LIMIT %s
+                    """, (last_id, batch_size))
+                    rows = cursor.fetchall()
+                    cursor.close()
                 
-                cursor.close()
-                conn.close()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
                 
-                return {
-                    'success': True,
-                    'message': 'Loan application submitted successfully.',
-                    'application_id': application_id,
-                    'file_path': file_path
-                }
+                paths = sorted({path for _, path in rows if os.path.isfile(path)})
+                missing.extend(application_id for application_id, path in rows if not os.path.isfile(path))
+                if executor is not None and len(paths) >= PARALLEL_VALIDATION_THRESHOLD:
+                    rendered = executor.map(_render_upload_derivatives, repeat(self.upload_store.root), paths)
+                else:
+                    rendered = (_render_upload_derivatives(self.upload_store.root, path) for path in paths)
+                by_path = dict(zip(paths, rendered))
                 
-            except Exception as e:
-                # Clean up file if database operation fails
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                raise e
+                values = []
+                for application_id, path in rows:
+                    if path not in by_path:
+                        continue
+                    ok, outcome = by_path[path]
+                    if not ok:
+                        failed.append({'application_id': application_id, 'message': outcome})
+                        continue
+                    values.append((application_id, path, outcome['thumbnail'], outcome['preview']))
                 
-        except psycopg2.Error as e:
+                if not values:
+                    continue
+                
+                with self._connection() as conn:
+                    cursor = conn.cursor()
+                    # Skip rows whose upload changed since they were read
+                    execute_values(cursor, """
+                    UPDATE loan_applications la
+                    SET thumbnail_path = v.thumbnail_path, preview_path = v.preview_path
+                    FROM (VALUES %s) AS v (application_id, jpg_file_path, thumbnail_path, preview_path)
+                    WHERE la.application_id = v.application_id AND la.jpg_file_path = v.jpg_file_path
+                    """, values, template='(%s::integer, %s, %s, %s)', page_size=len(values))
+                    updated += cursor.rowcount
+                    cursor.close()
+            
             return {
-                'success': False,
-                'message': f'Database error: {str(e)}',
-                'application_id': None
+                'success': True,
+                'message': f'Rendered derivatives for {updated} applications, {len(missing)} files missing, {len(failed)} failed.',
+                'updated': updated,
+                'missing': missing,
+                'failed': failed
             }
         except Exception as e:
             return {
                 'success': False,
-                'message': f'Error processing loan application: {str(e)}',
-                'application_id': None
+                'message': f'Error backfilling derivatives: {str(e)}',
+                'updated': updated,
+                'missing': missing,
+                'failed': failed
             }
+        finally:
+            if executor is not None:
+                executor.shutdown()
+    
+    def _place_blob(self, source_path, blob_path):
+        """Publish a copy of ``source_path`` at ``blob_path``, hardlinking when possible."""
+        staged_path = self.upload_store.staging_path(blob_path)
+        try:
+            os.link(source_path, staged_path)
+        except OSError:
+            shutil.copyfile(source_path, staged_path)
+            fd = os.open(staged_path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        self.upload_store.publish(staged_path, blob_path)
     
-    def get_loan_applications(self, user_id=None):
+    @instrumented('get_loan_applications')
+    def get_loan_applications(self, user_id=None, status=None, review_status=None,
+                              submitted_from=None, submitted_to=None, member_number=None,
+                              limit=None, cursor=None, include_total=False):
         """
-        Retrieve loan applications, optionally filtered by user_id.
+        Retrieve loan applications, newest first, one keyset page at a time.
+        
+        Pages are ordered by (submitted_at, application_id) descending. Pass the
+        returned ``next_cursor`` back as ``cursor`` to fetch the following page;
+        unlike OFFSET, every page costs the same however deep it is.
         
         Args:
             user_id (str, optional): User ID to filter applications
+            status (str, optional): Only applications with this status
+            review_status (str, optional): Only applications with this review_status
+            submitted_from (datetime or str, optional): Submitted at or after
+            submitted_to (datetime or str, optional): Submitted before
+            member_number (str, optional): Only applications of this member
+            limit (int, optional): Page size, at least 1; None returns every
+                matching row
+            cursor (str, optional): Opaque cursor from a previous page
+            include_total (bool): Also count all matching rows (extra query)
             
         Returns:
-            dict: Result containing success status and applications list
+            dict: Result containing success status, applications list,
+                next_cursor (None on the last page) and total if requested
         """
         try:
-            conn = self._get_db_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            if user_id:
-                query = """
-                SELECT la.*, mu.user_name, mu.user_email, mu.member_number
-                FROM loan_applications la
-                JOIN member_users mu ON la.user_id = mu.user_id
-                WHERE la.user_id = %s
-                ORDER BY la.submitted_at DESC
-                """
-                cursor.execute(query, (user_id,))
-            else:
-                query = """
-                SELECT la.*, mu.user_name, mu.user_email, mu.member_number
-                FROM loan_applications la
-                JOIN member_users mu ON la.user_id = mu.user_id
-                ORDER BY la.submitted_at DESC
-                """
-                cursor.execute(query)
+            conditions, params = self._application_filters(
+                user_id, status, review_status, submitted_from, submitted_to, member_number
+            )
+            page_conditions, page_params = list(conditions), list(params)
+            if limit is not None:
+                limit = max(1, int(limit))
+            if cursor:
+                after_submitted_at, after_id = _decode_cursor(cursor)
+                if after_submitted_at is None:
+                    # NULL submitted_at sorts first when descending
+                    page_conditions.append("(la.submitted_at IS NOT NULL OR la.application_id < %s)")
+                    page_params.append(after_id)
+                else:
+                    page_conditions.append("(la.submitted_at, la.application_id) < (%s::timestamp, %s)")
+                    page_params += [after_submitted_at, after_id]
             
-            applications = cursor.fetchall()
+            query = """
+            SELECT la.*, mu.user_name, mu.user_email, mu.member_number
+            FROM loan_applications la
+            JOIN member_users mu ON la.user_id = mu.user_id
+            """ + _where(page_conditions) + """
+            ORDER BY la.submitted_at DESC, la.application_id DESC
+            """
+            if limit is not None:
+                # One extra row tells whether another page exists
+                query += " LIMIT %s"
+                page_params.append(limit + 1)
             
-            cursor.close()
-            conn.close()
+            total = None
+            with self._connection() as conn, self.metrics.span('query'):
+                db_cursor = conn.cursor(cursor_factory=RealDictCursor)
+                db_cursor.execute(query, page_params)
+                applications = db_cursor.fetchall()
+                
+                if include_total:
+                    db_cursor.execute("""
+                    SELECT count(*) AS total
+                    FROM loan_applications la
+                    JOIN member_users mu ON la.user_id = mu.user_id
+                    """ + _where(conditions), params)
+                    total = db_cursor.fetchone()['total']
+                
+                db_cursor.close()
             
-            # Convert datetime objects to strings for JSON serialization
-            applications_list = []
-            for app in applications:
-                app_dict = dict(app)
-                # Convert datetime objects to ISO format strings
-                for key, value in app_dict.items():
-                    if hasattr(value, 'isoformat'):
-                        app_dict[key] = value.isoformat()
-                applications_list.append(app_dict)
+            next_cursor = None
+            if limit is not None and len(applications) > limit:
+                applications = applications[:limit]
+                last = applications[-1]
+                next_cursor = _encode_cursor(last['submitted_at'], last['application_id'])
             
-            return {
+            result = {
                 'success': True,
-                'applications': applications_list
+                'applications': [_jsonable_row(app) for app in applications],
+                'next_cursor': next_cursor
             }
+            if include_total:
+                result['total'] = total
+            return result
             
         except Exception as e:
             return {
@@ -363,6 +1723,72 @@ class LoanApplicationService:
                 'applications': []
             }
     
+    def iter_loan_applications(self, user_id=None, status=None, review_status=None,
+                               submitted_from=None, submitted_to=None, member_number=None,
+                               itersize=EXPORT_ITERSIZE):
+        """
+        Stream loan applications through a server-side cursor.
+        
+        Rows are fetched from a named cursor ``itersize`` at a time and yielded
+        one by one, so memory use does not grow with the table. The pooled
+        connection is held until the generator is exhausted or closed.
+        
+        Args:
+            user_id, status, review_status, submitted_from, submitted_to,
+                member_number: Same filters as get_loan_applications
+            itersize (int): Rows fetched from the server per round trip
+            
+        Yields:
+            dict: One application with datetime values as ISO strings
+        """
+        conditions, params = self._application_filters(
+            user_id, status, review_status, submitted_from, submitted_to, member_number
+        )
+        query = """
+        SELECT la.*, mu.user_name, mu.user_email, mu.member_number
+        FROM loan_applications la
+        JOIN member_users mu ON la.user_id = mu.user_id
+        """ + _where(conditions) + """
+        ORDER BY la.submitted_at DESC, la.application_id DESC
+        """
+        
+        try:
+            with self._connection() as conn:
+                db_cursor = conn.cursor(name=f"loan_export_{uuid.uuid4().hex[:8]}", cursor_factory=RealDictCursor)
+                db_cursor.itersize = itersize
+                try:
+                    db_cursor.execute(query, params)
+                    for row in db_cursor:
+                        yield _jsonable_row(row)
+                finally:
+                    db_cursor.close()
+        except psycopg2.Error as e:
+            raise Exception(f"Error exporting loan applications: {str(e)}")
+    
+    def _application_filters(self, user_id=None, status=None, review_status=None,
+                             submitted_from=None, submitted_to=None, member_number=None):
+        """
+        Build WHERE conditions for the loan application list filters.
+        
+        Returns:
+            tuple: (conditions, params) for a query aliasing loan_applications
+                as ``la`` and member_users as ``mu``
+        """
+        conditions, params = [], []
+        for clause, value in (
+            ("la.user_id = %s", user_id),
+            ("la.status = %s", status),
+            ("la.review_status = %s", review_status),
+            ("la.submitted_at >= %s", submitted_from),
+            ("la.submitted_at < %s", submitted_to),
+            ("mu.member_number = %s", member_number),
+        ):
+            if value:
+                conditions.append(clause)
+                params.append(value)
+        return conditions, params
+    
+    @instrumented('update_application_status')
     def update_application_status(self, application_id, new_status):
         """
         Update the status of a loan application.
@@ -374,36 +1800,163 @@ class LoanApplicationService:
         Returns:
             dict: Result containing success status and message
         """
-        try:
-            conn = self._get_db_connection()
-            cursor = conn.cursor()
-            
-            update_query = """
-            UPDATE loan_applications 
-            SET status = %s 
-            WHERE application_id = %s
-            RETURNING application_id
-            """
-            
-            cursor.execute(update_query, (new_status, application_id))
-            result = cursor.fetchone()
+        result = self.update_statuses([application_id], new_status)
+        if not result['success']:
+            return {
+                'success': False,
+                'message': result['message']
+            }
+        
+        if result['updated']:
+            return {
+                'success': True,
+                'message': f'Application status updated to {new_status}'
+            }
+        elif result['skipped']:
+            return {
+                'success': True,
+                'message': f'Application status is already {new_status}'
+            }
+        elif result['conflicted']:
+            current = result['conflicted'][0]['status']
+            return {
+                'success': False,
+                'message': f'Cannot change application status from {current} to {new_status}'
+            }
+        return {
+            'success': False,
+            'message': 'Application not found'
+        }
+    
+    @instrumented('update_statuses')
+    def update_statuses(self, applications, new_status, expected_current_status=None,
+                        reviewer_id=None, reviewer_role='system', notes=None):
+        """
+        Move many applications to a new status in one statement.
+        
+        Only transitions declared in STATUS_TRANSITIONS are applied. The
+        target rows are locked, updated with a single UPDATE ... WHERE status
+        = ANY(...), and a loan_review_history row and a notification_outbox
+        event are written for each change, all in one transaction. Members
+        are notified later by notifications.NotificationDispatcher, so
+        moving thousands of applications adds no delivery work here.
+        
+        Args:
+            applications (list or dict): Application IDs, or a filter dict with
+                the get_loan_applications filter names (user_id, status,
+                review_status, submitted_from, submitted_to, member_number)
+            new_status (str): Status to move to
+            expected_current_status (str, optional): Only move applications
+                currently in this status; others are reported as conflicted
+            reviewer_id (str, optional): Reviewer recorded in the history
+            reviewer_role (str): Role recorded in the history
+            notes (str, optional): Notes recorded in the history
             
-            if result:
-                conn.commit()
-                cursor.close()
-                conn.close()
+        Returns:
+            dict: Result with updated and skipped (already in new_status) IDs,
+                conflicted entries (application_id and current status) and,
+                for ID lists, not_found IDs
+        """
+        if new_status not in STATUS_TRANSITIONS:
+            return {
+                'success': False,
+                'message': f"Invalid status '{new_status}'. Expected one of: {', '.join(STATUS_TRANSITIONS)}"
+            }
+        
+        allowed_from = [status for status, targets in STATUS_TRANSITIONS.items() if new_status in targets]
+        if expected_current_status is not None:
+            allowed_from = [status for status in allowed_from if status == expected_current_status]
+        
+        if isinstance(applications, dict):
+            filters = dict(applications)
+            unknown = sorted(set(filters) - set(APPLICATION_FILTERS))
+            if unknown:
                 return {
-                    'success': True,
-                    'message': f'Application status updated to {new_status}'
+                    'success': False,
+                    'message': f"Unknown filter(s): {', '.join(map(str, unknown))}. Expected: {', '.join(APPLICATION_FILTERS)}"
                 }
-            else:
-                cursor.close()
-                conn.close()
+            if expected_current_status is not None:
+                filters.setdefault('status', expected_current_status)
+            if not any(filters.values()):
                 return {
                     'success': False,
-                    'message': 'Application not found'
+                    'message': 'Refusing to update every application; pass IDs or at least one filter'
                 }
-                
+            conditions, params = self._application_filters(**filters)
+            requested_ids = None
+        elif isinstance(applications, (str, bytes)):
+            # A lone string would otherwise be read one character at a time
+            return {
+                'success': False,
+                'message': 'Application IDs must be a list of integers'
+            }
+        else:
+            try:
+                requested_ids = sorted({int(application_id) for application_id in applications})
+            except (TypeError, ValueError):
+                return {
+                    'success': False,
+                    'message': 'Application IDs must be integers'
+                }
+            conditions, params = ["la.application_id = ANY(%s)"], [requested_ids]
+        
+        try:
+            with self._connection() as conn, self.metrics.span('query'):
+                cursor = conn.cursor()
+                cursor.execute("""
+                WITH target AS (
+                    SELECT la.application_id, la.status
+                    FROM loan_applications la
+                    JOIN member_users mu ON la.user_id = mu.user_id
+                    """ + _where(conditions) + """
+                    FOR UPDATE OF la
+                ), updated AS (
+                    UPDATE loan_applications la
+                    SET status = %s
+                    FROM target t
+                    WHERE la.application_id = t.application_id AND t.status = ANY(%s)
+                    RETURNING la.application_id, la.user_id
+                ), history AS (
+                    INSERT INTO loan_review_history (application_id, reviewer_id, reviewer_role, action_taken, notes)
+                    SELECT application_id, %s::uuid, %s, %s, %s FROM updated
+                ), outbox AS (
+                    INSERT INTO """ + notifications.OUTBOX_TABLE + """ (user_id, application_id, event_type, payload)
+                    SELECT u.user_id, u.application_id, 'status_changed',
+                           jsonb_build_object('status', %s::text, 'previous_status', t.status)
+                    FROM updated u JOIN target t ON t.application_id = u.application_id
+                )
+                SELECT t.application_id, t.status, u.application_id IS NOT NULL
+                FROM target t
+                LEFT JOIN updated u ON u.application_id = t.application_id
+                ORDER BY t.application_id
+                """, params + [new_status, allowed_from, reviewer_id, reviewer_role, new_status, notes, new_status])
+                rows = cursor.fetchall()
+                if any(was_updated for _, _, was_updated in rows):
+                    # Delivered on commit; wakes the dispatcher
+                    cursor.execute("SELECT pg_notify(%s, '')", (notifications.OUTBOX_CHANNEL,))
+                cursor.close()
+            
+            updated, skipped, conflicted = [], [], []
+            for application_id, current_status, was_updated in rows:
+                if was_updated:
+                    updated.append(application_id)
+                elif current_status == new_status:
+                    skipped.append(application_id)
+                else:
+                    conflicted.append({'application_id': application_id, 'status': current_status})
+            
+            result = {
+                'success': True,
+                'message': f'Updated {len(updated)}, skipped {len(skipped)}, conflicted {len(conflicted)}.',
+                'updated': updated,
+                'skipped': skipped,
+                'conflicted': conflicted
+            }
+            if requested_ids is not None:
+                found = {row[0] for row in rows}
+                result['not_found'] = [application_id for application_id in requested_ids if application_id not in found]
+            return result
+            
         except Exception as e:
             return {
                 'success': False,
@@ -411,6 +1964,22 @@ class LoanApplicationService:
             }
 
 
+def job_handlers(db_config):
+    """
+    Handlers for job_queue workers (``python job_queue.py --work``).
+
+    Each worker process gets its own service with a one-connection pool.
+
+    Args:
+        db_config (dict): Database configuration (staff database)
+
+    Returns:
+        dict: job_type -> handler
+    """
+    service = LoanApplicationService(db_config, {'min_size': 1, 'max_size': 1})
+    return {'process_upload': service.process_upload_job}
+
+
 # Example usage and Flask route integration
 def create_flask_routes(app, loan_service):
     """
@@ -423,7 +1992,7 @@ def create_flask_routes(app, loan_service):
     Note: This function requires Flask to be imported:
         from flask import Flask, request, jsonify
     """
-    from flask import request, jsonify
+    from flask import Response, request, jsonify, stream_with_context
     
     @app.route('/api/loan-application/submit', methods=['POST'])
     def submit_loan_application():
@@ -454,10 +2023,32 @@ def create_flask_routes(app, loan_service):
     
     @app.route('/api/loan-application/list', methods=['GET'])
     def get_loan_applications():
-        """Get loan applications for a user."""
+        """Get one page of loan applications, optionally filtered, or stream them all."""
         try:
-            user_id = request.args.get('user_id')
-            result = loan_service.get_loan_applications(user_id)
+            if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+                rows = loan_service.iter_loan_applications(
+                    user_id=request.args.get('user_id'),
+                    status=request.args.get('status'),
+                    review_status=request.args.get('review_status'),
+                    submitted_from=request.args.get('submitted_from'),
+                    submitted_to=request.args.get('submitted_to'),
+                    member_number=request.args.get('member_number')
+                )
+                lines = (json.dumps(row, default=str) + '\n' for row in rows)
+                return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+            
+            limit = clamp_page_size(request.args.get('limit', type=int))
+            result = loan_service.get_loan_applications(
+                user_id=request.args.get('user_id'),
+                status=request.args.get('status'),
+                review_status=request.args.get('review_status'),
+                submitted_from=request.args.get('submitted_from'),
+                submitted_to=request.args.get('submitted_to'),
+                member_number=request.args.get('member_number'),
+                limit=limit,
+                cursor=request.args.get('cursor'),
+                include_total=request.args.get('include_total', '').lower() in ('1', 'true', 'yes')
+            )
             return jsonify(result)
             
         except Exception as e:
@@ -472,23 +2063,48 @@ def create_flask_routes(app, loan_service):
         try:
             data = request.get_json()
             application_id = data.get('application_id')
+            application_ids = data.get('application_ids')
+            filters = data.get('filter')
             new_status = data.get('status')
             
-            if not application_id or not new_status:
+            if not (application_id or application_ids or filters) or not new_status:
                 return jsonify({
                     'success': False,
-                    'message': 'Application ID and status are required'
+                    'message': 'Application ID (or application_ids/filter) and status are required'
                 }), 400
             
-            result = loan_service.update_application_status(application_id, new_status)
+            if application_id:
+                result = loan_service.update_application_status(application_id, new_status)
+            else:
+                result = loan_service.update_statuses(
+                    application_ids or filters,
+                    new_status,
+                    expected_current_status=data.get('expected_current_status'),
+                    reviewer_id=data.get('reviewer_id'),
+                    reviewer_role=data.get('reviewer_role', 'system'),
+                    notes=data.get('notes')
+                )
             return jsonify(result)
-            
+
         except Exception as e:
             return jsonify({
                 'success': False,
                 'message': f'Server error: {str(e)}'
             }), 500
 
+    @app.route('/api/loan-application/metrics', methods=['GET'])
+    def get_loan_service_metrics():
+        """Service latency and error metrics (Prometheus text, or JSON with ?format=json)."""
+        if request.args.get('format') == 'json':
+            return jsonify(loan_service.get_metrics())
+        return Response(loan_service.render_metrics(), mimetype='text/plain; version=0.0.4')
+
+    @app.route('/api/loan-application/statistics', methods=['GET'])
+    def get_loan_review_statistics():
+        """Application counts by review status and status, without counting the table."""
+        result = loan_service.get_review_statistics()
+        return jsonify(result), 200 if result['success'] else 500
+
 
 # Example standalone usage
 if __name__ == "__main__":
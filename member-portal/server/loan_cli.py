@@ -2,132 +2,624 @@
 """
 Command-line interface for the Loan Application Service.
 This script can be called from Node.js or used directly from the command line.
+
+Besides the one-shot commands, ``--serve`` starts a long-lived worker that
+keeps a single LoanApplicationService warm and answers newline-delimited JSON
+requests on stdin/stdout (or on a Unix socket with ``--socket``).
 """
 
 import sys
+import csv
 import json
+import logging
 import os
-from loan_application_service import LoanApplicationService
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import image_normalize
+from loan_application_service import DEFAULT_PAGE_SIZE, EXPORT_ITERSIZE, LoanApplicationService, clamp_page_size
+
+# Database configuration - Connect to staff database
+DB_CONFIG = {
+    'host': 'localhost',
+    'database': 'slz_coop_staff',
+    'user': 'postgres',
+    'password': 'password',
+    'port': 5432
+}
+
+# Connection pool settings; one-shot commands only ever need one connection
+POOL_CONFIG = {
+    'min_size': 1,
+    'max_size': 1,
+    'acquire_timeout': 10.0,
+    'max_lifetime': 1800.0,
+    'health_check_after': 5.0
+}
+
+# 'verify' fails fast on schema drift; run --migrate to apply changes
+SCHEMA_MODE = 'verify'
+
+DEFAULT_SERVE_WORKERS = 4
+
+# Seconds between folds of the review statistics deltas in --serve
+DEFAULT_STATS_FOLD_INTERVAL = 60.0
+
+# Socket --stats asks when none is given; start the worker with the same --socket
+DEFAULT_STATS_SOCKET = '/tmp/loan_service.sock'
+
+
+class LocalFile:
+    """File object wrapper for a file that already exists on local disk."""
+
+    def __init__(self, file_path):
+        self.filename = os.path.basename(file_path)
+        self.file_path = file_path
+        self._handle = None
+
+    def _file(self):
+        if self._handle is None:
+            self._handle = open(self.file_path, 'rb')
+        return self._handle
+
+    def read(self, size=-1):
+        return self._file().read(size)
+
+    def seek(self, position, whence=0):
+        return self._file().seek(position, whence)
+
+    def tell(self):
+        return self._file().tell()
+
+    def save(self, path):
+        import shutil
+        shutil.copy2(self.file_path, path)
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+def list_applications(loan_service, params, default_limit=DEFAULT_PAGE_SIZE):
+    """
+    Run a 'list' command: one page of applications.
+
+    Worker requests without a limit get DEFAULT_PAGE_SIZE rows, like the
+    Flask route, and every limit is clamped to MAX_PAGE_SIZE. Only the
+    one-shot ``--list`` passes ``default_limit=None`` to print every row.
+    """
+    return loan_service.get_loan_applications(
+        user_id=params.get('user_id') or None,
+        status=params.get('status'),
+        review_status=params.get('review_status'),
+        submitted_from=params.get('submitted_from'),
+        submitted_to=params.get('submitted_to'),
+        member_number=params.get('member_number'),
+        limit=clamp_page_size(params.get('limit'), default_limit),
+        cursor=params.get('cursor'),
+        include_total=bool(params.get('include_total'))
+    )
+
+
+def handle_request(loan_service, command, params):
+    """
+    Run a single worker command and return its result dict.
+
+    Args:
+        loan_service (LoanApplicationService): Warm service instance
+        command (str): Command name ('submit', 'list', 'update_status',
+            'review_stats', 'pool_stats', 'cache_stats', 'stats', 'ping')
+        params (dict): Command parameters
+
+    Returns:
+        dict: Result in the same shape as the one-shot CLI output
+    """
+    if command == 'submit':
+        user_id = params.get('user_id')
+        file_path = params.get('file_path')
+        if not user_id or not file_path:
+            return {
+                'success': False,
+                'message': 'user_id and file_path are required',
+                'application_id': None
+            }
+        if params.get('adopt'):
+            # The caller hands the file over; it is moved into place, not copied
+            return loan_service.adopt_loan_application(user_id, file_path)
+        local_file = LocalFile(file_path)
+        try:
+            return loan_service.submit_loan_application(user_id, local_file)
+        finally:
+            local_file.close()
+
+    elif command == 'list':
+        return list_applications(loan_service, params)
+
+    elif command == 'update_status':
+        application_id = params.get('application_id')
+        application_ids = params.get('application_ids')
+        filters = params.get('filter')
+        status = params.get('status')
+        if not (application_id or application_ids or filters) or not status:
+            return {
+                'success': False,
+                'message': 'Application ID and status are required'
+            }
+        if application_id:
+            return loan_service.update_application_status(int(application_id), status)
+        return loan_service.update_statuses(
+            application_ids or filters,
+            status,
+            expected_current_status=params.get('expected_current_status'),
+            reviewer_id=params.get('reviewer_id'),
+            reviewer_role=params.get('reviewer_role') or 'system',
+            notes=params.get('notes')
+        )
+
+    elif command == 'review_stats':
+        return loan_service.get_review_statistics()
+
+    elif command == 'pool_stats':
+        return {'success': True, 'pool': loan_service.get_pool_stats()}
+
+    elif command == 'cache_stats':
+        return {'success': True, 'member_cache': loan_service.get_member_cache_stats()}
+
+    elif command == 'stats':
+        if params.get('format') == 'prometheus':
+            return {'success': True, 'text': loan_service.render_metrics()}
+        return {'success': True, 'metrics': loan_service.get_metrics()}
+
+    elif command == 'ping':
+        return {'success': True, 'message': 'pong', 'pid': os.getpid()}
+
+    return {
+        'success': False,
+        'message': f'Unknown command: {command}'
+    }
+
+
+class RequestDispatcher:
+    """
+    Decode newline-delimited JSON requests and run them on a thread pool.
+
+    Each request line looks like ``{"id": 7, "command": "submit",
+    "params": {...}}`` and is answered with one ``{"id": 7, "result": {...}}``
+    line. Responses are written as soon as each request finishes, so they may
+    arrive out of order; callers match them up by ``id``.
+    """
+
+    def __init__(self, loan_service, workers=DEFAULT_SERVE_WORKERS):
+        self.loan_service = loan_service
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def dispatch(self, line, write_response):
+        """Parse one request line and schedule it; ``write_response`` gets the reply dict."""
+        line = line.strip()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('request must be a JSON object')
+        except ValueError as e:
+            write_response({
+                'id': None,
+                'result': {'success': False, 'message': f'Invalid request: {str(e)}'}
+            })
+            return
+
+        request_id = request.get('id')
+        command = request.get('command')
+        params = request.get('params') or {}
+
+        def run():
+            try:
+                result = handle_request(self.loan_service, command, params)
+            except Exception as e:
+                result = {'success': False, 'message': f'Error: {str(e)}'}
+            write_response({'id': request_id, 'result': result})
+
+        self.executor.submit(run)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+def _line_writer(stream):
+    """Return a thread-safe function that writes one JSON document per line."""
+    lock = threading.Lock()
+
+    def write_response(response):
+        data = json.dumps(response, default=str)
+        with lock:
+            stream.write(data + '\n')
+            stream.flush()
+
+    return write_response
+
+
+def serve_stdio(loan_service, workers=DEFAULT_SERVE_WORKERS):
+    """Serve requests from stdin, writing responses to stdout until EOF."""
+    protocol_out = sys.stdout
+    # Anything else printed while serving must not corrupt the protocol stream
+    sys.stdout = sys.stderr
+
+    dispatcher = RequestDispatcher(loan_service, workers)
+    write_response = _line_writer(protocol_out)
+    try:
+        for line in sys.stdin:
+            dispatcher.dispatch(line, write_response)
+    finally:
+        dispatcher.shutdown()
+        sys.stdout = protocol_out
+
+
+def serve_socket(loan_service, socket_path, workers=DEFAULT_SERVE_WORKERS):
+    """Serve requests on a Unix domain socket, one NDJSON stream per connection."""
+    import socketserver
+
+    dispatcher = RequestDispatcher(loan_service, workers)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            write_response = _line_writer(_SocketWriter(self.wfile))
+            for raw_line in self.rfile:
+                dispatcher.dispatch(raw_line.decode('utf-8'), write_response)
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    server = socketserver.ThreadingUnixStreamServer(socket_path, Handler)
+    server.daemon_threads = True
+    print(f"Loan service worker listening on {socket_path}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        dispatcher.shutdown()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+class _SocketWriter:
+    """Text adapter over a socket's binary write file."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text):
+        try:
+            self.wfile.write(text.encode('utf-8'))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def flush(self):
+        try:
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def query_worker_stats(socket_path, output_format='json'):
+    """
+    Ask a running ``--serve --socket`` worker for its metrics.
+
+    One-shot processes start with empty metrics, so the numbers worth
+    reading live in the long-lived worker.
+
+    Args:
+        socket_path (str): The worker's Unix socket
+        output_format (str): 'json' or 'prometheus'
+
+    Returns:
+        dict: The worker's 'stats' result
+    """
+    import socket
+
+    request = {'id': 1, 'command': 'stats', 'params': {'format': output_format}}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(10.0)
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        reader = sock.makefile('r', encoding='utf-8')
+        line = reader.readline()
+    if not line:
+        raise Exception('Worker closed the connection without answering')
+    return json.loads(line)['result']
+
+
+def _option_value(args, name, default=None):
+    """Return the value following ``name`` in ``args``, or ``default``."""
+    if name in args:
+        index = args.index(name)
+        if index + 1 < len(args):
+            return args[index + 1]
+    return default
+
+
+def read_manifest(manifest_path):
+    """
+    Read a batch manifest of (user_id, file_path) items.
+
+    ``.jsonl`` files hold one JSON object per line; anything else is read as
+    CSV with a header row. Relative file paths are resolved against the
+    manifest's folder.
+
+    Returns:
+        list: Dicts with 'user_id' and 'file_path'
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    items = []
+    with open(manifest_path, newline='') as f:
+        if manifest_path.lower().endswith('.jsonl'):
+            records = (json.loads(line) for line in f if line.strip())
+        else:
+            records = csv.DictReader(f)
+        for record in records:
+            file_path = (record.get('file_path') or '').strip()
+            if file_path and not os.path.isabs(file_path):
+                file_path = os.path.join(base_dir, file_path)
+            items.append({
+                'user_id': (record.get('user_id') or '').strip(),
+                'file_path': file_path
+            })
+    return items
+
+
+def stream_applications(loan_service, user_id, options):
+    """Write matching applications to stdout as NDJSON while they are fetched."""
+    rows = loan_service.iter_loan_applications(
+        user_id=user_id,
+        status=_option_value(options, '--status'),
+        review_status=_option_value(options, '--review-status'),
+        submitted_from=_option_value(options, '--from'),
+        submitted_to=_option_value(options, '--to'),
+        member_number=_option_value(options, '--member-number'),
+        itersize=int(_option_value(options, '--itersize', EXPORT_ITERSIZE))
+    )
+    try:
+        for row in rows:
+            sys.stdout.write(json.dumps(row, default=str) + '\n')
+    except Exception as e:
+        # stdout carries only rows; report the failure out of band
+        print(json.dumps({'success': False, 'message': f'Error: {str(e)}'}), file=sys.stderr)
+        sys.exit(1)
+    sys.stdout.flush()
+
 
 def main():
     """Main CLI function."""
     if len(sys.argv) < 2:
         print_usage()
         sys.exit(1)
-    
+
     command = sys.argv[1]
-    
-    # Database configuration - Connect to staff database
-    db_config = {
-        'host': 'localhost',
-        'database': 'slz_coop_staff',
-        'user': 'postgres',
-        'password': 'password',
-        'port': 5432
-    }
-    
+
     try:
-        loan_service = LoanApplicationService(db_config)
-        
-        if command == '--submit':
-            if len(sys.argv) != 4:
-                print("Usage: python loan_cli.py --submit <user_id> <file_path>")
+        if command == '--serve':
+            options = sys.argv[2:]
+            workers = int(_option_value(options, '--workers', DEFAULT_SERVE_WORKERS))
+            socket_path = _option_value(options, '--socket')
+            slow_ms = _option_value(options, '--slow-ms')
+            # One pooled connection per worker thread keeps requests from queueing on the
+            # pool, plus one for the statistics folder thread started below
+            pool_config = dict(POOL_CONFIG, max_size=workers + 1)
+            loan_service = LoanApplicationService(DB_CONFIG, pool_config, SCHEMA_MODE)
+            if slow_ms:
+                # Slow calls are logged to stderr with their phase breakdown
+                logging.basicConfig(stream=sys.stderr, level=logging.WARNING)
+                loan_service.metrics.slow_call_threshold = float(slow_ms) / 1000.0
+            # Check the schema once at startup so a bad deployment fails before taking traffic
+            loan_service.ensure_schema()
+            # Warm workers answer repeat member lookups from memory
+            loan_service.enable_member_cache()
+            if '--background-jobs' in options:
+                # Normalization and derivatives run in job_queue.py --work processes
+                loan_service.post_process_in_background = True
+            loan_service.start_statistics_folder(
+                float(_option_value(options, '--fold-interval', DEFAULT_STATS_FOLD_INTERVAL))
+            )
+            # Finish or discard uploads a previous worker left mid-commit
+            recovery = loan_service.recover_uploads()
+            print(recovery['message'], file=sys.stderr)
+            if socket_path:
+                serve_socket(loan_service, socket_path, workers)
+            else:
+                serve_stdio(loan_service, workers)
+            return
+
+        if command == '--stats':
+            options = sys.argv[2:]
+            socket_path = _option_value(options, '--socket', DEFAULT_STATS_SOCKET)
+            output_format = _option_value(options, '--format', 'json')
+            result = query_worker_stats(socket_path, output_format)
+            if output_format == 'prometheus' and result.get('success'):
+                sys.stdout.write(result['text'])
+            else:
+                print(json.dumps(result, default=str))
+            return
+
+        if command == '--normalize-dir':
+            # Works on files only; no database connection needed
+            if len(sys.argv) < 3:
+                print("Usage: python loan_cli.py --normalize-dir <directory> [--dry-run] [--workers <n>] "
+                      "[--max-edge <px>] [--quality <q>]")
+                sys.exit(1)
+            options = sys.argv[3:]
+            normalize_options = {}
+            if _option_value(options, '--max-edge'):
+                normalize_options['max_edge'] = int(_option_value(options, '--max-edge'))
+            if _option_value(options, '--quality'):
+                normalize_options['jpeg_quality'] = int(_option_value(options, '--quality'))
+            workers = _option_value(options, '--workers')
+            result = image_normalize.normalize_directory(
+                sys.argv[2], normalize_options, dry_run='--dry-run' in options,
+                workers=int(workers) if workers else None
+            )
+            print(json.dumps(result))
+            return
+
+        loan_service = LoanApplicationService(DB_CONFIG, POOL_CONFIG, SCHEMA_MODE)
+
+        if command == '--migrate':
+            result = loan_service.migrate_schema()
+            print(json.dumps(result))
+            if not result['success']:
                 sys.exit(1)
-            
-            user_id = sys.argv[2]
-            file_path = sys.argv[3]
-            
-            # Create a mock file object
-            class MockFile:
-                def __init__(self, file_path):
-                    self.filename = os.path.basename(file_path)
-                    self.file_path = file_path
-                
-                def read(self, size=-1):
-                    with open(self.file_path, 'rb') as f:
-                        return f.read(size)
-                
-                def seek(self, position, whence=0):
-                    pass  # Not needed for this implementation
-                
-                def tell(self):
-                    return os.path.getsize(self.file_path)
-                
-                def save(self, path):
-                    import shutil
-                    shutil.copy2(self.file_path, path)
-            
-            mock_file = MockFile(file_path)
-            result = loan_service.submit_loan_application(user_id, mock_file)
+
+        elif command == '--recover-uploads':
+            result = loan_service.recover_uploads()
             print(json.dumps(result))
-            
+
+        elif command == '--migrate-uploads':
+            batch_size = int(_option_value(sys.argv[2:], '--batch-size', 200))
+            result = loan_service.migrate_uploads(batch_size)
+            print(json.dumps(result))
+            if not result['success']:
+                sys.exit(1)
+
+        elif command == '--gc-uploads':
+            result = loan_service.remove_unreferenced_blobs()
+            print(json.dumps(result))
+
+        elif command == '--backfill-derivatives':
+            batch_size = int(_option_value(sys.argv[2:], '--batch-size', 100))
+            workers = _option_value(sys.argv[2:], '--workers')
+            result = loan_service.backfill_derivatives(batch_size, workers=int(workers) if workers else None)
+            print(json.dumps(result))
+            if not result['success']:
+                sys.exit(1)
+
+        elif command == '--review-stats':
+            action = sys.argv[2] if len(sys.argv) > 2 else 'show'
+            if action == 'show':
+                result = loan_service.get_review_statistics()
+            elif action == 'fold':
+                result = loan_service.fold_review_statistics()
+            elif action == 'rebuild':
+                result = loan_service.rebuild_review_statistics()
+            elif action == 'check':
+                result = loan_service.check_review_statistics()
+            else:
+                result = {'success': False, 'message': f'Unknown --review-stats action: {action}'}
+            print(json.dumps(result))
+            if not result['success']:
+                sys.exit(1)
+
+        elif command == '--check-schema':
+            result = loan_service.check_schema()
+            print(json.dumps(result))
+            if not result['success']:
+                sys.exit(1)
+
+        elif command == '--submit':
+            if len(sys.argv) not in (4, 5) or (len(sys.argv) == 5 and sys.argv[4] != '--adopt'):
+                print("Usage: python loan_cli.py --submit <user_id> <file_path> [--adopt]")
+                sys.exit(1)
+
+            result = handle_request(loan_service, 'submit', {
+                'user_id': sys.argv[2],
+                'file_path': sys.argv[3],
+                'adopt': len(sys.argv) == 5
+            })
+            print(json.dumps(result))
+
+        elif command == '--submit-batch':
+            if len(sys.argv) < 3:
+                print("Usage: python loan_cli.py --submit-batch <manifest.csv|manifest.jsonl> [--workers <n>]")
+                sys.exit(1)
+
+            workers = _option_value(sys.argv[3:], '--workers')
+            items = read_manifest(sys.argv[2])
+            result = loan_service.submit_many(items, workers=int(workers) if workers else None)
+            print(json.dumps(result, default=str))
+            if not result['success']:
+                sys.exit(1)
+
         elif command == '--list':
-            user_id = sys.argv[2] if len(sys.argv) > 2 else None
-            result = loan_service.get_loan_applications(user_id)
+            options = sys.argv[2:]
+            user_id = options[0] if options and not options[0].startswith('--') else None
+            if '--stream' in options:
+                stream_applications(loan_service, user_id, options)
+                return
+            result = list_applications(loan_service, {
+                'user_id': user_id,
+                'status': _option_value(options, '--status'),
+                'review_status': _option_value(options, '--review-status'),
+                'submitted_from': _option_value(options, '--from'),
+                'submitted_to': _option_value(options, '--to'),
+                'member_number': _option_value(options, '--member-number'),
+                'limit': _option_value(options, '--limit'),
+                'cursor': _option_value(options, '--cursor'),
+                'include_total': '--count' in options
+            }, default_limit=None)
             print(json.dumps(result))
-            
+
         elif command == '--update-status':
-            if len(sys.argv) != 4:
-                print("Usage: python loan_cli.py --update-status <application_id> <status>")
+            if len(sys.argv) < 4 or sys.argv[2].startswith('--') or sys.argv[3].startswith('--'):
+                print("Usage: python loan_cli.py --update-status <application_id>[,<application_id>...]|filter <status> [options]")
                 sys.exit(1)
-            
-            application_id = int(sys.argv[2])
-            status = sys.argv[3]
-            result = loan_service.update_application_status(application_id, status)
+
+            target, status, options = sys.argv[2], sys.argv[3], sys.argv[4:]
+            params = {
+                'status': status,
+                'expected_current_status': _option_value(options, '--expect'),
+                'reviewer_id': _option_value(options, '--reviewer-id'),
+                'reviewer_role': _option_value(options, '--reviewer-role'),
+                'notes': _option_value(options, '--notes')
+            }
+            if target == 'filter':
+                params['filter'] = {
+                    'user_id': _option_value(options, '--user'),
+                    'review_status': _option_value(options, '--review-status'),
+                    'submitted_from': _option_value(options, '--from'),
+                    'submitted_to': _option_value(options, '--to'),
+                    'member_number': _option_value(options, '--member-number')
+                }
+            elif ',' in target or options:
+                params['application_ids'] = [int(application_id) for application_id in target.split(',') if application_id]
+            else:
+                params['application_id'] = target
+
+            result = handle_request(loan_service, 'update_status', params)
             print(json.dumps(result))
-            
+
         elif command == '--test':
             # Run basic test
             print("Testing loan application service...")
-            
+
             # Test user ID (using a sample UUID format for testing)
             # In real usage, this should be a valid member user ID from member_users table
             test_user_id = "123e4567-e89b-12d3-a456-426614174000"
-            
+
             # Create a test JPG file
             from PIL import Image
-            from io import BytesIO
-            
+
             img = Image.new('RGB', (100, 100), color='red')
             test_file_path = 'test_application.jpg'
             img.save(test_file_path, 'JPEG')
-            
-            # Define MockFile class for testing
-            class MockFile:
-                def __init__(self, file_path):
-                    self.filename = os.path.basename(file_path)
-                    self.file_path = file_path
-                
-                def read(self, size=-1):
-                    with open(self.file_path, 'rb') as f:
-                        return f.read(size)
-                
-                def seek(self, position, whence=0):
-                    pass  # Not needed for this implementation
-                
-                def tell(self):
-                    return os.path.getsize(self.file_path)
-                
-                def save(self, path):
-                    import shutil
-                    shutil.copy2(self.file_path, path)
-            
+
             try:
                 # Test submission
-                mock_file = MockFile(test_file_path)
-                result = loan_service.submit_loan_application(test_user_id, mock_file)
+                result = handle_request(loan_service, 'submit', {
+                    'user_id': test_user_id,
+                    'file_path': test_file_path
+                })
                 print(f"Test result: {json.dumps(result, indent=2)}")
-                
+
             finally:
                 # Clean up test file
                 if os.path.exists(test_file_path):
                     os.remove(test_file_path)
-                    
+
         else:
             print(f"Unknown command: {command}")
             print_usage()
             sys.exit(1)
-            
+
     except Exception as e:
         error_result = {
             'success': False,
@@ -141,17 +633,55 @@ def print_usage():
     print("Loan Application Service CLI")
     print("=" * 40)
     print("Usage:")
-    print("  python loan_cli.py --submit <user_id> <file_path>")
-    print("  python loan_cli.py --list [user_id]")
+    print("  python loan_cli.py --submit <user_id> <file_path> [--adopt]")
+    print("  python loan_cli.py --submit-batch <manifest.csv|manifest.jsonl> [--workers <n>]")
+    print("  python loan_cli.py --list [user_id] [--status <s>] [--review-status <s>] [--from <date>] [--to <date>]")
+    print("                        [--member-number <n>] [--limit <n>] [--cursor <c>] [--count]")
+    print("  python loan_cli.py --list [user_id] --stream [--itersize <n>] [filters]")
     print("  python loan_cli.py --update-status <application_id> <status>")
+    print("  python loan_cli.py --update-status <id>,<id>,... <status> [--expect <current>] [--reviewer-id <uuid>]")
+    print("                        [--reviewer-role <role>] [--notes <text>]")
+    print("  python loan_cli.py --update-status filter <status> --expect <current> [--user <id>] [--review-status <s>]")
+    print("                        [--member-number <n>] [--from <date>] [--to <date>]")
+    print("  python loan_cli.py --serve [--socket <path>] [--workers <n>] [--slow-ms <ms>] [--fold-interval <s>]")
+    print("                        [--background-jobs]")
+    print("  python loan_cli.py --stats [--socket <path>] [--format json|prometheus]")
+    print("  python loan_cli.py --migrate")
+    print("  python loan_cli.py --check-schema")
+    print("  python loan_cli.py --review-stats [show|fold|rebuild|check]")
+    print("  python loan_cli.py --recover-uploads")
+    print("  python loan_cli.py --migrate-uploads [--batch-size <n>]")
+    print("  python loan_cli.py --gc-uploads")
+    print("  python loan_cli.py --backfill-derivatives [--batch-size <n>] [--workers <n>]")
+    print("  python loan_cli.py --normalize-dir <directory> [--dry-run] [--workers <n>] [--max-edge <px>] [--quality <q>]")
     print("  python loan_cli.py --test")
     print("")
     print("Examples:")
     print("  python loan_cli.py --submit 123e4567-e89b-12d3-a456-426614174000 /path/to/application.jpg")
+    print("  python loan_cli.py --submit 123e4567-e89b-12d3-a456-426614174000 loan_applications/upload.jpg --adopt")
+    print("  python loan_cli.py --submit-batch branch_scans/manifest.csv --workers 8")
     print("  python loan_cli.py --list 123e4567-e89b-12d3-a456-426614174000")
     print("  python loan_cli.py --list")
+    print("  python loan_cli.py --list --status pending --limit 50 --count")
+    print("  python loan_cli.py --list --stream > applications.ndjson")
     print("  python loan_cli.py --update-status 1 approved")
+    print("  python loan_cli.py --update-status 4,5,9 approved --expect pending --notes 'Batch approval'")
+    print("  python loan_cli.py --update-status filter rejected --expect pending --to 2024-01-01")
+    print("  python loan_cli.py --serve --workers 8")
+    print("  python loan_cli.py --serve --socket /tmp/loan_service.sock --slow-ms 500")
+    print("  python loan_cli.py --stats --socket /tmp/loan_service.sock --format prometheus")
+    print("  python loan_cli.py --backfill-derivatives --workers 4")
+    print("  python loan_cli.py --normalize-dir payment_references --dry-run")
     print("  python loan_cli.py --test")
+    print("")
+    print("Worker protocol (--serve): one JSON object per line, e.g.")
+    print('  {"id": 1, "command": "submit", "params": {"user_id": "...", "file_path": "...", "adopt": true}}')
+    print('  {"id": 2, "command": "list", "params": {"status": "pending", "limit": 50, "cursor": "..."}}')
+    print('  {"id": 3, "command": "update_status", "params": {"application_id": 1, "status": "approved"}}')
+    print('  {"id": 5, "command": "update_status", "params": {"application_ids": [1, 2], "status": "approved"}}')
+    print('  {"id": 4, "command": "pool_stats"}')
+    print('  {"id": 6, "command": "cache_stats"}')
+    print('  {"id": 7, "command": "stats", "params": {"format": "prometheus"}}')
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,296 @@
+"""
+Low-overhead latency and outcome metrics for LoanApplicationService.
+
+Every public service method runs inside ``ServiceMetrics.call``. That records
+how long the method took, counts the call, and sorts failed results into an
+error category. Inside a call, ``span`` times one phase (connection, member
+lookup, read/validate, staging write, insert, commit, ...) and files the
+timing under the method that is running. Timings go into fixed-bucket
+histograms, so each observation is a ``bisect`` and a few additions under a
+lock.
+
+``render_prometheus`` produces the Prometheus text exposition format, and
+``snapshot`` gives the same data as a dict for JSON consumers. When
+``slow_call_threshold`` is set, calls slower than it are logged with their
+phase breakdown.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+# Upper bounds in seconds; slow-disk and PIL-bound phases land in the tail
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# First matching fragment of a failure message decides its category
+ERROR_CATEGORIES = (
+    ('Database error', 'database'),
+    ('Invalid user ID', 'unknown_member'),
+    ('does not exist', 'unknown_member'),
+    ('not found', 'not_found'),
+    ('inactive', 'inactive_member'),
+    ('File too large', 'upload_too_large'),
+    ('Invalid file type', 'invalid_file'),
+    ('No file provided', 'missing_file'),
+    ('Invalid status', 'invalid_status'),
+    ('Cannot change application status', 'status_conflict'),
+    ('Invalid cursor', 'invalid_request'),
+    ('must be integers', 'invalid_request'),
+    ('Refusing to update', 'invalid_request'),
+    ('required', 'invalid_request'),
+)
+
+PREFIX = 'loan_service'
+
+logger = logging.getLogger('loan_metrics')
+
+
+def error_category(message):
+    """Map a result message to a small fixed set of categories."""
+    message = message or ''
+    for fragment, category in ERROR_CATEGORIES:
+        if fragment in message:
+            return category
+    return 'other'
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense (not thread-safe on its own)."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding quantile ``q`` (None when empty)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class _Call:
+    """Phase timings collected for one in-flight method call."""
+
+    __slots__ = ('method', 'phases', 'result')
+
+    def __init__(self, method):
+        self.method = method
+        self.phases = []
+        self.result = None
+
+
+class ServiceMetrics:
+    def __init__(self, buckets=DEFAULT_BUCKETS, slow_call_threshold=None):
+        """
+        Initialize an empty metrics registry.
+
+        Args:
+            buckets (tuple): Histogram upper bounds in seconds
+            slow_call_threshold (float, optional): Log calls slower than this
+                many seconds, with their phase breakdown
+        """
+        self.buckets = tuple(buckets)
+        self.slow_call_threshold = slow_call_threshold
+        self._lock = threading.Lock()
+        self._counters = {}       # (name, labels) -> value
+        self._histograms = {}     # (name, labels) -> Histogram
+        self._local = threading.local()
+
+    def inc(self, name, amount=1, **labels):
+        """Add ``amount`` to a counter."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        """Record one duration in a histogram."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def call(self, method):
+        """
+        Time one service method call.
+
+        Set ``.result`` on the yielded object to the method's result dict so
+        unsuccessful results are counted by error category; an exception is
+        counted as category 'exception' and re-raised.
+        """
+        call = _Call(method)
+        stack = self._stack()
+        stack.append(call)
+        started = time.perf_counter()
+        try:
+            yield call
+        except Exception:
+            self.inc('errors_total', method=method, category='exception')
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            stack.pop()
+            self.inc('calls_total', method=method)
+            self.observe('call_seconds', elapsed, method=method)
+            result = call.result
+            if isinstance(result, dict) and result.get('success') is False:
+                self.inc('errors_total', method=method, category=error_category(result.get('message')))
+            if self.slow_call_threshold is not None and elapsed >= self.slow_call_threshold:
+                self.inc('slow_calls_total', method=method)
+                breakdown = ', '.join(f"{phase}={seconds * 1000:.1f}ms" for phase, seconds in call.phases)
+                logger.warning("Slow %s call: %.1fms (%s)", method, elapsed * 1000, breakdown or 'no phases')
+
+    @contextmanager
+    def span(self, phase):
+        """Time one phase of the innermost running call (or of 'none' outside calls)."""
+        stack = self._stack()
+        call = stack[-1] if stack else None
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe('phase_seconds', elapsed, method=call.method if call else 'none', phase=phase)
+            if call is not None:
+                call.phases.append((phase, elapsed))
+
+    def snapshot(self):
+        """
+        Return every counter and histogram as plain data.
+
+        Returns:
+            dict: counters as {name: [{labels, value}]} and histograms as
+                {name: [{labels, count, sum_ms, mean_ms, p50_ms, p95_ms, p99_ms}]};
+                percentiles are bucket upper bounds
+        """
+        with self._lock:
+            counters = [(name, dict(labels), value) for (name, labels), value in self._counters.items()]
+            histograms = [
+                (name, dict(labels), histogram.count, histogram.total,
+                 [histogram.quantile(q) for q in (0.5, 0.95, 0.99)])
+                for (name, labels), histogram in self._histograms.items()
+            ]
+
+        result = {'counters': {}, 'histograms': {}}
+        for name, labels, value in sorted(counters, key=lambda item: (item[0], sorted(item[1].items()))):
+            result['counters'].setdefault(name, []).append({'labels': labels, 'value': value})
+        for name, labels, count, total, quantiles in sorted(histograms, key=lambda item: (item[0], sorted(item[1].items()))):
+            result['histograms'].setdefault(name, []).append({
+                'labels': labels,
+                'count': count,
+                'sum_ms': total * 1000,
+                'mean_ms': total / count * 1000 if count else 0.0,
+                'p50_ms': _ms(quantiles[0]),
+                'p95_ms': _ms(quantiles[1]),
+                'p99_ms': _ms(quantiles[2]),
+            })
+        return result
+
+    def render_prometheus(self, gauges=None):
+        """
+        Render the registry in the Prometheus text exposition format.
+
+        Args:
+            gauges (dict, optional): Extra point-in-time values as
+                {name: value} (e.g. pool and cache stats)
+
+        Returns:
+            str: Exposition text
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, list(histogram.counts), histogram.total, histogram.count)
+                for key, histogram in self._histograms.items()
+            )
+
+        lines = []
+        declared = set()
+        for (name, labels), value in counters:
+            metric = f"{PREFIX}_{name}"
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_labels(labels)} {value}")
+
+        for (name, labels), counts, total, count in histograms:
+            metric = f"{PREFIX}_{name}"
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{metric}_bucket{_labels(labels + (('le', repr(bound)),))} {cumulative}")
+            lines.append(f"{metric}_bucket{_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{metric}_sum{_labels(labels)} {total}")
+            lines.append(f"{metric}_count{_labels(labels)} {count}")
+
+        for name, value in sorted((gauges or {}).items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            metric = f"{PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+
+        return '\n'.join(lines) + '\n'
+
+
+def _ms(seconds):
+    if seconds is None:
+        return None
+    return seconds * 1000 if seconds != float('inf') else None
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def instrumented(method, item_errors=False):
+    """
+    Decorator for LoanApplicationService methods: runs the method inside
+    ``self.metrics.call(method)`` and hands its result to the call record.
+
+    Batch methods that count their own per-item errors pass
+    ``item_errors=True`` so a partially failed batch is not counted again.
+    """
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.call(method) as call:
+                result = fn(self, *args, **kwargs)
+                if not item_errors:
+                    call.result = result
+                return result
+        return wrapper
+    return decorate
@@ -0,0 +1,303 @@
+"""
+Incrementally maintained loan application counts and amounts.
+
+loan_review_stats holds one row per (review_status, status, loan officer,
+submission month) with the number of applications and their loan_amount
+total. It is small and does not grow with the number of applications, so
+dashboard statistics read it instead of counting loan_applications.
+
+Statement-level triggers on loan_applications (see loan_schema.TRIGGERS)
+append the net change of every INSERT, UPDATE and DELETE to
+loan_review_stats_deltas. They cover review actions from the staff portal,
+``update_statuses`` and deletes cascading from member_users alike. The delta
+table is insert-only, so concurrent writers never wait on a shared counter
+row. ``fold_deltas`` moves deltas into loan_review_stats; readers add up both
+tables, so the numbers are exact before a fold as well.
+
+Deltas are folded by ``--serve`` workers on a timer, by a statistics read
+that finds more than FOLD_THRESHOLD of them pending (``fold_if_backlogged``),
+and by ``loan_cli.py --review-stats fold``, which can run from cron where no
+long-lived worker does.
+
+TRUNCATE and writes made with triggers disabled bypass the deltas;
+``check_statistics`` finds the drift and ``rebuild_statistics`` repairs it.
+"""
+
+STATS_TABLE = 'loan_review_stats'
+DELTAS_TABLE = 'loan_review_stats_deltas'
+
+# Group key columns of both tables
+KEY_COLUMNS = ('review_status', 'status', 'loan_officer_id', 'month')
+
+# Stand-ins for NULLs, since the key columns form the primary key
+UNSET = 'unset'
+UNASSIGNED_OFFICER = '00000000-0000-0000-0000-000000000000'
+
+# How a loan_applications row (``alias`` prefix) maps onto the key and values
+KEY_EXPRESSIONS = (
+    f"COALESCE({{alias}}review_status, '{UNSET}')",
+    f"COALESCE({{alias}}status, '{UNSET}')",
+    f"COALESCE({{alias}}loan_officer_id, '{UNASSIGNED_OFFICER}'::uuid)",
+    "date_trunc('month', COALESCE({alias}submitted_at, {alias}application_date, TIMESTAMP '1970-01-01'))::date",
+)
+AMOUNT_EXPRESSION = "COALESCE({alias}loan_amount, 0)"
+
+# Pending deltas above which a statistics read folds them first
+FOLD_THRESHOLD = 5000
+
+# Review statuses reported by the staff dashboard, in display order
+REVIEW_STATUSES = ('pending_review', 'under_review', 'approved', 'rejected', 'returned')
+
+
+def _row_keys(alias='', named=False):
+    return ', '.join(
+        expression.format(alias=alias) + (f' AS {column}' if named else '')
+        for expression, column in zip(KEY_EXPRESSIONS, KEY_COLUMNS)
+    )
+
+
+def _row_amount(alias=''):
+    return AMOUNT_EXPRESSION.format(alias=alias)
+
+
+_KEYS = ', '.join(KEY_COLUMNS)
+_DELTA_COLUMNS = f"{_KEYS}, application_count, loan_amount_total"
+
+# Trigger function shared by the INSERT, UPDATE and DELETE triggers. new_rows
+# and old_rows are the statement's transition tables; an UPDATE that does not
+# move a row between groups or change its amount nets out and writes nothing.
+TRIGGER_FUNCTION_SQL = f"""
+CREATE OR REPLACE FUNCTION loan_review_stats_delta()
+RETURNS TRIGGER AS $trigger_function$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO {DELTAS_TABLE} ({_DELTA_COLUMNS})
+        SELECT {_row_keys()}, count(*), sum({_row_amount()})
+        FROM new_rows GROUP BY 1, 2, 3, 4;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO {DELTAS_TABLE} ({_DELTA_COLUMNS})
+        SELECT {_row_keys()}, -count(*), -sum({_row_amount()})
+        FROM old_rows GROUP BY 1, 2, 3, 4;
+    ELSE
+        INSERT INTO {DELTAS_TABLE} ({_DELTA_COLUMNS})
+        SELECT {_KEYS}, sum(application_count), sum(loan_amount_total)
+        FROM (
+            SELECT {_row_keys(named=True)}, -1 AS application_count, -{_row_amount()} AS loan_amount_total
+            FROM old_rows
+            UNION ALL
+            SELECT {_row_keys()}, 1, {_row_amount()} FROM new_rows
+        ) changes
+        GROUP BY {_KEYS}
+        HAVING sum(application_count) <> 0 OR sum(loan_amount_total) <> 0;
+    END IF;
+    RETURN NULL;
+END;
+$trigger_function$ language 'plpgsql';
+"""
+
+
+def trigger_sql(name, event, referencing):
+    """CREATE TRIGGER statement (plus the shared function) for one event."""
+    return TRIGGER_FUNCTION_SQL + f"""
+    DROP TRIGGER IF EXISTS {name} ON loan_applications;
+    CREATE TRIGGER {name}
+        AFTER {event} ON loan_applications
+        REFERENCING {referencing}
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION loan_review_stats_delta();
+    """
+
+
+# Fills loan_review_stats from scratch; the caller locks loan_applications
+REBUILD_SQL = f"""
+DELETE FROM {DELTAS_TABLE};
+DELETE FROM {STATS_TABLE};
+INSERT INTO {STATS_TABLE} ({_DELTA_COLUMNS})
+SELECT {_row_keys()}, count(*), sum({_row_amount()})
+FROM loan_applications
+GROUP BY 1, 2, 3, 4;
+"""
+
+# Folded totals plus the deltas not folded yet
+CURRENT_SQL = f"""
+SELECT {_KEYS}, sum(application_count) AS application_count, sum(loan_amount_total) AS loan_amount_total
+FROM (
+    SELECT {_DELTA_COLUMNS} FROM {STATS_TABLE}
+    UNION ALL
+    SELECT {_DELTA_COLUMNS} FROM {DELTAS_TABLE}
+) combined
+GROUP BY {_KEYS}
+HAVING sum(application_count) <> 0 OR sum(loan_amount_total) <> 0
+"""
+
+
+def fold_deltas(conn):
+    """
+    Move pending deltas into loan_review_stats.
+
+    Only committed deltas are visible, and each is deleted in the same
+    statement that adds it, so concurrent writers and folds are safe. The
+    caller owns the transaction.
+
+    Args:
+        conn: Open psycopg2 connection
+
+    Returns:
+        dict: Number of deltas folded and groups touched
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"""
+    WITH moved AS (
+        DELETE FROM {DELTAS_TABLE} RETURNING {_DELTA_COLUMNS}
+    ), upserted AS (
+        INSERT INTO {STATS_TABLE} ({_DELTA_COLUMNS}, updated_at)
+        SELECT {_KEYS}, sum(application_count), sum(loan_amount_total), CURRENT_TIMESTAMP
+        FROM moved
+        GROUP BY {_KEYS}
+        ON CONFLICT ({_KEYS}) DO UPDATE
+        SET application_count = {STATS_TABLE}.application_count + EXCLUDED.application_count,
+            loan_amount_total = {STATS_TABLE}.loan_amount_total + EXCLUDED.loan_amount_total,
+            updated_at = EXCLUDED.updated_at
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM moved), (SELECT count(*) FROM upserted)
+    """)
+    deltas, groups = cursor.fetchone()
+    if deltas:
+        # Groups every application has left
+        cursor.execute(f"DELETE FROM {STATS_TABLE} WHERE application_count = 0 AND loan_amount_total = 0")
+    cursor.close()
+    return {'deltas': deltas, 'groups': groups}
+
+
+def fold_if_backlogged(conn, threshold=FOLD_THRESHOLD):
+    """
+    Fold the deltas when more than ``threshold`` are pending.
+
+    Counting stops at ``threshold`` + 1 rows, so the check costs no more
+    than the read it precedes. When another session is already folding,
+    this one skips the fold instead of waiting for it. The caller owns the
+    transaction.
+
+    Args:
+        conn: Open psycopg2 connection
+        threshold (int): Pending deltas tolerated without a fold
+
+    Returns:
+        dict or None: fold_deltas result, or None when nothing was folded
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT count(*) FROM (SELECT 1 FROM {DELTAS_TABLE} LIMIT %s) pending", (threshold + 1,))
+        if cursor.fetchone()[0] <= threshold:
+            return None
+        cursor.execute("SELECT pg_try_advisory_xact_lock(hashtext(%s))", (DELTAS_TABLE,))
+        if not cursor.fetchone()[0]:
+            return None
+    finally:
+        cursor.close()
+    return fold_deltas(conn)
+
+
+def rebuild_statistics(conn):
+    """
+    Recompute loan_review_stats from loan_applications.
+
+    Takes a SHARE lock on loan_applications so no write lands between the
+    count and the commit; writers wait for the length of one full scan.
+    The caller owns the transaction.
+
+    Args:
+        conn: Open psycopg2 connection
+
+    Returns:
+        int: Number of groups written
+    """
+    cursor = conn.cursor()
+    cursor.execute("LOCK TABLE loan_applications IN SHARE MODE")
+    cursor.execute(REBUILD_SQL)
+    cursor.execute(f"SELECT count(*) FROM {STATS_TABLE}")
+    groups = cursor.fetchone()[0]
+    cursor.close()
+    return groups
+
+
+def check_statistics(conn):
+    """
+    Compare the maintained statistics with a full count of loan_applications.
+
+    Both sides are read in one REPEATABLE READ snapshot, so writes in
+    flight cannot show up as differences. Ends the caller's transaction.
+
+    Args:
+        conn: Open psycopg2 connection
+
+    Returns:
+        dict: Result with 'consistent', the number of groups and the
+            mismatching groups (maintained vs counted)
+    """
+    conn.rollback()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        cursor.execute(CURRENT_SQL)
+        maintained = {tuple(row[:4]): (row[4], row[5]) for row in cursor.fetchall()}
+        cursor.execute(f"""
+        SELECT {_row_keys()}, count(*), sum({_row_amount()})
+        FROM loan_applications GROUP BY 1, 2, 3, 4
+        """)
+        counted = {tuple(row[:4]): (row[4], row[5]) for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+        conn.rollback()
+
+    mismatches = []
+    for key in sorted(set(maintained) | set(counted), key=str):
+        if maintained.get(key, (0, 0)) != counted.get(key, (0, 0)):
+            mismatches.append({
+                **dict(zip(KEY_COLUMNS, (str(value) for value in key))),
+                'maintained': [int(maintained.get(key, (0, 0))[0]), str(maintained.get(key, (0, 0))[1])],
+                'counted': [int(counted.get(key, (0, 0))[0]), str(counted.get(key, (0, 0))[1])]
+            })
+    return {
+        'success': not mismatches,
+        'message': (f'Statistics match loan_applications ({len(counted)} groups).' if not mismatches
+                    else f'{len(mismatches)} groups differ from loan_applications; run a rebuild.'),
+        'consistent': not mismatches,
+        'groups': len(counted),
+        'mismatches': mismatches
+    }
+
+
+def read_statistics(conn):
+    """
+    Dashboard totals from the maintained statistics.
+
+    Args:
+        conn: Open psycopg2 connection
+
+    Returns:
+        dict: total_applications, one count per REVIEW_STATUSES entry (the
+            shape the staff dashboard uses), by_review_status, by_status and
+            loan_amount_total
+    """
+    cursor = conn.cursor()
+    cursor.execute(CURRENT_SQL)
+    rows = cursor.fetchall()
+    cursor.close()
+
+    by_review_status, by_status = {}, {}
+    total, amount = 0, 0
+    for review_status, status, _, _, count, loan_amount in rows:
+        by_review_status[review_status] = by_review_status.get(review_status, 0) + int(count)
+        by_status[status] = by_status.get(status, 0) + int(count)
+        total += int(count)
+        amount += loan_amount
+    statistics = {'total_applications': total}
+    statistics.update({review_status: by_review_status.get(review_status, 0) for review_status in REVIEW_STATUSES})
+    statistics.update({
+        'by_review_status': by_review_status,
+        'by_status': by_status,
+        'loan_amount_total': str(amount)
+    })
+    return statistics
@@ -0,0 +1,490 @@
+"""
+Amortization schedules and outstanding balances for approved loans.
+
+Schedules are computed for the whole portfolio at once. Amounts are int64
+cents and loans are rows of (loans x months) arrays. The only Python loop is
+over installment numbers (at most the longest term), each step updating
+every loan.
+
+Rounding is exact. ``interest_rate`` is an annual percentage with two
+decimals, so the monthly interest on a balance of B cents is
+B * rate_hundredths / 120000 cents. It is rounded half-up in integer
+arithmetic. The level payment is rounded to the cent. The final installment
+pays off whatever balance is left, so every schedule ends at exactly zero
+and its principal column sums to the loan amount.
+
+Results go to loan_schedules (one row per installment) and
+loan_schedule_summary (one row per loan, with the outstanding balance as of
+the run date). Both are part of the canonical schema (loan_schema); run
+``python loan_cli.py --migrate`` before the first run. Both are written with binary COPY. DECIMAL values are encoded
+from the cent arrays directly, so no row passes through Python one at a time.
+"""
+
+import os
+import struct
+import sys
+import time
+import json
+from datetime import date, datetime
+
+import numpy as np
+import psycopg2
+
+import loan_schema
+from db_pool import ConnectionPool
+
+# interest_rate is an annual percentage: 12.50 -> 1250 hundredths; a month
+# is 1/12 of it, and a percentage is 1/100 of the balance
+_MONTHLY_RATE_DIVISOR = 12 * 100 * 100
+
+# Loans with a longer term are skipped as data errors
+MAX_TERM_MONTHS = 600
+
+_PG_EPOCH = np.datetime64('2000-01-01', 'D')
+
+# Bytes handed to libpq per COPY write
+COPY_CHUNK_BYTES = 1 << 20
+
+_COPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+_COPY_TRAILER = struct.pack('>h', -1)
+
+# (numpy dtype, Postgres binary width) of the column kinds COPY writes.
+# A numeric is four int16 header words (digit count, weight, sign, scale)
+# followed by base-10000 digits. Cents always go out as five digits of
+# weight 3 (10^12 down to 10^-4), which covers DECIMAL(15,2); Postgres
+# strips the leading and trailing zero digits.
+_BINARY_TYPES = {
+    'int4': ('>i4', 4),
+    'int8': ('>i8', 8),
+    'date': ('>i4', 4),
+    'numeric': (('>i2', (9,)), 18),
+}
+_NUMERIC_NEGATIVE = 0x4000
+
+# (create, drop) statements for the loan_schedules indexes, dropped for a
+# full rebuild and created again after the COPY. Schedules are read per loan;
+# portfolio figures come from loan_schedule_summary.
+SCHEDULE_INDEXES = [
+    ("ALTER TABLE loan_schedules ADD CONSTRAINT loan_schedules_pkey PRIMARY KEY (application_id, installment_number)",
+     "ALTER TABLE loan_schedules DROP CONSTRAINT IF EXISTS loan_schedules_pkey"),
+]
+
+# Rows loaded for the run: approved, with an amount and a term
+ACTIVE_LOANS_QUERY = """
+SELECT application_id,
+       round(loan_amount * 100)::bigint,
+       round(interest_rate * 100)::bigint,
+       COALESCE(loan_term_months, loan_duration),
+       COALESCE(approved_at, reviewed_at, submitted_at)::date
+FROM loan_applications
+WHERE review_status = 'approved'
+  AND loan_amount IS NOT NULL
+"""
+
+
+def _round_half_up(numerator, denominator):
+    """Integer numerator / denominator rounded half away from zero, elementwise (numerator >= 0)."""
+    return (2 * numerator + denominator) // (2 * denominator)
+
+
+def level_payment(principal_cents, rate_hundredths, terms):
+    """
+    Level monthly payment in cents for each loan.
+
+    Args:
+        principal_cents (numpy.ndarray): Loan amounts in cents
+        rate_hundredths (numpy.ndarray): Annual rates in hundredths of a percent
+        terms (numpy.ndarray): Terms in months (>= 1)
+
+    Returns:
+        numpy.ndarray: int64 payments, rounded to the cent
+    """
+    interest_free = rate_hundredths == 0
+    # Any positive rate stands in for the interest-free loans, whose
+    # annuity factor would divide by zero; np.where discards it
+    monthly = np.where(interest_free, 1.0, rate_hundredths / _MONTHLY_RATE_DIVISOR)
+    # P * r / (1 - (1 + r)^-n), with expm1/log1p to keep small rates accurate
+    annuity = principal_cents * monthly / -np.expm1(-terms * np.log1p(monthly))
+    return np.rint(np.where(interest_free, principal_cents / terms, annuity)).astype(np.int64)
+
+
+def due_dates(start_dates, terms_max):
+    """
+    Due date of installments 1..terms_max for each loan: the same day of
+    the month as the start date, clipped to the end of shorter months.
+
+    Args:
+        start_dates (numpy.ndarray): datetime64[D] start dates
+        terms_max (int): Number of installments to compute
+
+    Returns:
+        numpy.ndarray: datetime64[D] array of shape (loans, terms_max)
+    """
+    start_months = start_dates.astype('datetime64[M]')
+    start_day = (start_dates - start_months.astype('datetime64[D]')).astype(np.int64)
+    months = start_months[:, None] + np.arange(1, terms_max + 1)
+    month_start = months.astype('datetime64[D]')
+    month_days = ((months + 1).astype('datetime64[D]') - month_start).astype(np.int64)
+    return month_start + np.minimum(start_day[:, None], month_days - 1)
+
+
+def compute_schedules(principal_cents, rate_hundredths, terms, start_dates):
+    """
+    Amortize every loan at once.
+
+    Args:
+        principal_cents (numpy.ndarray): int64 loan amounts in cents
+        rate_hundredths (numpy.ndarray): int64 annual rates in hundredths of a percent
+        terms (numpy.ndarray): int64 terms in months (>= 1)
+        start_dates (numpy.ndarray): datetime64[D] dates the loans started
+
+    Returns:
+        dict: (loans, max term) int64 arrays 'payment', 'interest',
+            'principal' and 'balance' (after the installment), datetime64
+            'due_date', a boolean 'mask' of the installments that exist,
+            and the per-loan 'level_payment'
+    """
+    principal_cents = np.asarray(principal_cents, dtype=np.int64)
+    rate_hundredths = np.asarray(rate_hundredths, dtype=np.int64)
+    terms = np.asarray(terms, dtype=np.int64)
+    loans = len(principal_cents)
+    terms_max = int(terms.max()) if loans else 0
+
+    payments = level_payment(principal_cents, rate_hundredths, terms)
+    shape = (loans, terms_max)
+    interest = np.zeros(shape, dtype=np.int64)
+    principal = np.zeros(shape, dtype=np.int64)
+    balance = np.zeros(shape, dtype=np.int64)
+    mask = np.arange(1, terms_max + 1)[None, :] <= terms[:, None]
+
+    remaining = principal_cents.copy()
+    for month in range(terms_max):
+        active = month < terms
+        final = month == terms - 1
+        month_interest = _round_half_up(remaining * rate_hundredths, _MONTHLY_RATE_DIVISOR)
+        # Rounding can leave a level payment slightly off; the last
+        # installment takes whatever balance is left
+        month_principal = np.where(final, remaining, np.minimum(payments - month_interest, remaining))
+        month_principal = np.where(active, month_principal, 0)
+        month_interest = np.where(active, month_interest, 0)
+        remaining = remaining - month_principal
+        interest[:, month] = month_interest
+        principal[:, month] = month_principal
+        balance[:, month] = remaining
+
+    return {
+        'payment': interest + principal,
+        'interest': interest,
+        'principal': principal,
+        'balance': balance,
+        'due_date': due_dates(start_dates.astype('datetime64[D]'), terms_max),
+        'mask': mask,
+        'level_payment': payments
+    }
+
+
+def outstanding_balances(schedules, principal_cents, as_of):
+    """
+    Balance of each loan after the installments due on or before ``as_of``.
+
+    Returns:
+        tuple: (int64 balances in cents, int64 installments paid per loan)
+    """
+    due = (schedules['due_date'] <= np.datetime64(as_of, 'D')) & schedules['mask']
+    paid = due.sum(axis=1)
+    loans = np.arange(len(paid))
+    balance = np.where(paid > 0, schedules['balance'][loans, np.maximum(paid - 1, 0)], principal_cents)
+    return balance, paid
+
+
+def _numeric_words(cents):
+    """Binary NUMERIC(.., 2) representation of int64 cents, one row of int16 words per value."""
+    cents = np.asarray(cents, dtype=np.int64)
+    words = np.empty((len(cents), 9), dtype=np.int16)
+    words[:, :4] = (5, 3, 0, 2)
+    words[:, 2] = np.where(cents < 0, _NUMERIC_NEGATIVE, 0)
+    rest, fraction = np.divmod(np.abs(cents), 100)
+    words[:, 8] = fraction * 100
+    for column in (7, 6, 5):
+        rest, words[:, column] = np.divmod(rest, 10000)
+    words[:, 4] = rest
+    return words
+
+
+class _CopyBuffer:
+    """File-like reader over byte buffers, so COPY data is never joined into one bytes object."""
+
+    def __init__(self, *parts):
+        self._parts = [memoryview(part).cast('B') for part in parts]
+        self._index = 0
+        self._offset = 0
+
+    def read(self, size=-1):
+        while self._index < len(self._parts):
+            part = self._parts[self._index]
+            if self._offset < len(part):
+                end = len(part) if size is None or size < 0 else self._offset + size
+                chunk = part[self._offset:end]
+                self._offset += len(chunk)
+                return chunk.tobytes()
+            self._index += 1
+            self._offset = 0
+        return b''
+
+
+def _copy_binary(cursor, table, columns):
+    """
+    COPY equally long numpy columns into ``table`` in binary format.
+
+    Rows are a numpy structured array laid out exactly like Postgres binary
+    COPY tuples (field count, then length and big-endian value per column).
+
+    Args:
+        cursor: psycopg2 cursor
+        table (str): Target table
+        columns (list): (name, kind, values) with kind one of int4, int8,
+            date (values then datetime64[D]) or numeric (values in cents)
+    """
+    fields = [('count', '>i2')]
+    for index, (_, kind, _) in enumerate(columns):
+        fields.extend([(f'length{index}', '>i4'), (f'value{index}', _BINARY_TYPES[kind][0])])
+    # Field count and lengths are the same in every row
+    template = np.zeros(1, dtype=fields)
+    template['count'] = len(columns)
+    for index, (_, kind, _) in enumerate(columns):
+        template[f'length{index}'] = _BINARY_TYPES[kind][1]
+    rows = np.repeat(template, len(columns[0][2]))
+    for index, (_, kind, values) in enumerate(columns):
+        if kind == 'date':
+            values = (values - _PG_EPOCH).astype(np.int64)
+        elif kind == 'numeric':
+            values = _numeric_words(values)
+        rows[f'value{index}'] = values
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(name for name, _, _ in columns)}) FROM STDIN WITH (FORMAT binary)",
+        _CopyBuffer(_COPY_HEADER, rows, _COPY_TRAILER), size=COPY_CHUNK_BYTES
+    )
+
+
+class LoanScheduleEngine:
+    """Build and store amortization schedules for approved loans."""
+
+    def __init__(self, db_config):
+        """
+        Initialize the engine.
+
+        Args:
+            db_config (dict): Database configuration (staff database)
+        """
+        self.db_config = db_config
+        self.pool = ConnectionPool(db_config, min_size=1, max_size=1)
+
+    def verify_schema(self):
+        """
+        Check once per process that the database matches loan_schema.
+
+        Raises:
+            loan_schema.SchemaError: If tables (such as loan_schedules) are
+                missing; run ``python loan_cli.py --migrate``
+        """
+        db_key = (self.db_config.get('host'), self.db_config.get('port'),
+                  self.db_config.get('database') or self.db_config.get('dsn'))
+        with self.pool.connection() as conn:
+            loan_schema.ensure_schema(conn, db_key, 'verify')
+
+    def load_loans(self, application_ids=None, default_rate=None):
+        """
+        Load approved loans as numpy columns.
+
+        Args:
+            application_ids (list, optional): Only these applications
+            default_rate (float, optional): Annual rate (percent) for loans
+                with no interest_rate; without it they are skipped
+
+        Returns:
+            tuple: (dict of numpy columns, list of skipped {application_id, reason})
+        """
+        query = ACTIVE_LOANS_QUERY
+        params = ()
+        if application_ids is not None:
+            query += " AND application_id = ANY(%s)"
+            params = (list(application_ids),)
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query + " ORDER BY application_id", params)
+            rows = cursor.fetchall()
+            cursor.close()
+
+        default_hundredths = int(round(default_rate * 100)) if default_rate is not None else None
+        loans, skipped = [], []
+        for application_id, amount, rate, term, start in rows:
+            if rate is None:
+                rate = default_hundredths
+            if rate is None:
+                skipped.append({'application_id': application_id, 'reason': 'missing interest_rate'})
+            elif not term or term < 1 or term > MAX_TERM_MONTHS:
+                skipped.append({'application_id': application_id, 'reason': f'invalid term {term}'})
+            elif amount <= 0 or rate < 0:
+                skipped.append({'application_id': application_id, 'reason': 'non-positive amount or negative rate'})
+            elif start is None:
+                skipped.append({'application_id': application_id, 'reason': 'no approval date'})
+            else:
+                loans.append((application_id, amount, rate, term, start))
+
+        columns = {
+            'application_id': np.array([loan[0] for loan in loans], dtype=np.int64),
+            'principal_cents': np.array([loan[1] for loan in loans], dtype=np.int64),
+            'rate_hundredths': np.array([loan[2] for loan in loans], dtype=np.int64),
+            'terms': np.array([loan[3] for loan in loans], dtype=np.int64),
+            'start_dates': np.array([loan[4] for loan in loans], dtype='datetime64[D]')
+        }
+        return columns, skipped
+
+    def write(self, loans, schedules, as_of, application_ids=None):
+        """
+        Replace stored schedules with those of ``loans`` in one transaction.
+
+        With ``application_ids`` only those loans' rows are replaced
+        (including requested loans that were skipped). Otherwise the tables
+        are truncated and reloaded. The schedule indexes are dropped for the
+        load and built once afterwards, which is faster than maintaining them
+        row by row. TRUNCATE keeps readers waiting until the commit either way.
+
+        Returns:
+            int: Installment rows written
+        """
+        mask = schedules['mask']
+        loan_index, month_index = np.nonzero(mask)
+        balances, paid = outstanding_balances(schedules, loans['principal_cents'], as_of)
+        terms = loans['terms']
+        full_rebuild = application_ids is None
+
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            if full_rebuild:
+                # Loans no longer approved drop out as well
+                cursor.execute("TRUNCATE loan_schedules, loan_schedule_summary")
+                for _, drop_sql in SCHEDULE_INDEXES:
+                    cursor.execute(drop_sql)
+            else:
+                ids = [int(application_id) for application_id in application_ids]
+                cursor.execute("DELETE FROM loan_schedules WHERE application_id = ANY(%s)", (ids,))
+                cursor.execute("DELETE FROM loan_schedule_summary WHERE application_id = ANY(%s)", (ids,))
+
+            if len(terms):
+                _copy_binary(cursor, 'loan_schedules', [
+                    ('application_id', 'int4', loans['application_id'][loan_index]),
+                    ('installment_number', 'int4', month_index + 1),
+                    ('due_date', 'date', schedules['due_date'][mask]),
+                    ('payment', 'numeric', schedules['payment'][mask]),
+                    ('interest', 'numeric', schedules['interest'][mask]),
+                    ('principal', 'numeric', schedules['principal'][mask]),
+                    ('balance', 'numeric', schedules['balance'][mask]),
+                ])
+                _copy_binary(cursor, 'loan_schedule_summary', [
+                    ('application_id', 'int4', loans['application_id']),
+                    ('monthly_payment', 'numeric', schedules['level_payment']),
+                    ('total_interest', 'numeric', schedules['interest'].sum(axis=1)),
+                    ('installments', 'int4', terms),
+                    ('first_due_date', 'date', schedules['due_date'][:, 0]),
+                    ('maturity_date', 'date', schedules['due_date'][np.arange(len(terms)), terms - 1]),
+                    ('as_of', 'date', np.full(len(terms), np.datetime64(as_of, 'D'))),
+                    ('installments_due', 'int4', paid),
+                    ('outstanding_balance', 'numeric', balances),
+                ])
+
+            if full_rebuild:
+                for create_sql, _ in SCHEDULE_INDEXES:
+                    cursor.execute(create_sql)
+            cursor.close()
+        return int(mask.sum())
+
+    def run(self, as_of=None, application_ids=None, default_rate=None):
+        """
+        Compute and store schedules and balances for approved loans.
+
+        Args:
+            as_of (date, optional): Balance date (default: today)
+            application_ids (list, optional): Only rebuild these loans;
+                by default every approved loan is rebuilt and schedules
+                of loans no longer approved are removed
+            default_rate (float, optional): Annual rate (percent) for loans
+                with no interest_rate
+
+        Returns:
+            dict: Result with loans, installments, skipped and timings
+        """
+        as_of = as_of or date.today()
+        try:
+            self.verify_schema()
+            started = time.perf_counter()
+            loans, skipped = self.load_loans(application_ids, default_rate)
+            loaded = time.perf_counter()
+            schedules = compute_schedules(
+                loans['principal_cents'], loans['rate_hundredths'], loans['terms'], loans['start_dates']
+            )
+            computed = time.perf_counter()
+            installments = self.write(loans, schedules, as_of, application_ids)
+            written = time.perf_counter()
+        except loan_schema.SchemaError as e:
+            return {'success': False, 'message': str(e)}
+        except psycopg2.Error as e:
+            return {'success': False, 'message': f'Database error: {str(e)}'}
+
+        loan_count = len(loans['application_id'])
+        return {
+            'success': True,
+            'message': f"Built {installments} installments for {loan_count} loans ({len(skipped)} skipped).",
+            'as_of': as_of.isoformat(),
+            'loans': loan_count,
+            'installments': installments,
+            'skipped': skipped,
+            'seconds': {
+                'load': round(loaded - started, 3),
+                'compute': round(computed - loaded, 3),
+                'write': round(written - computed, 3)
+            }
+        }
+
+
+def main():
+    """Command-line entry point; DATABASE_URL overrides the default staff database settings."""
+    db_config = {
+        'host': 'localhost',
+        'database': 'slz_coop_staff',
+        'user': 'postgres',
+        'password': 'password',
+        'port': 5432
+    }
+    if os.environ.get('DATABASE_URL'):
+        db_config = {'dsn': os.environ['DATABASE_URL']}
+
+    args = sys.argv[1:]
+
+    def option(name, default=None):
+        return args[args.index(name) + 1] if name in args and args.index(name) + 1 < len(args) else default
+
+    if '--help' in args:
+        print("Usage: python loan_schedule.py [--as-of YYYY-MM-DD] [--ids <id>,<id>,...] [--default-rate <percent>]")
+        sys.exit(0)
+
+    engine = LoanScheduleEngine(db_config)
+    try:
+        as_of = option('--as-of')
+        ids = option('--ids')
+        default_rate = option('--default-rate')
+        result = engine.run(
+            as_of=datetime.strptime(as_of, '%Y-%m-%d').date() if as_of else None,
+            application_ids=[int(application_id) for application_id in ids.split(',') if application_id] if ids else None,
+            default_rate=float(default_rate) if default_rate else None
+        )
+    except Exception as e:
+        result = {'success': False, 'message': f'Error: {str(e)}'}
+    finally:
+        engine.pool.close()
+    print(json.dumps(result))
+    sys.exit(0 if result['success'] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,515 @@
+"""
+Canonical schema for the tables the loan application service depends on.
+
+This module is the single definition of the ``member_users``,
+``loan_applications``, ``loan_review_history``, ``upload_blobs``, loan
+review statistics, notification outbox, job queue and repayment schedule
+columns, indexes and triggers that used to be spread across setup_members_database.sql,
+manual_setup.sql, add_review_columns.sql and loan_review_schema.sql.
+
+``check_schema`` compares a live database against it and ``apply_migrations``
+brings the database up to date. Run ``python loan_cli.py --migrate`` as a
+deployment step; the service itself only verifies, once per process.
+"""
+
+import threading
+
+import loan_review_stats
+
+# Each table: (name, columns, table constraints used when creating it).
+# Each column: (name, type, extra clause used when creating/adding it).
+TABLES = [
+    ('member_users', [
+        ('user_id', 'UUID', 'PRIMARY KEY DEFAULT gen_random_uuid()'),
+        ('user_name', 'VARCHAR(255)', ''),
+        ('user_email', 'VARCHAR(255)', 'NOT NULL UNIQUE'),
+        ('user_password', 'VARCHAR(255)', 'NOT NULL'),
+        ('member_number', 'VARCHAR(50)', 'UNIQUE'),
+        ('created_at', 'TIMESTAMP', 'DEFAULT CURRENT_TIMESTAMP'),
+        ('updated_at', 'TIMESTAMP', 'DEFAULT CURRENT_TIMESTAMP'),
+        ('is_active', 'BOOLEAN', 'DEFAULT TRUE'),
+    ], []),
+    ('loan_applications', [
+        ('application_id', 'SERIAL', 'PRIMARY KEY'),
+        ('user_id', 'UUID', 'NOT NULL'),
+        ('application_date', 'TIMESTAMP', 'DEFAULT CURRENT_TIMESTAMP'),
+        ('jpg_file_path', 'VARCHAR(500)', ''),
+        ('status', 'VARCHAR(50)', "DEFAULT 'pending'"),
+        ('submitted_at', 'TIMESTAMP', 'DEFAULT CURRENT_TIMESTAMP'),
+        # Review workflow
+        ('review_status', 'VARCHAR(50)', "DEFAULT 'pending_review'"),
+        ('loan_officer_id', 'UUID', ''),
+        ('manager_id', 'UUID', ''),
+        ('loan_officer_notes', 'TEXT', ''),
+        ('manager_notes', 'TEXT', ''),
+        ('review_notes', 'TEXT', ''),
+        ('reviewed_at', 'TIMESTAMP', ''),
+        ('approved_at', 'TIMESTAMP', ''),
+        ('rejected_at', 'TIMESTAMP', ''),
+        # Loan details (filled during review)
+        ('loan_amount', 'DECIMAL(15,2)', ''),
+        ('interest_rate', 'DECIMAL(5,2)', ''),
+        ('loan_term_months', 'INTEGER', ''),
+        ('loan_duration', 'INTEGER', ''),
+        ('monthly_payment', 'DECIMAL(15,2)', ''),
+        ('loan_purpose', 'TEXT', ''),
+        # Credit assessment
+        ('credit_score', 'INTEGER', ''),
+        ('monthly_income', 'DECIMAL(15,2)', ''),
+        ('employment_status', 'VARCHAR(100)', ''),
+        ('collateral_description', 'TEXT', ''),
+        ('priority_level', 'VARCHAR(20)', "DEFAULT 'medium'"),
+        # Content hash of the stored upload (see upload_blobs)
+        ('upload_sha256', 'VARCHAR(64)', ''),
+        # Downsized copies for list and review screens (see image_derivatives)
+        ('thumbnail_path', 'VARCHAR(500)', ''),
+        ('preview_path', 'VARCHAR(500)', ''),
+        # Upload size as received and as stored (differ after normalization)
+        ('original_size_bytes', 'BIGINT', ''),
+        ('stored_size_bytes', 'BIGINT', ''),
+    ], [
+        'FOREIGN KEY (user_id) REFERENCES member_users(user_id) ON DELETE CASCADE',
+    ]),
+    ('loan_review_history', [
+        ('history_id', 'SERIAL', 'PRIMARY KEY'),
+        ('application_id', 'INTEGER', 'NOT NULL'),
+        ('reviewer_id', 'UUID', ''),
+        ('reviewer_role', 'VARCHAR(50)', ''),
+        ('action_taken', 'VARCHAR(100)', ''),
+        ('notes', 'TEXT', ''),
+        ('created_at', 'TIMESTAMP', 'DEFAULT CURRENT_TIMESTAMP'),
+    ], [
+        'FOREIGN KEY (application_id) REFERENCES loan_applications(application_id) ON DELETE CASCADE',
+    ]),
+    # One row per stored upload blob; ref_count is the number of
+    # loan_applications rows whose upload_sha256 points at it
+    ('upload_blobs', [
+        ('sha256', 'VARCHAR(64)', 'PRIMARY KEY'),
+        ('storage_path', 'VARCHAR(500)', 'NOT NULL'),
+        ('size_bytes', 'BIGINT', ''),
+        ('ref_count', 'INTEGER', 'NOT NULL DEFAULT 0'),
+        ('created_at', 'TIMESTAMP', 'DEFAULT CURRENT_TIMESTAMP'),
+        ('last_referenced_at', 'TIMESTAMP', 'DEFAULT CURRENT_TIMESTAMP'),
+    ], []),
+    # Application counts and amounts per group (see loan_review_stats)
+    ('loan_review_stats', [
+        ('review_status', 'VARCHAR(50)', 'NOT NULL'),
+        ('status', 'VARCHAR(50)', 'NOT NULL'),
+        ('loan_officer_id', 'UUID', 'NOT NULL'),
+        ('month', 'DATE', 'NOT NULL'),
+        ('application_count', 'BIGINT', 'NOT NULL DEFAULT 0'),
+        ('loan_amount_total', 'DECIMAL(18,2)', 'NOT NULL DEFAULT 0'),
+        ('updated_at', 'TIMESTAMP', 'DEFAULT CURRENT_TIMESTAMP'),
+    ], [
+        'PRIMARY KEY (review_status, status, loan_officer_id, month)',
+    ]),
+    # Changes not folded into loan_review_stats yet; written by triggers
+    ('loan_review_stats_deltas', [
+        ('delta_id', 'BIGSERIAL', 'PRIMARY KEY'),
+        ('review_status', 'VARCHAR(50)', 'NOT NULL'),
+        ('status', 'VARCHAR(50)', 'NOT NULL'),
+        ('loan_officer_id', 'UUID', 'NOT NULL'),
+        ('month', 'DATE', 'NOT NULL'),
+        ('application_count', 'BIGINT', 'NOT NULL'),
+        ('loan_amount_total', 'DECIMAL(18,2)', 'NOT NULL'),
+        ('created_at', 'TIMESTAMP', 'DEFAULT CURRENT_TIMESTAMP'),
+    ], []),
+    # Events waiting for notifications.NotificationDispatcher; written in the
+    # transaction of the status change they report
+    ('notification_outbox', [
+        ('event_id', 'BIGSERIAL', 'PRIMARY KEY'),
+        ('user_id', 'UUID', 'NOT NULL'),
+        ('application_id', 'INTEGER', ''),
+        ('event_type', 'VARCHAR(50)', 'NOT NULL'),
+        ('payload', 'JSONB', ''),
+        ('created_at', 'TIMESTAMP', 'DEFAULT CURRENT_TIMESTAMP'),
+        ('available_at', 'TIMESTAMP', 'DEFAULT CURRENT_TIMESTAMP'),
+        ('attempts', 'INTEGER', 'NOT NULL DEFAULT 0'),
+        ('last_error', 'TEXT', ''),
+        ('failed_at', 'TIMESTAMP', ''),
+    ], [
+        'FOREIGN KEY (user_id) REFERENCES member_users(user_id) ON DELETE CASCADE',
+    ]),
+    # What members see on their dashboard, one row per delivered batch
+    ('notifications', [
+        ('id', 'SERIAL', 'PRIMARY KEY'),
+        ('user_id', 'UUID', 'NOT NULL'),
+        ('title', 'VARCHAR(255)', 'NOT NULL'),
+        ('message', 'TEXT', 'NOT NULL'),
+        ('type', 'VARCHAR(50)', "DEFAULT 'info'"),
+        ('event_count', 'INTEGER', 'NOT NULL DEFAULT 1'),
+        ('is_read', 'BOOLEAN', 'DEFAULT false'),
+        ('created_at', 'TIMESTAMP', 'DEFAULT CURRENT_TIMESTAMP'),
+    ], [
+        'FOREIGN KEY (user_id) REFERENCES member_users(user_id) ON DELETE CASCADE',
+    ]),
+    # Background work for job_queue.JobWorker; a job is deleted once it succeeds
+    ('job_queue', [
+        ('job_id', 'BIGSERIAL', 'PRIMARY KEY'),
+        ('queue', 'VARCHAR(50)', 'NOT NULL'),
+        ('job_type', 'VARCHAR(50)', 'NOT NULL'),
+        ('payload', 'JSONB', "NOT NULL DEFAULT '{}'"),
+        ('priority', 'INTEGER', 'NOT NULL DEFAULT 2'),
+        ('status', 'VARCHAR(20)', "NOT NULL DEFAULT 'queued'"),
+        ('attempts', 'INTEGER', 'NOT NULL DEFAULT 0'),
+        ('max_attempts', 'INTEGER', 'NOT NULL DEFAULT 5'),
+        ('run_at', 'TIMESTAMP', 'NOT NULL DEFAULT CURRENT_TIMESTAMP'),
+        ('locked_at', 'TIMESTAMP', ''),
+        ('locked_by', 'VARCHAR(100)', ''),
+        ('last_error', 'TEXT', ''),
+        ('created_at', 'TIMESTAMP', 'DEFAULT CURRENT_TIMESTAMP'),
+    ], []),
+    # Jobs that ran out of attempts or failed permanently, kept for inspection
+    # and job_queue.retry_dead_jobs()
+    ('job_dead_letters', [
+        ('job_id', 'BIGINT', 'PRIMARY KEY'),
+        ('queue', 'VARCHAR(50)', 'NOT NULL'),
+        ('job_type', 'VARCHAR(50)', 'NOT NULL'),
+        ('payload', 'JSONB', 'NOT NULL'),
+        ('priority', 'INTEGER', 'NOT NULL'),
+        ('attempts', 'INTEGER', 'NOT NULL'),
+        ('max_attempts', 'INTEGER', 'NOT NULL'),
+        ('last_error', 'TEXT', ''),
+        ('created_at', 'TIMESTAMP', ''),
+        ('failed_at', 'TIMESTAMP', 'DEFAULT CURRENT_TIMESTAMP'),
+    ], []),
+    # Amortization schedules written by loan_schedule.py, one row per
+    # installment. No foreign key: full rebuilds TRUNCATE and COPY, and the
+    # primary key is dropped for the load (loan_schedule.SCHEDULE_INDEXES)
+    ('loan_schedules', [
+        ('application_id', 'INTEGER', 'NOT NULL'),
+        ('installment_number', 'INTEGER', 'NOT NULL'),
+        ('due_date', 'DATE', 'NOT NULL'),
+        ('payment', 'DECIMAL(15,2)', 'NOT NULL'),
+        ('interest', 'DECIMAL(15,2)', 'NOT NULL'),
+        ('principal', 'DECIMAL(15,2)', 'NOT NULL'),
+        ('balance', 'DECIMAL(15,2)', 'NOT NULL'),
+    ], [
+        'PRIMARY KEY (application_id, installment_number)',
+    ]),
+    # One row per scheduled loan with its outstanding balance as of the run
+    ('loan_schedule_summary', [
+        ('application_id', 'INTEGER', 'PRIMARY KEY'),
+        ('monthly_payment', 'DECIMAL(15,2)', 'NOT NULL'),
+        ('total_interest', 'DECIMAL(15,2)', 'NOT NULL'),
+        ('installments', 'INTEGER', 'NOT NULL'),
+        ('first_due_date', 'DATE', 'NOT NULL'),
+        ('maturity_date', 'DATE', 'NOT NULL'),
+        ('as_of', 'DATE', 'NOT NULL'),
+        ('installments_due', 'INTEGER', 'NOT NULL'),
+        ('outstanding_balance', 'DECIMAL(15,2)', 'NOT NULL'),
+        ('computed_at', 'TIMESTAMP', 'DEFAULT CURRENT_TIMESTAMP'),
+    ], []),
+]
+
+# Tables filled from existing data when they are created, in the same
+# transaction as their triggers: (table, SQL)
+BACKFILLS = [
+    ('loan_review_stats', "LOCK TABLE loan_applications IN SHARE MODE;" + loan_review_stats.REBUILD_SQL),
+]
+
+# (name, table, indexed columns). An existing index over the same columns
+# satisfies the check whatever it is called, so databases set up from the
+# staff-portal scripts do not get duplicate indexes.
+INDEXES = [
+    ('idx_member_users_email', 'member_users', ['user_email']),
+    ('idx_member_users_member_number', 'member_users', ['member_number']),
+    ('idx_member_users_active', 'member_users', ['is_active']),
+    ('idx_loan_applications_user_id', 'loan_applications', ['user_id']),
+    ('idx_loan_applications_status', 'loan_applications', ['status']),
+    ('idx_loan_applications_review_status', 'loan_applications', ['review_status']),
+    ('idx_loan_applications_submitted_at', 'loan_applications', ['submitted_at']),
+    # Keyset pagination order of get_loan_applications
+    ('idx_loan_applications_submitted_keyset', 'loan_applications', ['submitted_at', 'application_id']),
+    ('idx_loan_applications_loan_officer', 'loan_applications', ['loan_officer_id']),
+    ('idx_loan_applications_manager', 'loan_applications', ['manager_id']),
+    ('idx_loan_applications_upload_sha256', 'loan_applications', ['upload_sha256']),
+    ('idx_loan_review_history_application_id', 'loan_review_history', ['application_id']),
+    ('idx_loan_review_history_created_at', 'loan_review_history', ['created_at']),
+    ('idx_loan_review_history_reviewer', 'loan_review_history', ['reviewer_id']),
+    # The dispatcher's second claim step takes every event of a member
+    ('idx_notification_outbox_user_id', 'notification_outbox', ['user_id']),
+    ('idx_notifications_user_id', 'notifications', ['user_id', 'created_at']),
+    # Claim order of job_queue.claim_jobs
+    ('idx_job_queue_claim', 'job_queue', ['queue', 'status', 'priority', 'run_at', 'job_id']),
+    ('idx_job_dead_letters_queue', 'job_dead_letters', ['queue', 'failed_at']),
+]
+
+# (trigger name, table, SQL creating the trigger function and trigger)
+TRIGGERS = [
+    ('update_member_users_updated_at', 'member_users', """
+    CREATE OR REPLACE FUNCTION update_updated_at_column()
+    RETURNS TRIGGER AS $trigger_function$
+    BEGIN
+        NEW.updated_at = CURRENT_TIMESTAMP;
+        RETURN NEW;
+    END;
+    $trigger_function$ language 'plpgsql';
+
+    DROP TRIGGER IF EXISTS update_member_users_updated_at ON member_users;
+    CREATE TRIGGER update_member_users_updated_at
+        BEFORE UPDATE ON member_users
+        FOR EACH ROW
+        EXECUTE FUNCTION update_updated_at_column();
+    """),
+    # Tells warm workers (member_cache.MemberInvalidationListener) which member changed
+    ('member_users_notify_change', 'member_users', """
+    CREATE OR REPLACE FUNCTION notify_member_users_change()
+    RETURNS TRIGGER AS $trigger_function$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            PERFORM pg_notify('member_users_changed', OLD.user_id::text);
+            RETURN OLD;
+        END IF;
+        PERFORM pg_notify('member_users_changed', NEW.user_id::text);
+        IF TG_OP = 'UPDATE' AND NEW.user_id IS DISTINCT FROM OLD.user_id THEN
+            PERFORM pg_notify('member_users_changed', OLD.user_id::text);
+        END IF;
+        RETURN NEW;
+    END;
+    $trigger_function$ language 'plpgsql';
+
+    DROP TRIGGER IF EXISTS member_users_notify_change ON member_users;
+    CREATE TRIGGER member_users_notify_change
+        AFTER INSERT OR UPDATE OR DELETE ON member_users
+        FOR EACH ROW
+        EXECUTE FUNCTION notify_member_users_change();
+    """),
+    ('loan_applications_release_blob', 'loan_applications', """
+    CREATE OR REPLACE FUNCTION release_upload_blob()
+    RETURNS TRIGGER AS $trigger_function$
+    BEGIN
+        IF OLD.upload_sha256 IS NOT NULL THEN
+            UPDATE upload_blobs SET ref_count = ref_count - 1 WHERE sha256 = OLD.upload_sha256;
+        END IF;
+        RETURN OLD;
+    END;
+    $trigger_function$ language 'plpgsql';
+
+    DROP TRIGGER IF EXISTS loan_applications_release_blob ON loan_applications;
+    CREATE TRIGGER loan_applications_release_blob
+        AFTER DELETE ON loan_applications
+        FOR EACH ROW
+        EXECUTE FUNCTION release_upload_blob();
+    """),
+    # Statement-level; append net changes to loan_review_stats_deltas
+    ('loan_applications_stats_insert', 'loan_applications',
+     loan_review_stats.trigger_sql('loan_applications_stats_insert', 'INSERT', 'NEW TABLE AS new_rows')),
+    ('loan_applications_stats_update', 'loan_applications',
+     loan_review_stats.trigger_sql('loan_applications_stats_update', 'UPDATE',
+                                   'OLD TABLE AS old_rows NEW TABLE AS new_rows')),
+    ('loan_applications_stats_delete', 'loan_applications',
+     loan_review_stats.trigger_sql('loan_applications_stats_delete', 'DELETE', 'OLD TABLE AS old_rows')),
+]
+
+# information_schema.columns.data_type for each canonical column type
+_DATA_TYPES = {
+    'UUID': 'uuid',
+    'SERIAL': 'integer',
+    'BIGSERIAL': 'bigint',
+    'INTEGER': 'integer',
+    'BIGINT': 'bigint',
+    'BOOLEAN': 'boolean',
+    'TEXT': 'text',
+    'JSONB': 'jsonb',
+    'TIMESTAMP': 'timestamp without time zone',
+    'DATE': 'date',
+    'VARCHAR': 'character varying',
+    'DECIMAL': 'numeric',
+}
+
+
+class SchemaError(Exception):
+    """Raised when the database does not match the canonical schema."""
+
+
+def _data_type(column_type):
+    return _DATA_TYPES[column_type.split('(')[0]]
+
+
+def _column_sql(name, column_type, extra):
+    return f"{name} {column_type} {extra}".strip()
+
+
+def check_schema(conn):
+    """
+    Compare the database against the canonical definition.
+
+    Args:
+        conn: Open psycopg2 connection
+
+    Returns:
+        dict: missing_tables, missing_columns, missing_indexes and
+            missing_triggers (problems), plus type_mismatches (warnings only,
+            since older scripts created some columns with other types)
+    """
+    table_names = [table for table, _, _ in TABLES]
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT table_name, column_name, data_type
+        FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = ANY(%s)
+    """, (table_names,))
+    existing_columns = {}
+    for table, column, data_type in cursor.fetchall():
+        existing_columns.setdefault(table, {})[column] = data_type
+
+    cursor.execute("""
+        SELECT t.relname, array_agg(a.attname::text ORDER BY k.ord)
+        FROM pg_index x
+        JOIN pg_class t ON t.oid = x.indrelid
+        CROSS JOIN LATERAL unnest(x.indkey) WITH ORDINALITY AS k(attnum, ord)
+        JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = k.attnum
+        JOIN pg_namespace n ON n.oid = t.relnamespace AND n.nspname = current_schema()
+        WHERE t.relname = ANY(%s)
+        GROUP BY t.relname, x.indexrelid
+    """, (table_names,))
+    existing_indexes = {(table, tuple(columns)) for table, columns in cursor.fetchall()}
+
+    cursor.execute("""
+        SELECT tgname FROM pg_trigger
+        WHERE NOT tgisinternal AND tgrelid::regclass::text = ANY(%s)
+    """, (table_names,))
+    existing_triggers = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+
+    report = {
+        'missing_tables': [],
+        'missing_columns': [],
+        'missing_indexes': [],
+        'missing_triggers': [],
+        'type_mismatches': [],
+    }
+
+    for table, columns, _ in TABLES:
+        if table not in existing_columns:
+            report['missing_tables'].append(table)
+            continue
+        for name, column_type, _ in columns:
+            actual = existing_columns[table].get(name)
+            if actual is None:
+                report['missing_columns'].append(f"{table}.{name}")
+            elif actual != _data_type(column_type):
+                report['type_mismatches'].append(f"{table}.{name} is {actual}, expected {column_type}")
+
+    for name, table, columns in INDEXES:
+        if (table, tuple(columns)) not in existing_indexes:
+            report['missing_indexes'].append(name)
+
+    for name, table, _ in TRIGGERS:
+        if name not in existing_triggers:
+            report['missing_triggers'].append(name)
+
+    return report
+
+
+def schema_problems(report):
+    """Flatten a check_schema report into a list of blocking problems."""
+    problems = []
+    problems += [f"missing table {name}" for name in report['missing_tables']]
+    problems += [f"missing column {name}" for name in report['missing_columns']]
+    problems += [f"missing index {name}" for name in report['missing_indexes']]
+    problems += [f"missing trigger {name}" for name in report['missing_triggers']]
+    return problems
+
+
+def apply_migrations(conn, tables=None):
+    """
+    Create or extend the canonical tables, indexes and triggers.
+
+    Statements only add what is missing, so this is safe to re-run. The
+    caller owns the transaction.
+
+    Args:
+        conn: Open psycopg2 connection
+        tables (list, optional): Only migrate these tables (with their
+            indexes, triggers and backfills); default all
+
+    Returns:
+        list: Descriptions of the changes that were applied
+    """
+    report = check_schema(conn)
+    cursor = conn.cursor()
+    applied = []
+
+    def selected(table):
+        return tables is None or table in tables
+
+    for table, columns, constraints in TABLES:
+        if not selected(table):
+            continue
+        if table in report['missing_tables']:
+            body = [_column_sql(*column) for column in columns] + constraints
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} (\n    " + ",\n    ".join(body) + "\n)")
+            applied.append(f"created table {table}")
+            continue
+        for name, column_type, extra in columns:
+            if f"{table}.{name}" in report['missing_columns']:
+                # Constraints such as NOT NULL/PRIMARY KEY cannot be added to
+                # populated tables blindly, so only the type and default carry over
+                default = extra[extra.index('DEFAULT'):] if 'DEFAULT' in extra else ''
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {name} {column_type} {default}".strip())
+                applied.append(f"added column {table}.{name}")
+
+    for name, table, columns in INDEXES:
+        if not selected(table):
+            continue
+        if name in report['missing_indexes'] or table in report['missing_tables']:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join(columns)})")
+            applied.append(f"created index {name}")
+
+    for name, table, sql in TRIGGERS:
+        if selected(table) and name in report['missing_triggers']:
+            cursor.execute(sql)
+            applied.append(f"created trigger {name}")
+
+    for table, sql in BACKFILLS:
+        if selected(table) and table in report['missing_tables']:
+            cursor.execute(sql)
+            applied.append(f"filled table {table}")
+
+    cursor.close()
+    return applied
+
+
+_verified = set()
+_verified_lock = threading.Lock()
+
+
+def ensure_schema(conn, db_key, mode='verify'):
+    """
+    Verify (or migrate) the schema once per process for a given database.
+
+    Args:
+        conn: Open psycopg2 connection
+        db_key: Hashable identifier of the database (e.g. host/port/name)
+        mode (str): 'verify' raises SchemaError on problems, 'migrate'
+            applies missing changes, None skips the check
+
+    Returns:
+        list: Changes applied (empty unless mode is 'migrate')
+    """
+    if mode is None or db_key in _verified:
+        return []
+
+    with _verified_lock:
+        if db_key in _verified:
+            return []
+
+        applied = []
+        if mode == 'migrate':
+            applied = apply_migrations(conn)
+            conn.commit()
+        elif mode != 'verify':
+            raise ValueError(f"Unknown schema mode: {mode}")
+
+        problems = schema_problems(check_schema(conn))
+        if problems:
+            raise SchemaError(
+                "Database schema is out of date (" + "; ".join(problems) + "). "
+                "Run 'python loan_cli.py --migrate' to apply migrations."
+            )
+
+        _verified.add(db_key)
+        return applied
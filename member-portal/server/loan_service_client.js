@@ -0,0 +1,191 @@
+/**
+ * Pooled client for the long-lived Python loan service worker.
+ * Starts `python3 loan_cli.py --serve` processes once and sends requests to them
+ * as newline-delimited JSON instead of spawning a new interpreter per HTTP request.
+ */
+
+const { spawn } = require('child_process');
+const path = require('path');
+const readline = require('readline');
+
+const DEFAULT_POOL_SIZE = parseInt(process.env.LOAN_SERVICE_WORKERS || '2', 10);
+const DEFAULT_TIMEOUT_MS = parseInt(process.env.LOAN_SERVICE_TIMEOUT_MS || '30000', 10);
+
+// A worker that exits without answering anything is not respawned until its
+// backoff (doubling from RESPAWN_BACKOFF_MS up to MAX_RESPAWN_BACKOFF_MS) has
+// passed; calls in between fail fast instead of spawning another interpreter
+const RESPAWN_BACKOFF_MS = 1000;
+const MAX_RESPAWN_BACKOFF_MS = 30000;
+
+/**
+ * A single `loan_cli.py --serve` process with request/response matching by id.
+ */
+class LoanServiceWorker {
+    constructor(options = {}) {
+        this.script = options.script || path.join(__dirname, 'loan_cli.py');
+        this.python = options.python || process.env.PYTHON_BIN || 'python3';
+        this.timeoutMs = options.timeoutMs || DEFAULT_TIMEOUT_MS;
+        this.nextId = 1;
+        this.pending = new Map();
+        this.process = null;
+        // Consecutive worker exits without a response, and when the next spawn may happen
+        this.failures = 0;
+        this.retryAt = 0;
+    }
+
+    start() {
+        if (this.process) {
+            return;
+        }
+        if (Date.now() < this.retryAt) {
+            throw new Error(`Python service unavailable; retrying in ${Math.ceil((this.retryAt - Date.now()) / 1000)}s`);
+        }
+        let answered = false;
+
+        const child = spawn(this.python, [this.script, '--serve'], {
+            cwd: path.dirname(this.script),
+            stdio: ['pipe', 'pipe', 'pipe']
+        });
+
+        readline.createInterface({ input: child.stdout }).on('line', (line) => {
+            if (!answered) {
+                answered = true;
+                this.failures = 0;
+            }
+            this.handleLine(line);
+        });
+
+        // Writes to a worker that has died fail with EPIPE; without a listener
+        // that error would crash the Node process
+        child.stdin.on('error', (error) => {
+            this.discard(child, answered);
+            this.failPending(new Error(`Python service input closed: ${error.message}`));
+        });
+
+        child.stderr.on('data', (data) => {
+            console.error(`[loan-service ${child.pid}] ${data.toString().trimEnd()}`);
+        });
+
+        child.on('exit', (code, signal) => {
+            this.discard(child, answered);
+            this.failPending(new Error(`Python service exited (code ${code}, signal ${signal})`));
+        });
+
+        child.on('error', (error) => {
+            this.discard(child, answered);
+            this.failPending(new Error(`Python service failed: ${error.message}`));
+        });
+
+        this.process = child;
+    }
+
+    discard(child, answered) {
+        if (this.process !== child) {
+            return;
+        }
+        this.process = null;
+        if (!answered) {
+            // Died before answering anything (e.g. the startup schema check failed)
+            this.failures += 1;
+            const backoff = Math.min(RESPAWN_BACKOFF_MS * 2 ** (this.failures - 1), MAX_RESPAWN_BACKOFF_MS);
+            this.retryAt = Date.now() + backoff;
+        }
+    }
+
+    handleLine(line) {
+        let response;
+        try {
+            response = JSON.parse(line);
+        } catch (parseError) {
+            console.error('Failed to parse Python service response:', line);
+            return;
+        }
+
+        const entry = this.pending.get(response.id);
+        if (!entry) {
+            return;
+        }
+
+        this.pending.delete(response.id);
+        clearTimeout(entry.timer);
+        entry.resolve(response.result);
+    }
+
+    failPending(error) {
+        for (const entry of this.pending.values()) {
+            clearTimeout(entry.timer);
+            entry.reject(error);
+        }
+        this.pending.clear();
+    }
+
+    call(command, params = {}) {
+        try {
+            this.start();
+        } catch (error) {
+            return Promise.reject(error);
+        }
+
+        return new Promise((resolve, reject) => {
+            const id = this.nextId++;
+            const timer = setTimeout(() => {
+                this.pending.delete(id);
+                reject(new Error(`Python service timed out after ${this.timeoutMs}ms`));
+            }, this.timeoutMs);
+
+            this.pending.set(id, { resolve, reject, timer });
+            this.process.stdin.write(JSON.stringify({ id, command, params }) + '\n');
+        });
+    }
+
+    get load() {
+        return this.pending.size;
+    }
+
+    stop() {
+        if (this.process) {
+            this.process.stdin.end();
+            this.process = null;
+        }
+    }
+}
+
+/**
+ * Fixed-size pool of workers; each call goes to the least busy one.
+ */
+class LoanServiceClient {
+    constructor(options = {}) {
+        const size = Math.max(1, options.size || DEFAULT_POOL_SIZE);
+        this.workers = Array.from({ length: size }, () => new LoanServiceWorker(options));
+    }
+
+    call(command, params = {}) {
+        const worker = this.workers.reduce((best, candidate) =>
+            candidate.load < best.load ? candidate : best
+        );
+        return worker.call(command, params);
+    }
+
+    stop() {
+        this.workers.forEach((worker) => worker.stop());
+    }
+}
+
+let sharedClient = null;
+
+/**
+ * Return the process-wide loan service client, creating it on first use.
+ */
+function getLoanServiceClient() {
+    if (!sharedClient) {
+        sharedClient = new LoanServiceClient();
+        process.once('exit', () => sharedClient.stop());
+    }
+    return sharedClient;
+}
+
+module.exports = {
+    LoanServiceWorker,
+    LoanServiceClient,
+    getLoanServiceClient
+};
@@ -0,0 +1,205 @@
+"""
+In-process cache of member_users records for long-lived workers.
+
+``MemberCache`` is a bounded LRU with a TTL, and it also remembers unknown
+user IDs (negative entries) for a shorter time. ``MemberInvalidationListener``
+keeps a dedicated connection LISTENing on the channel the member_users trigger
+in loan_schema NOTIFYs, and drops the changed entry as soon as the
+notification arrives. The TTL is only a safety net for missed notifications.
+"""
+
+import select
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import psycopg2
+from psycopg2 import extensions
+
+MEMBER_CHANNEL = 'member_users_changed'
+
+# Returned by MemberCache.get when the cache has nothing usable
+MISS = object()
+
+
+def _key(user_id):
+    """Canonical form of a user ID, matching the text the trigger sends."""
+    try:
+        return str(uuid.UUID(str(user_id)))
+    except ValueError:
+        return str(user_id)
+
+
+class MemberCache:
+    """
+    Thread-safe LRU/TTL cache of member records keyed by user_id.
+
+    A cached value of None means "no such member" (negative entry).
+    """
+
+    def __init__(self, max_entries=10000, ttl=60.0, negative_ttl=10.0):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Entries kept before the least recently used is evicted
+            ttl (float): Seconds a member record stays valid
+            negative_ttl (float): Seconds an unknown user_id stays cached
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()     # user_id -> (record, expires_at)
+        self._generation = 0              # bumped by every invalidation
+        self._counters = {
+            'hits': 0,
+            'negative_hits': 0,
+            'misses': 0,
+            'expirations': 0,
+            'evictions': 0,
+            'invalidations': 0,
+        }
+
+    def get(self, user_id):
+        """Return the cached record (None for a known-unknown member) or MISS."""
+        key = _key(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return MISS
+            record, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._counters['expirations'] += 1
+                self._counters['misses'] += 1
+                return MISS
+            self._entries.move_to_end(key)
+            self._counters['hits' if record is not None else 'negative_hits'] += 1
+            return record
+
+    def load_token(self):
+        """
+        Snapshot taken before querying the database for a miss.
+
+        Pass it to put() so a result read before a concurrent invalidation
+        is not cached after it.
+        """
+        with self._lock:
+            return self._generation
+
+    def put(self, user_id, record, token=None):
+        """Cache ``record`` (None for an unknown member) unless invalidated since ``token``."""
+        key = _key(user_id)
+        ttl = self.ttl if record is not None else self.negative_ttl
+        with self._lock:
+            if token is not None and token != self._generation:
+                return
+            self._entries[key] = (record, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def invalidate(self, user_id):
+        """Drop one member."""
+        with self._lock:
+            self._generation += 1
+            self._counters['invalidations'] += 1
+            self._entries.pop(_key(user_id), None)
+
+    def clear(self):
+        """Drop every entry (e.g. after notifications may have been missed)."""
+        with self._lock:
+            self._generation += 1
+            self._counters['invalidations'] += 1
+            self._entries.clear()
+
+    def stats(self):
+        """Return size and hit/miss/eviction counters."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['size'] = len(self._entries)
+            stats['max_entries'] = self.max_entries
+        lookups = stats['hits'] + stats['negative_hits'] + stats['misses']
+        stats['hit_ratio'] = (stats['hits'] + stats['negative_hits']) / lookups if lookups else 0.0
+        return stats
+
+
+class MemberInvalidationListener:
+    """
+    Background thread that applies member_users NOTIFY payloads to a cache.
+
+    The payload is the changed user_id. When the connection drops the whole
+    cache is cleared, because notifications sent meanwhile are lost, and the
+    listener reconnects with backoff.
+    """
+
+    def __init__(self, db_config, cache, channel=MEMBER_CHANNEL, poll_interval=5.0):
+        self.db_config = db_config
+        self.cache = cache
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self.notifications = 0
+        self.reconnects = 0
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._thread = None
+
+    def start(self, wait=5.0):
+        """Start listening; waits up to ``wait`` seconds for LISTEN to be active."""
+        self._thread = threading.Thread(target=self._run, name='member-cache-listener', daemon=True)
+        self._thread.start()
+        self._ready.wait(wait)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.poll_interval + 1)
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.db_config)
+        conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {self.channel}")
+        return conn
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                # Anything cached before LISTEN took effect may be stale
+                self.cache.clear()
+                self._ready.set()
+                backoff = 1.0
+                while not self._stop.is_set():
+                    readable, _, _ = select.select([conn], [], [], self.poll_interval)
+                    if not readable:
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self.notifications += 1
+                        if notify.payload:
+                            self.cache.invalidate(notify.payload)
+                        else:
+                            self.cache.clear()
+            except (psycopg2.Error, OSError) as e:
+                self.cache.clear()
+                self.reconnects += 1
+                print(f"Member cache listener disconnected: {str(e)}; retrying in {backoff:.0f}s", file=sys.stderr)
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 60.0)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
@@ -0,0 +1,612 @@
+"""
+Monthly member statements, generated in batches for every active member.
+
+A statement lists one member's lines for a calendar month:
+
+- membership dues, a flat monthly amount (``--dues``; 0 leaves it out)
+- loan installments falling due in the month, from loan_schedules
+  (see loan_schedule.py)
+- payments confirmed in the month, from payment_references, as credits
+
+Members are taken in batches in user_id order. For each batch one UNION
+query returns every line of every member in it, the documents (HTML or PDF)
+are rendered in a process pool, and the statements are COPYed into invoices
+in the same transaction that records the batch as done in
+member_statement_runs. The statement columns, index and run table are
+added once by scripts/setup_member_statements.py. An interrupted run continues after its last
+committed batch when the same command is run again. Re-running a finished
+period replaces that period's statements instead of adding a second set.
+"""
+
+import html
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+
+import psycopg2
+
+from db_pool import ConnectionPool
+
+COOPERATIVE_NAME = 'Credit Cooperative'
+
+# Flat monthly membership dues; the cooperative sets the amount
+MONTHLY_DUES = Decimal('100.00')
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'statements')
+FORMATS = ('html', 'pdf')
+
+RUNS_TABLE = 'member_statement_runs'
+
+# Keeps one statement per member and month in invoices
+STATEMENT_INDEX = 'idx_invoices_member_statement'
+
+# Columns statements add to the staff portal's invoices table (see
+# scripts/setup_member_statements.py). Hand-made invoices leave them NULL.
+INVOICE_COLUMNS = [
+    ('statement_period', 'DATE'),
+    ('member_user_id', 'UUID'),
+    ('document_path', 'TEXT'),
+]
+
+# Columns COPY writes, in order
+_COPY_COLUMNS = (
+    'member_name', 'member_number', 'cashier_name', 'items', 'subtotal', 'tax', 'discount',
+    'total', 'notes', 'statement_period', 'member_user_id', 'document_path'
+)
+
+# Name written as cashier_name on generated statements
+STATEMENT_ISSUER = 'Statement run'
+
+# Line kinds in the order they appear on a statement
+LINE_KINDS = ('dues', 'loan_installment', 'payment')
+
+MEMBERS_QUERY = """
+SELECT user_id, COALESCE(user_name, user_email), member_number
+FROM member_users
+WHERE COALESCE(is_active, TRUE)
+  AND (%(after)s::uuid IS NULL OR user_id > %(after)s::uuid)
+  AND (%(from_member)s::text IS NULL OR member_number >= %(from_member)s)
+  AND (%(to_member)s::text IS NULL OR member_number <= %(to_member)s)
+ORDER BY user_id
+LIMIT %(limit)s
+"""
+
+# Every line of a batch of members. Amounts are cents; credits are negative.
+DUES_LINES = """
+SELECT member.user_id, 0, %(dues_label)s, %(dues)s::bigint, %(start)s::date
+FROM unnest(%(members)s::uuid[]) AS member(user_id)
+WHERE %(dues)s > 0
+"""
+
+INSTALLMENT_LINES = """
+SELECT la.user_id, 1,
+       'Loan #' || s.application_id || ' installment ' || s.installment_number
+           || COALESCE(' of ' || summary.installments, '') || ' (due ' || to_char(s.due_date, 'YYYY-MM-DD') || ')',
+       round(s.payment * 100)::bigint, s.due_date
+FROM loan_applications la
+JOIN loan_schedules s ON s.application_id = la.application_id
+LEFT JOIN loan_schedule_summary summary ON summary.application_id = s.application_id
+WHERE la.user_id = ANY(%(members)s::uuid[])
+  AND s.due_date >= %(start)s AND s.due_date < %(end)s
+"""
+
+PAYMENT_LINES = """
+SELECT user_id, 2, description, amount_cents, entry_date
+FROM statement_payments
+WHERE user_id = ANY(%(members)s::uuid[])
+"""
+
+
+def month_bounds(period):
+    """First day of ``period``'s month and of the month after it."""
+    start = period.replace(day=1)
+    end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start, end
+
+
+def previous_month(today=None):
+    """First day of the month before ``today`` (default: today)."""
+    today = today or date.today()
+    return month_bounds(date(today.year - (today.month == 1), (today.month - 2) % 12 + 1, 1))[0]
+
+
+def _cents(value):
+    """Cents as a 2-decimal string: -1234 -> '-12.34'."""
+    sign = '-' if value < 0 else ''
+    whole, cents = divmod(abs(int(value)), 100)
+    return f'{sign}{whole}.{cents:02d}'
+
+
+def _payment_member_link(columns):
+    """
+    (member expression, join) linking a payment_references row to member_users.
+
+    The rich schema has user_id. A simple-schema row is linked through
+    legacy_user_id, or through member_name when it names exactly one member
+    (the same rule migrations/migrate_payment_references.py uses).
+    """
+    if 'user_id' in columns:
+        return 'p.user_id', ''
+    join = ("LEFT JOIN (SELECT user_name, min(user_id::text)::uuid AS user_id FROM member_users "
+            "GROUP BY user_name HAVING count(*) = 1) mu ON mu.user_name = p.member_name")
+    if 'legacy_user_id' in columns:
+        return 'COALESCE(p.legacy_user_id, mu.user_id)', join
+    return 'mu.user_id', join
+
+
+def build_statements(members, lines, period):
+    """
+    Group a batch's lines into one statement per member.
+
+    Args:
+        members (list): (user_id, name, member_number) rows
+        lines (list): (user_id, kind index, description, cents, date) rows,
+            sorted by user_id, kind and date
+        period (date): First day of the statement month
+
+    Returns:
+        list: Statement dicts; members without any line get none
+    """
+    by_member = {}
+    for user_id, kind, description, cents, entry_date in lines:
+        by_member.setdefault(user_id, []).append({
+            'type': LINE_KINDS[kind],
+            'date': entry_date.isoformat(),
+            'description': description,
+            'quantity': 1,
+            'unit_price': _cents(cents),
+            'cents': int(cents),
+        })
+
+    statements = []
+    for user_id, name, member_number in members:
+        items = by_member.get(user_id)
+        if not items:
+            continue
+        charges = sum(item['cents'] for item in items if item['cents'] > 0)
+        credits = -sum(item['cents'] for item in items if item['cents'] < 0)
+        statements.append({
+            'user_id': user_id,
+            'member_name': name or '',
+            'member_number': member_number,
+            'period': period.isoformat(),
+            'items': items,
+            'charges_cents': charges,
+            'credits_cents': credits,
+            'total_cents': charges - credits,
+        })
+    return statements
+
+
+def render_html(statement):
+    """Statement as a standalone HTML page."""
+    rows = ''.join(
+        f"<tr><td>{item['date']}</td><td>{html.escape(item['description'])}</td>"
+        f"<td class=\"amount\">{item['unit_price']}</td></tr>\n"
+        for item in statement['items']
+    )
+    period = datetime.strptime(statement['period'], '%Y-%m-%d').strftime('%B %Y')
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Statement {period}</title>
+<style>body{{font-family:sans-serif}}table{{border-collapse:collapse;width:100%}}
+td,th{{padding:4px 8px;border-bottom:1px solid #ddd;text-align:left}}.amount{{text-align:right}}</style>
+</head><body>
+<h1>{html.escape(COOPERATIVE_NAME)}</h1>
+<h2>Member statement, {period}</h2>
+<p>{html.escape(statement['member_name'])}<br>Member number: {html.escape(statement['member_number'] or '-')}</p>
+<table><thead><tr><th>Date</th><th>Description</th><th class="amount">Amount</th></tr></thead>
+<tbody>
+{rows}</tbody></table>
+<p>Charges: {_cents(statement['charges_cents'])}<br>
+Payments received: {_cents(statement['credits_cents'])}<br>
+<strong>Amount due: {_cents(statement['total_cents'])}</strong></p>
+</body></html>
+"""
+
+
+# Text lines per PDF page (A4, 10pt Courier at 14pt leading)
+_PDF_LINES_PER_PAGE = 52
+
+
+def _pdf_text(value):
+    return value.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)').encode('latin-1', 'replace')
+
+
+def render_pdf(statement):
+    """
+    Statement as a plain-text PDF (Courier, one line per entry).
+
+    Written by hand so statements need no PDF library; a long statement
+    continues on further pages.
+    """
+    period = datetime.strptime(statement['period'], '%Y-%m-%d').strftime('%B %Y')
+    text = [
+        COOPERATIVE_NAME,
+        f'Member statement, {period}',
+        f"{statement['member_name']}  (member number {statement['member_number'] or '-'})",
+        '',
+    ]
+    text += [f"{item['date']}  {item['description'][:58]:<58} {item['unit_price']:>12}" for item in statement['items']]
+    text += [
+        '',
+        f"{'Charges:':<70} {_cents(statement['charges_cents']):>12}",
+        f"{'Payments received:':<70} {_cents(statement['credits_cents']):>12}",
+        f"{'Amount due:':<70} {_cents(statement['total_cents']):>12}",
+    ]
+    pages = [text[i:i + _PDF_LINES_PER_PAGE] for i in range(0, len(text), _PDF_LINES_PER_PAGE)]
+
+    # Objects: 1 catalog, 2 page tree, 3 font, then a (page, content) pair per page
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None, b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>']
+    kids = []
+    for lines in pages:
+        page_number, content_number = len(objects) + 1, len(objects) + 2
+        kids.append(f'{page_number} 0 R')
+        stream = b'BT /F1 10 Tf 14 TL 40 800 Td ' + b''.join(b'(' + _pdf_text(line) + b") '" for line in lines) + b' ET'
+        objects.append(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> '
+            f'/Contents {content_number} 0 R >>'.encode()
+        )
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    out = io.BytesIO()
+    out.write(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b'%d 0 obj\n' % number + body + b'\nendobj\n')
+    xref = out.tell()
+    out.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+    out.write(b''.join(b'%010d 00000 n \n' % offset for offset in offsets))
+    out.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def write_document(statement, output_dir, document_format):
+    """
+    Render one statement and write it to ``output_dir/<period>/``.
+
+    Runs in the process pool, so it takes and returns plain values.
+
+    Returns:
+        tuple: (user_id, path relative to output_dir, bytes written)
+    """
+    if document_format == 'pdf':
+        document = render_pdf(statement)
+    else:
+        document = render_html(statement).encode('utf-8')
+    relative = os.path.join(statement['period'][:7], f"{statement['user_id']}.{document_format}")
+    path = os.path.join(output_dir, relative)
+    # Write then rename, so a crash never leaves a half-written statement
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(document)
+    os.replace(temp_path, path)
+    return statement['user_id'], relative, len(document)
+
+
+def _copy_text(value):
+    """One COPY text-format field."""
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class MemberStatementEngine:
+    """Generate monthly statements for all active members in resumable batches."""
+
+    def __init__(self, db_config, output_dir=DEFAULT_OUTPUT_DIR, document_format='html', workers=None):
+        """
+        Initialize the engine.
+
+        Args:
+            db_config (dict): Database configuration (staff database)
+            output_dir (str): Directory statements are written under
+            document_format (str): 'html' or 'pdf'
+            workers (int, optional): Rendering processes (default: CPU count)
+        """
+        if document_format not in FORMATS:
+            raise ValueError(f"document_format must be one of {', '.join(FORMATS)}")
+        self.db_config = db_config
+        self.pool = ConnectionPool(db_config, min_size=1, max_size=1)
+        self.output_dir = output_dir
+        self.document_format = document_format
+        self.workers = workers or os.cpu_count() or 1
+
+    def check_tables(self, cursor):
+        """
+        List what scripts/setup_member_statements.py has not set up yet.
+
+        Returns:
+            list: Missing tables, columns and indexes (empty when ready)
+        """
+        cursor.execute("""
+        SELECT to_regclass('invoices') IS NOT NULL, to_regclass(%s) IS NOT NULL, to_regclass(%s) IS NOT NULL,
+               ARRAY(SELECT column_name::text FROM information_schema.columns
+                     WHERE table_schema = current_schema() AND table_name = 'invoices')
+        """, (RUNS_TABLE, STATEMENT_INDEX))
+        has_invoices, has_runs, has_index, columns = cursor.fetchone()
+        if not has_invoices:
+            return ['table invoices']
+        missing = [f"column invoices.{name}" for name, _ in INVOICE_COLUMNS if name not in columns]
+        if not has_index:
+            missing.append(f"index {STATEMENT_INDEX}")
+        if not has_runs:
+            missing.append(f"table {RUNS_TABLE}")
+        return missing
+
+    def _start_run(self, cursor, period, from_member, to_member, restart):
+        """Return (run_id, last_user_id) of the unfinished run to continue, or of a new one."""
+        cursor.execute(f"""
+        SELECT run_id, last_user_id FROM {RUNS_TABLE}
+        WHERE status = 'running' AND period = %s AND document_format = %s
+          AND from_member IS NOT DISTINCT FROM %s AND to_member IS NOT DISTINCT FROM %s
+        ORDER BY run_id DESC LIMIT 1
+        FOR UPDATE
+        """, (period, self.document_format, from_member, to_member))
+        row = cursor.fetchone()
+        if row and not restart:
+            return row[0], row[1]
+        if row:
+            cursor.execute(f"UPDATE {RUNS_TABLE} SET status = 'abandoned', updated_at = CURRENT_TIMESTAMP "
+                           f"WHERE run_id = %s", (row[0],))
+        cursor.execute(f"""
+        INSERT INTO {RUNS_TABLE} (period, from_member, to_member, document_format)
+        VALUES (%s, %s, %s, %s) RETURNING run_id
+        """, (period, from_member, to_member, self.document_format))
+        return cursor.fetchone()[0], None
+
+    def _stage_payments(self, cursor, start, end):
+        """
+        Collect the period's confirmed payments, linked to members, in a temp table.
+
+        One scan of payment_references per run instead of one per batch.
+        """
+        cursor.execute("DROP TABLE IF EXISTS statement_payments")
+        cursor.execute("""
+        CREATE TEMP TABLE statement_payments (
+            user_id UUID, description TEXT, amount_cents BIGINT, entry_date DATE
+        )
+        """)
+        cursor.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'payment_references'
+        """)
+        columns = {row[0] for row in cursor.fetchall()}
+        if not columns:
+            return 0
+        member, join = _payment_member_link(columns)
+        cursor.execute(f"""
+        INSERT INTO statement_payments
+        SELECT {member},
+               'Payment received' || COALESCE(' (' || NULLIF(p.reference_text, '') || ')', ''),
+               -round(p.amount * 100)::bigint, p.confirmed_at::date
+        FROM payment_references p {join}
+        WHERE p.status = 'confirmed' AND p.amount IS NOT NULL
+          AND p.confirmed_at >= %s AND p.confirmed_at < %s
+        """, (start, end))
+        staged = cursor.rowcount
+        cursor.execute("DELETE FROM statement_payments WHERE user_id IS NULL")
+        cursor.execute("CREATE INDEX ON statement_payments (user_id)")
+        cursor.execute("ANALYZE statement_payments")
+        return staged - cursor.rowcount
+
+    def _lines_query(self, cursor):
+        """UNION of the line sources that exist in this database."""
+        parts = [DUES_LINES]
+        cursor.execute("SELECT to_regclass('loan_schedules') IS NOT NULL")
+        if cursor.fetchone()[0]:
+            parts.append(INSTALLMENT_LINES)
+        parts.append(PAYMENT_LINES)
+        return '\nUNION ALL\n'.join(parts) + '\nORDER BY 1, 2, 5, 3'
+
+    def _write_batch(self, cursor, period, statements, documents):
+        """Replace the batch's statements for ``period`` and COPY the new ones in."""
+        cursor.execute(
+            "DELETE FROM invoices WHERE statement_period = %s AND member_user_id = ANY(%s::uuid[])",
+            (period, [statement['user_id'] for statement in statements])
+        )
+        label = f"Member statement for {period.strftime('%B %Y')}"
+        buffer = io.StringIO()
+        for statement in statements:
+            items = [{key: value for key, value in item.items() if key != 'cents'} for item in statement['items']]
+            total = _cents(statement['total_cents'])
+            row = (
+                statement['member_name'], statement['member_number'], STATEMENT_ISSUER,
+                json.dumps(items), total, '0.00', '0.00', total, label,
+                period.isoformat(), statement['user_id'], documents.get(statement['user_id'])
+            )
+            buffer.write('\t'.join(_copy_text(value) for value in row) + '\n')
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY invoices ({', '.join(_COPY_COLUMNS)}) FROM STDIN", buffer)
+
+    def run(self, period=None, from_member=None, to_member=None, batch_size=DEFAULT_BATCH_SIZE,
+            dues=MONTHLY_DUES, restart=False, progress=None):
+        """
+        Generate statements for ``period`` for every active member in range.
+
+        Args:
+            period (date, optional): Any day of the statement month
+                (default: the previous month)
+            from_member (str, optional): Lowest member_number to include
+            to_member (str, optional): Highest member_number to include
+            batch_size (int): Members per batch (and per transaction)
+            dues (Decimal): Monthly dues charged to every member; 0 for none
+            restart (bool): Start over instead of continuing an unfinished run
+            progress (callable, optional): Called with a status dict after
+                each batch
+
+        Returns:
+            dict: Result with members, statements, skipped members, document
+                bytes and members per second
+        """
+        start, end = month_bounds(period or previous_month())
+        dues_cents = int(Decimal(dues) * 100)
+        os.makedirs(os.path.join(self.output_dir, start.isoformat()[:7]), exist_ok=True)
+        started = time.perf_counter()
+        members_done = statements_done = document_bytes = 0
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                missing = self.check_tables(cursor)
+                if missing:
+                    cursor.close()
+                    return {
+                        'success': False,
+                        'message': f"Missing {', '.join(missing)}; run scripts/setup_member_statements.py first"
+                    }
+                run_id, last_user_id = self._start_run(cursor, start, from_member, to_member, restart)
+                conn.commit()
+                payments = self._stage_payments(cursor, start, end)
+                lines_query = self._lines_query(cursor)
+                conn.commit()
+
+                while True:
+                    cursor.execute(MEMBERS_QUERY, {
+                        'after': last_user_id, 'from_member': from_member,
+                        'to_member': to_member, 'limit': batch_size
+                    })
+                    members = cursor.fetchall()
+                    if not members:
+                        break
+                    member_ids = [row[0] for row in members]
+                    cursor.execute(lines_query, {
+                        'members': member_ids, 'start': start, 'end': end, 'dues': dues_cents,
+                        'dues_label': f"Membership dues, {start.strftime('%B %Y')}"
+                    })
+                    statements = build_statements(members, cursor.fetchall(), start)
+
+                    arguments = (statements, [self.output_dir] * len(statements),
+                                 [self.document_format] * len(statements))
+                    if executor is not None and len(statements) > 1:
+                        chunksize = max(1, len(statements) // (self.workers * 4))
+                        written = list(executor.map(write_document, *arguments, chunksize=chunksize))
+                    else:
+                        written = list(map(write_document, *arguments))
+                    documents = {user_id: path for user_id, path, _ in written}
+                    batch_bytes = sum(size for _, _, size in written)
+
+                    if statements:
+                        self._write_batch(cursor, start, statements, documents)
+                    last_user_id = member_ids[-1]
+                    cursor.execute(f"""
+                    UPDATE {RUNS_TABLE}
+                    SET last_user_id = %s, members = members + %s, statements = statements + %s,
+                        document_bytes = document_bytes + %s, updated_at = CURRENT_TIMESTAMP
+                    WHERE run_id = %s
+                    RETURNING members, statements
+                    """, (last_user_id, len(members), len(statements), batch_bytes, run_id))
+                    run_members, run_statements = cursor.fetchone()
+                    conn.commit()
+
+                    members_done += len(members)
+                    statements_done += len(statements)
+                    document_bytes += batch_bytes
+                    if progress:
+                        elapsed = time.perf_counter() - started
+                        progress({
+                            'run_id': run_id,
+                            'members': run_members,
+                            'statements': run_statements,
+                            'members_per_second': round(members_done / elapsed, 1) if elapsed else None
+                        })
+
+                cursor.execute(f"""
+                UPDATE {RUNS_TABLE} SET status = 'completed', updated_at = CURRENT_TIMESTAMP,
+                    finished_at = CURRENT_TIMESTAMP
+                WHERE run_id = %s
+                RETURNING members, statements
+                """, (run_id,))
+                run_members, run_statements = cursor.fetchone()
+                cursor.execute("DROP TABLE IF EXISTS statement_payments")
+                cursor.close()
+        except psycopg2.Error as e:
+            return {'success': False, 'message': f'Database error: {str(e)}'}
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        elapsed = time.perf_counter() - started
+        return {
+            'success': True,
+            'message': (f"Generated {run_statements} statements for {run_members} members "
+                        f"({start.strftime('%B %Y')})."),
+            'run_id': run_id,
+            'period': start.isoformat(),
+            'members': run_members,
+            'statements': run_statements,
+            'members_this_session': members_done,
+            'statements_this_session': statements_done,
+            'payments_linked': payments,
+            'document_bytes': document_bytes,
+            'seconds': round(elapsed, 3),
+            'members_per_second': round(members_done / elapsed, 1) if elapsed else None,
+        }
+
+
+def main():
+    """Command-line entry point; DATABASE_URL overrides the default staff database settings."""
+    db_config = {
+        'host': 'localhost',
+        'database': 'slz_coop_staff',
+        'user': 'postgres',
+        'password': 'password',
+        'port': 5432
+    }
+    if os.environ.get('DATABASE_URL'):
+        db_config = {'dsn': os.environ['DATABASE_URL']}
+
+    args = sys.argv[1:]
+
+    def option(name, default=None):
+        return args[args.index(name) + 1] if name in args and args.index(name) + 1 < len(args) else default
+
+    if '--help' in args:
+        print("Usage: python member_statements.py [--period YYYY-MM] [--from-member <n>] [--to-member <n>]")
+        print("                                   [--format html|pdf] [--dues <amount>] [--batch-size <n>]")
+        print("                                   [--workers <n>] [--output <dir>] [--restart]")
+        sys.exit(0)
+
+    try:
+        engine = MemberStatementEngine(
+            db_config,
+            output_dir=option('--output', DEFAULT_OUTPUT_DIR),
+            document_format=option('--format', 'html'),
+            workers=int(option('--workers')) if option('--workers') else None
+        )
+    except ValueError as e:
+        print(json.dumps({'success': False, 'message': str(e)}))
+        sys.exit(1)
+
+    def report(status):
+        print(json.dumps(status), file=sys.stderr, flush=True)
+
+    try:
+        period = option('--period')
+        result = engine.run(
+            period=datetime.strptime(period, '%Y-%m').date() if period else None,
+            from_member=option('--from-member'),
+            to_member=option('--to-member'),
+            batch_size=int(option('--batch-size', DEFAULT_BATCH_SIZE)),
+            dues=Decimal(option('--dues', str(MONTHLY_DUES))),
+            restart='--restart' in args,
+            progress=report
+        )
+    except Exception as e:
+        result = {'success': False, 'message': f'Error: {str(e)}'}
+    finally:
+        engine.pool.close()
+    print(json.dumps(result))
+    sys.exit(0 if result['success'] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,443 @@
+"""
+Member notifications delivered through a transactional outbox.
+
+Code that changes an application's status does not notify anyone itself. In
+the same transaction it appends an event to notification_outbox
+(``update_statuses`` does this in its UPDATE statement, and the staff portal
+review routes do it through services/NotificationService.js). It then
+signals OUTBOX_CHANNEL, which takes effect on commit. A review request
+therefore pays for one INSERT ... SELECT, however many members it touches,
+and an event exists only if the status change committed.
+
+``NotificationDispatcher`` runs a pool of worker threads. Each worker claims
+a batch with FOR UPDATE SKIP LOCKED, so workers never wait for each other or
+deliver an event twice. A batch takes every pending event of the members it
+picked, so a member gets one notification per batch however many events
+were queued for them. The batch's notifications are inserted in one
+statement and its events deleted in the same transaction. A failed batch is
+retried with backoff, and events that keep failing are parked with
+failed_at set.
+"""
+
+import json
+import os
+import select
+import sys
+import threading
+import time
+
+import psycopg2
+from psycopg2 import extensions
+
+from db_pool import ConnectionPool
+
+OUTBOX_TABLE = 'notification_outbox'
+NOTIFICATIONS_TABLE = 'notifications'
+
+# NOTIFY channel the writers signal after queueing events
+OUTBOX_CHANNEL = 'notification_outbox'
+
+# Oldest ready events a claim starts from; the claim then takes every ready
+# event of their members
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_WORKERS = 4
+
+# Seconds a worker sleeps when the outbox is empty and no NOTIFY arrives
+POLL_INTERVAL = 5.0
+
+# A batch that fails is retried after these delays (seconds); after the
+# last one its events are parked with failed_at set
+RETRY_DELAYS = (10, 60, 300, 1800)
+
+# Member-facing wording for each status an event can report
+STATUS_MESSAGES = {
+    'pending': 'is pending',
+    'approved': 'has been approved',
+    'rejected': 'has been rejected',
+}
+REVIEW_STATUS_MESSAGES = {
+    'pending_review': 'is waiting for review',
+    'under_review': 'has been forwarded for manager approval',
+    'returned': 'has been returned to you for changes',
+    'approved': 'has been approved',
+    'rejected': 'has been rejected',
+}
+
+# Notification type by the most important status in it
+_TYPE_BY_STATUS = {'approved': 'success', 'rejected': 'warning', 'returned': 'warning'}
+
+# Oldest-first members with ready events, then every ready event of those
+# members. Both steps skip rows another worker holds.
+CLAIM_SQL = f"""
+WITH seed AS (
+    SELECT DISTINCT user_id FROM (
+        SELECT user_id FROM {OUTBOX_TABLE}
+        WHERE failed_at IS NULL AND available_at <= CURRENT_TIMESTAMP
+        ORDER BY event_id
+        LIMIT %(limit)s
+        FOR UPDATE SKIP LOCKED
+    ) oldest
+)
+SELECT event_id, user_id, application_id, event_type, payload, attempts
+FROM {OUTBOX_TABLE}
+WHERE user_id IN (SELECT user_id FROM seed)
+  AND failed_at IS NULL AND available_at <= CURRENT_TIMESTAMP
+ORDER BY user_id, event_id
+FOR UPDATE SKIP LOCKED
+"""
+
+
+def _describe(event):
+    """One sentence for an event, or None if there is nothing to tell the member."""
+    payload = event['payload'] or {}
+    subject = f"Your loan application #{event['application_id']}"
+    if event['event_type'] == 'status_changed':
+        phrase = STATUS_MESSAGES.get(payload.get('status'))
+        return f'{subject} {phrase}.' if phrase else None
+    if event['event_type'] == 'review_status_changed':
+        phrase = REVIEW_STATUS_MESSAGES.get(payload.get('review_status'))
+        return f'{subject} {phrase}.' if phrase else None
+    if event['event_type'] == 'loan_terms_set':
+        terms = f"{subject} has a loan amount of {payload.get('loan_amount')}"
+        if payload.get('loan_duration'):
+            terms += f" over {payload['loan_duration']} months"
+        if payload.get('monthly_payment'):
+            terms += f" ({payload['monthly_payment']} a month)"
+        return terms + '.'
+    return None
+
+
+def compose(events):
+    """
+    Coalesce one member's events into a single notification.
+
+    Only the latest event of each kind per application is reported, so an
+    application that moved twice before delivery shows where it ended up.
+
+    Args:
+        events (list): Event dicts of one member, oldest first
+
+    Returns:
+        dict: title, message, type and event_count, or None when no event
+            has anything to tell the member
+    """
+    latest = {}
+    for event in events:
+        latest[(event['application_id'], event['event_type'])] = event
+    ordered = sorted(latest.values(), key=lambda event: event['event_id'])
+    lines = [line for line in (_describe(event) for event in ordered) if line]
+    if not lines:
+        return None
+
+    statuses = {
+        (event['payload'] or {}).get('status') or (event['payload'] or {}).get('review_status')
+        for event in ordered
+    }
+    notification_type = 'info'
+    for status in ('approved', 'rejected', 'returned'):
+        if status in statuses:
+            notification_type = _TYPE_BY_STATUS[status]
+            break
+    return {
+        'title': 'Loan application update' if len(lines) == 1 else f'{len(lines)} loan application updates',
+        'message': '\n'.join(lines),
+        'type': notification_type,
+        'event_count': len(events),
+    }
+
+
+def claim_batch(conn, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Lock the next batch of ready events; they stay locked until the caller's
+    transaction ends.
+
+    Returns:
+        list: Event dicts ordered by member and event_id
+    """
+    cursor = conn.cursor()
+    cursor.execute(CLAIM_SQL, {'limit': batch_size})
+    rows = cursor.fetchall()
+    cursor.close()
+    return [
+        {'event_id': event_id, 'user_id': user_id, 'application_id': application_id,
+         'event_type': event_type, 'payload': payload, 'attempts': attempts}
+        for event_id, user_id, application_id, event_type, payload, attempts in rows
+    ]
+
+
+def deliver_batch(conn, events):
+    """
+    Write one notification per member for ``events`` and delete the events.
+
+    The caller owns the transaction (the one that claimed the events).
+
+    Returns:
+        int: Notifications written
+    """
+    by_member = {}
+    for event in events:
+        by_member.setdefault(event['user_id'], []).append(event)
+
+    rows = []
+    for user_id, member_events in by_member.items():
+        notification = compose(member_events)
+        if notification:
+            rows.append((user_id, notification))
+
+    cursor = conn.cursor()
+    if rows:
+        cursor.execute(f"""
+        INSERT INTO {NOTIFICATIONS_TABLE} (user_id, title, message, type, event_count)
+        SELECT * FROM unnest(%s::uuid[], %s::text[], %s::text[], %s::text[], %s::int[])
+        """, (
+            [user_id for user_id, _ in rows],
+            [notification['title'] for _, notification in rows],
+            [notification['message'] for _, notification in rows],
+            [notification['type'] for _, notification in rows],
+            [notification['event_count'] for _, notification in rows],
+        ))
+    cursor.execute(f"DELETE FROM {OUTBOX_TABLE} WHERE event_id = ANY(%s)",
+                   ([event['event_id'] for event in events],))
+    cursor.close()
+    return len(rows)
+
+
+def record_failure(conn, events, error):
+    """Push failed events back with backoff, parking those out of retries."""
+    cursor = conn.cursor()
+    cursor.execute(f"""
+    UPDATE {OUTBOX_TABLE}
+    SET attempts = attempts + 1,
+        last_error = %s,
+        available_at = CURRENT_TIMESTAMP + make_interval(secs => (%s::int[])[LEAST(attempts + 1, %s)]),
+        failed_at = CASE WHEN attempts + 1 > %s THEN CURRENT_TIMESTAMP END
+    WHERE event_id = ANY(%s)
+    """, (str(error)[:1000], list(RETRY_DELAYS), len(RETRY_DELAYS), len(RETRY_DELAYS),
+          [event['event_id'] for event in events]))
+    cursor.close()
+
+
+def outbox_status(conn):
+    """
+    Backlog of the outbox.
+
+    Returns:
+        dict: ready, waiting (retry backoff) and failed event counts, and the
+            age in seconds of the oldest ready event
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"""
+    SELECT count(*) FILTER (WHERE failed_at IS NULL AND available_at <= CURRENT_TIMESTAMP),
+           count(*) FILTER (WHERE failed_at IS NULL AND available_at > CURRENT_TIMESTAMP),
+           count(*) FILTER (WHERE failed_at IS NOT NULL),
+           EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - min(created_at) FILTER (WHERE failed_at IS NULL))
+    FROM {OUTBOX_TABLE}
+    """)
+    ready, waiting, failed, oldest = cursor.fetchone()
+    cursor.close()
+    return {
+        'ready': ready,
+        'waiting': waiting,
+        'failed': failed,
+        'oldest_seconds': round(float(oldest), 1) if oldest is not None else None
+    }
+
+
+class NotificationDispatcher:
+    """Pool of worker threads draining notification_outbox."""
+
+    def __init__(self, db_config, workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE,
+                 poll_interval=POLL_INTERVAL):
+        """
+        Initialize the dispatcher.
+
+        Args:
+            db_config (dict): Database configuration (staff database)
+            workers (int): Worker threads, each using its own connection
+            batch_size (int): Oldest ready events each claim starts from
+            poll_interval (float): Seconds between outbox checks when no
+                NOTIFY arrives
+        """
+        self.db_config = db_config
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.pool = ConnectionPool(db_config, min_size=1, max_size=workers)
+        self._stop = threading.Event()
+        self._wake = threading.Condition()
+        self._signals = 0
+        self._threads = []
+        self._lock = threading.Lock()
+        self._counters = {'batches': 0, 'events': 0, 'notifications': 0, 'failed_batches': 0}
+
+    def dispatch_once(self):
+        """
+        Claim and deliver one batch.
+
+        Returns:
+            int: Events handled (0 when nothing was ready)
+        """
+        events = []
+        try:
+            with self.pool.connection() as conn:
+                events = claim_batch(conn, self.batch_size)
+                if not events:
+                    return 0
+                delivered = deliver_batch(conn, events)
+        except psycopg2.Error as e:
+            if not events:
+                raise
+            with self._lock:
+                self._counters['failed_batches'] += 1
+            print(f"Notification batch of {len(events)} events failed: {str(e)}", file=sys.stderr)
+            with self.pool.connection() as conn:
+                record_failure(conn, events, e)
+            return len(events)
+
+        with self._lock:
+            self._counters['batches'] += 1
+            self._counters['events'] += len(events)
+            self._counters['notifications'] += delivered
+        return len(events)
+
+    def drain(self):
+        """Deliver batches until nothing is ready; returns the events handled."""
+        handled = 0
+        while not self._stop.is_set():
+            count = self.dispatch_once()
+            if not count:
+                break
+            handled += count
+        return handled
+
+    def _worker(self):
+        seen = 0
+        while not self._stop.is_set():
+            try:
+                if self.drain():
+                    continue
+            except psycopg2.Error as e:
+                print(f"Notification worker error: {str(e)}", file=sys.stderr)
+            with self._wake:
+                if self._signals == seen:
+                    self._wake.wait(self.poll_interval)
+                seen = self._signals
+
+    def _listen(self):
+        """Wake the workers when a writer signals OUTBOX_CHANNEL."""
+        backoff = 1.0
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(**self.db_config)
+                conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {OUTBOX_CHANNEL}")
+                backoff = 1.0
+                while not self._stop.is_set():
+                    readable, _, _ = select.select([conn], [], [], self.poll_interval)
+                    if not readable:
+                        continue
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        with self._wake:
+                            self._signals += 1
+                            self._wake.notify_all()
+            except (psycopg2.Error, OSError) as e:
+                # Workers still poll every poll_interval meanwhile
+                print(f"Notification listener disconnected: {str(e)}; retrying in {backoff:.0f}s", file=sys.stderr)
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 60.0)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def start(self):
+        """Start the listener and worker threads."""
+        self._threads = [threading.Thread(target=self._listen, name='notification-listener', daemon=True)]
+        self._threads += [
+            threading.Thread(target=self._worker, name=f'notification-worker-{number}', daemon=True)
+            for number in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stop the threads after their current batch and close the pool."""
+        self._stop.set()
+        with self._wake:
+            self._wake.notify_all()
+        for thread in self._threads:
+            thread.join(self.poll_interval + 1)
+        self.pool.close()
+
+    def stats(self):
+        """Cumulative batch, event and notification counters."""
+        with self._lock:
+            return dict(self._counters)
+
+
+def main():
+    """Command-line entry point; DATABASE_URL overrides the default staff database settings."""
+    db_config = {
+        'host': 'localhost',
+        'database': 'slz_coop_staff',
+        'user': 'postgres',
+        'password': 'password',
+        'port': 5432
+    }
+    if os.environ.get('DATABASE_URL'):
+        db_config = {'dsn': os.environ['DATABASE_URL']}
+
+    args = sys.argv[1:]
+
+    def option(name, default=None):
+        return args[args.index(name) + 1] if name in args and args.index(name) + 1 < len(args) else default
+
+    if not args or '--help' in args:
+        print("Usage:")
+        print("  python notifications.py --dispatch [--workers <n>] [--batch-size <n>] [--poll <seconds>]")
+        print("  python notifications.py --drain [--batch-size <n>]")
+        print("  python notifications.py --status")
+        sys.exit(0 if args else 1)
+
+    dispatcher = NotificationDispatcher(
+        db_config,
+        workers=int(option('--workers', DEFAULT_WORKERS)),
+        batch_size=int(option('--batch-size', DEFAULT_BATCH_SIZE)),
+        poll_interval=float(option('--poll', POLL_INTERVAL))
+    )
+    try:
+        if '--status' in args:
+            with dispatcher.pool.connection() as conn:
+                result = dict(outbox_status(conn), success=True)
+        elif '--drain' in args:
+            started = time.perf_counter()
+            events = dispatcher.drain()
+            result = dict(dispatcher.stats(), success=True,
+                          message=f'Delivered {events} events.', seconds=round(time.perf_counter() - started, 3))
+        elif '--dispatch' in args:
+            print(f"Dispatching notifications with {dispatcher.workers} workers", file=sys.stderr)
+            dispatcher.start()
+            try:
+                while True:
+                    time.sleep(60)
+            except KeyboardInterrupt:
+                pass
+            result = dict(dispatcher.stats(), success=True, message='Dispatcher stopped.')
+        else:
+            result = {'success': False, 'message': f'Unknown command: {args[0]}'}
+    except psycopg2.Error as e:
+        result = {'success': False, 'message': f'Database error: {str(e)}'}
+    finally:
+        dispatcher.stop()
+    print(json.dumps(result))
+    sys.exit(0 if result['success'] else 1)
+
+
+if __name__ == "__main__":
+    main()
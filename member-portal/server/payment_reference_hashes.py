@@ -0,0 +1,765 @@
+"""
+Near-duplicate detection for payment reference screenshots.
+
+Every image gets two 64-bit perceptual hashes:
+
+- pHash: sign of the low-frequency 8x8 block of a 32x32 DCT against its
+  median. It survives re-encoding, rescaling and small crops, and is the
+  search key.
+- dHash: sign of horizontal gradients on a 9x8 thumbnail. It is cheap and
+  independent of pHash, so it confirms candidates.
+
+Hashes this coarse cannot read text. Two receipts from the same payment app
+that differ only in amount and reference number hash alike. Each image
+therefore also stores a 1024-bit detail hash (the same gradients on a 33x32
+grid). It separates those receipts, and only tolerates re-encoding and
+rescaling, not cropping. A match is reported as 'same_image' when the detail
+hashes agree. Otherwise it is 'similar': a re-crop, or another receipt with
+the same layout, for the cashier to compare.
+
+Hashes are stored in payment_reference_hashes and held in memory in a
+``HammingIndex``, which does multi-index hashing:
+
+- Each hash is split into m chunks. Each chunk column is kept sorted, with a
+  table of where each chunk value starts.
+- Two hashes within distance r cannot all differ by more than t_i bits on
+  chunk i when the t_i + 1 add up to r + 1 (pigeonhole). So a query looks up
+  every chunk value within t_i bits and computes exact distances only for
+  the entries in those buckets.
+- Fewer, wider chunks mean more probes but emptier buckets. ``chunk_plan``
+  picks m from the corpus size, at about log2(N) bits per chunk.
+
+Query cost therefore grows well below linearly with the corpus. It is
+not constant, because r is large for 64 bits.
+"""
+
+import os
+import sys
+import json
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from math import comb
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import execute_values
+from PIL import Image, ImageOps
+
+from db_pool import ConnectionPool
+
+HASH_BITS = 64
+# Chunk counts chunk_plan chooses from. Each chunk keeps a table of
+# 2**width bucket offsets, so 3 chunks (22 bits, 16MB) is the fewest
+MIN_CHUNKS = 3
+MAX_CHUNKS = 8
+# Cost of checking one candidate relative to one bucket probe, measured
+# with benchmarks/bench_phash_index.py
+PROBE_COST_RATIO = 3.0
+_SIGN_BIT = 1 << 63
+
+# Default match thresholds (bits out of 64); see PaymentReferenceHashService
+PHASH_THRESHOLD = 10
+DHASH_THRESHOLD = 14
+# Bits out of 1024 within which two detail hashes are the same screenshot
+DETAIL_THRESHOLD = 12
+DETAIL_SIZE = 32
+
+# New hashes are scanned linearly until this many accumulate, then merged
+# into the sorted chunk columns
+MERGE_THRESHOLD = 4096
+
+# Rows per INSERT when indexing the backlog
+INDEX_BATCH_SIZE = 500
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def _dct_matrix(size):
+    n = np.arange(size)
+    matrix = np.sqrt(2.0 / size) * np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / (2 * size))
+    matrix[0, :] = np.sqrt(1.0 / size)
+    return matrix
+
+
+_DCT_32 = _dct_matrix(32)
+
+if hasattr(np, 'bitwise_count'):
+    def _popcount(values):
+        return np.bitwise_count(values)
+else:
+    _BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _popcount(values):
+        return _BYTE_POPCOUNT[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def _pack_bits(bits):
+    return int(np.packbits(bits.astype(np.uint8).ravel()).view('>u8')[0])
+
+
+def _grayscale(image, size):
+    return np.asarray(image.convert('L').resize(size, Image.LANCZOS), dtype=np.float64)
+
+
+def phash(image):
+    """64-bit DCT perceptual hash of a PIL image."""
+    low = (_DCT_32 @ _grayscale(image, (32, 32)) @ _DCT_32.T)[:8, :8].ravel()
+    # The DC term only carries overall brightness
+    return _pack_bits(low > np.median(low[1:]))
+
+
+def dhash(image):
+    """64-bit horizontal-gradient hash of a PIL image."""
+    pixels = _grayscale(image, (9, 8))
+    return _pack_bits(pixels[:, 1:] > pixels[:, :-1])
+
+
+def detail_hash(image):
+    """1024-bit gradient hash on a 33x32 grid, as 128 bytes."""
+    pixels = _grayscale(image, (DETAIL_SIZE + 1, DETAIL_SIZE))
+    return np.packbits((pixels[:, 1:] > pixels[:, :-1]).ravel()).tobytes()
+
+
+def detail_distance(a, b):
+    """Number of differing bits between two detail hashes."""
+    return int(np.unpackbits(np.frombuffer(a, dtype=np.uint8) ^ np.frombuffer(b, dtype=np.uint8)).sum())
+
+
+def hamming(a, b):
+    """Number of differing bits between two 64-bit hashes."""
+    return bin(a ^ b).count('1')
+
+
+def hash_image_file(path):
+    """
+    Compute (phash, dhash, detail_hash, width, height) for an image file.
+
+    JPEGs are decoded at reduced size (draft mode) since the hashes only look
+    at a 32x32 thumbnail; EXIF orientation is applied so a rotated re-upload
+    hashes like the original.
+
+    Raises:
+        ValueError: If the file cannot be decoded as an image
+    """
+    try:
+        with Image.open(path) as image:
+            width, height = image.size
+            if image.format == 'JPEG':
+                image.draft('L', (2 * DETAIL_SIZE, 2 * DETAIL_SIZE))
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('L', 'RGB'):
+                image = image.convert('RGB')
+            return phash(image), dhash(image), detail_hash(image), width, height
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Cannot decode {path}: {str(e)}")
+
+
+def _hash_for_pool(path):
+    """Process-pool wrapper: (path, hash_image_file result or error message, ok)."""
+    try:
+        return path, hash_image_file(path), True
+    except ValueError as e:
+        return path, str(e), False
+
+
+def _to_signed(value):
+    """uint64 hash -> BIGINT."""
+    return value - (1 << 64) if value & _SIGN_BIT else value
+
+
+def _to_unsigned(value):
+    """BIGINT -> uint64 hash."""
+    return value & ((1 << 64) - 1)
+
+
+class HammingIndex:
+    """
+    Multi-index hashing over 64-bit hashes with integer ids.
+
+    The pHash is split into ``chunks`` bit ranges. Each range has a sorted
+    key column with the positions of its entries, and a table of where each
+    key value starts. The number of chunks is chosen from the corpus size
+    whenever the columns are rebuilt, so chunk_plan keeps the probe count
+    and the bucket occupancy both small.
+
+    Memory is about 24 bytes per entry (phash, dhash and id) plus 8 bytes
+    per entry and chunk (key and position). On top of that, each chunk has
+    4 * 2**width bytes of offsets: 32MB at 3 chunks, 1MB at 4 chunks and
+    less beyond.
+    """
+
+    def __init__(self, merge_threshold=MERGE_THRESHOLD, radius=PHASH_THRESHOLD, chunks=None):
+        """
+        Args:
+            merge_threshold (int): Pending entries scanned linearly before
+                they are merged into the chunk columns
+            radius (int): Search radius the chunk count is planned for;
+                other radii stay exact, only slower
+            chunks (int, optional): Fixed chunk count instead of planning
+                it from the corpus size
+        """
+        self.merge_threshold = merge_threshold
+        self.radius = radius
+        self.fixed_chunks = chunks
+        self._phashes = np.empty(0, dtype=np.uint64)
+        self._dhashes = np.empty(0, dtype=np.uint64)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._chunk_widths = []
+        self._chunk_keys = []
+        self._chunk_positions = []
+        # _chunk_offsets[chunk][value] is where ``value`` starts in the sorted keys
+        self._chunk_offsets = []
+        self._pending = []
+
+    def __len__(self):
+        return len(self._ids) + len(self._pending)
+
+    @property
+    def chunks(self):
+        """Chunk count of the merged columns (0 before the first merge)."""
+        return len(self._chunk_widths)
+
+    def add(self, entry_id, phash_value, dhash_value):
+        """Add one hash; it is searchable immediately."""
+        self._pending.append((phash_value, dhash_value, entry_id))
+        if len(self._pending) >= self.merge_threshold:
+            self._merge()
+
+    def extend(self, entries):
+        """Add many (id, phash, dhash) entries and rebuild the chunk columns once."""
+        self._pending.extend((p, d, i) for i, p, d in entries)
+        self._merge()
+
+    def _merge(self):
+        if not self._pending:
+            return
+        pending = np.array(self._pending, dtype=np.uint64).reshape(-1, 3)
+        self._pending = []
+        self._phashes = np.concatenate([self._phashes, pending[:, 0]])
+        self._dhashes = np.concatenate([self._dhashes, pending[:, 1]])
+        self._ids = np.concatenate([self._ids, pending[:, 2].astype(np.int64)])
+
+        count = self.fixed_chunks or chunk_plan(len(self._phashes), self.radius)
+        self._chunk_widths = chunk_widths(count)
+        self._chunk_keys, self._chunk_positions, self._chunk_offsets = [], [], []
+        for shift, width in _chunk_shifts(self._chunk_widths):
+            keys = ((self._phashes >> np.uint64(shift)) & np.uint64((1 << width) - 1)).astype(np.uint32)
+            order = np.argsort(keys, kind='stable').astype(np.int32)
+            self._chunk_keys.append(keys[order])
+            self._chunk_positions.append(order)
+            self._chunk_offsets.append(
+                np.concatenate([[0], np.cumsum(np.bincount(keys, minlength=1 << width))]).astype(np.int32)
+            )
+
+    def _candidates(self, phash_value, radius):
+        """
+        Positions whose phash is within its chunk threshold on some chunk
+        (see chunk_thresholds); a position can appear once per chunk.
+        """
+        found = []
+        thresholds = chunk_thresholds(radius, len(self._chunk_widths))
+        for (shift, width), threshold, offsets, positions in zip(
+                _chunk_shifts(self._chunk_widths), thresholds, self._chunk_offsets, self._chunk_positions):
+            if threshold < 0 or not len(positions):
+                continue
+            value = (phash_value >> shift) & ((1 << width) - 1)
+            probes = (np.uint32(value) ^ _neighbour_masks(width, threshold)).astype(np.int64)
+            starts = offsets[probes]
+            lengths = offsets[probes + 1] - starts
+            total = int(lengths.sum())
+            if not total:
+                continue
+            # Expand the [start, end) ranges without a Python loop
+            offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            found.append(positions[np.repeat(starts, lengths) + offsets])
+        if not found:
+            return np.empty(0, dtype=np.int32)
+        return np.concatenate(found)
+
+    def search(self, phash_value, radius, dhash_value=None, dhash_radius=None):
+        """
+        Find entries within ``radius`` bits of ``phash_value``.
+
+        Args:
+            phash_value (int): Query pHash
+            radius (int): Maximum pHash distance
+            dhash_value (int, optional): Query dHash; with ``dhash_radius``
+                also requires the dHash distance to be within it
+            dhash_radius (int, optional): Maximum dHash distance
+
+        Returns:
+            list: (id, phash_distance, dhash_distance) sorted by distance
+        """
+        query = np.uint64(phash_value)
+        positions = self._candidates(phash_value, radius)
+        phashes, dhashes, ids = self._phashes[positions], self._dhashes[positions], self._ids[positions]
+        if self._pending:
+            pending = np.array(self._pending, dtype=np.uint64).reshape(-1, 3)
+            phashes = np.concatenate([phashes, pending[:, 0]])
+            dhashes = np.concatenate([dhashes, pending[:, 1]])
+            ids = np.concatenate([ids, pending[:, 2].astype(np.int64)])
+
+        phash_distances = _popcount(phashes ^ query).astype(np.int64)
+        keep = phash_distances <= radius
+        dhash_distances = _popcount(dhashes ^ np.uint64(dhash_value or 0)).astype(np.int64)
+        if dhash_value is not None and dhash_radius is not None:
+            keep &= dhash_distances <= dhash_radius
+        # An entry close on several chunks was found once per chunk
+        matches = sorted(set(zip(phash_distances[keep].tolist(), dhash_distances[keep].tolist(), ids[keep].tolist())))
+        return [(entry_id, p, d if dhash_value is not None else None) for p, d, entry_id in matches]
+
+    def nbytes(self):
+        """Approximate memory held by the merged columns."""
+        return (self._phashes.nbytes + self._dhashes.nbytes + self._ids.nbytes
+                + sum(keys.nbytes for keys in self._chunk_keys)
+                + sum(offsets.nbytes for offsets in self._chunk_offsets)
+                + sum(positions.nbytes for positions in self._chunk_positions))
+
+
+def chunk_widths(chunks):
+    """Bit widths of ``chunks`` near-equal ranges covering the 64-bit hash."""
+    base, extra = divmod(HASH_BITS, chunks)
+    return [base + 1 if chunk < extra else base for chunk in range(chunks)]
+
+
+def _chunk_shifts(widths):
+    shift = 0
+    for width in widths:
+        yield shift, width
+        shift += width
+
+
+def chunk_thresholds(radius, chunks):
+    """
+    Per-chunk distance thresholds that cannot miss a hash within ``radius``.
+
+    If every chunk differed by more than its threshold t_i, the hashes would
+    differ by at least sum(t_i + 1) bits. The thresholds therefore only need
+    sum(t_i + 1) = radius + 1, spread as evenly as possible. A threshold of
+    -1 means the chunk is not probed, which happens when radius + 1 < chunks.
+    """
+    base, extra = divmod(radius + 1, chunks)
+    return [(base + 1 if chunk < extra else base) - 1 for chunk in range(chunks)]
+
+
+_MASKS = {}
+
+
+def _neighbour_masks(width, distance):
+    """All ``width``-bit masks with at most ``distance`` bits set, as uint32."""
+    masks = _MASKS.get((width, distance))
+    if masks is None:
+        values = [0]
+        for bits in range(1, distance + 1):
+            values.extend(sum(1 << bit for bit in chosen) for chosen in combinations(range(width), bits))
+        masks = _MASKS[(width, distance)] = np.array(values, dtype=np.uint32)
+    return masks
+
+
+def chunk_plan(size, radius=PHASH_THRESHOLD):
+    """
+    Chunk count that minimizes the expected query cost for ``size`` hashes.
+
+    The cost counts the probes (two offset lookups each) and the
+    candidates (gathered and distance-checked, about PROBE_COST_RATIO times
+    as expensive as a probe). For uniformly spread hashes
+    a chunk of b bits probed at threshold t has V(b, t) probes and expects
+    size * V(b, t) / 2**b candidates, where V(b, t) is the number of b-bit
+    masks with at most t bits set. Larger corpora get fewer, wider chunks,
+    which is where the about log2(size) bits per chunk of multi-index hashing
+    comes from.
+    """
+    def volume(width, threshold):
+        return sum(comb(width, bits) for bits in range(threshold + 1)) if threshold >= 0 else 0
+
+    best = None
+    for chunks in range(MIN_CHUNKS, MAX_CHUNKS + 1):
+        probes = candidates = 0.0
+        for width, threshold in zip(chunk_widths(chunks), chunk_thresholds(radius, chunks)):
+            count = volume(width, threshold)
+            probes += count
+            candidates += size * count / 2.0 ** width
+        cost = probes + PROBE_COST_RATIO * candidates
+        if best is None or cost < best[0]:
+            best = (cost, chunks)
+    return best[1]
+
+
+class PaymentReferenceHashService:
+    def __init__(self, db_config, images_dir='payment_references',
+                 phash_threshold=PHASH_THRESHOLD, dhash_threshold=DHASH_THRESHOLD):
+        """
+        Initialize the service; the index is loaded on first use.
+
+        A candidate needs both distances within their thresholds. The
+        defaults catch re-saves, rescales and crops of up to about 4% of the
+        same screenshot. Candidates are then graded with the detail hash
+        (see the module docstring).
+
+        Args:
+            db_config (dict): Database configuration (staff database)
+            images_dir (str): Directory the member portal saves uploads to;
+                image_path values are relative to its parent
+            phash_threshold (int): Maximum pHash distance for a match
+            dhash_threshold (int): Maximum dHash distance for a match
+        """
+        self.db_config = db_config
+        self.pool = ConnectionPool(db_config, min_size=1, max_size=2)
+        self.images_dir = images_dir
+        self.phash_threshold = phash_threshold
+        self.dhash_threshold = dhash_threshold
+        self.index = None
+        # Highest hash_id in the index; newer rows come from other processes
+        self._last_hash_id = 0
+        self._table_ready = False
+
+    def ensure_table(self):
+        """Create payment_reference_hashes if it does not exist."""
+        if self._table_ready:
+            return
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS payment_reference_hashes (
+                hash_id BIGSERIAL PRIMARY KEY,
+                image_path VARCHAR(500) NOT NULL UNIQUE,
+                phash BIGINT NOT NULL,
+                dhash BIGINT NOT NULL,
+                detail_hash BYTEA NOT NULL,
+                width INTEGER,
+                height INTEGER,
+                file_size BIGINT,
+                computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """)
+            cursor.close()
+        self._table_ready = True
+
+    def _image_path(self, path):
+        """Stored form of a file path: 'payment_references/<name>', as the upload endpoint returns it."""
+        return f"{os.path.basename(os.path.normpath(self.images_dir))}/{os.path.basename(path)}"
+
+    def _refresh(self):
+        """Load the index, or add rows other processes inserted since the last call."""
+        self.ensure_table()
+        if self.index is None:
+            self.index = HammingIndex()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor(name='payment_reference_hashes_load')
+            cursor.itersize = 50000
+            cursor.execute(
+                "SELECT hash_id, phash, dhash FROM payment_reference_hashes WHERE hash_id > %s ORDER BY hash_id",
+                (self._last_hash_id,)
+            )
+            rows = [(hash_id, _to_unsigned(p), _to_unsigned(d)) for hash_id, p, d in cursor]
+            cursor.close()
+        if len(rows) > 1:
+            self.index.extend(rows)
+        elif rows:
+            self.index.add(*rows[0])
+        if rows:
+            self._last_hash_id = rows[-1][0]
+
+    def _describe(self, matches, detail, reference_text=None):
+        """
+        Grade (hash_id, phash distance, dhash distance) candidates and attach
+        their image path and payment reference.
+        """
+        if not matches:
+            return []
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT to_regclass('payment_references') IS NOT NULL")
+            has_payments = cursor.fetchone()[0]
+            payment_columns = (
+                "(SELECT p.id FROM payment_references p WHERE p.image_path = h.image_path ORDER BY p.id LIMIT 1), "
+                "(SELECT p.reference_text FROM payment_references p WHERE p.image_path = h.image_path ORDER BY p.id LIMIT 1)"
+                if has_payments else "NULL, NULL"
+            )
+            cursor.execute(f"""
+            SELECT h.hash_id, h.image_path, h.detail_hash, {payment_columns}
+            FROM payment_reference_hashes h WHERE h.hash_id = ANY(%s)
+            """, ([hash_id for hash_id, _, _ in matches],))
+            described = {row[0]: row[1:] for row in cursor.fetchall()}
+            cursor.close()
+
+        results = []
+        for hash_id, phash_distance, dhash_distance in matches:
+            if hash_id not in described:
+                continue
+            image_path, stored_detail, payment_id, stored_reference = described[hash_id]
+            distance = detail_distance(detail, bytes(stored_detail))
+            results.append({
+                'image_path': image_path,
+                'payment_reference_id': payment_id,
+                'match': 'same_image' if distance <= DETAIL_THRESHOLD else 'similar',
+                'same_reference_text': bool(
+                    reference_text and stored_reference
+                    and reference_text.strip().lower() == stored_reference.strip().lower()
+                ),
+                'phash_distance': phash_distance,
+                'dhash_distance': dhash_distance,
+                'detail_distance': distance
+            })
+        # Same screenshot first, then closest
+        results.sort(key=lambda match: (match['match'] != 'same_image', match['detail_distance']))
+        return results
+
+    def check_image(self, path, exclude_image_path=None, reference_text=None):
+        """
+        Look for earlier screenshots that look like the image at ``path``.
+
+        Args:
+            path (str): Image file to check
+            exclude_image_path (str, optional): Stored path to ignore (the
+                image itself, once registered)
+            reference_text (str, optional): Reference number typed by the
+                member; matches with the same text are marked
+
+        Returns:
+            dict: Result with 'duplicate' (a 'same_image' match or one with
+                the same reference text), 'matches' (each graded
+                'same_image' or 'similar', most certain first) and the
+                image's hashes as hex
+        """
+        try:
+            phash_value, dhash_value, detail, _, _ = hash_image_file(path)
+        except ValueError as e:
+            return {'success': False, 'message': str(e), 'duplicate': False, 'matches': []}
+        try:
+            self._refresh()
+            matches = self._describe(self.index.search(
+                phash_value, self.phash_threshold, dhash_value, self.dhash_threshold
+            ), detail, reference_text)
+        except psycopg2.Error as e:
+            return {'success': False, 'message': f'Database error: {str(e)}', 'duplicate': False, 'matches': []}
+        matches = [match for match in matches if match['image_path'] != exclude_image_path]
+        duplicate = any(match['match'] == 'same_image' or match['same_reference_text'] for match in matches)
+        if duplicate:
+            message = 'This screenshot was already submitted.'
+        elif matches:
+            message = f'{len(matches)} earlier payment reference(s) look similar; compare before confirming.'
+        else:
+            message = 'No similar payment references.'
+        return {
+            'success': True,
+            'message': message,
+            'duplicate': duplicate,
+            'matches': matches,
+            'phash': f'{phash_value:016x}',
+            'dhash': f'{dhash_value:016x}',
+            'detail_hash': detail.hex()
+        }
+
+    def register_image(self, path, reference_text=None):
+        """
+        Check an upload against earlier ones, then store and index its hashes.
+
+        Args:
+            path (str): Saved upload under images_dir
+            reference_text (str, optional): Reference number typed by the member
+
+        Returns:
+            dict: check_image result plus the stored 'image_path'
+        """
+        image_path = self._image_path(path)
+        result = self.check_image(path, exclude_image_path=image_path, reference_text=reference_text)
+        if not result['success']:
+            return result
+        try:
+            with Image.open(path) as image:
+                width, height = image.size
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                INSERT INTO payment_reference_hashes (image_path, phash, dhash, detail_hash, width, height, file_size)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (image_path) DO UPDATE
+                SET phash = EXCLUDED.phash, dhash = EXCLUDED.dhash, detail_hash = EXCLUDED.detail_hash,
+                    width = EXCLUDED.width, height = EXCLUDED.height, file_size = EXCLUDED.file_size,
+                    computed_at = CURRENT_TIMESTAMP
+                """, (image_path, _to_signed(int(result['phash'], 16)), _to_signed(int(result['dhash'], 16)),
+                      psycopg2.Binary(bytes.fromhex(result['detail_hash'])), width, height, os.path.getsize(path)))
+                cursor.close()
+            # Picks up this row (and any from other processes)
+            self._refresh()
+        except (OSError, psycopg2.Error) as e:
+            return dict(result, success=False, message=f'Error storing image hashes: {str(e)}')
+        result['image_path'] = image_path
+        return result
+
+    def index_backlog(self, workers=None, batch_size=INDEX_BATCH_SIZE):
+        """
+        Hash every image in images_dir that has no row yet.
+
+        Files are hashed across processes and written in multi-row inserts;
+        already indexed files are skipped, so the job can be re-run or
+        interrupted safely.
+
+        Args:
+            workers (int, optional): Hashing processes (default: CPU count)
+            batch_size (int): Rows per INSERT statement
+
+        Returns:
+            dict: Result with indexed, skipped and failed counts
+        """
+        self.ensure_table()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor(name='payment_reference_hashes_paths')
+            cursor.itersize = 50000
+            cursor.execute("SELECT image_path FROM payment_reference_hashes")
+            known = {row[0] for row in cursor}
+            cursor.close()
+
+        paths = []
+        skipped = 0
+        if os.path.isdir(self.images_dir):
+            for entry in os.scandir(self.images_dir):
+                if not entry.is_file() or not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                if self._image_path(entry.path) in known:
+                    skipped += 1
+                else:
+                    paths.append(entry.path)
+
+        indexed, failed, rows = 0, [], []
+
+        def flush():
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                execute_values(cursor, """
+                INSERT INTO payment_reference_hashes (image_path, phash, dhash, detail_hash, width, height, file_size)
+                VALUES %s ON CONFLICT (image_path) DO NOTHING
+                """, rows, page_size=len(rows))
+                cursor.close()
+
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(paths) // (workers * 8) or 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for path, info, ok in executor.map(_hash_for_pool, paths, chunksize=chunksize):
+                if not ok:
+                    failed.append({'file': path, 'message': info})
+                    continue
+                phash_value, dhash_value, detail, width, height = info
+                rows.append((self._image_path(path), _to_signed(phash_value), _to_signed(dhash_value),
+                             psycopg2.Binary(detail), width, height, os.path.getsize(path)))
+                if len(rows) >= batch_size:
+                    flush()
+                    indexed += len(rows)
+                    rows = []
+        if rows:
+            flush()
+            indexed += len(rows)
+
+        if self.index is not None:
+            self._refresh()
+        return {
+            'success': not failed,
+            'message': f'Indexed {indexed} images ({skipped} already indexed, {len(failed)} unreadable).',
+            'indexed': indexed,
+            'skipped': skipped,
+            'failed': failed
+        }
+
+    def find_duplicates(self, same_image_only=True):
+        """
+        Group every indexed image with the earlier ones it matches.
+
+        Args:
+            same_image_only (bool): Group only 'same_image' matches; when
+                False, 'similar' ones (crops, same layout) are grouped too
+
+        Returns:
+            dict: Result with 'groups', each a list of image paths that look
+                alike, oldest first
+        """
+        self._refresh()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor(name='payment_reference_hashes_scan')
+            cursor.itersize = 50000
+            cursor.execute("SELECT hash_id, image_path, phash, dhash, detail_hash FROM payment_reference_hashes ORDER BY hash_id")
+            rows = [(hash_id, image_path, _to_unsigned(p), _to_unsigned(d), bytes(detail))
+                    for hash_id, image_path, p, d, detail in cursor]
+            cursor.close()
+
+        paths = {hash_id: image_path for hash_id, image_path, _, _, _ in rows}
+        details = {hash_id: detail for hash_id, _, _, _, detail in rows}
+        # Union-find over matching pairs
+        parent = {}
+
+        def root(node):
+            while parent.get(node, node) != node:
+                node = parent[node]
+            return node
+
+        for hash_id, _, phash_value, dhash_value, detail in rows:
+            for match_id, _, _ in self.index.search(phash_value, self.phash_threshold, dhash_value, self.dhash_threshold):
+                if match_id == hash_id:
+                    continue
+                if same_image_only and detail_distance(detail, details[match_id]) > DETAIL_THRESHOLD:
+                    continue
+                a, b = root(hash_id), root(match_id)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+
+        groups = {}
+        for hash_id in parent:
+            groups.setdefault(root(hash_id), set()).add(hash_id)
+        result = [
+            [paths[hash_id] for hash_id in sorted(members | {group_root})]
+            for group_root, members in sorted(groups.items())
+        ]
+        return {
+            'success': True,
+            'message': f"{len(result)} groups of {'identical' if same_image_only else 'similar'} payment references among {len(rows)} images.",
+            'groups': result
+        }
+
+
+def main():
+    """Command-line entry point; DATABASE_URL overrides the default staff database settings."""
+    db_config = {
+        'host': 'localhost',
+        'database': 'slz_coop_staff',
+        'user': 'postgres',
+        'password': 'password',
+        'port': 5432
+    }
+    if os.environ.get('DATABASE_URL'):
+        db_config = {'dsn': os.environ['DATABASE_URL']}
+
+    args = sys.argv[1:]
+    if not args or args[0] not in ('--index-backlog', '--check', '--register', '--duplicates'):
+        print("Usage:")
+        print("  python payment_reference_hashes.py --index-backlog [--dir <images dir>] [--workers <n>]")
+        print("  python payment_reference_hashes.py --check <image> [--reference <text>]")
+        print("  python payment_reference_hashes.py --register <image> [--reference <text>]")
+        print("  python payment_reference_hashes.py --duplicates [--similar]")
+        sys.exit(1)
+
+    def option(name, default=None):
+        return args[args.index(name) + 1] if name in args and args.index(name) + 1 < len(args) else default
+
+    service = PaymentReferenceHashService(db_config, option('--dir', 'payment_references'))
+    try:
+        if args[0] == '--index-backlog':
+            workers = option('--workers')
+            result = service.index_backlog(int(workers) if workers else None)
+        elif args[0] == '--duplicates':
+            result = service.find_duplicates(same_image_only='--similar' not in args)
+        elif len(args) < 2:
+            result = {'success': False, 'message': f'{args[0]} needs an image path'}
+        elif args[0] == '--check':
+            result = service.check_image(args[1], reference_text=option('--reference'))
+        else:
+            result = service.register_image(args[1], reference_text=option('--reference'))
+    except Exception as e:
+        result = {'success': False, 'message': f'Error: {str(e)}'}
+    finally:
+        service.pool.close()
+    print(json.dumps(result))
+    sys.exit(0 if result['success'] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+const router = require('express').Router();
+const pool = require('../db_members');
+const authorization = require('../middleware/authorization');
+
+// Notifications are written by notifications.py (NotificationDispatcher);
+// members only read them and mark them read
+
+// List the member's notifications, newest first
+router.get('/', authorization, async (req, res) => {
+    try {
+        const limit = Math.min(parseInt(req.query.limit, 10) || 20, 100);
+        const result = await pool.query(
+            `SELECT id, title, message, type, is_read, created_at
+             FROM notifications
+             WHERE user_id = $1
+             ORDER BY created_at DESC, id DESC
+             LIMIT $2`,
+            [req.user, limit]
+        );
+        const unread = await pool.query(
+            'SELECT COUNT(*)::int AS count FROM notifications WHERE user_id = $1 AND NOT is_read',
+            [req.user]
+        );
+        res.json({ success: true, notifications: result.rows, unread: unread.rows[0].count });
+    } catch (err) {
+        console.error('Error fetching notifications:', err);
+        res.status(500).json({ success: false, message: 'Failed to fetch notifications' });
+    }
+});
+
+// Mark one notification read
+router.put('/:id/read', authorization, async (req, res) => {
+    try {
+        const result = await pool.query(
+            'UPDATE notifications SET is_read = true WHERE id = $1 AND user_id = $2 RETURNING id',
+            [req.params.id, req.user]
+        );
+        if (result.rows.length === 0) {
+            return res.status(404).json({ success: false, message: 'Notification not found' });
+        }
+        res.json({ success: true });
+    } catch (err) {
+        console.error('Error updating notification:', err);
+        res.status(500).json({ success: false, message: 'Failed to update notification' });
+    }
+});
+
+// Mark all of the member's notifications read
+router.put('/read-all', authorization, async (req, res) => {
+    try {
+        const result = await pool.query(
+            'UPDATE notifications SET is_read = true WHERE user_id = $1 AND NOT is_read',
+            [req.user]
+        );
+        res.json({ success: true, updated: result.rowCount });
+    } catch (err) {
+        console.error('Error updating notifications:', err);
+        res.status(500).json({ success: false, message: 'Failed to update notifications' });
+    }
+});
+
+module.exports = router;
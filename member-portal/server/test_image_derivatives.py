@@ -0,0 +1,54 @@
+"""
+Tests for image_derivatives: draft sizing and rendered derivative sizes.
+
+Run with: python -m pytest test_image_derivatives.py
+"""
+
+import io
+
+import pytest
+from PIL import Image
+
+import image_derivatives
+
+
+def _jpeg(width, height):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (120, 80, 40)).save(buffer, 'JPEG', quality=90)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.mark.parametrize('size, expected', [
+    ((4032, 3024), (2016, 1512)),
+    ((3000, 4000), (1500, 2000)),
+    ((6000, 4000), (3000, 2000)),
+])
+def test_draft_decodes_phone_scans_at_reduced_scale(size, expected):
+    with Image.open(_jpeg(*size)) as img:
+        img.draft('RGB', image_derivatives.draft_size(img.size, 1600))
+        assert img.size[0] <= expected[0] and img.size[1] <= expected[1]
+        # Never below the largest output
+        assert max(img.size) >= 1600
+
+
+def test_draft_size_keeps_small_images():
+    assert image_derivatives.draft_size((800, 600), 1600) == (800, 600)
+
+
+def test_render_derivatives_sizes(tmp_path):
+    source = tmp_path / 'scan.jpg'
+    source.write_bytes(_jpeg(4032, 3024).getvalue())
+    outputs = {kind: str(tmp_path / f'{kind}.jpg') for kind in image_derivatives.DERIVATIVE_SIZES}
+
+    image_derivatives.render_derivatives(str(source), outputs)
+
+    for kind, (width, height, _) in image_derivatives.DERIVATIVE_SIZES.items():
+        with Image.open(outputs[kind]) as img:
+            assert img.size[0] <= width and img.size[1] <= height
+            assert max(img.size) == max(width, height)
+
+
+def test_derivative_path_mirrors_upload_path():
+    path = image_derivatives.derivative_path('loan_applications', 'loan_applications/ab/cd/abcd.jpg', 'thumbnail')
+    assert path == 'loan_applications/derivatives/thumbnail/ab/cd/abcd.jpg'
@@ -0,0 +1,57 @@
+"""
+Tests for image_normalize: re-encoding and which files a directory pass touches.
+
+Run with: python -m pytest test_image_normalize.py
+"""
+
+import io
+import os
+
+from PIL import Image
+
+import image_normalize
+from upload_storage import STAGING_FOLDER
+
+
+def _jpeg_bytes(width, height, quality=98):
+    buffer = io.BytesIO()
+    Image.effect_noise((width, height), 40).convert('RGB').save(buffer, 'JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def test_normalize_image_caps_longest_edge():
+    result = image_normalize.normalize_image(_jpeg_bytes(4032, 3024), {'max_edge': 1000})
+
+    assert result.changed
+    assert max(result.width, result.height) == 1000
+    assert result.stored_size < result.original_size
+
+
+def test_normalize_image_keeps_original_when_not_smaller():
+    data = _jpeg_bytes(64, 48, quality=10)
+    result = image_normalize.normalize_image(data, {'max_edge': None, 'jpeg_quality': 95})
+
+    assert not result.changed
+    assert result.data == data
+
+
+def test_find_images_skips_store_and_derivatives(tmp_path):
+    loose = tmp_path / 'payment_references'
+    store = tmp_path / 'loan_applications'
+    derivatives = tmp_path / 'scans' / 'derivatives' / 'preview'
+    for folder in (loose, store / STAGING_FOLDER, store / 'ab' / 'cd', derivatives):
+        folder.mkdir(parents=True)
+    for path in (loose / 'ref.png', store / 'ab' / 'cd' / ('ab' * 32 + '.jpg'),
+                 derivatives / 'x.jpg', tmp_path / 'scans' / 'scan.jpg'):
+        path.write_bytes(b'')
+
+    skipped = []
+    paths = image_normalize.find_images(str(tmp_path), skipped)
+
+    assert sorted(os.path.relpath(path, tmp_path) for path in paths) == [
+        os.path.join('payment_references', 'ref.png'),
+        os.path.join('scans', 'scan.jpg'),
+    ]
+    assert sorted(os.path.relpath(folder, tmp_path) for folder in skipped) == [
+        'loan_applications', os.path.join('scans', 'derivatives'),
+    ]
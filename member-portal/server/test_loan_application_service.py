@@ -0,0 +1,71 @@
+"""
+Tests for the loan application service helpers that need no database:
+keyset cursors, status transitions and update_statuses argument checks.
+
+Run with: python -m pytest test_loan_application_service.py
+"""
+
+from datetime import datetime
+
+import pytest
+
+from loan_application_service import (STATUS_TRANSITIONS, LoanApplicationService, _decode_cursor,
+                                      _encode_cursor)
+
+
+@pytest.fixture
+def service():
+    # The pool connects on first use; none of these calls reach the database
+    return LoanApplicationService({'host': 'localhost', 'database': 'slz_coop_staff',
+                                   'user': 'postgres', 'password': ''})
+
+
+@pytest.mark.parametrize('submitted_at', [datetime(2026, 3, 1, 9, 30, 15, 250), None])
+def test_cursor_round_trip(submitted_at):
+    token = _encode_cursor(submitted_at, 4321)
+
+    assert token.isascii() and '/' not in token and '+' not in token
+    expected = submitted_at.isoformat() if submitted_at else None
+    assert _decode_cursor(token) == (expected, 4321)
+
+
+@pytest.mark.parametrize('token', ['not-a-cursor', _encode_cursor(None, 1)[:-4], 'WzEsMiwzXQ=='])
+def test_decode_cursor_rejects_garbage(token):
+    with pytest.raises(ValueError):
+        _decode_cursor(token)
+
+
+def test_status_transitions_are_closed_and_final():
+    for targets in STATUS_TRANSITIONS.values():
+        assert set(targets) <= set(STATUS_TRANSITIONS)
+    assert set(STATUS_TRANSITIONS['pending']) == {'approved', 'rejected'}
+    assert STATUS_TRANSITIONS['approved'] == () and STATUS_TRANSITIONS['rejected'] == ()
+
+
+def test_update_statuses_rejects_unknown_status(service):
+    result = service.update_statuses([1], 'archived')
+
+    assert not result['success']
+    assert "Invalid status 'archived'" in result['message']
+
+
+@pytest.mark.parametrize('applications', ['123', b'123', ['12', 'x']])
+def test_update_statuses_rejects_bad_ids(service, applications):
+    result = service.update_statuses(applications, 'approved')
+
+    assert not result['success']
+    assert 'integers' in result['message']
+
+
+def test_update_statuses_rejects_unknown_filters(service):
+    result = service.update_statuses({'status': 'pending', 'branch': 'north'}, 'approved')
+
+    assert not result['success']
+    assert 'Unknown filter(s): branch' in result['message']
+
+
+def test_update_statuses_refuses_empty_filter(service):
+    result = service.update_statuses({'status': None}, 'approved')
+
+    assert not result['success']
+    assert 'Refusing to update every application' in result['message']
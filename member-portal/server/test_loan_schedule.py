@@ -0,0 +1,71 @@
+"""
+Tests for loan_schedule: amortization arithmetic and due dates.
+
+Run with: python -m pytest test_loan_schedule.py
+"""
+
+import numpy as np
+
+from loan_schedule import compute_schedules, due_dates, level_payment, outstanding_balances
+
+
+def _portfolio():
+    principal = np.array([100000, 2500000, 99999, 60000, 1], dtype=np.int64)
+    rate = np.array([1200, 1875, 999, 0, 2400], dtype=np.int64)
+    terms = np.array([12, 36, 7, 6, 1], dtype=np.int64)
+    starts = np.array(['2026-01-31', '2025-11-15', '2026-02-28', '2026-03-01', '2026-01-01'],
+                      dtype='datetime64[D]')
+    return principal, rate, terms, starts
+
+
+def test_level_payment_matches_annuity_formula():
+    # 1,000.00 at 12% a year over 12 months is 88.85 a month
+    assert level_payment(np.array([100000]), np.array([1200]), np.array([12])).tolist() == [8885]
+    # Interest-free loans split the principal evenly
+    assert level_payment(np.array([60000]), np.array([0]), np.array([6])).tolist() == [10000]
+
+
+def test_schedules_reconcile_to_the_principal():
+    principal, rate, terms, starts = _portfolio()
+    schedules = compute_schedules(principal, rate, terms, starts)
+    mask = schedules['mask']
+
+    assert mask.sum(axis=1).tolist() == terms.tolist()
+    assert (schedules['principal'] * mask).sum(axis=1).tolist() == principal.tolist()
+    assert (schedules['payment'] == schedules['interest'] + schedules['principal']).all()
+    assert not schedules['payment'][~mask].any()
+    # Every schedule ends at exactly zero and never goes negative
+    assert schedules['balance'][np.arange(len(terms)), terms - 1].tolist() == [0] * len(terms)
+    assert (schedules['balance'] >= 0).all()
+    assert (np.diff(schedules['balance'], axis=1) <= 0).all()
+
+
+def test_installments_other_than_the_last_are_level():
+    principal, rate, terms, starts = _portfolio()
+    schedules = compute_schedules(principal, rate, terms, starts)
+
+    for loan, term in enumerate(terms):
+        payments = schedules['payment'][loan, :term - 1]
+        assert (payments == schedules['level_payment'][loan]).all()
+        # Rounding leaves the last installment within a few cents of the others
+        assert abs(schedules['payment'][loan, term - 1] - schedules['level_payment'][loan]) <= term
+
+
+def test_due_dates_clip_to_month_end():
+    starts = np.array(['2026-01-31', '2024-01-30'], dtype='datetime64[D]')
+    dates = due_dates(starts, 3).astype(str).tolist()
+
+    assert dates[0] == ['2026-02-28', '2026-03-31', '2026-04-30']
+    assert dates[1] == ['2024-02-29', '2024-03-30', '2024-04-30']
+
+
+def test_outstanding_balances_as_of():
+    principal, rate, terms, starts = _portfolio()
+    schedules = compute_schedules(principal, rate, terms, starts)
+
+    balance, paid = outstanding_balances(schedules, principal, '2026-03-31')
+
+    assert paid.tolist() == [2, 4, 1, 0, 1]
+    assert balance[3] == principal[3]
+    assert balance[4] == 0
+    assert balance[0] == schedules['balance'][0, 1]
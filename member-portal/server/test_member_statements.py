@@ -0,0 +1,41 @@
+"""
+Tests for member_statements: grouping lines into statements and month math.
+
+Run with: python -m pytest test_member_statements.py
+"""
+
+from datetime import date
+
+from member_statements import _cents, build_statements, month_bounds, previous_month
+
+
+def test_build_statements_groups_and_totals_lines():
+    members = [('u1', 'Ana Reyes', 'M-001'), ('u2', None, 'M-002'), ('u3', 'No Lines', 'M-003')]
+    lines = [
+        ('u1', 0, 'Membership dues', 10000, date(2026, 3, 1)),
+        ('u1', 1, 'Loan #7 installment 2 of 12', 88850, date(2026, 3, 15)),
+        ('u1', 2, 'Payment REF-1', -50000, date(2026, 3, 20)),
+        ('u2', 2, 'Payment REF-2', -2500, date(2026, 3, 5)),
+    ]
+
+    statements = build_statements(members, lines, date(2026, 3, 1))
+
+    assert [statement['user_id'] for statement in statements] == ['u1', 'u2']
+    first, second = statements
+    assert [item['type'] for item in first['items']] == ['dues', 'loan_installment', 'payment']
+    assert (first['charges_cents'], first['credits_cents'], first['total_cents']) == (98850, 50000, 48850)
+    assert first['items'][1]['unit_price'] == '888.50'
+    assert first['period'] == '2026-03-01'
+    assert second['member_name'] == ''
+    assert second['total_cents'] == -2500
+
+
+def test_cents_formatting():
+    assert [_cents(value) for value in (0, 5, 1234, -1234, -5)] == ['0.00', '0.05', '12.34', '-12.34', '-0.05']
+
+
+def test_month_bounds_and_previous_month():
+    assert month_bounds(date(2026, 12, 17)) == (date(2026, 12, 1), date(2027, 1, 1))
+    assert month_bounds(date(2026, 2, 28)) == (date(2026, 2, 1), date(2026, 3, 1))
+    assert previous_month(date(2026, 1, 10)) == date(2025, 12, 1)
+    assert previous_month(date(2026, 10, 17)) == date(2026, 9, 1)
@@ -0,0 +1,62 @@
+"""
+Tests for the payment reference HammingIndex against a linear scan.
+
+Run with: python -m pytest test_payment_reference_hashes.py
+"""
+
+import numpy as np
+import pytest
+
+from payment_reference_hashes import HammingIndex, chunk_plan, chunk_thresholds, chunk_widths, hamming
+
+
+def _corpus(seed, size):
+    rng = np.random.default_rng(seed)
+    phashes = rng.integers(0, np.iinfo(np.uint64).max, size=size, dtype=np.uint64, endpoint=True).tolist()
+    dhashes = rng.integers(0, np.iinfo(np.uint64).max, size=size, dtype=np.uint64, endpoint=True).tolist()
+    return rng, phashes, dhashes
+
+
+def _near(rng, value, bits):
+    for bit in rng.choice(64, size=bits, replace=False):
+        value ^= 1 << int(bit)
+    return value
+
+
+@pytest.mark.parametrize('chunks', [None, 3, 5, 8])
+@pytest.mark.parametrize('radius', [0, 4, 10, 14])
+def test_search_matches_linear_scan(chunks, radius):
+    rng, phashes, dhashes = _corpus(7, 3000)
+    index = HammingIndex(chunks=chunks)
+    index.extend((entry_id, p, d) for entry_id, (p, d) in enumerate(zip(phashes, dhashes)))
+
+    for position in rng.integers(0, len(phashes), size=40):
+        query = _near(rng, phashes[position], int(rng.integers(0, radius + 3)))
+        expected = sorted(
+            (entry_id, hamming(p, query)) for entry_id, p in enumerate(phashes) if hamming(p, query) <= radius
+        )
+        found = sorted((entry_id, distance) for entry_id, distance, _ in index.search(query, radius))
+        assert found == expected
+
+
+def test_search_filters_on_dhash_and_sees_pending_entries():
+    index = HammingIndex(merge_threshold=100)
+    index.extend([(1, 0b1111, 0), (2, 0b1111, (1 << 20) - 1)])
+    index.add(3, 0b0111, 1)
+
+    assert [entry[0] for entry in index.search(0b1111, 2, dhash_value=0, dhash_radius=3)] == [1, 3]
+    assert len(index) == 3
+
+
+@pytest.mark.parametrize('radius, chunks', [(10, 3), (10, 4), (2, 5), (0, 4), (14, 8)])
+def test_chunk_thresholds_satisfy_pigeonhole(radius, chunks):
+    thresholds = chunk_thresholds(radius, chunks)
+    assert len(thresholds) == chunks
+    assert sum(threshold + 1 for threshold in thresholds) == radius + 1
+    assert max(thresholds) - min(thresholds) <= 1
+
+
+def test_chunk_plan_uses_wider_chunks_for_larger_corpora():
+    plans = [chunk_plan(size) for size in (1000, 10000, 1000000)]
+    assert plans == sorted(plans, reverse=True)
+    assert sum(chunk_widths(plans[-1])) == 64
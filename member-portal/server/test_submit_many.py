@@ -0,0 +1,106 @@
+"""
+Tests for submit_many against a throwaway PostgreSQL database.
+
+Set TEST_DATABASE_URL to a database that may be modified, never production;
+the tests are skipped without it.
+
+Run with: TEST_DATABASE_URL=postgresql://postgres@localhost/slz_test python -m pytest test_submit_many.py
+"""
+
+import os
+import sys
+import uuid
+
+import psycopg2
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+import loan_schema  # noqa: E402
+from bench_common import create_member, synthetic_jpeg, unique_jpeg  # noqa: E402
+from loan_application_service import LoanApplicationService  # noqa: E402
+
+DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason='TEST_DATABASE_URL is not set')
+
+
+@pytest.fixture
+def conn():
+    conn = psycopg2.connect(DATABASE_URL)
+    loan_schema.apply_migrations(conn)
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    # The upload folder is relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    return LoanApplicationService({'dsn': DATABASE_URL}, {'min_size': 0, 'max_size': 1})
+
+
+def _items(conn, tmp_path, count):
+    content = synthetic_jpeg(64, 48)
+    members = [create_member(conn) for _ in range(count)]
+    inactive = create_member(conn)
+    cursor = conn.cursor()
+    cursor.execute("UPDATE member_users SET is_active = false WHERE user_id = %s", (inactive,))
+    cursor.close()
+    conn.commit()
+
+    items = []
+    for number, member_id in enumerate(members):
+        path = tmp_path / f'scan_{number}.jpg'
+        path.write_bytes(unique_jpeg(content))
+        items.append({'user_id': member_id, 'file_path': str(path)})
+        if number % 3 == 1:
+            items.append({'user_id': inactive, 'file_path': str(path)})
+    items.append({'user_id': str(uuid.uuid4()), 'file_path': str(tmp_path / 'scan_0.jpg')})
+    return items
+
+
+def _assert_results_match_rows(conn, items, result):
+    cursor = conn.cursor()
+    for item, outcome in zip(items, result['results']):
+        if outcome['application_id'] is None:
+            continue
+        cursor.execute("SELECT user_id::text, jpg_file_path FROM loan_applications WHERE application_id = %s",
+                       (outcome['application_id'],))
+        assert cursor.fetchone() == (item['user_id'], outcome['file_path'])
+        assert outcome['source'] == item['file_path']
+    cursor.close()
+
+
+def test_submit_many_reports_each_row_its_own_id(conn, service, tmp_path):
+    items = _items(conn, tmp_path, 12)
+
+    result = service.submit_many(items, workers=1)
+
+    assert result['submitted'] == 12
+    rejected = [outcome['message'] for outcome in result['results'] if not outcome['success']]
+    assert len(rejected) == len(items) - 12
+    _assert_results_match_rows(conn, items, result)
+
+
+def test_submit_many_does_not_depend_on_id_order(conn, service, tmp_path):
+    # A descending sequence hands the ids out in the reverse of the batch
+    # order; matching ids to rows by rank would swap every application
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_get_serial_sequence('loan_applications', 'application_id')")
+    sequence = cursor.fetchone()[0]
+    cursor.execute("SELECT COALESCE(max(application_id), 0) + 100000 FROM loan_applications")
+    start = cursor.fetchone()[0]
+    cursor.execute(f"ALTER SEQUENCE {sequence} INCREMENT BY -1 RESTART WITH {start}")
+    conn.commit()
+    try:
+        items = _items(conn, tmp_path, 6)
+        result = service.submit_many(items, workers=1)
+    finally:
+        cursor.execute(f"ALTER SEQUENCE {sequence} INCREMENT BY 1 RESTART WITH {start + 1}")
+        conn.commit()
+        cursor.close()
+
+    assert result['submitted'] == 6
+    _assert_results_match_rows(conn, items, result)
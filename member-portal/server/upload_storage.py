@@ -0,0 +1,153 @@
+"""
+Storage backends for loan application uploads.
+
+Uploads are first written (or renamed) into a staging folder inside the
+store and only published under their final path once the database row that
+references them has committed. ``FlatUploadStore`` keeps the original layout
+of unique timestamped names in a single folder. ``ShardedUploadStore`` names
+each blob by its SHA-256 digest and spreads blobs over two levels of
+subfolders (``ab/cd/<digest>.jpg``), so identical uploads share one file.
+"""
+
+import hashlib
+import os
+import uuid
+from datetime import datetime
+
+STAGING_FOLDER = '.staging'
+CHUNK_SIZE = 64 * 1024
+
+
+def sha256_file(path, chunk_size=CHUNK_SIZE):
+    """Return the hex SHA-256 digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fsync_dir(path):
+    """Flush a directory entry change (rename/create) to disk."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class UploadStore:
+    """
+    Base class for upload layouts.
+
+    Subclasses decide where a blob lives (``path_for``) and how to find a
+    published file from its file name (``locate``); staging, publishing and
+    recovery are shared.
+    """
+
+    # True when identical content maps to the same path
+    deduplicates = False
+
+    def __init__(self, root):
+        self.root = root
+        self.staging_folder = os.path.join(root, STAGING_FOLDER)
+        os.makedirs(self.staging_folder, exist_ok=True)
+
+    def path_for(self, digest, original_filename):
+        """
+        Return the final path for an upload.
+
+        Args:
+            digest (str): Hex SHA-256 of the content (may be None for
+                stores that do not deduplicate)
+            original_filename (str): Sanitized client filename
+
+        Returns:
+            str: Final path inside the store
+        """
+        raise NotImplementedError
+
+    def locate(self, filename):
+        """Return the final path of a published file given only its name."""
+        raise NotImplementedError
+
+    def owns(self, path):
+        """True if ``path`` already sits where this store would put it."""
+        return os.path.normpath(self.locate(os.path.basename(path))) == os.path.normpath(path)
+
+    def staging_path(self, final_path):
+        """Return a unique staging path for an upload destined for ``final_path``."""
+        token = uuid.uuid4().hex[:8]
+        return os.path.join(self.staging_folder, f"{token}_{os.path.basename(final_path)}")
+
+    def final_path_for_staged(self, staged_path):
+        """Map a staging file back to the final path it was written for."""
+        name = os.path.basename(staged_path)
+        return self.locate(name.split('_', 1)[1])
+
+    def staged_files(self):
+        """List files currently in the staging folder."""
+        return [
+            os.path.join(self.staging_folder, name)
+            for name in os.listdir(self.staging_folder)
+            if '_' in name
+        ]
+
+    def publish(self, staged_path, final_path):
+        """
+        Move a staged file to its final path.
+
+        Returns:
+            bool: False if identical content was already published there, in
+                which case the staged copy is discarded
+        """
+        if self.deduplicates and os.path.exists(final_path):
+            os.remove(staged_path)
+            return False
+        directory = os.path.dirname(final_path)
+        os.makedirs(directory, exist_ok=True)
+        os.replace(staged_path, final_path)
+        _fsync_dir(directory)
+        return True
+
+    def discard(self, staged_path):
+        """Remove a staged file if it is still there."""
+        if os.path.exists(staged_path):
+            os.remove(staged_path)
+
+
+class FlatUploadStore(UploadStore):
+    """One folder, one uniquely named file per upload (the original layout)."""
+
+    def path_for(self, digest, original_filename):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        unique_id = str(uuid.uuid4())[:8]
+        file_ext = original_filename.split('.')[-1].lower()
+        return os.path.join(self.root, f"loan_app_{timestamp}_{unique_id}.{file_ext}")
+
+    def locate(self, filename):
+        return os.path.join(self.root, filename)
+
+
+class ShardedUploadStore(UploadStore):
+    """
+    Content-addressed store: ``<root>/ab/cd/<sha256>.jpg``.
+
+    Two levels of 256 folders keep every directory small even with millions
+    of uploads. The extension is normalized to ``.jpg`` so the same bytes
+    always map to the same path.
+    """
+
+    deduplicates = True
+    extension = 'jpg'
+
+    def path_for(self, digest, original_filename):
+        return self.locate(f"{digest}.{self.extension}")
+
+    def locate(self, filename):
+        return os.path.join(self.root, filename[0:2], filename[2:4], filename)
@@ -0,0 +1,169 @@
+"""
+In-memory validation of uploaded JPEG files.
+
+Uploads are read from the incoming stream in chunks into a memory buffer.
+The size limit is enforced while reading, the JPEG start/end markers are
+sniffed, and Pillow parses only the header for format and dimensions. Nothing
+is written to disk until the bytes have passed every check.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+from PIL import Image
+
+JPEG_SOI = b'\xff\xd8\xff'
+JPEG_EOI = b'\xff\xd9'
+CHUNK_SIZE = 64 * 1024
+
+# Bytes some encoders leave after the end-of-image marker
+_TRAILING_PADDING = b'\x00\r\n '
+
+INVALID_JPEG_MESSAGE = 'Invalid file type. Only JPG/JPEG files are allowed.'
+
+
+class UploadRejected(Exception):
+    """Raised when an upload fails validation; ``reason`` is a short machine-readable code."""
+
+    def __init__(self, message, reason):
+        super().__init__(message)
+        self.reason = reason
+
+
+class ValidatedUpload:
+    """Validated upload bytes held in memory together with what was learned about them."""
+
+    def __init__(self, buffer, size, width, height, sha256=None, original_size=None):
+        self.buffer = buffer
+        self.size = size
+        self.width = width
+        self.height = height
+        self.sha256 = sha256
+        # Size as uploaded when the buffer holds a normalized re-encode
+        self.original_size = original_size if original_size is not None else size
+
+    def write_to(self, path):
+        """Write the buffered bytes to ``path`` and fsync them."""
+        self.buffer.seek(0)
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(self.buffer, f, CHUNK_SIZE)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self):
+        self.buffer.close()
+
+
+def _too_large_message(max_size):
+    return f'File too large. Maximum size allowed is {max_size / (1024*1024):.1f}MB.'
+
+
+def read_jpeg(stream, max_size, chunk_size=CHUNK_SIZE):
+    """
+    Read and validate a JPEG upload without touching disk.
+
+    Args:
+        stream: Object with a read(size) method (werkzeug FileStorage, open file, ...)
+        max_size (int): Maximum accepted size in bytes, enforced while reading
+        chunk_size (int): Read size
+
+    Returns:
+        ValidatedUpload: The buffered bytes, image dimensions and SHA-256
+            digest (computed while reading)
+
+    Raises:
+        UploadRejected: With reason 'empty', 'too_large', 'not_jpeg',
+            'truncated' or 'corrupt'
+    """
+    # Everything up to max_size stays in memory; larger uploads are rejected
+    # before they could spill to disk.
+    buffer = tempfile.SpooledTemporaryFile(max_size=max_size + 1)
+    size = 0
+    tail = b''
+    digest = hashlib.sha256()
+
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            if size == 0 and not chunk.startswith(JPEG_SOI[:len(chunk)]):
+                raise UploadRejected(INVALID_JPEG_MESSAGE, 'not_jpeg')
+            size += len(chunk)
+            if size > max_size:
+                raise UploadRejected(_too_large_message(max_size), 'too_large')
+            buffer.write(chunk)
+            digest.update(chunk)
+            tail = (tail + chunk)[-32:]
+
+        if size == 0:
+            raise UploadRejected('No file provided.', 'empty')
+        if size < len(JPEG_SOI):
+            raise UploadRejected(INVALID_JPEG_MESSAGE, 'not_jpeg')
+        if not tail.rstrip(_TRAILING_PADDING).endswith(JPEG_EOI):
+            raise UploadRejected(INVALID_JPEG_MESSAGE, 'truncated')
+
+        width, height = inspect_jpeg(buffer)
+        buffer.seek(0)
+        return ValidatedUpload(buffer, size, width, height, digest.hexdigest())
+    except Exception:
+        buffer.close()
+        raise
+
+
+def inspect_jpeg(fileobj):
+    """
+    Parse only the JPEG header with Pillow; pixel data is never decoded.
+
+    Args:
+        fileobj: Seekable binary file object
+
+    Returns:
+        tuple: (width, height)
+
+    Raises:
+        UploadRejected: If Pillow cannot identify the data as a JPEG
+    """
+    fileobj.seek(0)
+    try:
+        with Image.open(fileobj) as img:
+            if img.format not in ['JPEG', 'JPG']:
+                raise UploadRejected(INVALID_JPEG_MESSAGE, 'not_jpeg')
+            return img.size
+    except UploadRejected:
+        raise
+    except Exception:
+        raise UploadRejected(INVALID_JPEG_MESSAGE, 'corrupt')
+
+
+def validate_jpeg_file(path, max_size):
+    """
+    Validate a JPEG that is already on disk, reading only its header and tail.
+
+    Args:
+        path (str): File to check
+        max_size (int): Maximum accepted size in bytes
+
+    Returns:
+        tuple: (size, width, height)
+
+    Raises:
+        UploadRejected: Same reasons as read_jpeg
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        raise UploadRejected('No file provided.', 'empty')
+    if size > max_size:
+        raise UploadRejected(_too_large_message(max_size), 'too_large')
+
+    with open(path, 'rb') as f:
+        if f.read(len(JPEG_SOI)) != JPEG_SOI:
+            raise UploadRejected(INVALID_JPEG_MESSAGE, 'not_jpeg')
+        f.seek(max(0, size - 32))
+        if not f.read().rstrip(_TRAILING_PADDING).endswith(JPEG_EOI):
+            raise UploadRejected(INVALID_JPEG_MESSAGE, 'truncated')
+        width, height = inspect_jpeg(f)
+
+    return size, width, height
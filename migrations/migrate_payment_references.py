@@ -0,0 +1,995 @@
+#!/usr/bin/env python3
+"""
+Online migration of payment_references between its two schemas.
+
+``simple``: the integer schema the staff portal writes (member_id,
+member_name, integer confirmed_by). ``rich``: the UUID schema from
+setup_payment_system.sql (user_id referencing member_users, UUID
+confirmed_by, status CHECK, updated_at).
+
+The table is never rebuilt in place. Instead:
+
+1. A shadow table with the target schema is created, together with a
+   trigger on payment_references that mirrors every insert, update and
+   delete into it while the migration runs. A mirror write that fails does
+   not fail the application's write; its id is recorded in
+   payment_references_shadow_failures instead.
+2. Existing rows are copied in keyset batches (``id > last_id ORDER BY id
+   LIMIT n``). Each batch commits together with its checkpoint, so an
+   interrupted run resumes where it stopped.
+3. Secondary indexes are built with CREATE INDEX CONCURRENTLY; a build left
+   invalid by an interruption is dropped and rebuilt.
+4. Row counts and per-chunk checksums of the shared columns are compared;
+   mismatched chunks are re-copied and checked again.
+5. Cut-over takes a short ACCESS EXCLUSIVE lock (bounded by lock_timeout and
+   retried), re-copies the rows whose mirror writes failed, and swaps table
+   names only if both tables then hold the same rows. The old table is kept as
+   payment_references_retired_<timestamp> until dropped explicitly.
+
+Columns the target schema has no place for are kept in legacy_* columns, so
+migrating back restores them.
+
+Usage:
+    python migrations/migrate_payment_references.py --to rich|simple [--batch-size <n>] [--sleep <s>] [--no-cutover]
+    python migrations/migrate_payment_references.py --status
+    python migrations/migrate_payment_references.py --verify
+    python migrations/migrate_payment_references.py --abort
+    python migrations/migrate_payment_references.py --reconcile-images [--images-dir <dir>] [--quarantine]
+    python migrations/migrate_payment_references.py --drop-retired <table>
+
+Set DATABASE_URL to override the default connection settings.
+"""
+
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+import psycopg2
+
+# Database configuration - Connect to staff database
+DB_CONFIG = {
+    'host': 'localhost',
+    'database': 'slz_coop_staff',
+    'user': 'postgres',
+    'password': 'password',
+    'port': 5432
+}
+
+TABLE = 'payment_references'
+SHADOW = 'payment_references_shadow'
+STATE_TABLE = 'payment_references_migration'
+SYNC_FUNCTION = 'payment_references_shadow_sync'
+SYNC_FAILURES = 'payment_references_shadow_failures'
+RETIRED_PREFIX = 'payment_references_retired_'
+
+DEFAULT_IMAGES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'member-portal', 'server', 'payment_references'
+)
+IMAGE_PATH_PREFIX = 'payment_references/'
+
+DEFAULT_BATCH_SIZE = 5000
+VERIFY_CHUNK_SIZE = 50000
+LOCK_TIMEOUT = '3s'
+CUTOVER_ATTEMPTS = 5
+
+VALID_STATUSES = ('pending', 'confirmed', 'rejected')
+
+SCHEMAS = {
+    'simple': {
+        'columns': [
+            ('id', 'INTEGER NOT NULL'),
+            ('member_id', 'INTEGER'),
+            ('member_name', 'VARCHAR(255)'),
+            ('image_path', 'VARCHAR(500) NOT NULL'),
+            ('amount', 'DECIMAL(12,2)'),
+            ('reference_text', 'TEXT'),
+            ('status', "VARCHAR(20) DEFAULT 'pending'"),
+            ('created_at', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP'),
+            ('confirmed_by', 'INTEGER'),
+            ('confirmed_by_name', 'VARCHAR(255)'),
+            ('confirmed_notes', 'TEXT'),
+            ('confirmed_at', 'TIMESTAMP'),
+            # Kept from the rich schema so migrating back is lossless
+            ('legacy_user_id', 'UUID'),
+            ('legacy_confirmed_by', 'UUID'),
+        ],
+        'indexes': [
+            ('idx_payment_references_status', 'status'),
+            ('idx_payment_references_member_id', 'member_id'),
+            ('idx_payment_references_created_at', 'created_at'),
+        ],
+    },
+    'rich': {
+        'columns': [
+            ('id', 'INTEGER NOT NULL'),
+            # Nullable: legacy rows whose member_name matches no single member
+            ('user_id', 'UUID'),
+            ('image_path', 'VARCHAR(500) NOT NULL'),
+            ('amount', 'DECIMAL(10,2)'),
+            ('reference_text', 'VARCHAR(255)'),
+            ('status', "VARCHAR(20) DEFAULT 'pending' CHECK (status IN ('pending', 'confirmed', 'rejected'))"),
+            ('confirmed_by', 'UUID'),
+            ('confirmed_by_name', 'VARCHAR(255)'),
+            ('confirmed_notes', 'TEXT'),
+            ('confirmed_at', 'TIMESTAMP'),
+            ('created_at', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP'),
+            ('updated_at', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP'),
+            # Kept from the simple schema so migrating back is lossless
+            ('legacy_member_id', 'INTEGER'),
+            ('legacy_member_name', 'VARCHAR(255)'),
+            ('legacy_confirmed_by', 'INTEGER'),
+        ],
+        'indexes': [
+            ('idx_payment_references_user_id', 'user_id'),
+            ('idx_payment_references_status', 'status'),
+            ('idx_payment_references_created_at', 'created_at'),
+        ],
+    },
+}
+
+SHARED_COLUMNS = ('image_path', 'amount', 'reference_text', 'status', 'confirmed_by_name',
+                  'confirmed_notes', 'confirmed_at', 'created_at')
+
+# Source rows the target columns cannot hold, per target schema
+PREFLIGHT_CHECKS = {
+    'rich': [
+        ('status outside pending/confirmed/rejected', "status IS NULL OR status NOT IN ('pending', 'confirmed', 'rejected')"),
+        ('amount does not fit DECIMAL(10,2)', 'abs(amount) >= 100000000'),
+        ('reference_text longer than 255 characters', 'length(reference_text) > 255'),
+        ('image_path longer than 500 characters', 'length(image_path) > 500'),
+    ],
+    'simple': [
+        ('image_path longer than 500 characters', 'length(image_path) > 500'),
+    ],
+}
+
+
+def connect(autocommit=False):
+    """Open a connection using DATABASE_URL when set, otherwise DB_CONFIG."""
+    dsn = os.environ.get('DATABASE_URL')
+    conn = psycopg2.connect(dsn) if dsn else psycopg2.connect(**DB_CONFIG)
+    conn.autocommit = autocommit
+    return conn
+
+
+def _log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def table_columns(conn, table):
+    """Return the column names of ``table`` in the current schema, in order."""
+    cursor = conn.cursor()
+    cursor.execute("""
+    SELECT column_name FROM information_schema.columns
+    WHERE table_schema = current_schema() AND table_name = %s
+    ORDER BY ordinal_position
+    """, (table,))
+    columns = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    return columns
+
+
+def detect_schema(conn, table=TABLE):
+    """
+    Tell which payment_references schema ``table`` has.
+
+    Returns:
+        str: 'simple', 'rich', 'missing' or 'unknown'
+    """
+    columns = set(table_columns(conn, table))
+    if not columns:
+        return 'missing'
+    if 'image_path' in columns and 'member_id' in columns:
+        return 'simple'
+    if 'image_path' in columns and 'user_id' in columns:
+        return 'rich'
+    return 'unknown'
+
+
+def _table_exists(conn, table):
+    cursor = conn.cursor()
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+    exists = cursor.fetchone()[0]
+    cursor.close()
+    return exists
+
+
+def _conversion(target, source_columns, has_member_users):
+    """
+    Build the row conversion into ``target``.
+
+    Returns:
+        tuple: (list of (target column, SQL expression over alias ``s``),
+            join clause that provides alias ``mu``)
+    """
+    def source(column):
+        return f's.{column}' if column in source_columns else 'NULL'
+
+    expressions = [('id', 's.id')] + [(column, f's.{column}') for column in SHARED_COLUMNS]
+    if target == 'rich':
+        if has_member_users:
+            # member_name is the only link a simple row has to a member; use
+            # it only when it names exactly one member
+            join = ("LEFT JOIN (SELECT user_name, min(user_id::text)::uuid AS user_id FROM member_users "
+                    "GROUP BY user_name HAVING count(*) = 1) mu ON mu.user_name = s.member_name")
+            user_id = f"COALESCE({source('legacy_user_id')}, mu.user_id)"
+        else:
+            join = ''
+            user_id = source('legacy_user_id')
+        expressions += [
+            ('user_id', user_id),
+            ('confirmed_by', source('legacy_confirmed_by')),
+            ('updated_at', 'COALESCE(s.confirmed_at, s.created_at)'),
+            ('legacy_member_id', 's.member_id'),
+            ('legacy_member_name', 's.member_name'),
+            ('legacy_confirmed_by', 's.confirmed_by'),
+        ]
+    else:
+        if has_member_users:
+            join = "LEFT JOIN member_users mu ON mu.user_id = s.user_id"
+            member_name = f"COALESCE({source('legacy_member_name')}, mu.user_name)"
+        else:
+            join = ''
+            member_name = source('legacy_member_name')
+        expressions += [
+            ('member_id', source('legacy_member_id')),
+            ('member_name', member_name),
+            ('confirmed_by', source('legacy_confirmed_by')),
+            ('legacy_user_id', 's.user_id'),
+            ('legacy_confirmed_by', 's.confirmed_by'),
+        ]
+    return expressions, join
+
+
+def _verify_pairs(expressions):
+    """(source column, target column) pairs that must hold identical values."""
+    return [
+        (expression[2:], column) for column, expression in expressions
+        if expression.startswith('s.') and expression[2:].isidentifier()
+    ]
+
+
+def _checksum_rows(expressions):
+    """Row-to-text expressions over the source and the shadow whose values must match."""
+    pairs = _verify_pairs(expressions)
+    return ('ROW(' + ', '.join(source for source, _ in pairs) + ')::text',
+            'ROW(' + ', '.join(target for _, target in pairs) + ')::text')
+
+
+class PaymentReferencesMigration:
+    """One resumable migration run, tracked by a row in payment_references_migration."""
+
+    def __init__(self, conn, batch_size=DEFAULT_BATCH_SIZE, sleep=0.0):
+        """
+        Args:
+            conn: psycopg2 connection used for copying and bookkeeping
+            batch_size (int): Rows copied per transaction
+            sleep (float): Seconds to pause between batches to leave room
+                for production traffic
+        """
+        self.conn = conn
+        self.batch_size = batch_size
+        self.sleep = sleep
+
+    # -- bookkeeping -----------------------------------------------------
+
+    def ensure_state_table(self):
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+            migration_id SERIAL PRIMARY KEY,
+            source_schema VARCHAR(20) NOT NULL,
+            target_schema VARCHAR(20) NOT NULL,
+            phase VARCHAR(20) NOT NULL,
+            last_id INTEGER NOT NULL DEFAULT 0,
+            max_id INTEGER,
+            rows_copied BIGINT NOT NULL DEFAULT 0,
+            retired_table VARCHAR(63),
+            message TEXT,
+            started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+        """)
+        cursor.close()
+        self.conn.commit()
+
+    def active(self):
+        """Return the unfinished migration row as a dict, or None."""
+        if not _table_exists(self.conn, STATE_TABLE):
+            return None
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+        SELECT migration_id, source_schema, target_schema, phase, last_id, max_id, rows_copied,
+               retired_table, message, started_at, updated_at
+        FROM {STATE_TABLE} WHERE phase NOT IN ('done', 'aborted')
+        ORDER BY migration_id DESC LIMIT 1
+        """)
+        row = cursor.fetchone()
+        names = [column[0] for column in cursor.description]
+        cursor.close()
+        self.conn.commit()
+        return dict(zip(names, row)) if row else None
+
+    def _set_phase(self, migration_id, phase, message=None, **fields):
+        assignments = ', '.join(f"{name} = %s" for name in fields)
+        cursor = self.conn.cursor()
+        cursor.execute(
+            f"UPDATE {STATE_TABLE} SET phase = %s, message = %s, updated_at = CURRENT_TIMESTAMP"
+            + (f", {assignments}" if assignments else '')
+            + (", finished_at = CURRENT_TIMESTAMP" if phase in ('done', 'aborted') else '')
+            + " WHERE migration_id = %s",
+            [phase, message] + list(fields.values()) + [migration_id]
+        )
+        cursor.close()
+        self.conn.commit()
+
+    # -- setup -----------------------------------------------------------
+
+    def _plan(self, state):
+        """Conversion expressions and join for the active migration."""
+        has_member_users = _table_exists(self.conn, 'member_users')
+        return _conversion(state['target_schema'], set(table_columns(self.conn, TABLE)), has_member_users)
+
+    def preflight(self, target):
+        """
+        Count source rows the target schema would reject.
+
+        Returns:
+            list: Human-readable problems (empty when the copy can proceed)
+        """
+        problems = []
+        cursor = self.conn.cursor()
+        for description, condition in PREFLIGHT_CHECKS[target]:
+            cursor.execute(f"SELECT count(*) FROM {TABLE} WHERE {condition}")
+            count = cursor.fetchone()[0]
+            if count:
+                problems.append(f"{count} rows with {description}")
+        cursor.close()
+        self.conn.commit()
+        return problems
+
+    def start(self, target):
+        """
+        Create the shadow table and sync trigger and record a new migration.
+
+        Returns:
+            dict: The new migration row
+        """
+        source_schema = detect_schema(self.conn)
+        if source_schema in ('missing', 'unknown'):
+            raise Exception(f"{TABLE} has no recognised schema ({source_schema}); run scripts/setup_payment_references.py")
+        if source_schema == target:
+            raise Exception(f"{TABLE} already uses the {target} schema")
+
+        problems = self.preflight(target)
+        if problems:
+            raise Exception('Cannot migrate without losing data: ' + '; '.join(problems))
+
+        self.ensure_state_table()
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", (TABLE,))
+        sequence = cursor.fetchone()[0]
+        if sequence is None:
+            raise Exception(f"{TABLE}.id has no owned sequence; cannot keep ids stable")
+
+        columns = ',\n            '.join(f"{name} {definition}" for name, definition in SCHEMAS[target]['columns'])
+        cursor.execute(f"DROP TABLE IF EXISTS {SHADOW}")
+        cursor.execute(f"DROP TABLE IF EXISTS {SYNC_FAILURES}")
+        cursor.execute(f"""
+        CREATE TABLE {SHADOW} (
+            {columns},
+            CONSTRAINT {SHADOW}_pkey PRIMARY KEY (id)
+        )
+        """)
+        # New rows keep drawing ids from the existing sequence
+        cursor.execute(f"ALTER TABLE {SHADOW} ALTER COLUMN id SET DEFAULT nextval(%s::regclass)", (sequence,))
+        if target == 'rich' and _table_exists(self.conn, 'member_users'):
+            # NOT VALID: existing rows are checked later by VALIDATE, which
+            # does not block writes
+            cursor.execute(f"""
+            ALTER TABLE {SHADOW} ADD CONSTRAINT fk_payment_user
+            FOREIGN KEY (user_id) REFERENCES member_users(user_id) ON DELETE CASCADE NOT VALID
+            """)
+
+        cursor.execute(f"SELECT coalesce(max(id), 0) FROM {TABLE}")
+        max_id = cursor.fetchone()[0]
+        cursor.execute(f"""
+        INSERT INTO {STATE_TABLE} (source_schema, target_schema, phase, max_id, message)
+        VALUES (%s, %s, 'copying', %s, %s)
+        RETURNING migration_id
+        """, (source_schema, target, max_id, f'Copying {TABLE} into the {target} schema'))
+        migration_id = cursor.fetchone()[0]
+        cursor.close()
+
+        state = {'migration_id': migration_id, 'source_schema': source_schema, 'target_schema': target}
+        self._install_sync_trigger(state)
+        self.conn.commit()
+        return self.active()
+
+    def _upsert_sql(self, expressions, join, source_sql):
+        target_columns = ', '.join(column for column, _ in expressions)
+        select_list = ', '.join(expression for _, expression in expressions)
+        updates = ', '.join(f"{column} = EXCLUDED.{column}" for column, _ in expressions if column != 'id')
+        return f"""
+        INSERT INTO {SHADOW} ({target_columns})
+        SELECT {select_list} FROM {source_sql} s {join}
+        ON CONFLICT (id) DO UPDATE SET {updates}
+        """
+
+    def _install_sync_trigger(self, state):
+        """
+        Mirror writes on payment_references into the shadow table.
+
+        A failing mirror write (e.g. a user_id the NOT VALID fk_payment_user
+        rejects) must never fail the application's write, so the affected
+        ids are recorded in payment_references_shadow_failures and a warning
+        is raised. Cut-over re-copies those rows under its lock and refuses
+        to swap while they still fail.
+        """
+        expressions, join = self._plan(state)
+        upsert = self._upsert_sql(expressions, join, '(SELECT NEW.*)')
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SYNC_FAILURES} (
+            id INTEGER PRIMARY KEY,
+            error TEXT,
+            failed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION {SYNC_FUNCTION}() RETURNS trigger AS $$
+        BEGIN
+            BEGIN
+                IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND NEW.id <> OLD.id) THEN
+                    DELETE FROM {SHADOW} WHERE id = OLD.id;
+                END IF;
+                IF TG_OP <> 'DELETE' THEN
+                    {upsert};
+                END IF;
+            EXCEPTION WHEN OTHERS THEN
+                -- An update that changes the id leaves both ids out of step
+                INSERT INTO {SYNC_FAILURES} (id, error)
+                SELECT DISTINCT failed_id, SQLERRM FROM unnest(ARRAY[NEW.id, OLD.id]) failed_id
+                WHERE failed_id IS NOT NULL
+                ON CONFLICT (id) DO UPDATE SET error = EXCLUDED.error, failed_at = CURRENT_TIMESTAMP;
+                RAISE WARNING '{SYNC_FUNCTION}: % (id %)', SQLERRM, COALESCE(NEW.id, OLD.id);
+            END;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """)
+        cursor.execute(f"DROP TRIGGER IF EXISTS {SYNC_FUNCTION} ON {TABLE}")
+        cursor.execute(f"""
+        CREATE TRIGGER {SYNC_FUNCTION}
+        AFTER INSERT OR UPDATE OR DELETE ON {TABLE}
+        FOR EACH ROW EXECUTE FUNCTION {SYNC_FUNCTION}()
+        """)
+        cursor.close()
+
+    # -- phases ----------------------------------------------------------
+
+    def copy_rows(self, state):
+        """
+        Copy rows after the checkpoint in keyset batches.
+
+        Each batch locks its source rows FOR SHARE, so a concurrent update
+        either lands before the batch reads the row or after it commits;
+        the sync trigger then carries it over. The checkpoint is updated in
+        the same transaction as the batch.
+        """
+        expressions, join = self._plan(state)
+        batch_source = f"(SELECT * FROM {TABLE} WHERE id > %(last_id)s ORDER BY id LIMIT %(limit)s FOR SHARE)"
+        statement = f"""
+        WITH copied AS ({self._upsert_sql(expressions, join, batch_source)} RETURNING id)
+        SELECT max(id), count(*) FROM copied
+        """
+        last_id, copied = state['last_id'], state['rows_copied']
+        cursor = self.conn.cursor()
+        cursor.execute(f"SET lock_timeout = '{LOCK_TIMEOUT}'")
+        started = time.perf_counter()
+        while True:
+            cursor.execute(statement, {'last_id': last_id, 'limit': self.batch_size})
+            batch_max, batch_count = cursor.fetchone()
+            if not batch_count:
+                self.conn.commit()
+                break
+            last_id, copied = batch_max, copied + batch_count
+            cursor.execute(
+                f"UPDATE {STATE_TABLE} SET last_id = %s, rows_copied = %s, updated_at = CURRENT_TIMESTAMP "
+                "WHERE migration_id = %s",
+                (last_id, copied, state['migration_id'])
+            )
+            self.conn.commit()
+            elapsed = time.perf_counter() - started
+            _log(f"Copied {copied} rows (last id {last_id} of {state['max_id']}, {copied / elapsed if elapsed else 0:.0f} rows/s)")
+            if self.sleep:
+                time.sleep(self.sleep)
+        cursor.execute("RESET lock_timeout")
+        cursor.close()
+        self.conn.commit()
+        state['last_id'], state['rows_copied'] = last_id, copied
+        return copied
+
+    def build_indexes(self, state):
+        """
+        Build the target's secondary indexes on the shadow table concurrently.
+
+        Returns:
+            list: Index names built in this run
+        """
+        built = []
+        autocommit = connect(autocommit=True)
+        try:
+            cursor = autocommit.cursor()
+            for name, column in SCHEMAS[state['target_schema']]['indexes']:
+                shadow_name = f"{name}_shadow"
+                cursor.execute("""
+                SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE c.relname = %s
+                """, (shadow_name,))
+                row = cursor.fetchone()
+                if row and row[0]:
+                    continue
+                if row:
+                    # Left invalid by an interrupted concurrent build
+                    cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {shadow_name}")
+                _log(f"Building index {shadow_name}")
+                cursor.execute(f"CREATE INDEX CONCURRENTLY {shadow_name} ON {SHADOW} ({column})")
+                built.append(shadow_name)
+            cursor.execute("""
+            SELECT 1 FROM pg_constraint WHERE conrelid = %s::regclass AND conname = 'fk_payment_user' AND NOT convalidated
+            """, (SHADOW,))
+            if cursor.fetchone():
+                _log("Validating fk_payment_user")
+                cursor.execute(f"ALTER TABLE {SHADOW} VALIDATE CONSTRAINT fk_payment_user")
+            cursor.close()
+        finally:
+            autocommit.close()
+        return built
+
+    def verify(self, state, repair=True):
+        """
+        Compare row counts and checksums of payment_references and the shadow.
+
+        Rows are compared in id chunks on the columns both schemas share plus
+        every column copied unchanged. A mismatched chunk is re-copied (when
+        ``repair``) and compared again.
+
+        Returns:
+            dict: rows compared, chunks, repaired and still-mismatched ranges
+        """
+        expressions, join = self._plan(state)
+        source_row, target_row = _checksum_rows(expressions)
+
+        def checksums(low, high):
+            # One statement, one snapshot: a write mirrored by the trigger is
+            # seen on both sides or on neither
+            aggregate = "SELECT count(*), md5(coalesce(string_agg({}, '|' ORDER BY id), '')) FROM {} WHERE id > %(low)s AND id <= %(high)s"
+            cursor.execute(
+                f"SELECT source.*, target.* FROM ({aggregate.format(source_row, TABLE)}) source, "
+                f"({aggregate.format(target_row, SHADOW)}) target",
+                {'low': low, 'high': high}
+            )
+            row = cursor.fetchone()
+            return row[:2], row[2:]
+
+        cursor = self.conn.cursor()
+        rows, chunks, repaired, mismatched = 0, 0, [], []
+        low = 0
+        while True:
+            cursor.execute(
+                f"SELECT max(id) FROM (SELECT id FROM {TABLE} WHERE id > %s ORDER BY id LIMIT %s) chunk",
+                (low, VERIFY_CHUNK_SIZE)
+            )
+            high = cursor.fetchone()[0]
+            if high is None:
+                # Anything left in the shadow beyond the source's last id is extra
+                cursor.execute(f"SELECT coalesce(max(id), %s) FROM {SHADOW} WHERE id > %s", (low, low))
+                high = cursor.fetchone()[0]
+                if high == low:
+                    break
+            for attempt in range(3):
+                source, target = checksums(low, high)
+                self.conn.commit()
+                if source == target:
+                    break
+                if not repair or attempt == 2:
+                    mismatched.append({'from_id': low, 'to_id': high, 'source_rows': source[0], 'shadow_rows': target[0]})
+                    break
+                self._repair_range(expressions, join, low, high)
+                repaired.append({'from_id': low, 'to_id': high})
+            rows += source[0]
+            chunks += 1
+            low = high
+        cursor.close()
+        self.conn.commit()
+        return {'rows': rows, 'chunks': chunks, 'repaired': repaired, 'mismatched': mismatched}
+
+    def _repair_range(self, expressions, join, low, high):
+        """Re-copy source rows with low < id <= high and drop shadow rows the source no longer has."""
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+        DELETE FROM {SHADOW} t WHERE t.id > %s AND t.id <= %s
+        AND NOT EXISTS (SELECT 1 FROM {TABLE} s WHERE s.id = t.id)
+        """, (low, high))
+        range_source = f"(SELECT * FROM {TABLE} WHERE id > %(low)s AND id <= %(high)s FOR SHARE)"
+        cursor.execute(self._upsert_sql(expressions, join, range_source), {'low': low, 'high': high})
+        cursor.close()
+        self.conn.commit()
+
+    def _repair_failed_writes(self, cursor, expressions, join):
+        """
+        Re-copy the rows whose mirror writes failed and check them again.
+
+        Runs inside the caller's transaction (the cut-over lock) and does not
+        commit.
+
+        Returns:
+            int: Number of rows re-copied
+        """
+        if not _table_exists(self.conn, SYNC_FAILURES):
+            return 0
+        cursor.execute(f"SELECT id FROM {SYNC_FAILURES} ORDER BY id")
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return 0
+        try:
+            cursor.execute(f"""
+            DELETE FROM {SHADOW} t WHERE t.id = ANY(%(ids)s)
+            AND NOT EXISTS (SELECT 1 FROM {TABLE} s WHERE s.id = t.id)
+            """, {'ids': ids})
+            failed_source = f"(SELECT * FROM {TABLE} WHERE id = ANY(%(ids)s))"
+            cursor.execute(self._upsert_sql(expressions, join, failed_source), {'ids': ids})
+        except psycopg2.errors.LockNotAvailable:
+            raise
+        except psycopg2.Error as e:
+            raise Exception(
+                f"{len(ids)} rows failed to mirror into {SHADOW} and still cannot be copied "
+                f"({e.diag.message_primary}); see {SYNC_FAILURES}"
+            )
+
+        source_row, target_row = _checksum_rows(expressions)
+        aggregate = "SELECT md5(coalesce(string_agg({}, '|' ORDER BY id), '')) FROM {} WHERE id = ANY(%(ids)s)"
+        cursor.execute(
+            f"SELECT ({aggregate.format(source_row, TABLE)}) = ({aggregate.format(target_row, SHADOW)})",
+            {'ids': ids}
+        )
+        if not cursor.fetchone()[0]:
+            raise Exception(f"Rows listed in {SYNC_FAILURES} still differ after re-copying them")
+        cursor.execute(f"DELETE FROM {SYNC_FAILURES}")
+        return len(ids)
+
+    def cutover(self, state):
+        """
+        Swap the shadow table in under a short, bounded lock.
+
+        Under the lock, rows whose mirror writes failed are re-copied and
+        the two tables' row counts and highest ids are compared; the swap is
+        refused (and the lock released) if anything still differs.
+
+        Returns:
+            str: Name the old table was retired under
+        """
+        suffix = datetime.now().strftime('%Y%m%d%H%M%S')
+        retired = f"{RETIRED_PREFIX}{suffix}"
+        expressions, join = self._plan(state)
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", (TABLE,))
+        sequence = cursor.fetchone()[0]
+        cursor.execute("""
+        SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = %s::regclass
+        """, (TABLE,))
+        old_indexes = [row[0] for row in cursor.fetchall()]
+        self.conn.commit()
+
+        for attempt in range(1, CUTOVER_ATTEMPTS + 1):
+            try:
+                cursor.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+                cursor.execute(f"LOCK TABLE {TABLE}, {SHADOW} IN ACCESS EXCLUSIVE MODE")
+                repaired = self._repair_failed_writes(cursor, expressions, join)
+                if repaired:
+                    _log(f"Re-copied {repaired} rows whose mirror writes failed")
+                # The trigger kept the shadow current; a last check guards
+                # against a write it missed without recording
+                cursor.execute(f"""
+                SELECT (SELECT count(*) FROM {TABLE}), (SELECT count(*) FROM {SHADOW}),
+                       (SELECT max(id) FROM {TABLE}) IS NOT DISTINCT FROM (SELECT max(id) FROM {SHADOW})
+                """)
+                source_rows, shadow_rows, same_max = cursor.fetchone()
+                if source_rows != shadow_rows or not same_max:
+                    raise Exception(f"Shadow table differs from {TABLE} ({shadow_rows} of {source_rows} rows); "
+                                    "run the migration again")
+                cursor.execute(f"DROP TRIGGER IF EXISTS {SYNC_FUNCTION} ON {TABLE}")
+                for index in old_indexes:
+                    cursor.execute(f'ALTER INDEX "{index}" RENAME TO "{index[:48]}_r{suffix}"')
+                cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {retired}")
+                cursor.execute(f"ALTER TABLE {SHADOW} RENAME TO {TABLE}")
+                cursor.execute(f"ALTER INDEX {SHADOW}_pkey RENAME TO {TABLE}_pkey")
+                for name, _ in SCHEMAS[state['target_schema']]['indexes']:
+                    cursor.execute(f"ALTER INDEX {name}_shadow RENAME TO {name}")
+                # The sequence must outlive the retired table
+                cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id")
+                if state['target_schema'] == 'rich':
+                    cursor.execute("""
+                    CREATE OR REPLACE FUNCTION update_updated_at_column()
+                    RETURNS TRIGGER AS $$
+                    BEGIN
+                        NEW.updated_at = CURRENT_TIMESTAMP;
+                        RETURN NEW;
+                    END;
+                    $$ language 'plpgsql'
+                    """)
+                    cursor.execute(f"""
+                    CREATE TRIGGER update_payment_references_updated_at
+                    BEFORE UPDATE ON {TABLE} FOR EACH ROW EXECUTE FUNCTION update_updated_at_column()
+                    """)
+                else:
+                    cursor.execute(f"DROP TRIGGER IF EXISTS update_payment_references_updated_at ON {retired}")
+                cursor.execute(f"DROP FUNCTION IF EXISTS {SYNC_FUNCTION}()")
+                cursor.execute(f"DROP TABLE IF EXISTS {SYNC_FAILURES}")
+                cursor.execute(
+                    f"UPDATE {STATE_TABLE} SET phase = 'done', retired_table = %s, message = %s, "
+                    "updated_at = CURRENT_TIMESTAMP, finished_at = CURRENT_TIMESTAMP WHERE migration_id = %s",
+                    (retired, f"{TABLE} now uses the {state['target_schema']} schema", state['migration_id'])
+                )
+                self.conn.commit()
+                cursor.close()
+                return retired
+            except psycopg2.errors.LockNotAvailable:
+                self.conn.rollback()
+                _log(f"Cut-over lock not available (attempt {attempt}/{CUTOVER_ATTEMPTS}); retrying")
+                time.sleep(attempt)
+            except Exception:
+                self.conn.rollback()
+                cursor.close()
+                raise
+        cursor.close()
+        raise Exception(f"Could not lock {TABLE} for cut-over after {CUTOVER_ATTEMPTS} attempts; run again later")
+
+    # -- entry points ----------------------------------------------------
+
+    def run(self, target, cutover=True):
+        """
+        Start or resume a migration to ``target`` and carry it as far as possible.
+
+        Args:
+            target (str): 'simple' or 'rich'
+            cutover (bool): Swap the tables once verified; when False the
+                migration stops in phase 'ready' and the trigger keeps the
+                shadow current until the next run
+
+        Returns:
+            dict: Result with success, message, phase and per-phase details
+        """
+        state = self.active()
+        if state is None:
+            state = self.start(target)
+            _log(f"Started migration {state['migration_id']}: {state['source_schema']} -> {target}")
+        elif state['target_schema'] != target:
+            return {
+                'success': False,
+                'message': f"Migration {state['migration_id']} to {state['target_schema']} is in progress; "
+                           "finish it or run --abort first",
+                'phase': state['phase']
+            }
+        else:
+            _log(f"Resuming migration {state['migration_id']} in phase {state['phase']} at id {state['last_id']}")
+
+        result = {'migration_id': state['migration_id'], 'target_schema': target}
+        if state['phase'] == 'copying':
+            self.copy_rows(state)
+            self._set_phase(state['migration_id'], 'indexing', 'Rows copied; building indexes')
+            state['phase'] = 'indexing'
+        result['rows_copied'] = state['rows_copied']
+
+        if state['phase'] == 'indexing':
+            result['indexes_built'] = self.build_indexes(state)
+            self._set_phase(state['migration_id'], 'verifying', 'Indexes built; verifying')
+            state['phase'] = 'verifying'
+
+        if state['phase'] in ('verifying', 'ready'):
+            verification = self.verify(state)
+            result['verification'] = verification
+            if verification['mismatched']:
+                self._set_phase(state['migration_id'], 'verifying', 'Verification found mismatched chunks')
+                result.update(success=False, phase='verifying',
+                              message=f"{len(verification['mismatched'])} chunks still differ after repair")
+                return result
+            self._set_phase(state['migration_id'], 'ready', f"Verified {verification['rows']} rows")
+            state['phase'] = 'ready'
+
+        if not cutover:
+            result.update(success=True, phase='ready',
+                          message='Verified; the shadow table is kept current until cut-over')
+            return result
+
+        result['retired_table'] = self.cutover(state)
+        result.update(success=True, phase='done',
+                      message=f"{TABLE} migrated to the {target} schema; old table kept as {result['retired_table']}")
+        return result
+
+    def abort(self):
+        """Drop the sync trigger and shadow table and mark the migration aborted."""
+        state = self.active()
+        if state is None:
+            return {'success': True, 'message': 'No migration in progress.'}
+        cursor = self.conn.cursor()
+        cursor.execute(f"SET lock_timeout = '{LOCK_TIMEOUT}'")
+        cursor.execute(f"DROP TRIGGER IF EXISTS {SYNC_FUNCTION} ON {TABLE}")
+        cursor.execute(f"DROP FUNCTION IF EXISTS {SYNC_FUNCTION}()")
+        cursor.execute(f"DROP TABLE IF EXISTS {SHADOW}")
+        cursor.execute(f"DROP TABLE IF EXISTS {SYNC_FAILURES}")
+        cursor.execute("RESET lock_timeout")
+        cursor.close()
+        self.conn.commit()
+        self._set_phase(state['migration_id'], 'aborted', 'Aborted; shadow table dropped')
+        return {'success': True, 'message': f"Migration {state['migration_id']} aborted."}
+
+    def status(self):
+        """Describe the current schema and the latest migration."""
+        result = {'success': True, 'schema': detect_schema(self.conn), 'migration': None}
+        if _table_exists(self.conn, STATE_TABLE):
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+            SELECT migration_id, source_schema, target_schema, phase, last_id, max_id, rows_copied,
+                   retired_table, message, started_at, updated_at, finished_at
+            FROM {STATE_TABLE} ORDER BY migration_id DESC LIMIT 1
+            """)
+            row = cursor.fetchone()
+            if row:
+                names = [column[0] for column in cursor.description]
+                result['migration'] = dict(zip(names, row))
+            cursor.close()
+        if _table_exists(self.conn, SYNC_FAILURES):
+            cursor = self.conn.cursor()
+            cursor.execute(f"SELECT count(*) FROM {SYNC_FAILURES}")
+            result['failed_mirror_writes'] = cursor.fetchone()[0]
+            cursor.close()
+        self.conn.commit()
+        result['message'] = f"{TABLE} uses the {result['schema']} schema"
+        return result
+
+
+def reconcile_images(conn, images_dir=DEFAULT_IMAGES_DIR, quarantine=False, sample=100):
+    """
+    Compare the payment_references image directory with image_path.
+
+    image_path values are streamed through a server-side cursor and the
+    directory is walked once.
+
+    Args:
+        conn: psycopg2 connection
+        images_dir (str): Directory holding the uploaded images
+        quarantine (bool): Move files no row references into
+            ``<images_dir>/orphaned/``
+        sample (int): How many ids/files to list per problem
+
+    Returns:
+        dict: Result with counts and samples of rows whose file is missing
+            and of files no row references
+    """
+    referenced = set()
+    missing, missing_count, outside_count = [], 0, 0
+    cursor = conn.cursor(name='payment_reference_images')
+    cursor.itersize = 10000
+    cursor.execute(f"SELECT id, image_path FROM {TABLE} ORDER BY id")
+    for payment_id, image_path in cursor:
+        relative = (image_path or '').lstrip('/')
+        if relative.startswith(IMAGE_PATH_PREFIX):
+            relative = relative[len(IMAGE_PATH_PREFIX):]
+        if not relative or os.path.isabs(relative) or '..' in relative.split('/'):
+            outside_count += 1
+            continue
+        referenced.add(relative)
+        if not os.path.isfile(os.path.join(images_dir, relative)):
+            missing_count += 1
+            if len(missing) < sample:
+                missing.append({'id': payment_id, 'image_path': image_path})
+    cursor.close()
+    conn.commit()
+
+    orphaned, orphan_count, quarantined = [], 0, 0
+    orphan_dir = os.path.join(images_dir, 'orphaned')
+    if os.path.isdir(images_dir):
+        for entry in os.scandir(images_dir):
+            if not entry.is_file() or entry.name in referenced:
+                continue
+            orphan_count += 1
+            if len(orphaned) < sample:
+                orphaned.append(entry.name)
+            if quarantine:
+                os.makedirs(orphan_dir, exist_ok=True)
+                shutil.move(entry.path, os.path.join(orphan_dir, entry.name))
+                quarantined += 1
+
+    return {
+        'success': missing_count == 0,
+        'message': f"{len(referenced)} referenced images, {missing_count} missing, {orphan_count} unreferenced files",
+        'referenced': len(referenced),
+        'missing_files': missing_count,
+        'missing_sample': missing,
+        'unreferenced_files': orphan_count,
+        'unreferenced_sample': orphaned,
+        'quarantined': quarantined,
+        'invalid_paths': outside_count
+    }
+
+
+def drop_retired(conn, table):
+    """Drop a table left behind by cut-over (only payment_references_retired_* tables)."""
+    if not table.startswith(RETIRED_PREFIX) or not table[len(RETIRED_PREFIX):].isdigit():
+        return {'success': False, 'message': f"Refusing to drop {table}; only {RETIRED_PREFIX}<timestamp> tables"}
+    cursor = conn.cursor()
+    cursor.execute(f"SET lock_timeout = '{LOCK_TIMEOUT}'")
+    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.close()
+    conn.commit()
+    return {'success': True, 'message': f"Dropped {table}"}
+
+
+def _option_value(args, name, default=None):
+    """Return the value following ``name`` in ``args``, or ``default``."""
+    if name in args:
+        index = args.index(name)
+        if index + 1 < len(args):
+            return args[index + 1]
+    return default
+
+
+def main():
+    args = sys.argv[1:]
+    if not args:
+        print(__doc__)
+        sys.exit(1)
+
+    try:
+        conn = connect()
+        try:
+            migration = PaymentReferencesMigration(
+                conn,
+                batch_size=int(_option_value(args, '--batch-size', DEFAULT_BATCH_SIZE)),
+                sleep=float(_option_value(args, '--sleep', 0.0))
+            )
+            if '--to' in args:
+                target = _option_value(args, '--to')
+                if target not in SCHEMAS:
+                    raise Exception("--to must be 'simple' or 'rich'")
+                result = migration.run(target, cutover='--no-cutover' not in args)
+            elif '--status' in args:
+                result = migration.status()
+            elif '--verify' in args:
+                state = migration.active()
+                if state is None or state['phase'] == 'copying':
+                    result = {'success': False, 'message': 'No copied migration to verify.'}
+                else:
+                    verification = migration.verify(state, repair=False)
+                    result = dict(verification, success=not verification['mismatched'],
+                                  message=f"{verification['rows']} rows in {verification['chunks']} chunks, "
+                                          f"{len(verification['mismatched'])} mismatched")
+            elif '--abort' in args:
+                result = migration.abort()
+            elif '--reconcile-images' in args:
+                result = reconcile_images(
+                    conn, _option_value(args, '--images-dir', DEFAULT_IMAGES_DIR), quarantine='--quarantine' in args
+                )
+            elif '--drop-retired' in args:
+                result = drop_retired(conn, _option_value(args, '--drop-retired', ''))
+            else:
+                print(__doc__)
+                sys.exit(1)
+        finally:
+            conn.close()
+    except Exception as e:
+        result = {'success': False, 'message': f'Error: {str(e)}'}
+
+    print(json.dumps(result, indent=2, default=str))
+    sys.exit(0 if result['success'] else 1)
+
+
+if __name__ == "__main__":
+    main()
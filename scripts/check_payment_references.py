@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Report on payment_references: schema, row count, index health, migration
+progress and whether the image directory matches image_path.
+
+Usage:
+    python scripts/check_payment_references.py [--images-dir <dir>] [--exact-count]
+
+Exits 1 when something needs attention (unknown schema, missing or invalid
+indexes, rows whose image file is missing).
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'migrations'))
+
+import migrate_payment_references as payment_migration  # noqa: E402
+
+
+def check_payment_references(images_dir=payment_migration.DEFAULT_IMAGES_DIR, exact_count=False):
+    """
+    Inspect payment_references without changing anything.
+
+    Args:
+        images_dir (str): Directory holding the uploaded images
+        exact_count (bool): Count rows with count(*) instead of using the
+            planner estimate
+
+    Returns:
+        dict: Result with schema, rows, indexes, migration and images sections
+    """
+    conn = payment_migration.connect()
+    try:
+        schema = payment_migration.detect_schema(conn)
+        result = {'schema': schema, 'problems': []}
+        if schema in ('missing', 'unknown'):
+            result.update(success=False, message=f"{payment_migration.TABLE} is {schema}")
+            return result
+
+        cursor = conn.cursor()
+        if exact_count:
+            cursor.execute(f"SELECT count(*) FROM {payment_migration.TABLE}")
+        else:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", (payment_migration.TABLE,))
+        result['rows'] = cursor.fetchone()[0]
+        if result['rows'] < 0:
+            # Never analyzed; no estimate yet
+            cursor.execute(f"SELECT count(*) FROM {payment_migration.TABLE}")
+            result['rows'] = cursor.fetchone()[0]
+
+        cursor.execute("""
+        SELECT c.relname, i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = %s::regclass
+        """, (payment_migration.TABLE,))
+        indexes = dict(cursor.fetchall())
+        cursor.close()
+        conn.commit()
+        result['indexes'] = indexes
+        for name, _ in payment_migration.SCHEMAS[schema]['indexes']:
+            if name not in indexes:
+                result['problems'].append(f"Missing index {name}")
+        for name, valid in indexes.items():
+            if not valid:
+                result['problems'].append(f"Invalid index {name} (interrupted concurrent build)")
+
+        result['migration'] = payment_migration.PaymentReferencesMigration(conn).status()['migration']
+
+        images = payment_migration.reconcile_images(conn, images_dir, sample=10)
+        images.pop('success')
+        images.pop('quarantined')
+        result['images'] = images
+        if images['missing_files']:
+            result['problems'].append(f"{images['missing_files']} rows point at missing image files")
+    finally:
+        conn.close()
+
+    result['success'] = not result['problems']
+    result['message'] = 'payment_references looks healthy.' if result['success'] else '; '.join(result['problems'])
+    return result
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    try:
+        result = check_payment_references(
+            payment_migration._option_value(args, '--images-dir', payment_migration.DEFAULT_IMAGES_DIR),
+            exact_count='--exact-count' in args
+        )
+    except Exception as e:
+        result = {'success': False, 'message': f'Error: {str(e)}'}
+    print(json.dumps(result, indent=2, default=str))
+    sys.exit(0 if result['success'] else 1)
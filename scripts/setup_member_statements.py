@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Prepare the staff database for member statements (one-time setup).
+
+Usage:
+    python scripts/setup_member_statements.py
+
+Adds the statement columns to invoices, the unique index that keeps one
+statement per member and month, and the member_statement_runs table that
+member-portal/server/member_statements.py records its progress in. The
+invoices table itself belongs to the staff portal (routes/invoices.js
+creates it on start-up) and must already exist. Existing objects are left
+alone; the index is built with CREATE INDEX CONCURRENTLY so writes to
+invoices are not blocked.
+"""
+
+import json
+import os
+import sys
+
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'member-portal', 'server'))
+
+import member_statements  # noqa: E402
+
+DB_CONFIG = {
+    'host': 'localhost',
+    'database': 'slz_coop_staff',
+    'user': 'postgres',
+    'password': 'password',
+    'port': 5432
+}
+
+
+def connect(autocommit=False):
+    """Open a connection using DATABASE_URL when set, otherwise DB_CONFIG."""
+    dsn = os.environ.get('DATABASE_URL')
+    conn = psycopg2.connect(dsn) if dsn else psycopg2.connect(**DB_CONFIG)
+    conn.autocommit = autocommit
+    return conn
+
+
+def setup_member_statements():
+    """
+    Add the statement columns, index and run table if they are missing.
+
+    Returns:
+        dict: Result with the changes applied
+    """
+    applied = []
+    conn = connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT to_regclass('invoices') IS NOT NULL")
+        if not cursor.fetchone()[0]:
+            return {
+                'success': False,
+                'message': 'invoices does not exist; start the staff portal once to create it'
+            }
+        cursor.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'invoices'
+        """)
+        existing = {row[0] for row in cursor.fetchall()}
+        for name, column_type in member_statements.INVOICE_COLUMNS:
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE invoices ADD COLUMN {name} {column_type}")
+                applied.append(f"invoices.{name}")
+
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (member_statements.RUNS_TABLE,))
+        if not cursor.fetchone()[0]:
+            cursor.execute(f"""
+            CREATE TABLE {member_statements.RUNS_TABLE} (
+                run_id SERIAL PRIMARY KEY,
+                period DATE NOT NULL,
+                from_member TEXT,
+                to_member TEXT,
+                document_format VARCHAR(10) NOT NULL,
+                status VARCHAR(20) NOT NULL DEFAULT 'running',
+                last_user_id UUID,
+                members INTEGER NOT NULL DEFAULT 0,
+                statements INTEGER NOT NULL DEFAULT 0,
+                document_bytes BIGINT NOT NULL DEFAULT 0,
+                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+            """)
+            applied.append(member_statements.RUNS_TABLE)
+        cursor.close()
+        conn.commit()
+    finally:
+        conn.close()
+
+    # CONCURRENTLY cannot run inside a transaction block
+    autocommit = connect(autocommit=True)
+    try:
+        cursor = autocommit.cursor()
+        index = member_statements.STATEMENT_INDEX
+        cursor.execute("""
+        SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = %s
+        """, (index,))
+        row = cursor.fetchone()
+        if not (row and row[0]):
+            if row:
+                # Left invalid by an interrupted concurrent build
+                cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index}")
+            cursor.execute(f"""
+            CREATE UNIQUE INDEX CONCURRENTLY {index}
+            ON invoices (member_user_id, statement_period) WHERE statement_period IS NOT NULL
+            """)
+            applied.append(index)
+        cursor.close()
+    finally:
+        autocommit.close()
+
+    return {
+        'success': True,
+        'message': f"Applied {len(applied)} changes." if applied else 'Member statement tables are up to date.',
+        'applied': applied
+    }
+
+
+if __name__ == '__main__':
+    try:
+        result = setup_member_statements()
+    except psycopg2.Error as e:
+        result = {'success': False, 'message': f'Database error: {str(e)}'}
+    print(json.dumps(result))
+    sys.exit(0 if result['success'] else 1)
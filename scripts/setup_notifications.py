@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Create the member notification tables and report the outbox backlog.
+
+Usage:
+    python scripts/setup_notifications.py
+
+Creates notification_outbox and notifications (with their indexes) from the
+canonical definitions in member-portal/server/loan_schema.py, leaving the
+other tables alone; ``python loan_cli.py --migrate`` creates them as well.
+Existing tables are only extended, never rebuilt. Start delivery with
+``python member-portal/server/notifications.py --dispatch``.
+"""
+
+import json
+import os
+import sys
+
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'member-portal', 'server'))
+
+import loan_schema  # noqa: E402
+import notifications  # noqa: E402
+
+DB_CONFIG = {
+    'host': 'localhost',
+    'database': 'slz_coop_staff',
+    'user': 'postgres',
+    'password': 'password',
+    'port': 5432
+}
+
+
+def connect():
+    """Open a connection using DATABASE_URL when set, otherwise DB_CONFIG."""
+    dsn = os.environ.get('DATABASE_URL')
+    return psycopg2.connect(dsn) if dsn else psycopg2.connect(**DB_CONFIG)
+
+
+def setup_notifications():
+    """
+    Create or extend the notification tables.
+
+    Returns:
+        dict: Result with the changes applied and the current backlog
+    """
+    conn = connect()
+    try:
+        applied = loan_schema.apply_migrations(
+            conn, tables=[notifications.OUTBOX_TABLE, notifications.NOTIFICATIONS_TABLE]
+        )
+        conn.commit()
+        backlog = notifications.outbox_status(conn)
+    finally:
+        conn.close()
+    return {
+        'success': True,
+        'message': f"Applied {len(applied)} changes." if applied else 'Notification tables are up to date.',
+        'applied': applied,
+        'outbox': backlog
+    }
+
+
+if __name__ == '__main__':
+    try:
+        result = setup_notifications()
+    except psycopg2.Error as e:
+        result = {'success': False, 'message': f'Database error: {str(e)}'}
+    print(json.dumps(result))
+    sys.exit(0 if result['success'] else 1)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Create payment_references if it does not exist, and make sure its indexes do.
+
+Usage:
+    python scripts/setup_payment_references.py [--schema simple|rich]
+
+An existing table is never dropped or rebuilt; missing indexes are added
+with CREATE INDEX CONCURRENTLY so writes are not blocked. To move an existing
+table to the other schema use migrations/migrate_payment_references.py.
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'migrations'))
+
+import migrate_payment_references as payment_migration  # noqa: E402
+
+
+def setup_payment_references(schema='simple'):
+    """
+    Create the table in ``schema`` or bring an existing table's indexes up to date.
+
+    Args:
+        schema (str): 'simple' or 'rich' (only used when creating the table)
+
+    Returns:
+        dict: Result with the schema in use and the indexes created
+    """
+    conn = payment_migration.connect()
+    try:
+        current = payment_migration.detect_schema(conn)
+        if current == 'unknown':
+            return {
+                'success': False,
+                'message': f"{payment_migration.TABLE} exists with an unrecognised structure; not touching it"
+            }
+
+        created_table = False
+        if current == 'missing':
+            definition = payment_migration.SCHEMAS[schema]
+            columns = ',\n                '.join(
+                f"{name} {column}" for name, column in definition['columns'] if name != 'id'
+            )
+            cursor = conn.cursor()
+            cursor.execute(f"""
+            CREATE TABLE {payment_migration.TABLE} (
+                id SERIAL PRIMARY KEY,
+                {columns}
+            )
+            """)
+            if schema == 'rich' and payment_migration._table_exists(conn, 'member_users'):
+                cursor.execute(f"""
+                ALTER TABLE {payment_migration.TABLE} ADD CONSTRAINT fk_payment_user
+                FOREIGN KEY (user_id) REFERENCES member_users(user_id) ON DELETE CASCADE
+                """)
+            cursor.close()
+            conn.commit()
+            created_table, current = True, schema
+    finally:
+        conn.close()
+
+    # CONCURRENTLY cannot run inside a transaction block
+    autocommit = payment_migration.connect(autocommit=True)
+    created_indexes = []
+    try:
+        cursor = autocommit.cursor()
+        for name, column in payment_migration.SCHEMAS[current]['indexes']:
+            cursor.execute("""
+            SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = %s
+            """, (name,))
+            row = cursor.fetchone()
+            if row and row[0]:
+                continue
+            if row:
+                cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+            cursor.execute(f"CREATE INDEX CONCURRENTLY {name} ON {payment_migration.TABLE} ({column})")
+            created_indexes.append(name)
+        cursor.close()
+    finally:
+        autocommit.close()
+
+    return {
+        'success': True,
+        'message': (f"Created {payment_migration.TABLE} with the {current} schema" if created_table
+                    else f"{payment_migration.TABLE} already exists with the {current} schema"),
+        'schema': current,
+        'created_table': created_table,
+        'created_indexes': created_indexes
+    }
+
+
+if __name__ == "__main__":
+    schema = payment_migration._option_value(sys.argv[1:], '--schema', 'simple')
+    if schema not in payment_migration.SCHEMAS:
+        print("Usage: python scripts/setup_payment_references.py [--schema simple|rich]")
+        sys.exit(1)
+    try:
+        result = setup_payment_references(schema)
+    except Exception as e:
+        result = {'success': False, 'message': f'Error: {str(e)}'}
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result['success'] else 1)
@@ -0,0 +1,486 @@
+"""
+Streaming member import engine.
+
+Reads a CSV or XLSX file row by row, normalizes the column aliases the
+``/import-members`` route accepts, validates each row against the live
+``membership_applications`` columns (required fields, lengths, numeric
+precision), and streams the valid rows into a temporary staging table with
+``COPY FROM STDIN``. One set-based statement then merges the staging table
+into ``membership_applications``. Memory stays flat whatever the file size:
+only the rejected rows reported back and the keys used for in-file duplicate
+checks are kept.
+
+Requires psycopg2; XLSX files also need openpyxl.
+"""
+
+import csv
+import io
+import json
+import os
+import re
+import sys
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+import member_dedupe
+
+TARGET_TABLE = 'membership_applications'
+
+# Columns the import fills, in the order of the original route's INSERT
+IMPORT_COLUMNS = [
+    'number_of_shares', 'amount_subscribe', 'application_date', 'membership_type',
+    'applicants_membership_number', 'last_name', 'first_name', 'middle_name', 'suffix',
+    'address', 'contact_number', 'type_of_address', 'occupied_since', 'email_address',
+    'date_of_birth', 'place_of_birth', 'religion', 'age', 'gender', 'civil_status',
+    'highest_educational_attainment', 'spouse_full_name', 'fathers_full_name',
+    'mothers_maiden_name', 'number_of_dependents', 'occupation', 'annual_income',
+    'tax_identification_number', 'identification_type', 'identification_number',
+    'employment_choice', 'business_type', 'business_address', 'employer_trade_name',
+    'employer_tin_number', 'employer_phone_number', 'date_hired_from', 'date_hired_to',
+    'employment_occupation', 'employment_occupation_status', 'annual_monthly_indicator',
+    'employment_industry', 'facebook_account', 'reference_person', 'reference_address',
+    'reference_contact_number', 'profile_image_path', 'status', 'review_notes', 'reviewed_at',
+]
+
+# Header names accepted for a column besides the column name itself
+COLUMN_ALIASES = {
+    'amount_subscribe': ('amount',),
+    'applicants_membership_number': ('member_number',),
+    'contact_number': ('phone', 'contact'),
+    'email_address': ('email',),
+}
+
+EMAIL_PATTERN = re.compile(r'^[^\s@]+@[^\s@]+\.[^\s@]+$')
+
+# Excel stores dates as days since 1899-12-30
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%m/%d/%y', '%d-%b-%Y', '%b %d, %Y', '%B %d, %Y')
+TIMESTAMP_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M', '%m/%d/%Y %H:%M:%S')
+
+# Rejected rows listed in the result; the failed count always covers all of them
+MAX_REPORTED_ERRORS = 1000
+
+# Characters handed to COPY per read
+COPY_CHUNK_SIZE = 256 * 1024
+
+
+def _header_key(header):
+    """Normalize a header cell: 'First Name' / 'first-name' -> 'first_name'."""
+    if header is None:
+        return ''
+    return re.sub(r'[\s\-]+', '_', str(header).strip().lower())
+
+
+def _is_blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def iter_csv_rows(path):
+    """
+    Yield (line_number, row dict) for each non-blank data row of a CSV file.
+
+    Args:
+        path (str): CSV file with a header row (UTF-8, BOM allowed)
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        headers = [_header_key(header) for header in next(reader, [])]
+        for values in reader:
+            if all(_is_blank(value) for value in values):
+                continue
+            yield reader.line_num, dict(zip(headers, values))
+
+
+def iter_xlsx_rows(path):
+    """
+    Yield (row_number, row dict) for each non-blank row of the first worksheet.
+
+    The workbook is opened in read-only mode, so rows are parsed as they are
+    read instead of loading the whole sheet.
+    """
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise Exception("Reading .xlsx files requires openpyxl (pip install openpyxl)")
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        headers = [_header_key(header) for header in next(rows, ())]
+        for row_number, values in enumerate(rows, start=2):
+            if all(_is_blank(value) for value in values):
+                continue
+            yield row_number, dict(zip(headers, values))
+    finally:
+        workbook.close()
+
+
+def iter_rows(path):
+    """Dispatch to the CSV or XLSX reader by file extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return iter_csv_rows(path)
+    if extension in ('.xlsx', '.xlsm'):
+        return iter_xlsx_rows(path)
+    raise ValueError('Please upload a CSV or Excel (.xlsx) file')
+
+
+def _lookup(row, column):
+    """Return the value for ``column`` under its name or one of its aliases."""
+    for key in (column,) + COLUMN_ALIASES.get(column, ()):
+        if key in row:
+            return row[key]
+    return None
+
+
+def _to_datetime(value):
+    """Parse a date/timestamp cell (datetime, Excel serial or string); None if unparseable."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, (int, float)):
+        try:
+            return EXCEL_EPOCH + timedelta(days=value)
+        except OverflowError:
+            return None
+    text = str(value).strip()
+    for fmt in TIMESTAMP_FORMATS + DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    try:
+        return EXCEL_EPOCH + timedelta(days=float(text))
+    except (ValueError, OverflowError):
+        return None
+
+
+def _to_text(value):
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheet numbers such as phone or TIN columns
+        return str(int(value))
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return str(value).strip()
+
+
+def _to_decimal(value):
+    if isinstance(value, float):
+        value = repr(value)
+    return Decimal(str(value).strip().replace(',', ''))
+
+
+class _CopyStream:
+    """File-like object feeding COPY from a generator of text lines."""
+
+    def __init__(self, lines):
+        self._lines = lines
+        self._buffer = ''
+
+    def read(self, size=-1):
+        size = COPY_CHUNK_SIZE if size is None or size < 0 else size
+        parts = [self._buffer]
+        length = len(self._buffer)
+        while length < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            parts.append(line)
+            length += len(line)
+        data = ''.join(parts)
+        self._buffer = data[size:]
+        return data[:size]
+
+
+class CsvImportService:
+    def __init__(self, db_config, max_reported_errors=MAX_REPORTED_ERRORS, reject_probable_duplicates=False):
+        """
+        Initialize the import service.
+
+        Args:
+            db_config (dict or str): psycopg2 connection keywords, or a
+                connection string such as DATABASE_URL
+            max_reported_errors (int): Rejected rows listed in the result
+            reject_probable_duplicates (bool): Reject rows matching an existing
+                member only by name and birthdate instead of importing them
+                and listing them for review
+        """
+        self.db_config = db_config
+        self.max_reported_errors = max_reported_errors
+        self.reject_probable_duplicates = reject_probable_duplicates
+
+    def _connect(self):
+        if isinstance(self.db_config, str):
+            return psycopg2.connect(self.db_config)
+        return psycopg2.connect(**self.db_config)
+
+    def _target_columns(self, cursor):
+        """
+        Read type, nullability and size limits of the import columns.
+
+        Returns:
+            list: (name, data_type, max_length, precision, scale, required)
+                for each import column present in the table, in import order
+        """
+        cursor.execute("""
+        SELECT column_name, data_type, character_maximum_length, numeric_precision, numeric_scale,
+               is_nullable = 'NO' AND column_default IS NULL
+        FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s
+        """, (TARGET_TABLE,))
+        found = {row[0]: row for row in cursor.fetchall()}
+        if not found:
+            raise Exception(f"Table {TARGET_TABLE} does not exist")
+        return [found[name] for name in IMPORT_COLUMNS if name in found]
+
+    def normalize_row(self, row, columns):
+        """
+        Map one raw row onto the import columns and validate it.
+
+        Args:
+            row (dict): Raw row keyed by normalized header
+            columns (list): Output of _target_columns
+
+        Returns:
+            tuple: (values, errors); values is a list in ``columns`` order
+                and is only meaningful when errors is empty
+        """
+        errors = []
+        if _is_blank(_lookup(row, 'first_name')):
+            errors.append('first_name is required')
+        if _is_blank(_lookup(row, 'last_name')):
+            errors.append('last_name is required')
+        email = _lookup(row, 'email_address')
+        if _is_blank(email):
+            errors.append('email_address (or email) is required')
+        elif not EMAIL_PATTERN.match(str(email).strip()):
+            errors.append('Invalid email format')
+        if errors:
+            return None, errors
+
+        values = []
+        for name, data_type, max_length, precision, scale, required in columns:
+            raw = _lookup(row, name)
+            if _is_blank(raw):
+                value = 'pending' if name == 'status' else None
+            elif data_type in ('integer', 'smallint', 'bigint'):
+                try:
+                    number = _to_decimal(raw)
+                    if number != number.to_integral_value():
+                        raise InvalidOperation
+                    value = int(number)
+                except (InvalidOperation, ValueError):
+                    errors.append(f'{name} must be a whole number')
+                    continue
+            elif data_type == 'numeric':
+                try:
+                    value = _to_decimal(raw)
+                    if not value.is_finite():
+                        raise InvalidOperation
+                except (InvalidOperation, ValueError):
+                    errors.append(f'{name} must be a number')
+                    continue
+                if precision is not None:
+                    value = value.quantize(Decimal(1).scaleb(-(scale or 0)))
+                    if abs(value) >= Decimal(10) ** (precision - (scale or 0)):
+                        errors.append(f'{name} is out of range')
+                        continue
+            elif data_type == 'date':
+                parsed = _to_datetime(raw)
+                value = parsed.date().isoformat() if parsed else None
+            elif data_type.startswith('timestamp'):
+                parsed = _to_datetime(raw)
+                value = parsed.isoformat(sep=' ') if parsed else None
+            else:
+                value = _to_text(raw)
+                if max_length is not None and len(value) > max_length:
+                    errors.append(f'{name} must be at most {max_length} characters')
+                    continue
+            if value is None and required:
+                errors.append(f'{name} is required')
+                continue
+            values.append(value)
+
+        return values, errors
+
+    def import_file(self, path):
+        """
+        Import a CSV/XLSX file of membership applications.
+
+        Rows are validated while they are read and classified against a
+        member_dedupe.DuplicateIndex of existing members, applications and
+        the rows accepted so far. Exact duplicates and conflicts are rejected
+        before anything is written; probable duplicates (same name and
+        birthdate) are imported and listed unless reject_probable_duplicates
+        is set. Accepted rows are COPYed into a temporary table and merged in
+        one statement. The merge holds a SHARE ROW EXCLUSIVE lock on the
+        table and re-checks emails and membership numbers, so applications
+        inserted since the index was loaded are not duplicated either.
+
+        Args:
+            path (str): CSV or XLSX file
+
+        Returns:
+            dict: Result with message and the route's stats (total,
+                successful, failed, errors; each error is {line, row,
+                errors}), plus per-classification counts in duplicates,
+                probable_duplicates ({line, reason}) and the index's
+                memory use in dedupe
+        """
+        stats = {'total': 0, 'successful': 0, 'failed': 0, 'errors': []}
+        duplicates = dict.fromkeys(member_dedupe.CLASSIFICATIONS, 0)
+        probable_duplicates = []
+        index = None
+
+        def reject(line, row, errors):
+            stats['failed'] += 1
+            if len(stats['errors']) < self.max_reported_errors:
+                stats['errors'].append({'line': line, 'row': row, 'errors': errors})
+
+        try:
+            rows = iter_rows(path)
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                columns = self._target_columns(cursor)
+                names = [column[0] for column in columns]
+                positions = {name: position for position, name in enumerate(names)}
+                number_index = positions.get('applicants_membership_number')
+
+                def field(values, name):
+                    return values[positions[name]] if name in positions else None
+
+                index = member_dedupe.DuplicateIndex.load(conn)
+
+                column_list = ', '.join(names)
+                cursor.execute(f"""
+                CREATE TEMP TABLE import_rows ON COMMIT DROP AS
+                SELECT NULL::integer AS line_no, {column_list} FROM {TARGET_TABLE} WITH NO DATA
+                """)
+
+                def copy_lines():
+                    buffer = io.StringIO()
+                    writer = csv.writer(buffer, lineterminator='\n')
+                    for line, row in rows:
+                        stats['total'] += 1
+                        values, errors = self.normalize_row(row, columns)
+                        if errors:
+                            reject(line, row, errors)
+                            continue
+                        identity = (
+                            field(values, 'email_address'), field(values, 'applicants_membership_number'),
+                            field(values, 'first_name'), field(values, 'last_name'), field(values, 'date_of_birth')
+                        )
+                        classification, reason = index.classify(*identity)
+                        duplicates[classification] += 1
+                        if classification == member_dedupe.PROBABLE_DUPLICATE:
+                            if self.reject_probable_duplicates:
+                                reject(line, row, [reason])
+                                continue
+                            if len(probable_duplicates) < self.max_reported_errors:
+                                probable_duplicates.append({'line': line, 'reason': reason})
+                        elif classification != member_dedupe.NEW:
+                            reject(line, row, [reason])
+                            continue
+                        index.add(*identity)
+                        writer.writerow([line] + values)
+                        yield buffer.getvalue()
+                        buffer.seek(0)
+                        buffer.truncate()
+
+                cursor.copy_expert(
+                    f"COPY import_rows (line_no, {column_list}) FROM STDIN WITH (FORMAT csv)",
+                    _CopyStream(copy_lines())
+                )
+
+                # Temp tables are never auto-analyzed; the merge plan needs row counts
+                cursor.execute("ANALYZE import_rows")
+
+                # Imports are rare and short; serializing them keeps the
+                # duplicate check below exact
+                cursor.execute(f"LOCK TABLE {TARGET_TABLE} IN SHARE ROW EXCLUSIVE MODE")
+                # Each key is matched with its own join so both can be hash
+                # joins; an OR of IN-subqueries degrades to a per-row scan
+                # once the table no longer fits in work_mem
+                number_match = f"""
+                    UNION
+                    SELECT s.line_no FROM import_rows s
+                    JOIN {TARGET_TABLE} m ON m.applicants_membership_number = s.applicants_membership_number
+                """ if number_index is not None else ''
+                merge_cursor = conn.cursor(cursor_factory=RealDictCursor)
+                merge_cursor.execute(f"""
+                WITH rejected AS (
+                    SELECT s.line_no FROM import_rows s
+                    JOIN {TARGET_TABLE} m ON m.email_address = s.email_address
+                    {number_match}
+                ), inserted AS (
+                    INSERT INTO {TARGET_TABLE} ({column_list})
+                    SELECT {column_list} FROM import_rows s
+                    WHERE NOT EXISTS (SELECT 1 FROM rejected r WHERE r.line_no = s.line_no)
+                    ORDER BY s.line_no
+                    RETURNING 1
+                )
+                SELECT
+                    (SELECT count(*) FROM inserted) AS inserted,
+                    (SELECT count(*) FROM rejected) AS rejected,
+                    (SELECT json_agg(row_to_json(r) ORDER BY r.line_no) FROM (
+                        SELECT s.* FROM import_rows s JOIN rejected USING (line_no)
+                        ORDER BY s.line_no LIMIT %s
+                    ) r) AS rejected_rows
+                """, (self.max_reported_errors,))
+                merged = merge_cursor.fetchone()
+                merge_cursor.close()
+                cursor.close()
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+
+            stats['successful'] = merged['inserted']
+            for row in merged['rejected_rows'] or []:
+                line = row.pop('line_no')
+                reject(line, row, ['Application with this email or membership number already exists'])
+            stats['failed'] += merged['rejected'] - len(merged['rejected_rows'] or [])
+
+            outcome = {'success': True, 'message': 'Import completed'}
+        except psycopg2.Error as e:
+            outcome = {'success': False, 'message': f'Database error: {str(e)}'}
+        except Exception as e:
+            outcome = {'success': False, 'message': f'Error processing import: {str(e)}'}
+
+        outcome.update(stats)
+        outcome['duplicates'] = duplicates
+        outcome['probable_duplicates'] = probable_duplicates
+        outcome['dedupe'] = index.stats() if index is not None else None
+        return outcome
+
+
+def main():
+    """Import a file given on the command line; prints the result as JSON."""
+    if len(sys.argv) != 2:
+        print("Usage: DATABASE_URL=postgres://... python csv_import_service.py <file.csv|file.xlsx>")
+        sys.exit(1)
+    database_url = os.environ.get('DATABASE_URL')
+    if not database_url:
+        print("DATABASE_URL is not set")
+        sys.exit(1)
+
+    result = CsvImportService(database_url).import_file(sys.argv[1])
+    print(json.dumps(result, default=str))
+    if not result['success']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,7 @@
+-- NOTE: The canonical definition of member_users, loan_applications and
+-- loan_review_history now lives in member-portal/server/loan_schema.py.
+-- Prefer `python loan_cli.py --migrate` over running this script by hand.
+
 -- Enhanced loan applications table with review workflow
 -- This extends the existing loan_applications table with review fields
 
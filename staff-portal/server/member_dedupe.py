@@ -0,0 +1,219 @@
+"""
+Duplicate-member detection for bulk imports.
+
+Existing members (``member_users``) and applications
+(``membership_applications``) are loaded once into compact hashed key sets:
+each normalized key (email, member number, email+number pair,
+name+birthdate fingerprint) becomes a 64-bit hash in a sorted
+``array('Q')``. That is 8 bytes per key, looked up by binary search, instead
+of a Python string in a set. Rows of the file being imported are tracked in
+plain sets of the same hashes as they are accepted, so duplicates inside the
+file are found in the same single pass.
+
+Hashes use Python's built-in string hash. They are only compared within one
+process, and with 64 bits a false match is negligible even at millions of
+keys.
+"""
+
+import re
+import sys
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+NEW = 'new'
+EXACT_DUPLICATE = 'exact_duplicate'
+PROBABLE_DUPLICATE = 'probable_duplicate'
+CONFLICT = 'conflict'
+
+CLASSIFICATIONS = (NEW, EXACT_DUPLICATE, PROBABLE_DUPLICATE, CONFLICT)
+
+_MASK = (1 << 64) - 1
+
+# Rows fetched per round trip while loading existing keys
+LOAD_ITERSIZE = 10000
+
+
+def normalize_email(email):
+    if email is None:
+        return None
+    email = str(email).strip().lower()
+    return email or None
+
+
+def normalize_member_number(member_number):
+    if member_number is None:
+        return None
+    member_number = re.sub(r'[\s\-]+', '', str(member_number)).upper()
+    return member_number or None
+
+
+def _normalize_name(name):
+    decomposed = unicodedata.normalize('NFKD', str(name or ''))
+    return ''.join(c for c in decomposed if c.isalnum()).casefold()
+
+
+def name_fingerprint(first_name, last_name, date_of_birth):
+    """'Ma. José', 'Dela Cruz', 1990-01-02 -> 'majose|delacruz|1990-01-02'; None without a birthdate."""
+    if date_of_birth is None:
+        return None
+    first, last = _normalize_name(first_name), _normalize_name(last_name)
+    if not first or not last:
+        return None
+    birthdate = date_of_birth.isoformat() if hasattr(date_of_birth, 'isoformat') else str(date_of_birth)
+    return f"{first}|{last}|{birthdate[:10]}"
+
+
+def _hash(kind, value):
+    return hash((kind, value)) & _MASK
+
+
+class KeySet:
+    """Immutable set of 64-bit key hashes stored in a sorted array."""
+
+    def __init__(self, hashes):
+        # Repeated keys are harmless for lookups and not worth a set's memory
+        self._keys = array('Q', sorted(hashes))
+
+    def __contains__(self, key):
+        index = bisect_left(self._keys, key)
+        return index < len(self._keys) and self._keys[index] == key
+
+    def __len__(self):
+        return len(self._keys)
+
+    @property
+    def nbytes(self):
+        return len(self._keys) * self._keys.itemsize
+
+
+class DuplicateIndex:
+    """
+    Existing member keys plus the keys of rows accepted so far in one import.
+
+    ``classify`` decides, per row and before anything is written:
+
+    - exact_duplicate: the email (and member number, if given) belong to one
+      existing record or earlier row
+    - conflict: the email or member number is taken, but not as that pair
+    - probable_duplicate: same name and birthdate as an existing record or
+      earlier row, with a different email and member number
+    - new: none of the above
+    """
+
+    KINDS = ('email', 'member_number', 'pair', 'fingerprint')
+
+    def __init__(self, existing=None):
+        existing = existing or {}
+        self.existing = {kind: KeySet(existing.get(kind, ())) for kind in self.KINDS}
+        self.in_file = {kind: set() for kind in self.KINDS}
+        self.load_seconds = 0.0
+
+    @classmethod
+    def load(cls, conn, itersize=LOAD_ITERSIZE):
+        """
+        Build the index from member_users and membership_applications.
+
+        Both tables are streamed through server-side cursors; either may be
+        missing in a given database.
+
+        Args:
+            conn: Open psycopg2 connection
+            itersize (int): Rows fetched per round trip
+
+        Returns:
+            DuplicateIndex: Index of every existing member key
+        """
+        started = time.perf_counter()
+        hashes = {kind: array('Q') for kind in cls.KINDS}
+
+        cursor = conn.cursor()
+        cursor.execute("SELECT to_regclass('member_users') IS NOT NULL, to_regclass('membership_applications') IS NOT NULL")
+        has_members, has_applications = cursor.fetchone()
+        cursor.close()
+
+        sources = []
+        if has_members:
+            sources.append("SELECT user_email, member_number, NULL, NULL, NULL::date FROM member_users")
+        if has_applications:
+            sources.append("""
+            SELECT email_address, applicants_membership_number, first_name, last_name, date_of_birth
+            FROM membership_applications
+            """)
+
+        for query in sources:
+            cursor = conn.cursor(name='member_dedupe_keys')
+            cursor.itersize = itersize
+            cursor.execute(query)
+            for email, member_number, first_name, last_name, date_of_birth in cursor:
+                for kind, key in cls._keys(email, member_number, first_name, last_name, date_of_birth):
+                    hashes[kind].append(key)
+            cursor.close()
+
+        index = cls(hashes)
+        index.load_seconds = time.perf_counter() - started
+        return index
+
+    @staticmethod
+    def _keys(email, member_number, first_name=None, last_name=None, date_of_birth=None):
+        """Yield (kind, hash) for every key a record has."""
+        email = normalize_email(email)
+        member_number = normalize_member_number(member_number)
+        if email:
+            yield 'email', _hash('email', email)
+        if member_number:
+            yield 'member_number', _hash('member_number', member_number)
+        if email and member_number:
+            yield 'pair', _hash('pair', (email, member_number))
+        fingerprint = name_fingerprint(first_name, last_name, date_of_birth)
+        if fingerprint:
+            yield 'fingerprint', _hash('fingerprint', fingerprint)
+
+    def _seen(self, kind, key):
+        if key in self.existing[kind]:
+            return 'existing'
+        if key in self.in_file[kind]:
+            return 'file'
+        return None
+
+    def classify(self, email, member_number, first_name=None, last_name=None, date_of_birth=None):
+        """
+        Classify one row against existing records and earlier accepted rows.
+
+        Returns:
+            tuple: (classification, reason); reason is None for new rows
+        """
+        keys = dict(self._keys(email, member_number, first_name, last_name, date_of_birth))
+        seen = {kind: self._seen(kind, key) for kind, key in keys.items()}
+
+        def where(kind):
+            return 'an existing member' if seen[kind] == 'existing' else 'an earlier row in this file'
+
+        if 'member_number' in keys:
+            if seen.get('pair'):
+                return EXACT_DUPLICATE, f"Same email and member number as {where('pair')}"
+            if seen.get('email'):
+                return CONFLICT, f"Email belongs to {where('email')} with a different member number"
+            if seen.get('member_number'):
+                return CONFLICT, f"Member number belongs to {where('member_number')} with a different email"
+        elif seen.get('email'):
+            return EXACT_DUPLICATE, f"Same email as {where('email')}"
+        if seen.get('fingerprint'):
+            return PROBABLE_DUPLICATE, f"Same name and date of birth as {where('fingerprint')}"
+        return NEW, None
+
+    def add(self, email, member_number, first_name=None, last_name=None, date_of_birth=None):
+        """Record the keys of an accepted row so later rows are checked against it."""
+        for kind, key in self._keys(email, member_number, first_name, last_name, date_of_birth):
+            self.in_file[kind].add(key)
+
+    def stats(self):
+        """Key counts and memory used by the existing-key arrays and in-file sets."""
+        return {
+            'existing_keys': {kind: len(keys) for kind, keys in self.existing.items()},
+            'existing_bytes': sum(keys.nbytes for keys in self.existing.values()),
+            'in_file_keys': sum(len(keys) for keys in self.in_file.values()),
+            'in_file_bytes': sum(sys.getsizeof(keys) for keys in self.in_file.values()),
+            'load_seconds': round(self.load_seconds, 3)
+        }
@@ -0,0 +1,33 @@
+-- Member notification tables (run in the staff database, slz_coop_staff)
+-- The canonical definition is member-portal/server/loan_schema.py; prefer
+-- `python scripts/setup_notifications.py` or `python loan_cli.py --migrate`.
+-- Delivery: member-portal/server/notifications.py --dispatch
+
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    event_id BIGSERIAL PRIMARY KEY,
+    user_id UUID NOT NULL,
+    application_id INTEGER,
+    event_type VARCHAR(50) NOT NULL,
+    payload JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    available_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    failed_at TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES member_users(user_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS notifications (
+    id SERIAL PRIMARY KEY,
+    user_id UUID NOT NULL,
+    title VARCHAR(255) NOT NULL,
+    message TEXT NOT NULL,
+    type VARCHAR(50) DEFAULT 'info',
+    event_count INTEGER NOT NULL DEFAULT 1,
+    is_read BOOLEAN DEFAULT false,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES member_users(user_id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_user_id ON notification_outbox(user_id);
+CREATE INDEX IF NOT EXISTS idx_notifications_user_id ON notifications(user_id, created_at);
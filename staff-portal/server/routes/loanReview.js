@@ -1,8 +1,8 @@
 const express = require('express');
 const { Pool } = require('pg');
-const { spawn } = require('child_process');
 const path = require('path');
 require('dotenv').config();
+const { updateAndNotify } = require('../services/NotificationService');
 const router = express.Router();
 router.post('/applications/:id/set-loan-amount', async (req, res) => {
     try {
@@ -15,14 +15,15 @@ router.post('/applications/:id/set-loan-amount', async (req, res) => {
             WHERE application_id = $4 AND review_status = 'approved'
             RETURNING *
         `;
-        const result = await membersPool.query(updateQuery, [loan_amount, loan_duration, monthly_payment, id]);
+        const result = await updateAndNotify(
+            membersPool, updateQuery, [loan_amount, loan_duration, monthly_payment, id], 'loan_terms_set'
+        );
         if (result.rows.length === 0) {
             return res.status(404).json({
                 success: false,
                 message: 'Application not found or not approved'
             });
         }
-        // Optionally, trigger update/notification for member dashboard here
         res.json({
             success: true,
             message: 'Loan amount and duration updated',
@@ -321,7 +322,7 @@ router.post('/applications/:id/review', async (req, res) => {
         
         // params are set per action above
         
-        const result = await membersPool.query(updateQuery, params);
+        const result = await updateAndNotify(membersPool, updateQuery, params, 'review_status_changed');
         
         if (result.rows.length === 0) {
             return res.status(404).json({
@@ -434,7 +435,7 @@ router.post('/applications/:id/approve', async (req, res) => {
         console.log('Executing update query:', updateQuery);
         console.log('Query parameters:', [notes, id, reviewer_id]);
 
-        const result = await membersPool.query(updateQuery, [notes, id, reviewer_id]);
+        const result = await updateAndNotify(membersPool, updateQuery, [notes, id, reviewer_id], 'review_status_changed');
         console.log('Update query result:', result.rows);
 
         if (result.rows.length === 0) {
@@ -484,21 +485,47 @@ router.post('/applications/:id/approve', async (req, res) => {
     }
 });
 
+// Counts straight from loan_applications; used until the member portal's
+// migrations have created loan_review_stats
+const countedStatsQuery = `
+    SELECT 
+        COUNT(*) as total_applications,
+        COUNT(CASE WHEN review_status = 'pending_review' THEN 1 END) as pending_review,
+        COUNT(CASE WHEN review_status = 'under_review' THEN 1 END) as under_review,
+        COUNT(CASE WHEN review_status = 'approved' THEN 1 END) as approved,
+        COUNT(CASE WHEN review_status = 'rejected' THEN 1 END) as rejected,
+        COUNT(CASE WHEN review_status = 'returned' THEN 1 END) as returned
+    FROM loan_applications
+`;
+
+// Same totals from the trigger-maintained statistics: folded groups plus
+// the deltas not folded yet (see member-portal/server/loan_review_stats.py)
+const maintainedStatsQuery = `
+    SELECT 
+        COALESCE(SUM(application_count), 0)::bigint as total_applications,
+        COALESCE(SUM(application_count) FILTER (WHERE review_status = 'pending_review'), 0)::bigint as pending_review,
+        COALESCE(SUM(application_count) FILTER (WHERE review_status = 'under_review'), 0)::bigint as under_review,
+        COALESCE(SUM(application_count) FILTER (WHERE review_status = 'approved'), 0)::bigint as approved,
+        COALESCE(SUM(application_count) FILTER (WHERE review_status = 'rejected'), 0)::bigint as rejected,
+        COALESCE(SUM(application_count) FILTER (WHERE review_status = 'returned'), 0)::bigint as returned
+    FROM (
+        SELECT review_status, application_count FROM loan_review_stats
+        UNION ALL
+        SELECT review_status, application_count FROM loan_review_stats_deltas
+    ) combined
+`;
+
 // Get review statistics
 router.get('/statistics', async (req, res) => {
     try {
-        const statsQuery = `
-            SELECT 
-                COUNT(*) as total_applications,
-                COUNT(CASE WHEN review_status = 'pending_review' THEN 1 END) as pending_review,
-                COUNT(CASE WHEN review_status = 'under_review' THEN 1 END) as under_review,
-                COUNT(CASE WHEN review_status = 'approved' THEN 1 END) as approved,
-                COUNT(CASE WHEN review_status = 'rejected' THEN 1 END) as rejected,
-                COUNT(CASE WHEN review_status = 'returned' THEN 1 END) as returned
-            FROM loan_applications
-        `;
-        
-        const result = await membersPool.query(statsQuery);
+        let result;
+        try {
+            result = await membersPool.query(maintainedStatsQuery);
+        } catch (error) {
+            // 42P01: undefined_table
+            if (error.code !== '42P01') throw error;
+            result = await membersPool.query(countedStatsQuery);
+        }
         
         res.json({
             success: true,
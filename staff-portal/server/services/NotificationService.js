@@ -0,0 +1,50 @@
+// Queues member notifications in notification_outbox. Delivery is done by
+// member-portal/server/notifications.py (NotificationDispatcher), so a review
+// request only pays for one extra INSERT in the statement it already runs.
+
+// NOTIFY channel the dispatcher listens on
+const OUTBOX_CHANNEL = 'notification_outbox';
+
+// jsonb payload of each event type, over the updated loan_applications row
+const PAYLOADS = {
+    review_status_changed: "jsonb_build_object('review_status', review_status)",
+    loan_terms_set: "jsonb_build_object('loan_amount', loan_amount, 'loan_duration', loan_duration, 'monthly_payment', monthly_payment)"
+};
+
+// Wrap an `UPDATE loan_applications ... RETURNING *` so every updated row
+// also queues an event, in the same statement (and so the same transaction)
+function withOutbox(updateQuery, eventType) {
+    return `
+        WITH updated AS (${updateQuery}),
+        queued AS (
+            INSERT INTO notification_outbox (user_id, application_id, event_type, payload)
+            SELECT user_id, application_id, '${eventType}', ${PAYLOADS[eventType]}
+            FROM updated
+        )
+        SELECT * FROM updated
+    `;
+}
+
+// Run the update with its outbox event and wake the dispatcher. Until the
+// member portal's migrations have created notification_outbox (42P01,
+// undefined_table) the update runs on its own.
+async function updateAndNotify(pool, updateQuery, params, eventType) {
+    let result;
+    try {
+        result = await pool.query(withOutbox(updateQuery, eventType), params);
+    } catch (error) {
+        if (error.code !== '42P01') throw error;
+        return pool.query(updateQuery, params);
+    }
+    if (result.rows.length > 0) {
+        try {
+            await pool.query('SELECT pg_notify($1, \'\')', [OUTBOX_CHANNEL]);
+        } catch (error) {
+            // The dispatcher also polls, so a lost wake-up only delays delivery
+            console.error('Error signalling notification dispatcher:', error);
+        }
+    }
+    return result;
+}
+
+module.exports = { updateAndNotify, withOutbox, OUTBOX_CHANNEL };
@@ -0,0 +1,55 @@
+"""
+Tests for member_dedupe: classifying import rows against existing members and
+earlier rows of the same file.
+
+Run with: python -m pytest test_member_dedupe.py
+"""
+
+from datetime import date
+
+from member_dedupe import (CONFLICT, EXACT_DUPLICATE, NEW, PROBABLE_DUPLICATE, DuplicateIndex,
+                           name_fingerprint, normalize_member_number)
+
+
+def _index():
+    existing = {kind: [] for kind in DuplicateIndex.KINDS}
+    for kind, key in DuplicateIndex._keys('Ana@Example.com ', 'm-001', 'Ana', 'Reyes', date(1990, 1, 2)):
+        existing[kind].append(key)
+    return DuplicateIndex(existing)
+
+
+def test_classify_against_existing_members():
+    index = _index()
+
+    assert index.classify('ana@example.com', 'M 001')[0] == EXACT_DUPLICATE
+    assert index.classify('ANA@example.com', None)[0] == EXACT_DUPLICATE
+    assert index.classify('ana@example.com', 'M-002')[0] == CONFLICT
+    assert index.classify('other@example.com', 'M-001')[0] == CONFLICT
+    assert index.classify('ana.r@example.com', 'M-003', 'ANA', 'reyes', date(1990, 1, 2))[0] == PROBABLE_DUPLICATE
+    assert index.classify('new@example.com', 'M-004', 'Ana', 'Reyes', date(1991, 1, 2)) == (NEW, None)
+
+
+def test_classify_reports_where_the_match_is():
+    classification, reason = _index().classify('ana@example.com', 'M-001')
+
+    assert classification == EXACT_DUPLICATE
+    assert reason.endswith('an existing member')
+
+
+def test_accepted_rows_are_checked_against_later_rows():
+    index = _index()
+    assert index.classify('ben@example.com', 'M-010') == (NEW, None)
+    index.add('ben@example.com', 'M-010', 'Ben', 'Cruz', date(1985, 5, 6))
+
+    classification, reason = index.classify('Ben@Example.com', 'm-010')
+    assert classification == EXACT_DUPLICATE
+    assert reason.endswith('an earlier row in this file')
+    assert index.classify('ben@example.com', 'M-011')[0] == CONFLICT
+    assert index.classify('b.cruz@example.com', None, 'Ben', 'Cruz', '1985-05-06')[0] == PROBABLE_DUPLICATE
+
+
+def test_normalization():
+    assert normalize_member_number(' m-00 1 ') == 'M001'
+    assert normalize_member_number('  ') is None
+    assert name_fingerprint('Ma. José', 'Dela Cruz', date(1990, 1, 2)) == 'majose|delacruz|1990-01-02'
+    assert name_fingerprint('Ana', 'Reyes', None) is None